@@ -156,9 +156,9 @@ def generar_alertas_sistema():
     """Genera alertas del sistema basadas en métricas"""
     try:
         sys.path.append("/opt/airflow/train_simulator")
-        from alert_system import AlertSystem  # type: ignore
+        from alert_system import get_alert_system  # type: ignore
 
-        alert_system = AlertSystem()
+        alert_system = get_alert_system()
         alertas = alert_system.verificar_todas_alertas()  # type: ignore
 
         # Guardar alertas
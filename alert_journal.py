@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+alert_journal.py
+Diario de alertas solo-anexar (JSONL) con compactación y retención
+
+Sustituye la reescritura completa de ``alerts.json`` en cada alerta nueva. Cada
+cambio es una línea anexada al diario::
+
+    {"op": "add", "alert": {...}}                       # alerta nueva
+    {"op": "ack", "id": "speed_...", "at": "2026-..."}  # alerta reconocida
+
+Cuando el diario acumula demasiados registros respecto a las alertas vivas se
+compacta en segundo plano: se reescribe con una línea ``add`` por alerta
+retenida (ya con su estado de reconocimiento) y se sustituye de forma atómica.
+La retención descarta alertas reconocidas más antiguas que ``max_edad_dias`` y
+las más antiguas por encima de ``max_alertas``; las activas nunca se descartan.
+
+Al arrancar solo se reproduce el diario compactado más la cola de registros
+posteriores, acotado por la retención. Una última línea truncada (proceso
+terminado a mitad de escritura) se ignora.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    from logging_config import get_logger
+
+    logger = get_logger(__name__)
+except ImportError:
+    import logging
+
+    logger = logging.getLogger(__name__)
+
+OP_ALTA = "add"
+OP_RECONOCIMIENTO = "ack"
+
+MAX_ALERTAS = 10000
+MAX_EDAD_DIAS = 30
+# Compactar cuando los registros del archivo superan este múltiplo de las
+# alertas vivas (y al menos MIN_REGISTROS_COMPACTACION)
+FACTOR_COMPACTACION = 2.0
+MIN_REGISTROS_COMPACTACION = 1000
+
+
+def ruta_diario(alerts_file: str) -> str:
+    """Ruta del diario asociado a un ``alerts.json`` (misma base, extensión .jsonl)."""
+    return os.path.splitext(alerts_file)[0] + ".jsonl"
+
+
+class AlertJournal:
+    """Diario de alertas solo-anexar con compactación en segundo plano.
+
+    Mantiene un espejo de las alertas (diccionarios de ``Alert.to_dict``) para
+    poder compactar sin tocar los objetos del sistema de alertas.
+
+    Args:
+        ruta: Archivo JSONL del diario
+        max_alertas: Alertas retenidas como máximo tras compactar
+        max_edad_dias: Edad máxima de las alertas reconocidas retenidas
+        compactar_en_segundo_plano: Compactar en un hilo propio (False para
+            compactar en el hilo que escribe)
+        registro: Registro de métricas donde exponer las del diario
+            (None = solo ``get_metrics``)
+    """
+
+    def __init__(
+        self,
+        ruta: str,
+        max_alertas: int = MAX_ALERTAS,
+        max_edad_dias: Optional[float] = MAX_EDAD_DIAS,
+        compactar_en_segundo_plano: bool = True,
+        registro=None,
+    ):
+        self.ruta = ruta
+        self.max_alertas = max_alertas
+        self.max_edad_dias = max_edad_dias
+        self.compactar_en_segundo_plano = compactar_en_segundo_plano
+
+        self._estado: Dict[str, Dict[str, Any]] = {}
+        self._registros_archivo = 0
+        self._archivo = None
+        # Si el diario existe en disco (None = aún sin comprobar); se mantiene
+        # en memoria para no consultar el sistema de archivos en cada registro
+        self._en_disco: Optional[bool] = None
+        # Con el diario ausente, la primera escritura vuelca el estado completo
+        # (p. ej. el historial importado de alerts.json)
+        self._volcado_pendiente = False
+        self._lock = threading.Lock()
+        self._compactacion: Optional[threading.Thread] = None
+        self._durante_compactacion: Optional[List[str]] = None
+
+        self.metrics: Dict[str, Any] = {
+            "registros_escritos": 0,
+            "compactaciones": 0,
+            "descartadas_retencion": 0,
+            "lineas_corruptas": 0,
+            "compactacion_ultima_ms": 0.0,
+        }
+        if registro is not None:
+            self.metrics = registro.gauge_map(
+                "alerts_journal_", "Alert journal metric", self.metrics
+            )
+            registro.gauge_fn(
+                "alerts_journal_alertas", "Alerts held by the journal", lambda: len(self._estado)
+            )
+            registro.gauge_fn(
+                "alerts_journal_registros_archivo",
+                "Records in the journal file",
+                lambda: self._registros_archivo,
+            )
+
+    # ------------------------------------------------------------------
+    # Carga
+    # ------------------------------------------------------------------
+    def existe(self) -> bool:
+        return os.path.exists(self.ruta)
+
+    def cargar(self) -> List[Dict[str, Any]]:
+        """Reproducir el diario y devolver las alertas retenidas en orden."""
+        estado: Dict[str, Dict[str, Any]] = {}
+        registros = 0
+        try:
+            with open(self.ruta, encoding="utf-8") as f:
+                for linea in f:
+                    if not linea.strip():
+                        continue
+                    try:
+                        registro = json.loads(linea)
+                    except ValueError:
+                        self.metrics["lineas_corruptas"] += 1
+                        continue
+                    registros += 1
+                    self._aplicar(estado, registro)
+            en_disco = True
+        except FileNotFoundError:
+            en_disco = False
+        with self._lock:
+            self._en_disco = en_disco
+            self._estado = estado
+            self._registros_archivo = registros
+            self._aplicar_retencion()
+            return list(self._estado.values())
+
+    def importar(self, alertas: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Adoptar un historial existente (p. ej. el ``alerts.json`` anterior).
+
+        No escribe nada hasta el primer cambio, que vuelca el historial completo.
+        """
+        with self._lock:
+            self._estado = {a["alert_id"]: dict(a) for a in alertas}
+            self._aplicar_retencion()
+            self._volcado_pendiente = True
+            return list(self._estado.values())
+
+    @staticmethod
+    def _aplicar(estado: Dict[str, Dict[str, Any]], registro: Dict[str, Any]) -> None:
+        op = registro.get("op")
+        if op == OP_ALTA:
+            alerta = registro.get("alert") or {}
+            if "alert_id" in alerta:
+                estado.pop(alerta["alert_id"], None)  # conservar el orden de llegada
+                estado[alerta["alert_id"]] = alerta
+        elif op == OP_RECONOCIMIENTO:
+            alerta = estado.get(registro.get("id"))
+            if alerta is not None:
+                alerta["acknowledged"] = True
+                alerta["acknowledged_at"] = registro.get("at")
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+    def registrar_alta(self, alerta: Dict[str, Any]) -> None:
+        self._registrar({"op": OP_ALTA, "alert": alerta})
+
+    def registrar_reconocimiento(self, alert_id: str, momento: Optional[datetime] = None) -> None:
+        instante = (momento or datetime.now()).isoformat()
+        self._registrar({"op": OP_RECONOCIMIENTO, "id": alert_id, "at": instante})
+
+    def _registrar(self, registro: Dict[str, Any]) -> None:
+        linea = json.dumps(registro, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._aplicar(self._estado, registro)
+            if self._en_disco is None:
+                self._en_disco = self.existe()
+            if self._volcado_pendiente or not self._en_disco:
+                # Sin diario previo: volcar el estado completo (incluye este registro)
+                self._volcado_pendiente = False
+                self._reescribir_locked()
+                if self._durante_compactacion is not None:
+                    self._durante_compactacion.append(linea)
+            else:
+                self._anexar_locked(linea)
+            compactar = self._registros_archivo > max(
+                MIN_REGISTROS_COMPACTACION, FACTOR_COMPACTACION * len(self._estado)
+            )
+        if compactar:
+            self.compactar(bloquear=not self.compactar_en_segundo_plano)
+
+    def _abrir_locked(self):
+        if self._archivo is None:
+            directorio = os.path.dirname(os.path.abspath(self.ruta))
+            os.makedirs(directorio, exist_ok=True)
+            self._archivo = open(self.ruta, "a", encoding="utf-8")
+        return self._archivo
+
+    def _anexar_locked(self, linea: str) -> None:
+        archivo = self._abrir_locked()
+        archivo.write(linea)
+        archivo.flush()
+        self._registros_archivo += 1
+        self.metrics["registros_escritos"] += 1
+        if self._durante_compactacion is not None:
+            self._durante_compactacion.append(linea)
+
+    def _lineas_estado(self) -> List[str]:
+        return [
+            json.dumps({"op": OP_ALTA, "alert": a}, ensure_ascii=False, default=str) + "\n"
+            for a in self._estado.values()
+        ]
+
+    def _reescribir_locked(self) -> None:
+        self._sustituir_archivo_locked(self._lineas_estado())
+
+    def _sustituir_archivo_locked(self, lineas: List[str], tmp: Optional[str] = None) -> None:
+        """Reemplazar el diario de forma atómica por ``lineas``."""
+        if tmp is None:
+            tmp = f"{self.ruta}.tmp"
+            directorio = os.path.dirname(os.path.abspath(self.ruta))
+            os.makedirs(directorio, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.writelines(lineas)
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+        os.replace(tmp, self.ruta)
+        self._en_disco = True
+        self._registros_archivo = len(lineas)
+        self.metrics["registros_escritos"] += len(lineas)
+
+    # ------------------------------------------------------------------
+    # Compactación y retención
+    # ------------------------------------------------------------------
+    def _aplicar_retencion(self) -> int:
+        """Descartar reconocidas antiguas y el exceso sobre ``max_alertas`` (con lock)."""
+        descartar = []
+        if self.max_edad_dias is not None:
+            limite = (datetime.now() - timedelta(days=self.max_edad_dias)).isoformat()
+            descartar = [
+                alert_id
+                for alert_id, a in self._estado.items()
+                if a.get("acknowledged") and str(a.get("timestamp", "")) < limite
+            ]
+        for alert_id in descartar:
+            del self._estado[alert_id]
+        exceso = len(self._estado) - self.max_alertas
+        if exceso > 0:
+            reconocidas = sorted(
+                (str(a.get("timestamp", "")), alert_id)
+                for alert_id, a in self._estado.items()
+                if a.get("acknowledged")
+            )
+            for _, alert_id in reconocidas[:exceso]:
+                del self._estado[alert_id]
+            descartar.extend(reconocidas[:exceso])
+        self.metrics["descartadas_retencion"] += len(descartar)
+        return len(descartar)
+
+    def compactar(self, bloquear: bool = True) -> None:
+        """Reescribir el diario con las alertas retenidas.
+
+        Args:
+            bloquear: Compactar en este hilo; si es False se lanza un hilo (si
+                no hay ya una compactación en curso)
+        """
+        if not bloquear:
+            with self._lock:
+                if self._compactacion is not None and self._compactacion.is_alive():
+                    return
+                self._compactacion = threading.Thread(
+                    target=self.compactar, name="AlertJournalCompactacion", daemon=True
+                )
+                self._compactacion.start()
+            return
+
+        inicio = time.perf_counter()
+        with self._lock:
+            if self._durante_compactacion is not None:
+                return  # otra compactación en curso
+            self._aplicar_retencion()
+            lineas = self._lineas_estado()
+            self._durante_compactacion = []
+        tmp = f"{self.ruta}.compact.tmp"
+        try:
+            # La escritura del archivo nuevo no bloquea a quien anexa registros
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.writelines(lineas)
+            with self._lock:
+                pendientes = self._durante_compactacion or []
+                with open(tmp, "a", encoding="utf-8") as f:
+                    f.writelines(pendientes)
+                self._sustituir_archivo_locked(lineas + pendientes, tmp=tmp)
+                self._volcado_pendiente = False
+        except OSError as e:
+            logger.warning("No se pudo compactar el diario de alertas %s: %s", self.ruta, e)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+        finally:
+            with self._lock:
+                self._durante_compactacion = None
+        self.metrics["compactaciones"] += 1
+        self.metrics["compactacion_ultima_ms"] = (time.perf_counter() - inicio) * 1000.0
+
+    def esperar_compactacion(self, timeout: Optional[float] = None) -> None:
+        hilo = self._compactacion
+        if hilo is not None:
+            hilo.join(timeout)
+
+    def cerrar(self) -> None:
+        self.esperar_compactacion(5.0)
+        with self._lock:
+            if self._archivo is not None:
+                self._archivo.close()
+                self._archivo = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            datos = dict(self.metrics)
+            datos["alertas"] = len(self._estado)
+            datos["registros_archivo"] = self._registros_archivo
+        return datos
@@ -1,14 +1,18 @@
 # alert_system.py
 # Sistema de alertas basado en análisis estadístico para Train Simulator Autopilot
 
+import bisect
+import functools
+import itertools
 import json
 import os
+import threading
 import time
 import traceback
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
 
 import numpy as np
 import pandas as pd
@@ -27,8 +31,22 @@ except Exception:
     
 
 # Importar módulos del proyecto
+from alert_journal import AlertJournal, ruta_diario
+from metrics_registry import get_metrics_registry
+from streaming_stats import StreamingTelemetryStats
+from telemetry_bus import POLITICA_DESCARTAR_ANTIGUO, get_telemetry_bus
+from telemetry_watcher import find_telemetry_watcher
 from tsc_integration import TSCIntegration
 
+# Secuencia de alert_id del proceso: el instante solo no basta porque el mismo
+# chequeo puede disparar varias veces dentro de un segundo
+_SECUENCIA_IDS = itertools.count(1)
+
+
+def nuevo_alert_id(prefijo: str) -> str:
+    """Identificador único de alerta: ``prefijo``, instante (µs) y secuencia."""
+    return f"{prefijo}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{next(_SECUENCIA_IDS)}"
+
 
 class AlertSeverity(Enum):
     """Niveles de severidad para alertas"""
@@ -101,13 +119,235 @@ class Alert:
         )
 
 
+# Alertas conservadas en memoria; por encima se descartan las reconocidas más
+# antiguas (las activas nunca se descartan)
+MAX_ALERTAS_HISTORIAL = 10000
+# Ventana en la que una alerta del mismo tipo se considera duplicada (segundos)
+VENTANA_DUPLICADOS_S = 60
+SEVERITY_ORDER = {
+    AlertSeverity.CRITICAL: 0,
+    AlertSeverity.HIGH: 1,
+    AlertSeverity.MEDIUM: 2,
+    AlertSeverity.LOW: 3,
+}
+# Variables vigiladas por la detección de anomalías: nombre en las alertas (el
+# de las columnas de SeabornAnalysis) -> clave de la telemetría convertida
+ANOMALY_VARIABLES = {
+    "velocidad": "velocidad_actual",
+    "aceleracion": "aceleracion",
+    "rpm": "rpm",
+    "presion_freno": "presion_tubo_freno",
+}
+
+
+class AlertIndex:
+    """Historial de alertas indexado por tipo, estado y minuto.
+
+    Se comporta como la lista ``AlertSystem.alerts`` (``append``, iteración,
+    ``len``) pero mantiene índices para que las operaciones de cada ciclo no
+    recorran el historial completo:
+
+    - alertas activas (no reconocidas) por tipo: consulta y resolución
+    - última alerta de cada tipo: detección de duplicados en O(1)
+    - ``alert_id`` -> alerta: reconocimiento en O(1)
+    - cubetas por minuto: consultas por ventana de tiempo y poda por antigüedad
+
+    Las alertas se reconocen con ``reconocer``; si alguien marca
+    ``acknowledged`` directamente, los índices lo detectan de forma perezosa.
+
+    El worker de alertas agrega y resuelve alertas mientras los hilos de Flask
+    las reconocen: todas las operaciones toman ``lock`` (reentrante), que
+    ``AlertSystem`` usa también para sus operaciones compuestas.
+    """
+
+    def __init__(self, alertas: Iterable[Alert] = (), max_alertas: int = MAX_ALERTAS_HISTORIAL):
+        self.max_alertas = max_alertas
+        self.version = 0
+        self.lock = threading.RLock()
+        # Claves por identidad: el historial puede contener alert_id repetidos
+        self._alertas: Dict[int, Alert] = {}
+        self._por_id: Dict[str, Alert] = {}
+        self._activas: Dict[AlertType, Dict[int, Alert]] = {t: {} for t in AlertType}
+        self._ultima_por_tipo: Dict[AlertType, Alert] = {}
+        self._cubetas: Dict[int, Dict[int, Alert]] = {}
+        self._minutos: List[int] = []  # claves de ``_cubetas`` ordenadas
+        self.extend(alertas)
+
+    @staticmethod
+    def _minuto(momento: datetime) -> int:
+        return int(momento.timestamp() // 60)
+
+    # ------------------------------------------------------------------
+    # Interfaz de lista
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self._alertas)
+
+    def __iter__(self) -> Iterator[Alert]:
+        with self.lock:
+            return iter(list(self._alertas.values()))
+
+    def __contains__(self, alerta: object) -> bool:
+        return id(alerta) in self._alertas
+
+    def __bool__(self) -> bool:
+        return bool(self._alertas)
+
+    def append(self, alerta: Alert) -> None:
+        with self.lock:
+            self._append(alerta)
+
+    def _append(self, alerta: Alert) -> None:
+        clave = id(alerta)
+        if clave in self._alertas:
+            return
+        self._alertas[clave] = alerta
+        self._por_id[alerta.alert_id] = alerta
+        if not alerta.acknowledged:
+            self._activas[alerta.alert_type][clave] = alerta
+        ultima = self._ultima_por_tipo.get(alerta.alert_type)
+        if ultima is None or alerta.timestamp >= ultima.timestamp:
+            self._ultima_por_tipo[alerta.alert_type] = alerta
+
+        minuto = self._minuto(alerta.timestamp)
+        cubeta = self._cubetas.get(minuto)
+        if cubeta is None:
+            cubeta = self._cubetas[minuto] = {}
+            if not self._minutos or minuto > self._minutos[-1]:
+                self._minutos.append(minuto)
+            else:
+                bisect.insort(self._minutos, minuto)
+        cubeta[clave] = alerta
+        self.version += 1
+
+        # Podar por lotes (10% por encima del límite) para amortizar el coste
+        if len(self._alertas) > self.max_alertas + max(1, self.max_alertas // 10):
+            self._podar()
+
+    def extend(self, alertas: Iterable[Alert]) -> None:
+        with self.lock:
+            for alerta in alertas:
+                self._append(alerta)
+
+    def _quitar(self, clave: int, alerta: Alert) -> None:
+        del self._alertas[clave]
+        if self._por_id.get(alerta.alert_id) is alerta:
+            del self._por_id[alerta.alert_id]
+        self._activas[alerta.alert_type].pop(clave, None)
+        if self._ultima_por_tipo.get(alerta.alert_type) is alerta:
+            del self._ultima_por_tipo[alerta.alert_type]
+        minuto = self._minuto(alerta.timestamp)
+        cubeta = self._cubetas.get(minuto)
+        if cubeta is not None:
+            cubeta.pop(clave, None)
+
+    def podar(self) -> int:
+        """Descartar las alertas reconocidas más antiguas por encima de ``max_alertas``.
+
+        Returns:
+            Número de alertas descartadas
+        """
+        with self.lock:
+            return self._podar()
+
+    def _podar(self) -> int:
+        exceso = len(self._alertas) - self.max_alertas
+        descartadas = 0
+        for minuto in list(self._minutos):
+            if descartadas >= exceso:
+                break
+            cubeta = self._cubetas[minuto]
+            for clave, alerta in list(cubeta.items()):
+                if descartadas >= exceso:
+                    break
+                if alerta.acknowledged:
+                    self._quitar(clave, alerta)
+                    descartadas += 1
+        if descartadas:
+            vacias = {m for m in self._minutos if not self._cubetas[m]}
+            for minuto in vacias:
+                del self._cubetas[minuto]
+            self._minutos = [m for m in self._minutos if m not in vacias]
+            self.version += 1
+        return descartadas
+
+    # ------------------------------------------------------------------
+    # Consultas indexadas
+    # ------------------------------------------------------------------
+    def buscar(self, alert_id: str) -> Optional[Alert]:
+        with self.lock:
+            return self._por_id.get(alert_id)
+
+    def ultima(self, alert_type: AlertType) -> Optional[Alert]:
+        """Alerta más reciente del tipo (activa o reconocida)."""
+        with self.lock:
+            return self._ultima_por_tipo.get(alert_type)
+
+    def activas(self, alert_type: Optional[AlertType] = None) -> List[Alert]:
+        """Alertas no reconocidas, de un tipo o de todos (sin orden garantizado).
+
+        Es una lectura: devuelve una copia tomada bajo ``lock`` y no cambia
+        ``version``. Las marcadas como reconocidas fuera de ``reconocer`` se
+        omiten y salen del índice al podar.
+        """
+        tipos = (alert_type,) if alert_type is not None else tuple(self._activas)
+        with self.lock:
+            return [
+                alerta
+                for tipo in tipos
+                for alerta in self._activas[tipo].values()
+                if not alerta.acknowledged
+            ]
+
+    def num_activas(self, alert_type: AlertType) -> int:
+        return len(self.activas(alert_type))
+
+    def recientes(self, desde: datetime) -> List[Alert]:
+        """Alertas con timestamp posterior a ``desde`` (solo recorre sus cubetas)."""
+        with self.lock:
+            inicio = bisect.bisect_left(self._minutos, self._minuto(desde))
+            return [
+                alerta
+                for minuto in self._minutos[inicio:]
+                for alerta in self._cubetas[minuto].values()
+                if alerta.timestamp > desde
+            ]
+
+    def es_duplicada(self, alerta: Alert, ventana_s: float = VENTANA_DUPLICADOS_S) -> bool:
+        """Hay una alerta del mismo tipo a menos de ``ventana_s`` segundos."""
+        ultima = self.ultima(alerta.alert_type)
+        if ultima is None or ultima is alerta:
+            return False
+        return abs((ultima.timestamp - alerta.timestamp).total_seconds()) < ventana_s
+
+    def reconocer(self, alerta: Alert, momento: Optional[datetime] = None) -> bool:
+        """Marcar una alerta como reconocida y sacarla del índice de activas."""
+        with self.lock:
+            if alerta.acknowledged:
+                return False
+            alerta.acknowledged = True
+            alerta.acknowledged_at = momento or datetime.now()
+            self._activas[alerta.alert_type].pop(id(alerta), None)
+            self.version += 1
+            return True
+
+
 class AlertSystem:
     """Sistema de alertas basado en análisis estadístico"""
 
-    def __init__(self, alerts_file="alerts.json", config_file="alert_config.json"):
+    def __init__(self, alerts_file="alerts.json", config_file="alert_config.json", telemetry_bus=None):
         self.alerts_file = alerts_file
         self.config_file = config_file
-        self.tsc_integration = TSCIntegration()
+        # Diario solo-anexar junto a alerts.json (alerts.jsonl); alerts.json solo
+        # se lee para importar el historial anterior
+        registro = get_metrics_registry()
+        self.journal = AlertJournal(
+            ruta_diario(alerts_file), max_alertas=MAX_ALERTAS_HISTORIAL, registro=registro
+        )
+        # Con bus compartido se reutiliza su TSCIntegration (un único lector de GetData.txt)
+        self.telemetry_bus = telemetry_bus
+        self.tsc_integration = telemetry_bus.tsc if telemetry_bus is not None else TSCIntegration()
+        self._telemetry_sub = None
         # Initialize analyzer lazily if seaborn analysis is available; otherwise keep None
         if SEABORN_AVAILABLE and SeabornAnalysis is not None:
             try:
@@ -157,8 +397,28 @@ class AlertSystem:
         # Cargar configuración
         self.config = self.load_config()
 
-        # Cargar alertas existentes
-        self.alerts: List[Alert] = self.load_alerts()
+        # Cargar alertas existentes (historial indexado por tipo, estado y minuto)
+        self.alerts: AlertIndex = AlertIndex(self.load_alerts())
+
+        # Media, desviación y cuantiles por variable, actualizados con cada
+        # snapshot para detectar anomalías sin fase de recogida de datos
+        self.streaming_stats = StreamingTelemetryStats(ANOMALY_VARIABLES)
+        for variable, stats in self.streaming_stats.stats.items():
+            for stat in stats.resumen():
+                registro.gauge_fn(
+                    "alerts_stream_stat",
+                    "Rolling telemetry statistic per variable",
+                    functools.partial(stats.estadistica, stat),
+                    {"variable": variable, "stat": stat},
+                )
+
+        # Reglas de umbral evaluadas con cada snapshot de telemetría
+        self.threshold_rules = (
+            self.check_speed_violation,
+            self.check_overheating,
+            self.check_wheelslip,
+            self.check_brake_pipe_discrepancy,
+        )
 
         # Estado para monitoreo continuo
         self.monitoring_active = False
@@ -167,12 +427,16 @@ class AlertSystem:
         self.baseline_data = {}  # Datos baseline para comparación
 
         # Métricas de alertas
-        self.metrics = {
-            "alerts_total_generated": 0,
-            "alerts_last_cycle_count": 0,
-            "alerts_active_count": len(self.alerts),
-            "last_check_duration_ms": 0.0,
-        }
+        self.metrics = registro.gauge_map(
+            "alerts_",
+            "Alert system metric",
+            {
+                "alerts_total_generated": 0,
+                "alerts_last_cycle_count": 0,
+                "alerts_active_count": len(self.alerts),
+                "last_check_duration_ms": 0.0,
+            },
+        )
 
         print("Sistema de alertas inicializado")
 
@@ -202,36 +466,48 @@ class AlertSystem:
             print(f"Error guardando configuración: {e}")
 
     def load_alerts(self) -> List[Alert]:
-        """Cargar alertas desde archivo"""
-        if os.path.exists(self.alerts_file):
-            try:
+        """Cargar alertas desde el diario (o importar el alerts.json anterior)"""
+        try:
+            if self.journal.existe():
+                alerts_data = self.journal.cargar()
+            elif os.path.exists(self.alerts_file):
                 with open(self.alerts_file, encoding="utf-8") as f:
                     alerts_data = json.load(f)
-                    # Filter out deprecated fuel_low alerts
-                    filtered = [a for a in alerts_data if a.get("alert_type") != "fuel_low"]
-                    if len(filtered) != len(alerts_data):
-                        try:
-                            with open(self.alerts_file, "w", encoding="utf-8") as wf:
-                                json.dump(filtered, wf, indent=2, ensure_ascii=False)
-                            print("[INFO] Removed legacy fuel_low alerts from alerts.json")
-                        except Exception as e:
-                            print(f"[ERROR] Could not update alerts file after pruning legacy fuel_low alerts: {e}")
-                    return [Alert.from_dict(alert_data) for alert_data in filtered]
-            except Exception as e:
-                print(f"Error cargando alertas: {e}")
+                # Filter out deprecated fuel_low alerts
+                alerts_data = self.journal.importar(
+                    a for a in alerts_data if a.get("alert_type") != "fuel_low"
+                )
+                print(f"[INFO] Historial de {self.alerts_file} importado al diario de alertas")
+            else:
+                return []
+            alerts = []
+            for alert_data in alerts_data:
+                try:
+                    alerts.append(Alert.from_dict(alert_data))
+                except Exception as e:
+                    print(f"[WARN] Alerta ignorada al cargar: {e}")
+            return alerts
+        except Exception as e:
+            print(f"Error cargando alertas: {e}")
 
         return []
 
     def save_alerts(self):
-        """Guardar alertas en archivo"""
+        """Guardar el estado completo de las alertas (compacta el diario)"""
         try:
-            alerts_data = [alert.to_dict() for alert in self.alerts]
-            with open(self.alerts_file, "w", encoding="utf-8") as f:
-                json.dump(alerts_data, f, indent=2, ensure_ascii=False)
-            print(f"Alertas guardadas en {self.alerts_file}")
+            self.journal.importar(alert.to_dict() for alert in self.alerts)
+            self.journal.compactar()
+            print(f"Alertas guardadas en {self.journal.ruta}")
         except Exception as e:
             print(f"Error guardando alertas: {e}")
 
+    def _journal_ack(self, alert: Alert) -> None:
+        """Anexar al diario el reconocimiento de ``alert``."""
+        try:
+            self.journal.registrar_reconocimiento(alert.alert_id, alert.acknowledged_at)
+        except Exception as e:
+            print(f"Error guardando reconocimiento de alerta: {e}")
+
     def _to_float(self, x: Any) -> Optional[float]:
         """Convertir de forma segura a float, devolviendo None si no es posible."""
         try:
@@ -260,7 +536,7 @@ class AlertSystem:
         if current_speed > max_speed:
             severity = AlertSeverity(self.config["speed_violation"]["severity"])
             return Alert(
-                alert_id=f"speed_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                alert_id=nuevo_alert_id("speed"),
                 alert_type=AlertType.SPEED_VIOLATION,
                 severity=severity,
                 title="Violación de Velocidad Detectada",
@@ -305,33 +581,75 @@ class AlertSystem:
                         max_z_idx = np.argmax(z_scores)
 
                         if max_z > z_threshold:
-                            severity = AlertSeverity(self.config["anomaly_detection"]["severity"])
-                            if max_z > 4.0:
-                                severity = AlertSeverity.CRITICAL
-                            elif max_z > 3.5:
-                                severity = AlertSeverity.HIGH
-
                             alerts.append(
-                                Alert(
-                                    alert_id=f"anomaly_{var}_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-                                    alert_type=AlertType.ANOMALY_DETECTED,
-                                    severity=severity,
-                                    title=f"Anomalía Detectada en {var.title()}",
-                                    message=f"Valor anómalo detectado (Z-score: {max_z:.2f}) en variable {var}",
-                                    timestamp=datetime.now(),
-                                    data={
-                                        "variable": var,
-                                        "z_score": max_z,
-                                        "threshold": z_threshold,
-                                        "anomalous_value": float(data_array[max_z_idx]),
-                                        "mean": mean_val,
-                                        "std": std_val,
-                                    },
+                                self._anomaly_alert(
+                                    var, max_z, float(data_array[max_z_idx]), mean_val, std_val
                                 )
                             )
 
         return alerts
 
+    def _anomaly_alert(
+        self, var: str, z_score: float, value: float, mean: float, std: float, **extra
+    ) -> Alert:
+        severity = AlertSeverity(self.config["anomaly_detection"]["severity"])
+        if z_score > 4.0:
+            severity = AlertSeverity.CRITICAL
+        elif z_score > 3.5:
+            severity = AlertSeverity.HIGH
+
+        data = {
+            "variable": var,
+            "z_score": z_score,
+            "threshold": self.config["anomaly_detection"]["z_score_threshold"],
+            "anomalous_value": value,
+            "mean": mean,
+            "std": std,
+        }
+        data.update(extra)
+        return Alert(
+            alert_id=nuevo_alert_id(f"anomaly_{var}"),
+            alert_type=AlertType.ANOMALY_DETECTED,
+            severity=severity,
+            title=f"Anomalía Detectada en {var.title()}",
+            message=f"Valor anómalo detectado (Z-score: {z_score:.2f}) en variable {var}",
+            timestamp=datetime.now(),
+            data=data,
+        )
+
+    def check_streaming_anomalies(self, current_data: Dict) -> List[Alert]:
+        """Actualizar las estadísticas incrementales con un snapshot y detectar anomalías.
+
+        Cada variable se compara (z-score) con la media y desviación de su
+        ventana deslizante antes de incluir la muestra: O(1) por snapshot, sin
+        recorrer un DataFrame ni esperar a recoger datos.
+        """
+        zscores = self.streaming_stats.actualizar(current_data)
+        config = self.config["anomaly_detection"]
+        if not config["enabled"]:
+            return []
+
+        alerts = []
+        for var, z_score in zscores.items():
+            stats = self.streaming_stats.stats[var]
+            # n incluye la muestra actual; el z-score usa las anteriores
+            if stats.n <= config["min_samples"] or z_score <= config["z_score_threshold"]:
+                continue
+            media, desviacion = stats.referencia
+            alerts.append(
+                self._anomaly_alert(
+                    var,
+                    z_score,
+                    stats.ultimo_valor,
+                    media,
+                    desviacion,
+                    ewma_mean=stats.ewma.media,
+                    p5=stats.cuantiles.cuantil(0.05),
+                    p95=stats.cuantiles.cuantil(0.95),
+                )
+            )
+        return alerts
+
     def check_efficiency_drop(self, recent_data: pd.DataFrame) -> Optional[Alert]:
         """Verificar caída en eficiencia"""
         if not self.config["efficiency_drop"]["enabled"] or recent_data is None:
@@ -356,7 +674,7 @@ class AlertSystem:
                 if drop_percentage > self.config["efficiency_drop"]["drop_percentage"]:
                     severity = AlertSeverity(self.config["efficiency_drop"]["severity"])
                     return Alert(
-                        alert_id=f"efficiency_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                        alert_id=nuevo_alert_id("efficiency"),
                         alert_type=AlertType.EFFICIENCY_DROP,
                         severity=severity,
                         title="Caída en Eficiencia Detectada",
@@ -396,7 +714,7 @@ class AlertSystem:
         if temperature > threshold:
             severity = AlertSeverity(self.config["overheating"]["severity"])
             return Alert(
-                alert_id=f"temp_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                alert_id=nuevo_alert_id("temp"),
                 alert_type=AlertType.OVERHEATING,
                 severity=severity,
                 title="Sobrecalentamiento Detectado",
@@ -433,7 +751,7 @@ class AlertSystem:
         if wheelslip > threshold:
             severity = AlertSeverity(self.config["wheelslip"]["severity"])
             return Alert(
-                alert_id=f"wheelslip_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                alert_id=nuevo_alert_id("wheelslip"),
                 alert_type=AlertType.WHEELSLIP,
                 severity=severity,
                 title="Deslizamiento de Ruedas Detectado",
@@ -473,7 +791,7 @@ class AlertSystem:
         if diff > threshold:
             severity = AlertSeverity(self.config.get("brake_pipe_discrepancy", {}).get("severity", "high"))
             return Alert(
-                alert_id=f"brake_pipe_diff_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                alert_id=nuevo_alert_id("brake_pipe_diff"),
                 alert_type=AlertType.BRAKE_PRESSURE_DISCREPANCY,
                 severity=severity,
                 title="Discrepancia Presión Tubo de Freno (Frente/Cola)",
@@ -489,14 +807,19 @@ class AlertSystem:
         if not self.config["performance_degradation"]["enabled"]:
             return None
 
-        # Medir tiempo de respuesta del sistema TSC
-        import time
-
-        start_time = time.time()
-
         try:
-            self.tsc_integration.leer_datos_archivo()
-            response_time = (time.time() - start_time) * 1000  # ms
+            if self.telemetry_bus is not None:
+                # El watcher compartido ya lee GetData.txt para el bus: usar su
+                # latencia escritura -> publicación en lugar de releer el archivo
+                watcher = find_telemetry_watcher(self.tsc_integration.ruta_archivo)
+                if watcher is None:
+                    return None
+                response_time = float(watcher.metrics["latencia_ultima_ms"])
+            else:
+                # Medir tiempo de respuesta del sistema TSC
+                start_time = time.time()
+                self.tsc_integration.leer_datos_archivo()
+                response_time = (time.time() - start_time) * 1000  # ms
 
             threshold = self.config["performance_degradation"].get("response_time_threshold_ms")
             try:
@@ -510,7 +833,7 @@ class AlertSystem:
             if response_time > threshold:
                 severity = AlertSeverity(self.config["performance_degradation"]["severity"])
                 return Alert(
-                    alert_id=f"perf_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                    alert_id=nuevo_alert_id("perf"),
                     alert_type=AlertType.PERFORMANCE_DEGRADATION,
                     severity=severity,
                     title="Degradación de Rendimiento",
@@ -522,7 +845,7 @@ class AlertSystem:
         except Exception as e:
             # Si hay error de conexión, generar alerta crítica
             return Alert(
-                alert_id=f"system_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                alert_id=nuevo_alert_id("system"),
                 alert_type=AlertType.SYSTEM_ERROR,
                 severity=AlertSeverity.CRITICAL,
                 title="Error de Sistema Crítico",
@@ -533,41 +856,39 @@ class AlertSystem:
 
         return None
 
-    def perform_health_check(self) -> List[Alert]:
-        """Realizar verificación completa de salud del sistema"""
+    def perform_health_check(self, current_data: Optional[Dict] = None) -> List[Alert]:
+        """Realizar verificación completa de salud del sistema
+
+        Args:
+            current_data: Telemetría ya convertida (p. ej. el snapshot del
+                dashboard). Si es None se usa el último snapshot del bus o se
+                lee el archivo.
+        """
         alerts = []
 
         start = time.time()
         try:
-            # Obtener datos actuales
-            raw_data = self.tsc_integration.leer_datos_archivo()
+            # Obtener datos actuales: los recibidos, el último snapshot del bus
+            # si existe (ya convertido), o lectura directa del archivo
+            ultimo = self.telemetry_bus.ultimo if self.telemetry_bus is not None else None
+            if current_data is not None:
+                raw_data = current_data
+            elif ultimo is not None:
+                raw_data = ultimo.raw
+                current_data = dict(ultimo.datos)
+            else:
+                raw_data = self.tsc_integration.leer_datos_archivo()
+                # Convertir datos al formato IA
+                current_data = self.tsc_integration.convertir_datos_ia(raw_data) if raw_data else None
 
             if raw_data:
-                # Convertir datos al formato IA
-                current_data = self.tsc_integration.convertir_datos_ia(raw_data)
                 # Guardar últimas lecturas para re-resolución automática
                 self.last_telemetry = current_data
 
-                # Verificar alertas basadas en datos actuales
-                # Verificar alertas basadas en datos actuales
-                speed_alert = self.check_speed_violation(current_data)
-                if speed_alert:
-                    alerts.append(speed_alert)
-
+                # Verificar alertas basadas en datos actuales (velocidad,
+                # temperatura, patinaje, discrepancia del tubo de freno)
                 # Fuel alerts removed per request - trains are always fueled
-
-                temp_alert = self.check_overheating(current_data)
-                if temp_alert:
-                    alerts.append(temp_alert)
-
-                wheelslip_alert = self.check_wheelslip(current_data)
-                if wheelslip_alert:
-                    alerts.append(wheelslip_alert)
-
-                # Verificar discrepancia de presión de tubo de freno (frente vs cola)
-                brake_diff_alert = self.check_brake_pipe_discrepancy(current_data)
-                if brake_diff_alert:
-                    alerts.append(brake_diff_alert)
+                alerts.extend(self._evaluate_threshold_rules(current_data))
 
             # Verificar rendimiento del sistema
             perf_alert = self.check_performance_degradation()
@@ -579,7 +900,7 @@ class AlertSystem:
             print(f"Error en health check: {e}\n{tb}")
             alerts.append(
                 Alert(
-                    alert_id=f"health_check_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                    alert_id=nuevo_alert_id("health_check"),
                     alert_type=AlertType.SYSTEM_ERROR,
                     severity=AlertSeverity.CRITICAL,
                     title="Error en Health Check",
@@ -598,9 +919,20 @@ class AlertSystem:
 
         return alerts
 
-    def analyze_recent_data(self, time_window_minutes: int = 10) -> List[Alert]:
-        """Analizar datos recientes para detectar anomalías y tendencias"""
+    def analyze_recent_data(
+        self, time_window_minutes: int = 10, incluir_anomalias: Optional[bool] = None
+    ) -> List[Alert]:
+        """Analizar datos recientes para detectar anomalías y tendencias
+
+        Args:
+            time_window_minutes: Minutos de datos a recoger
+            incluir_anomalias: Buscar anomalías sobre el DataFrame; por defecto
+                solo si las estadísticas incrementales aún no han recibido
+                telemetría (si la reciben, las anomalías se detectan por snapshot)
+        """
         alerts = []
+        if incluir_anomalias is None:
+            incluir_anomalias = self.streaming_stats.muestras == 0
 
         try:
             # Recopilar datos recientes
@@ -610,8 +942,9 @@ class AlertSystem:
                 # Verificar que tenemos datos antes de analizar
                 if self.analyzer.df is not None:
                     # Verificar anomalías
-                    anomaly_alerts = self.check_anomalies(self.analyzer.df)
-                    alerts.extend(anomaly_alerts)
+                    if incluir_anomalias:
+                        anomaly_alerts = self.check_anomalies(self.analyzer.df)
+                        alerts.extend(anomaly_alerts)
 
                     # Verificar caída en eficiencia
                     efficiency_alert = self.check_efficiency_drop(self.analyzer.df)
@@ -645,17 +978,8 @@ class AlertSystem:
             new_alerts.extend(analysis_alerts)
             self.last_check_time = datetime.now()
 
-        # Filtrar alertas duplicadas recientes (evitar spam)
-        filtered_alerts = self._filter_duplicate_alerts(new_alerts)
-
-        # Agregar alertas nuevas
-        for alert in filtered_alerts:
-            self.alerts.append(alert)
-            print(f"[ALERTA] Nueva alerta: {alert.title} ({alert.severity.value})")
-
-        # Guardar alertas
-        if filtered_alerts:
-            self.save_alerts()
+        # Filtrar alertas duplicadas recientes (evitar spam), agregar y guardar
+        filtered_alerts = self.registrar_alertas(new_alerts)
 
         # Intentar resolver alertas transitorias basadas en última telemetría
         try:
@@ -668,27 +992,70 @@ class AlertSystem:
     def _filter_duplicate_alerts(
         self, new_alerts: List[Alert], time_window_minutes: int = 5
     ) -> List[Alert]:
-        """Filtrar alertas duplicadas dentro de una ventana de tiempo"""
+        """Filtrar alertas duplicadas dentro de una ventana de tiempo
+
+        Una alerta es duplicada si la última del mismo tipo en el historial es
+        de los últimos ``time_window_minutes`` y está a menos de un minuto: se
+        consulta el índice por tipo en lugar de recorrer el historial.
+        """
         cutoff_time = datetime.now() - timedelta(minutes=time_window_minutes)
-        recent_alerts = [a for a in self.alerts if a.timestamp > cutoff_time]
 
         filtered = []
         for new_alert in new_alerts:
-            # Verificar si ya existe una alerta similar reciente
-            duplicate = False
-            for recent_alert in recent_alerts:
-                if (
-                    recent_alert.alert_type == new_alert.alert_type
-                    and abs((recent_alert.timestamp - new_alert.timestamp).total_seconds()) < 60
-                ):  # 1 minuto
-                    duplicate = True
-                    break
-
-            if not duplicate:
-                filtered.append(new_alert)
+            ultima = self.alerts.ultima(new_alert.alert_type)
+            if ultima is not None and ultima.timestamp > cutoff_time:
+                if self.alerts.es_duplicada(new_alert):
+                    continue
+            filtered.append(new_alert)
 
         return filtered
 
+    def registrar_alertas(self, new_alerts: List[Alert]) -> List[Alert]:
+        """Filtrar duplicadas, agregar al historial y guardar si hubo nuevas.
+
+        Returns:
+            Las alertas agregadas
+        """
+        # El alta llega al diario antes de que otro hilo pueda reconocerla
+        with self.alerts.lock:
+            filtered_alerts = self._filter_duplicate_alerts(new_alerts)
+            for alert in filtered_alerts:
+                self.alerts.append(alert)
+                try:
+                    self.journal.registrar_alta(alert.to_dict())
+                except Exception as e:
+                    print(f"Error guardando alerta: {e}")
+        for alert in filtered_alerts:
+            print(f"[ALERTA] Nueva alerta: {alert.title} ({alert.severity.value})")
+        return filtered_alerts
+
+    def _evaluate_threshold_rules(self, current_data: Dict) -> List[Alert]:
+        alerts = []
+        for rule in self.threshold_rules:
+            alert = rule(current_data)
+            if alert:
+                alerts.append(alert)
+        return alerts
+
+    def evaluate_snapshot(self, current_data: Dict) -> List[Alert]:
+        """Evaluar las reglas de umbral y las anomalías sobre un snapshot y resolver
+        las transitorias.
+
+        Evaluación incremental: cada regla es O(1) sobre el snapshot, las
+        anomalías se comparan con estadísticas de ventana deslizante, los
+        duplicados se detectan con el índice por tipo y la resolución solo
+        recorre las alertas activas de los tipos transitorios.
+
+        Returns:
+            Las alertas nuevas agregadas
+        """
+        self.last_telemetry = current_data
+        alerts = self._evaluate_threshold_rules(current_data)
+        alerts.extend(self.check_streaming_anomalies(current_data))
+        new_alerts = self.registrar_alertas(alerts)
+        self._resolve_transient_alerts(current_data)
+        return new_alerts
+
     def _resolve_transient_alerts(self, current_data: Optional[Dict] = None) -> None:
         """Marcar como reconocidas las alertas transitorias cuya condición ya se ha resuelto.
 
@@ -699,7 +1066,6 @@ class AlertSystem:
         if not current_data:
             return
 
-        changed = False
         try:
             # Speed violations
             current_speed = self._to_float(current_data.get("velocidad_actual"))
@@ -713,10 +1079,14 @@ class AlertSystem:
 
             temp_current = self._to_float(current_data.get("temperatura_motor"))
 
-            for alert in self.alerts:
-                if alert.acknowledged:
-                    continue
-                # Resolvemos solo tipo speed_violation / wheelslip / overheating
+            # Resolvemos solo tipo speed_violation / wheelslip / overheating: solo
+            # se recorren sus alertas activas, no el historial
+            transitorias = (
+                self.alerts.activas(AlertType.SPEED_VIOLATION)
+                + self.alerts.activas(AlertType.WHEELSLIP)
+                + self.alerts.activas(AlertType.OVERHEATING)
+            )
+            for alert in transitorias:
                 try:
                     if alert.alert_type == AlertType.SPEED_VIOLATION:
                         # Obtener umbral del dato de la alerta o del config
@@ -724,82 +1094,66 @@ class AlertSystem:
                         max_speed_val = self._to_float(max_speed_candidate)
                         max_speed = max_speed_val if max_speed_val is not None else self.config["speed_violation"]["max_speed"]
                         if current_speed is not None and max_speed is not None and current_speed <= float(max_speed):
-                            alert.acknowledged = True
-                            alert.acknowledged_at = datetime.now()
-                            print(f"[OK] Alerta resuelta automáticamente: {alert.alert_id} (speed)")
-                            changed = True
+                            if self.alerts.reconocer(alert):
+                                self._journal_ack(alert)
+                                print(f"[OK] Alerta resuelta automáticamente: {alert.alert_id} (speed)")
                     elif alert.alert_type == AlertType.WHEELSLIP:
                         thr_candidate = alert.data.get("threshold", self.config["wheelslip"]["threshold"])
                         thr_val = self._to_float(thr_candidate)
                         threshold = thr_val if thr_val is not None else self.config["wheelslip"]["threshold"]
                         if wheelslip_current is not None and threshold is not None and wheelslip_current <= float(threshold):
-                            alert.acknowledged = True
-                            alert.acknowledged_at = datetime.now()
-                            print(f"[OK] Alerta resuelta automáticamente: {alert.alert_id} (wheelslip)")
-                            changed = True
+                            if self.alerts.reconocer(alert):
+                                self._journal_ack(alert)
+                                print(f"[OK] Alerta resuelta automáticamente: {alert.alert_id} (wheelslip)")
                     elif alert.alert_type == AlertType.OVERHEATING:
                         th_candidate = alert.data.get("temperature_threshold", self.config["overheating"]["temperature_threshold"])
                         th_val = self._to_float(th_candidate)
                         threshold = th_val if th_val is not None else self.config["overheating"]["temperature_threshold"]
                         if temp_current is not None and threshold is not None and temp_current <= float(threshold):
-                            alert.acknowledged = True
-                            alert.acknowledged_at = datetime.now()
-                            print(f"[OK] Alerta resuelta automáticamente: {alert.alert_id} (overheating)")
-                            changed = True
+                            if self.alerts.reconocer(alert):
+                                self._journal_ack(alert)
+                                print(f"[OK] Alerta resuelta automáticamente: {alert.alert_id} (overheating)")
                 except Exception as e:
                     # No romper si hay error en evaluación de una alerta
                     print(f"[WARN] Error al evaluar resolución para {alert.alert_id}: {e}")
         except Exception as e:
             print(f"[WARN] Error evaluando alertas a resolver: {e}")
 
-        if changed:
-            self.save_alerts()
 
     def get_active_alerts(self, severity_filter: Optional[AlertSeverity] = None) -> List[Alert]:
         """Obtener alertas activas (no reconocidas)"""
-        active_alerts = [a for a in self.alerts if not a.acknowledged]
+        active_alerts = self.alerts.activas()
 
         if severity_filter:
             active_alerts = [a for a in active_alerts if a.severity == severity_filter]
 
         # Ordenar por severidad y timestamp (más recientes primero)
-        severity_order = {
-            AlertSeverity.CRITICAL: 0,
-            AlertSeverity.HIGH: 1,
-            AlertSeverity.MEDIUM: 2,
-            AlertSeverity.LOW: 3,
-        }
-
-        active_alerts.sort(key=lambda x: (severity_order[x.severity], -x.timestamp.timestamp()))
+        active_alerts.sort(key=lambda x: (SEVERITY_ORDER[x.severity], -x.timestamp.timestamp()))
         return active_alerts
 
     def acknowledge_alert(self, alert_id: str) -> bool:
         """Marcar alerta como reconocida"""
-        for alert in self.alerts:
-            if alert.alert_id == alert_id and not alert.acknowledged:
-                alert.acknowledged = True
-                alert.acknowledged_at = datetime.now()
-                self.save_alerts()
-                print(f"[OK] Alerta {alert_id} reconocida")
-                return True
-
-        return False
+        with self.alerts.lock:
+            alert = self.alerts.buscar(alert_id)
+            if alert is None or not self.alerts.reconocer(alert):
+                return False
+        self._journal_ack(alert)
+        print(f"[OK] Alerta {alert_id} reconocida")
+        return True
 
     def get_alerts_summary(self) -> Dict:
         """Obtener resumen de alertas"""
-        total_alerts = len(self.alerts)
-        active_alerts = len(self.get_active_alerts())
+        with self.alerts.lock:
+            total_alerts = len(self.alerts)
+            activas = self.alerts.activas()
+        active_alerts = len(activas)
         acknowledged_alerts = total_alerts - active_alerts
 
-        severity_counts = {}
-        for severity in AlertSeverity:
-            severity_counts[severity.value] = len(self.get_active_alerts(severity))
-
-        type_counts = {}
-        for alert_type in AlertType:
-            type_counts[alert_type.value] = len(
-                [a for a in self.get_active_alerts() if a.alert_type == alert_type]
-            )
+        severity_counts = {severity.value: 0 for severity in AlertSeverity}
+        type_counts = {alert_type.value: 0 for alert_type in AlertType}
+        for alert in activas:
+            severity_counts[alert.severity.value] += 1
+            type_counts[alert.alert_type.value] += 1
 
         return {
             "total_alerts": total_alerts,
@@ -811,10 +1165,13 @@ class AlertSystem:
         }
 
     def start_monitoring(self, interval_seconds: int = 30):
-        """Iniciar monitoreo continuo"""
-        import threading
-        import time
+        """Iniciar monitoreo continuo
 
+        El ciclo completo (health check + análisis de logs) se ejecuta cada
+        ``interval_seconds``; entre ciclos, las alertas transitorias se
+        re-evalúan con cada snapshot recibido del bus de telemetría en lugar
+        de releer el archivo con un temporizador propio.
+        """
         if self.monitoring_active:
             print("Monitoreo ya está activo")
             return
@@ -822,6 +1179,18 @@ class AlertSystem:
         self.monitoring_active = True
         print(f"Iniciando monitoreo continuo (intervalo: {interval_seconds}s)")
 
+        try:
+            if self.telemetry_bus is None:
+                self.telemetry_bus = get_telemetry_bus(self.tsc_integration)
+            self._telemetry_sub = self.telemetry_bus.subscribe(
+                "alerts", capacidad=256, politica=POLITICA_DESCARTAR_ANTIGUO
+            )
+        except Exception as e:
+            self._telemetry_sub = None
+            print(f"[WARN] Bus de telemetría no disponible: {e}")
+
+        sub = self._telemetry_sub
+
         def monitoring_loop():
             while self.monitoring_active:
                 try:
@@ -829,25 +1198,297 @@ class AlertSystem:
                 except Exception as e:
                     print(f"Error en ciclo de monitoreo: {e}")
 
-                time.sleep(interval_seconds)
+                fin = time.monotonic() + interval_seconds
+                while self.monitoring_active:
+                    restante = fin - time.monotonic()
+                    if restante <= 0:
+                        break
+                    if sub is None or sub.cerrada:
+                        time.sleep(min(restante, 1.0))
+                        continue
+                    snapshot = sub.get(timeout=min(restante, 1.0))
+                    if snapshot is not None:
+                        try:
+                            self._on_telemetry_snapshot(snapshot)
+                        except Exception as e:
+                            print(f"[WARN] Error procesando telemetría: {e}")
 
         monitoring_thread = threading.Thread(target=monitoring_loop, daemon=True)
         monitoring_thread.start()
 
+    def _on_telemetry_snapshot(self, snapshot) -> None:
+        """Evaluar las reglas de umbral y resolver alertas transitorias con el snapshot."""
+        self.evaluate_snapshot(dict(snapshot.datos))
+
     def stop_monitoring(self):
         """Detener monitoreo continuo"""
         self.monitoring_active = False
+        if self._telemetry_sub is not None:
+            self._telemetry_sub.cerrar()
+            self._telemetry_sub = None
+        self.journal.cerrar()
         print("Monitoreo detenido")
 
 
+class AlertWorker:
+    """Evaluación de alertas en un hilo propio con un resumen cacheado y versionado.
+
+    El bucle de telemetría del dashboard no debe pagar la evaluación de alertas
+    (persistencia de alertas, análisis de datos recientes que bloquea minutos):
+    este worker evalúa el snapshot que le entrega ``proveedor_telemetria`` cada
+    ``intervalo`` segundos, lanza el análisis estadístico en otro hilo cada
+    ``intervalo_analisis`` y publica un resumen que se lee sin trabajo adicional.
+
+    Si el sistema de alertas tiene bus de telemetría, el worker se suscribe a
+    él para alimentar las estadísticas de anomalías con todos los snapshots
+    (no solo con el último de cada ciclo).
+
+    Args:
+        alert_system: Sistema de alertas a evaluar
+        proveedor_telemetria: Callable que devuelve la telemetría actual ya
+            convertida (None para usar el bus del sistema de alertas)
+        intervalo: Segundos entre evaluaciones del snapshot
+        intervalo_analisis: Segundos entre análisis de datos recientes
+    """
+
+    def __init__(
+        self,
+        alert_system: AlertSystem,
+        proveedor_telemetria: Optional[Callable[[], Optional[Dict]]] = None,
+        intervalo: float = 1.0,
+        intervalo_analisis: float = 300.0,
+    ):
+        self.alert_system = alert_system
+        self.proveedor_telemetria = proveedor_telemetria
+        self.intervalo = intervalo
+        self.intervalo_analisis = intervalo_analisis
+
+        self.version = 0
+        self._resumen: Dict[str, Any] = self._construir_resumen([])
+        self._version_alertas: Optional[int] = None
+        self._analisis_pendientes: List[Alert] = []
+        self._analisis_hilo: Optional[threading.Thread] = None
+        self._ultimo_analisis: Optional[float] = None
+
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._activo = False
+        self._hilo: Optional[threading.Thread] = None
+        self._stats_sub = None
+
+        registro = get_metrics_registry()
+        self.metrics: Dict[str, Any] = registro.gauge_map(
+            "alerts_worker_",
+            "Alert worker metric",
+            {
+                "ciclos": 0,
+                "errores": 0,
+                "analisis_ejecutados": 0,
+                "ciclo_ultimo_ms": 0.0,
+                "ciclo_max_ms": 0.0,
+            },
+        )
+        registro.gauge_fn(
+            "alerts_worker_version", "Alert worker summary version", lambda: self.version
+        )
+        registro.gauge_fn(
+            "alerts_worker_muestras_estadisticas",
+            "Telemetry samples fed to the streaming statistics",
+            lambda: self.alert_system.streaming_stats.muestras,
+        )
+        registro.gauge_fn(
+            "alerts_worker_analisis_en_curso",
+            "1 while a recent-data analysis is running",
+            self._analisis_en_curso,
+        )
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+    def iniciar(self) -> None:
+        """Arrancar el hilo del worker (idempotente)."""
+        with self._lock:
+            if self._activo:
+                return
+            self._activo = True
+        bus = self.alert_system.telemetry_bus
+        if bus is not None:
+            try:
+                self._stats_sub = bus.subscribe(
+                    "alert_stats", capacidad=256, politica=POLITICA_DESCARTAR_ANTIGUO
+                )
+            except Exception as e:
+                self._stats_sub = None
+                print(f"[WARN] Bus de telemetría no disponible para estadísticas: {e}")
+        self._hilo = threading.Thread(target=self._bucle, name="AlertWorker", daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout: float = 2.0) -> None:
+        self._activo = False
+        self._despertar.set()
+        if self._hilo and self._hilo is not threading.current_thread():
+            self._hilo.join(timeout=timeout)
+        self._hilo = None
+        if self._stats_sub is not None:
+            self._stats_sub.cerrar()
+            self._stats_sub = None
+
+    @property
+    def activo(self) -> bool:
+        return self._activo
+
+    def invalidar(self) -> None:
+        """Pedir una evaluación inmediata (p. ej. tras reconocer una alerta)."""
+        self._despertar.set()
+
+    def _bucle(self) -> None:
+        while self._activo:
+            self.evaluar_ahora()
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+
+    # ------------------------------------------------------------------
+    # Evaluación (hilo del worker)
+    # ------------------------------------------------------------------
+    def _telemetria_actual(self) -> Optional[Dict]:
+        if self.proveedor_telemetria is None:
+            return None
+        telemetria = self.proveedor_telemetria()
+        return dict(telemetria) if telemetria else None
+
+    def evaluar_ahora(self) -> Dict[str, Any]:
+        """Ejecutar un ciclo de evaluación y devolver el resumen publicado."""
+        inicio = time.perf_counter()
+        system = self.alert_system
+        try:
+            telemetria = self._telemetria_actual()
+            nuevas = system.perform_health_check(telemetria)
+            nuevas.extend(self._detectar_anomalias(telemetria))
+
+            self._lanzar_analisis_si_toca()
+            with self._lock:
+                nuevas.extend(self._analisis_pendientes)
+                self._analisis_pendientes = []
+
+            filtradas = system.registrar_alertas(nuevas)
+            system._resolve_transient_alerts(system.last_telemetry)
+            self._publicar(filtradas)
+        except Exception as e:
+            self.metrics["errores"] += 1
+            print(f"[WARN] Error en ciclo del worker de alertas: {e}")
+        finally:
+            duracion_ms = (time.perf_counter() - inicio) * 1000.0
+            self.metrics["ciclos"] += 1
+            self.metrics["ciclo_ultimo_ms"] = round(duracion_ms, 3)
+            self.metrics["ciclo_max_ms"] = max(self.metrics["ciclo_max_ms"], round(duracion_ms, 3))
+        return self.get_summary()
+
+    def _detectar_anomalias(self, telemetria: Optional[Dict]) -> List[Alert]:
+        """Alimentar las estadísticas con los snapshots recibidos desde el último ciclo."""
+        sub = self._stats_sub
+        if sub is not None:
+            snapshots = [s.datos for s in sub.drain()]
+        else:
+            snapshots = [telemetria] if telemetria else []
+        alertas: List[Alert] = []
+        for datos in snapshots:
+            alertas.extend(self.alert_system.check_streaming_anomalies(datos))
+        return alertas
+
+    def _lanzar_analisis_si_toca(self) -> None:
+        """Lanzar el análisis de datos recientes en su propio hilo si corresponde."""
+        if self.alert_system.analyzer is None:
+            return
+        ahora = time.monotonic()
+        ultimo = self._ultimo_analisis
+        if ultimo is not None and ahora - ultimo < self.intervalo_analisis:
+            return
+        if self._analisis_hilo is not None and self._analisis_hilo.is_alive():
+            return
+        self._ultimo_analisis = ahora
+        self._analisis_hilo = threading.Thread(
+            target=self._analizar, name="AlertWorkerAnalisis", daemon=True
+        )
+        self._analisis_hilo.start()
+
+    def _analizar(self) -> None:
+        alertas = self.alert_system.analyze_recent_data(time_window_minutes=5)
+        self.alert_system.last_check_time = datetime.now()
+        self.metrics["analisis_ejecutados"] += 1
+        if alertas:
+            with self._lock:
+                self._analisis_pendientes.extend(alertas)
+            self.invalidar()
+
+    # ------------------------------------------------------------------
+    # Resumen cacheado
+    # ------------------------------------------------------------------
+    def _construir_resumen(self, nuevas: List[Alert]) -> Dict[str, Any]:
+        activas = self.alert_system.get_active_alerts()
+        return {
+            "new_alerts": len(nuevas),
+            "active_alerts": len(activas),
+            "alerts": [alert.to_dict() for alert in nuevas],
+            "active_alerts_list": [a.to_dict() for a in activas],
+            "version": self.version,
+        }
+
+    def _publicar(self, nuevas: List[Alert]) -> None:
+        """Sustituir el resumen solo si cambiaron las alertas (nueva versión)."""
+        version_alertas = self.alert_system.alerts.version
+        if not nuevas and version_alertas == self._version_alertas:
+            return
+        self.version += 1
+        resumen = self._construir_resumen(nuevas)
+        with self._lock:
+            self._version_alertas = version_alertas
+            self._resumen = resumen
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Último resumen publicado (mismo formato que ``check_alerts`` más ``version``)."""
+        with self._lock:
+            return self._resumen
+
+    def get_metrics(self) -> Dict[str, Any]:
+        datos = dict(self.metrics)
+        datos["version"] = self.version
+        datos["muestras_estadisticas"] = self.alert_system.streaming_stats.muestras
+        datos["analisis_en_curso"] = self._analisis_en_curso()
+        return datos
+
+    def _analisis_en_curso(self) -> int:
+        return int(self._analisis_hilo is not None and self._analisis_hilo.is_alive())
+
+
 # Funciones de utilidad para integración con web dashboard
 def get_alert_system() -> AlertSystem:
     """Obtener instancia singleton del sistema de alertas"""
     if not hasattr(get_alert_system, "_instance"):
-        get_alert_system._instance = AlertSystem()
+        get_alert_system._instance = AlertSystem(telemetry_bus=get_telemetry_bus())
     return get_alert_system._instance
 
 
+def get_alert_worker(
+    proveedor_telemetria: Optional[Callable[[], Optional[Dict]]] = None,
+) -> AlertWorker:
+    """Obtener el worker singleton del sistema de alertas (sin arrancarlo)."""
+    if not hasattr(get_alert_worker, "_instance"):
+        get_alert_worker._instance = AlertWorker(get_alert_system(), proveedor_telemetria)
+    elif proveedor_telemetria is not None:
+        get_alert_worker._instance.proveedor_telemetria = proveedor_telemetria
+    return get_alert_worker._instance
+
+
+def get_cached_alerts() -> Dict:
+    """Resumen de alertas para el bucle del dashboard: nunca evalúa alertas.
+
+    Si el worker no está en marcha se devuelve el último resumen publicado (o
+    uno vacío), de modo que la latencia del llamador no depende del trabajo de
+    alertas.
+    """
+    return get_alert_worker().get_summary()
+
+
 def check_alerts() -> Dict:
     """Función para verificar alertas (llamada desde web dashboard)"""
     system = get_alert_system()
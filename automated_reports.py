@@ -13,10 +13,11 @@ from typing import Dict, List, Optional
 import pandas as pd
 import schedule
 
-from alert_system import AlertSystem
+from alert_system import get_alert_system
 
 # Importar módulos del proyecto
 from seaborn_analysis import SeabornAnalysis
+from telemetry_bus import get_telemetry_bus
 
 
 @dataclass
@@ -36,8 +37,8 @@ class AutomatedReports:
     def __init__(self, reports_dir="reports_automaticos", config_file="reports_config.json"):
         self.reports_dir = reports_dir
         self.config_file = config_file
-        self.analyzer = SeabornAnalysis(use_tsc_integration=True)
-        self.alert_system = AlertSystem()
+        self.analyzer = SeabornAnalysis(telemetry_bus=get_telemetry_bus())
+        self.alert_system = get_alert_system()
 
         # Crear directorio de reportes
         os.makedirs(self.reports_dir, exist_ok=True)
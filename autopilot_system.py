@@ -12,16 +12,27 @@ from datetime import datetime
 from typing import Any, Dict, Optional
 
 from autopilot.traction_control import TractionConfig, TractionControl  # noqa: E402
+from metrics_registry import CUBETAS_RAPIDAS_MS, get_metrics_registry
+from telemetry_bus import POLITICA_ULTIMO
 from tsc_integration import TSCIntegration
 
 logger = logging.getLogger(__name__)
 
+# Latencia de decisión de la IA (registro Prometheus, actualizado en sitio)
+_LATENCIA_DECISION = get_metrics_registry().histogram(
+    "autopilot_decision_latency_ms", "IA decision latency in ms", cubetas=CUBETAS_RAPIDAS_MS
+)
+
 
 class IASistema:
     """Sistema de Inteligencia Artificial para control de tren."""
 
-    def __init__(self):
-        """Inicializar el sistema IA."""
+    def __init__(self, registro=None):
+        """Inicializar el sistema IA.
+
+        Args:
+            registro: Registro de métricas donde exponer las de la IA (opcional)
+        """
         self.historial_decisiones = []
         self.umbral_cambio_velocidad = 0.5  # mph
         self.umbral_aceleracion_maxima = 0.8
@@ -33,6 +44,8 @@ class IASistema:
             "decision_total_time_ms": 0.0,
             "decision_last_latency_ms": 0.0,
         }
+        if registro is not None:
+            self.metrics = registro.gauge_map("autopilot_ia_", "Autopilot IA metric", self.metrics)
 
     def _to_float(self, value: Any, default: float = 0.0) -> float:
         """Coerce a value to float safely, returning `default` on failure.
@@ -194,10 +207,22 @@ class IASistema:
 class AutopilotSystem:
     """Sistema completo de piloto automático."""
 
-    def __init__(self):
-        """Inicializar el sistema de piloto automático."""
-        self.tsc = TSCIntegration()
-        self.ia = IASistema()
+    def __init__(self, telemetry_bus=None):
+        """Inicializar el sistema de piloto automático.
+
+        Args:
+            telemetry_bus: Bus de telemetría compartido (opcional). Si se indica,
+                se reutiliza su ``TSCIntegration`` y la telemetría se toma de
+                los snapshots publicados en lugar de leer GetData.txt.
+        """
+        self.telemetry_bus = telemetry_bus
+        self.tsc = telemetry_bus.tsc if telemetry_bus is not None else TSCIntegration()
+        self._telemetry_sub = (
+            telemetry_bus.subscribe("autopilot", politica=POLITICA_ULTIMO)
+            if telemetry_bus is not None
+            else None
+        )
+        self.ia = IASistema(registro=get_metrics_registry())
         self.modo_automatico = False
         self.timestamp_inicio = None
         self.sesion_activa = False
@@ -217,6 +242,41 @@ class AutopilotSystem:
         self._ai_accel_cooldown = float(os.getenv("AI_ACCEL_COOLDOWN", "1.0"))
         self._ai_accel_min_diff = float(os.getenv("AI_ACCEL_MIN_DIFF", "0.05"))
 
+    def _ai_accel_writer_callback(self, desired: float, snapped: float, sent_ts: float):
+        """Aviso del escritor: fijar cooldown y referencia si ``desired`` se escribió."""
+
+        def al_escribir(ok: bool, lote: Dict[str, Any]) -> None:
+            # Un valor posterior del mismo ciclo (p. ej. mitigación de patinaje) lo sustituyó
+            if ok and lote.get("acelerador") == desired:
+                self._last_ai_accel_sent_ts = sent_ts
+                self._last_ai_accel_sent_value = snapped
+
+        return al_escribir
+
+    def _traction_writer_callback(self, current_th: float, new_th: float):
+        """Aviso del escritor: contar la mitigación de patinaje solo si se escribió."""
+
+        def al_escribir(ok: bool, lote: Dict[str, Any]) -> None:
+            if not ok:
+                logger.warning("Traction mitigation throttle %.3f was not written", new_th)
+                return
+            try:
+                self.ia.metrics["traction_commands_sent_total"] = (
+                    int(self.ia.metrics.get("traction_commands_sent_total", 0)) + 1
+                )
+            except Exception:
+                self.ia.metrics["traction_commands_sent_total"] = 1
+            logger.info("Applied traction mitigation: throttle %.3f -> %.3f", current_th, new_th)
+
+        return al_escribir
+
+    def _leer_telemetria(self) -> Optional[Dict[str, Any]]:
+        """Telemetría del ciclo: snapshot nuevo del bus o lectura directa sin bus."""
+        if self._telemetry_sub is None:
+            return self.tsc.obtener_datos_telemetria()
+        snapshot = self._telemetry_sub.get_nowait()
+        return dict(snapshot.datos) if snapshot is not None else None
+
     def iniciar_sesion(self) -> bool:
         """
         Iniciar sesión de piloto automático.
@@ -296,7 +356,7 @@ class AutopilotSystem:
             return None
 
         # Obtener datos de telemetría
-        datos_telemetria = self.tsc.obtener_datos_telemetria()
+        datos_telemetria = self._leer_telemetria()
 
         if not datos_telemetria:
             return None
@@ -305,6 +365,7 @@ class AutopilotSystem:
         start = time.time()
         comandos = self.ia.procesar_telemetria(datos_telemetria)
         elapsed_ms = (time.time() - start) * 1000.0
+        _LATENCIA_DECISION.observar(elapsed_ms)
         # Update IA metrics
         try:
             # Ensure metrics storage is a dict; if it's None or a wrong type, initialize
@@ -358,10 +419,12 @@ class AutopilotSystem:
                     except Exception:
                         snapped = desired
                     logger.info("[IA] Computed acelerador desired=%.3f snapped=%.3f (baseline=%.3f)", desired, snapped, baseline)
-                    ok = self.tsc.enviar_comandos({"acelerador": desired})
-                    if ok:
-                        self._last_ai_accel_sent_ts = now
-                        self._last_ai_accel_sent_value = snapped
+                    # Encolado: el hilo escritor agrupa los comandos del ciclo en una escritura.
+                    # El cooldown y la referencia solo se actualizan si el valor llega a escribirse
+                    self.tsc.encolar_comandos(
+                        {"acelerador": desired},
+                        al_escribir=self._ai_accel_writer_callback(desired, snapped, now),
+                    )
         except Exception as e:
             logger.exception("Failed to send IA accelerator command: %s", e)
 
@@ -399,13 +462,10 @@ class AutopilotSystem:
                     current_th = float(datos_telemetria.get("acelerador", 0.0))
                     new_th = self.traction.compute_throttle_adjustment(current_th, True)
                     # Enviar comando de throttle (la integración mapeará a Regulator/VirtualThrottle)
-                    ok = self.tsc.enviar_comandos({"acelerador": new_th})
-                    if ok:
-                        try:
-                            self.ia.metrics["traction_commands_sent_total"] = int(self.ia.metrics.get("traction_commands_sent_total", 0)) + 1
-                        except Exception:
-                            self.ia.metrics["traction_commands_sent_total"] = 1
-                        logger.info("Applied traction mitigation: throttle %.3f -> %.3f", current_th, new_th)
+                    self.tsc.encolar_comandos(
+                        {"acelerador": new_th},
+                        al_escribir=self._traction_writer_callback(current_th, new_th),
+                    )
         except Exception as e:
             logger.exception("Error during traction detection/mitigation: %s", e)
 
@@ -449,6 +509,8 @@ class AutopilotSystem:
             self.desactivar_modo_automatico()
         if self.sesion_activa:
             self.finalizar_sesion()
+        # Escribir los comandos aún encolados y detener el hilo escritor
+        self.tsc.detener_command_writer()
 
     def modo_prueba_interactivo(self):
         """Modo de prueba interactivo."""
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+cache_engine.py
+Caché LRU con expiración por TTL en O(1), límite en bytes y estadísticas por namespace
+
+Sustituye a ``SmartCache`` (desalojo con ``min()`` sobre todos los accesos y
+limpieza de expirados recorriendo la caché entera):
+
+- LRU sobre un ``OrderedDict``: ``get``, ``put`` y desalojo en O(1)
+- Expiración con una rueda de tiempo (timing wheel): cada entrada se apunta
+  en la ranura de su instante de expiración y avanzar la rueda solo visita
+  las ranuras vencidas; además ``get`` comprueba la expiración exacta
+- Límite por número de entradas y por bytes (tamaño que ocuparía el valor en
+  JSON, estimado recorriéndolo sin serializarlo; el llamador puede pasarlo)
+- Namespaces con TTL propio, límite de entradas propio opcional y, también
+  opcional, una fuente de versión (p. ej. la versión del snapshot de
+  telemetría): una entrada guardada con otra versión se invalida al leerla
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from stream_encoding import estimar_bytes_json
+
+MAX_ENTRADAS = 1024
+MAX_BYTES = 16 * 1024 * 1024
+TTL_POR_DEFECTO = 300.0
+# Rueda de tiempo: resolución de cada ranura y número de ranuras (una vuelta
+# cubre resolución * ranuras segundos; las entradas con TTL mayor dan vueltas)
+RESOLUCION_RUEDA_S = 0.25
+RANURAS_RUEDA = 512
+
+_FALTA = object()
+
+
+def estimar_tamano(valor: Any) -> int:
+    """Bytes aproximados de ``valor`` (su longitud o la de su JSON estimado)."""
+    if isinstance(valor, (bytes, bytearray, str)):
+        return len(valor)
+    return estimar_bytes_json(valor)
+
+
+class _Entrada:
+    __slots__ = ("valor", "expira", "tamano", "version")
+
+    def __init__(self, valor: Any, expira: float, tamano: int, version: Hashable):
+        self.valor = valor
+        self.expira = expira
+        self.tamano = tamano
+        self.version = version
+
+
+class _Namespace:
+    __slots__ = ("ttl", "version", "max_entradas", "orden", "stats")
+
+    def __init__(
+        self,
+        ttl: float,
+        version: Optional[Callable[[], Hashable]],
+        max_entradas: Optional[int] = None,
+    ):
+        self.ttl = ttl
+        self.version = version
+        self.max_entradas = max_entradas
+        # Claves del namespace de la menos a la más recientemente usada
+        self.orden: OrderedDict = OrderedDict()
+        self.stats = {
+            "aciertos": 0,
+            "fallos": 0,
+            "expiraciones": 0,
+            "desalojos": 0,
+            "invalidaciones": 0,
+            "rechazados": 0,
+            "entradas": 0,
+            "bytes": 0,
+        }
+
+
+class CacheEngine:
+    """Caché LRU + TTL compartida, organizada por namespaces.
+
+    Args:
+        max_entradas: Número máximo de entradas (todas los namespaces)
+        max_bytes: Tamaño máximo estimado de los valores guardados
+        resolucion_s: Segundos por ranura de la rueda de tiempo
+        ranuras: Ranuras de la rueda de tiempo
+        reloj: Fuente de tiempo monótona (inyectable en tests)
+    """
+
+    def __init__(
+        self,
+        max_entradas: int = MAX_ENTRADAS,
+        max_bytes: int = MAX_BYTES,
+        resolucion_s: float = RESOLUCION_RUEDA_S,
+        ranuras: int = RANURAS_RUEDA,
+        reloj: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.resolucion_s = resolucion_s
+        self.reloj = reloj
+        self._datos: OrderedDict[Tuple[str, Hashable], _Entrada] = OrderedDict()
+        self._namespaces: Dict[str, _Namespace] = {}
+        self._bytes = 0
+        self._rueda: List[List[Tuple[Tuple[str, Hashable], _Entrada]]] = [
+            [] for _ in range(ranuras)
+        ]
+        self._tick = int(reloj() / resolucion_s)
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # Configuración
+    # ------------------------------------------------------------------
+    def configurar(
+        self,
+        namespace: str,
+        ttl: float = TTL_POR_DEFECTO,
+        version: Optional[Callable[[], Hashable]] = None,
+        max_entradas: Optional[int] = None,
+    ) -> None:
+        """Fijar el TTL, la fuente de versión y el límite de entradas de un namespace.
+
+        ``max_entradas`` acota las entradas del namespace dentro del motor
+        compartido (None = solo el límite global); al superarlo se desaloja la
+        entrada menos usada del propio namespace.
+        """
+        with self._lock:
+            ns = self._namespaces.get(namespace)
+            if ns is None:
+                self._namespaces[namespace] = _Namespace(ttl, version, max_entradas)
+            else:
+                ns.ttl = ttl
+                ns.version = version
+                ns.max_entradas = max_entradas
+
+    def _namespace(self, namespace: str) -> _Namespace:
+        ns = self._namespaces.get(namespace)
+        if ns is None:
+            ns = self._namespaces[namespace] = _Namespace(TTL_POR_DEFECTO, None)
+        return ns
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+    def get(self, namespace: str, clave: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            ahora = self.reloj()
+            self._avanzar(ahora)
+            ns = self._namespace(namespace)
+            entrada = self._datos.get((namespace, clave))
+            if entrada is not None:
+                if entrada.expira <= ahora:
+                    self._quitar((namespace, clave), entrada, "expiraciones")
+                elif ns.version is not None and entrada.version != ns.version():
+                    self._quitar((namespace, clave), entrada, "invalidaciones")
+                else:
+                    self._datos.move_to_end((namespace, clave))
+                    ns.orden.move_to_end(clave)
+                    ns.stats["aciertos"] += 1
+                    return entrada.valor
+            ns.stats["fallos"] += 1
+            return default
+
+    def put(
+        self,
+        namespace: str,
+        clave: Hashable,
+        valor: Any,
+        ttl: Optional[float] = None,
+        tamano: Optional[int] = None,
+        version: Any = _FALTA,
+    ) -> bool:
+        """Guardar ``valor``; devuelve False si no cabe en el límite de bytes.
+
+        ``tamano`` evita la estimación cuando el llamador ya conoce los bytes.
+        ``version`` es la versión con la que se calculó el valor (por defecto la
+        actual de la fuente del namespace).
+        """
+        tamano = estimar_tamano(valor) if tamano is None else tamano
+        with self._lock:
+            ahora = self.reloj()
+            self._avanzar(ahora)
+            ns = self._namespace(namespace)
+            if tamano > self.max_bytes:
+                ns.stats["rechazados"] += 1
+                return False
+            k = (namespace, clave)
+            previa = self._datos.get(k)
+            if previa is not None:
+                self._quitar(k, previa, None)
+            if version is _FALTA:
+                version = ns.version() if ns.version is not None else None
+            entrada = _Entrada(valor, ahora + (ns.ttl if ttl is None else ttl), tamano, version)
+            while ns.orden and ns.max_entradas is not None and len(ns.orden) >= ns.max_entradas:
+                clave_lru = next(iter(ns.orden))
+                self._quitar(
+                    (namespace, clave_lru), self._datos[(namespace, clave_lru)], "desalojos"
+                )
+            while self._datos and (
+                len(self._datos) >= self.max_entradas or self._bytes + tamano > self.max_bytes
+            ):
+                k_lru, e_lru = next(iter(self._datos.items()))
+                self._quitar(k_lru, e_lru, "desalojos")
+            self._datos[k] = entrada
+            ns.orden[clave] = None
+            self._bytes += tamano
+            ns.stats["entradas"] += 1
+            ns.stats["bytes"] += tamano
+            self._programar(k, entrada)
+            return True
+
+    def obtener_o_calcular(
+        self,
+        namespace: str,
+        clave: Hashable,
+        calcular: Callable[[], Any],
+        ttl: Optional[float] = None,
+    ) -> Any:
+        """Valor cacheado o, si falta, el resultado de ``calcular()`` (que se guarda)."""
+        valor = self.get(namespace, clave, _FALTA)
+        if valor is _FALTA:
+            # La versión se toma antes de calcular: si cambia mientras tanto, el
+            # valor se invalidará en la siguiente lectura
+            fuente = self._namespace(namespace).version
+            version = fuente() if fuente is not None else None
+            valor = calcular()
+            self.put(namespace, clave, valor, ttl=ttl, version=version)
+        return valor
+
+    def invalidar(self, namespace: str, clave: Hashable = _FALTA) -> int:
+        """Invalidar una clave o, sin clave, todo el namespace."""
+        with self._lock:
+            if clave is not _FALTA:
+                entrada = self._datos.get((namespace, clave))
+                if entrada is None:
+                    return 0
+                self._quitar((namespace, clave), entrada, "invalidaciones")
+                return 1
+            claves = [k for k in self._datos if k[0] == namespace]
+            for k in claves:
+                self._quitar(k, self._datos[k], "invalidaciones")
+            return len(claves)
+
+    def limpiar_expirados(self) -> int:
+        """Avanzar la rueda de tiempo hasta ahora; devuelve las entradas expiradas."""
+        with self._lock:
+            return self._avanzar(self.reloj())
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+    def _quitar(self, k: Tuple[str, Hashable], entrada: _Entrada, motivo: Optional[str]) -> None:
+        del self._datos[k]
+        self._bytes -= entrada.tamano
+        ns = self._namespace(k[0])
+        del ns.orden[k[1]]
+        stats = ns.stats
+        stats["entradas"] -= 1
+        stats["bytes"] -= entrada.tamano
+        if motivo:
+            stats[motivo] += 1
+
+    def _programar(self, k: Tuple[str, Hashable], entrada: _Entrada) -> None:
+        tick = max(int(math.ceil(entrada.expira / self.resolucion_s)), self._tick + 1)
+        self._rueda[tick % len(self._rueda)].append((k, entrada))
+
+    def _avanzar(self, ahora: float) -> int:
+        objetivo = int(ahora / self.resolucion_s)
+        pasos = min(objetivo - self._tick, len(self._rueda))
+        expiradas = 0
+        for i in range(1, pasos + 1):
+            indice = (self._tick + i) % len(self._rueda)
+            pendientes, self._rueda[indice] = self._rueda[indice], []
+            for k, entrada in pendientes:
+                if self._datos.get(k) is not entrada:
+                    continue  # sustituida o ya eliminada
+                if entrada.expira <= ahora:
+                    self._quitar(k, entrada, "expiraciones")
+                    expiradas += 1
+                else:
+                    # Expira en una vuelta posterior de la rueda
+                    self._rueda[
+                        max(int(math.ceil(entrada.expira / self.resolucion_s)), objetivo + 1)
+                        % len(self._rueda)
+                    ].append((k, entrada))
+        if objetivo > self._tick:
+            self._tick = objetivo
+        return expiradas
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            namespaces = {}
+            for nombre, ns in self._namespaces.items():
+                datos: Dict[str, Any] = dict(ns.stats)
+                consultas = ns.stats["aciertos"] + ns.stats["fallos"]
+                datos["hit_rate"] = ns.stats["aciertos"] / consultas if consultas else 0.0
+                datos["ttl"] = ns.ttl
+                namespaces[nombre] = datos
+            return {
+                "entradas": len(self._datos),
+                "max_entradas": self.max_entradas,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "namespaces": namespaces,
+            }
+
+
+def get_cache_engine() -> CacheEngine:
+    """Obtener la caché compartida del dashboard (singleton)."""
+    if not hasattr(get_cache_engine, "_instance"):
+        get_cache_engine._instance = CacheEngine()
+    return get_cache_engine._instance
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+command_writer.py
+Escritor asíncrono de comandos con cola de coalescencia por control
+
+El ciclo de control no debe pagar la escritura de los archivos de comandos
+(archivo temporal, fsync, bloqueo con portalocker y ``os.replace`` con
+reintentos de hasta 0.6 s). Los comandos se encolan por control con política
+"el último gana" y un hilo propio los escribe juntos: una única escritura
+atómica por ventana de flush, aunque el ciclo haya enviado varios valores del
+mismo control (p. ej. acelerador de la IA y mitigación de patinaje).
+
+Los envíos síncronos (freno de emergencia, directivas del dashboard) pasan por
+el mismo escritor con ``enviar_ahora``: absorben los comandos pendientes y se
+escriben en el hilo que llama, de modo que un valor encolado antes nunca
+sobrescribe uno enviado después.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metrics_registry import LatencyHistogram, MetricsRegistry
+
+try:
+    from logging_config import get_logger
+
+    logger = get_logger(__name__)
+except ImportError:
+    import logging
+
+    logger = logging.getLogger(__name__)
+
+# Tiempo que se siguen acumulando comandos tras el primero pendiente
+VENTANA_FLUSH_S = 0.02
+
+# Aviso tras escribir un lote: ``(resultado, lote_escrito)``
+AlEscribir = Callable[[bool, Dict[str, Any]], None]
+
+
+class CommandWriter:
+    """Hilo escritor de comandos con coalescencia "el último gana" por control.
+
+    Args:
+        escribir: Función que escribe un diccionario de comandos de forma
+            síncrona y devuelve True si tuvo éxito
+            (``TSCIntegration._escribir_comandos``)
+        ventana_flush: Segundos que se acumulan comandos antes de escribir
+        registro: Registro de métricas donde exponer contadores e histogramas
+            (None = solo ``get_metrics``)
+    """
+
+    def __init__(
+        self,
+        escribir: Callable[[Dict[str, Any]], bool],
+        ventana_flush: float = VENTANA_FLUSH_S,
+        registro: Optional[MetricsRegistry] = None,
+    ):
+        self.escribir = escribir
+        self.ventana_flush = ventana_flush
+
+        self._pendientes: Dict[str, Any] = {}
+        self._avisos: List[AlEscribir] = []
+        self._primer_encolado: Optional[float] = None
+        self._cond = threading.Condition()
+        # Serializa las escrituras del hilo y las síncronas
+        self._lock_escritura = threading.Lock()
+        self._escribiendo = False
+        self._activo = False
+        self._hilo: Optional[threading.Thread] = None
+        self.ultimo_resultado: Optional[bool] = None
+
+        self.latencia_cola = LatencyHistogram()
+        self.latencia_escritura = LatencyHistogram()
+        self.metrics: Dict[str, Any] = {
+            "encolados": 0,
+            "coalescidos": 0,
+            "escrituras": 0,
+            "escrituras_sincronas": 0,
+            "errores": 0,
+            "profundidad_max": 0,
+        }
+        if registro is not None:
+            self.metrics = registro.gauge_map(
+                "tsc_io_command_writer_", "TSC I/O metric command_writer", self.metrics
+            )
+            registro.gauge_fn(
+                "tsc_io_command_writer_profundidad",
+                "Commands waiting in the writer queue",
+                lambda: self.profundidad,
+            )
+            registro.exponer(
+                "tsc_command_queue_latency_ms",
+                "Command writer queue latency in ms",
+                self.latencia_cola,
+            )
+            registro.exponer(
+                "tsc_command_write_latency_ms",
+                "Command writer write latency in ms",
+                self.latencia_escritura,
+            )
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+    def iniciar(self) -> None:
+        """Arrancar el hilo escritor (idempotente)."""
+        with self._cond:
+            if self._activo:
+                return
+            self._activo = True
+        self._hilo = threading.Thread(target=self._bucle, name="CommandWriter", daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout: float = 2.0) -> None:
+        """Escribir lo pendiente y detener el hilo."""
+        with self._cond:
+            self._activo = False
+            self._cond.notify_all()
+        if self._hilo and self._hilo is not threading.current_thread():
+            self._hilo.join(timeout=timeout)
+        self._hilo = None
+        self._flush()
+
+    @property
+    def activo(self) -> bool:
+        return self._activo
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+    def encolar(self, comandos: Dict[str, Any], al_escribir: Optional[AlEscribir] = None) -> None:
+        """Encolar comandos; un control ya pendiente se sustituye por el valor nuevo.
+
+        ``al_escribir`` se llama (en el hilo que escribe) con el resultado y el
+        lote escrito, que puede llevar un valor posterior del mismo control.
+        """
+        if not comandos:
+            return
+        with self._cond:
+            if al_escribir is not None:
+                self._avisos.append(al_escribir)
+            for control, valor in comandos.items():
+                if control in self._pendientes:
+                    self.metrics["coalescidos"] += 1
+                    del self._pendientes[control]  # conservar el orden de llegada
+                self._pendientes[control] = valor
+            self.metrics["encolados"] += len(comandos)
+            if self._primer_encolado is None:
+                self._primer_encolado = time.perf_counter()
+            self.metrics["profundidad_max"] = max(
+                self.metrics["profundidad_max"], len(self._pendientes)
+            )
+            self._cond.notify_all()
+
+    def enviar_ahora(self, comandos: Dict[str, Any]) -> bool:
+        """Escribir ``comandos`` (junto con los pendientes) en el hilo que llama."""
+        with self._lock_escritura:
+            with self._cond:
+                lote, avisos = self._tomar_pendientes_locked()
+                for control in comandos:
+                    lote.pop(control, None)
+                lote.update(comandos)
+            self.metrics["escrituras_sincronas"] += 1
+            return self._escribir_lote(lote, avisos)
+
+    def vaciar(self, timeout: Optional[float] = 2.0) -> Optional[bool]:
+        """Esperar a que se escriban los comandos pendientes.
+
+        Returns:
+            El resultado de la última escritura (None si nunca se escribió)
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pendientes or self._escribiendo:
+                if not self._activo:
+                    break
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    break
+                self._cond.wait(restante)
+            quedan = bool(self._pendientes)
+        if quedan and not self._activo:
+            self._flush()
+        return self.ultimo_resultado
+
+    @property
+    def profundidad(self) -> int:
+        return len(self._pendientes)
+
+    # ------------------------------------------------------------------
+    # Hilo escritor
+    # ------------------------------------------------------------------
+    def _bucle(self) -> None:
+        while True:
+            with self._cond:
+                while self._activo and not self._pendientes:
+                    self._cond.wait()
+                if not self._activo:
+                    return
+                # Seguir acumulando durante la ventana de flush
+                restante = self._primer_encolado + self.ventana_flush - time.perf_counter()
+                if restante > 0:
+                    self._cond.wait(restante)
+                    continue
+            self._flush()
+
+    def _tomar_pendientes_locked(self) -> Tuple[Dict[str, Any], List[AlEscribir]]:
+        lote, self._pendientes = self._pendientes, {}
+        avisos, self._avisos = self._avisos, []
+        if self._primer_encolado is not None:
+            self.latencia_cola.observar((time.perf_counter() - self._primer_encolado) * 1000.0)
+        self._primer_encolado = None
+        return lote, avisos
+
+    def _flush(self) -> None:
+        with self._lock_escritura:
+            with self._cond:
+                if not self._pendientes:
+                    return
+                lote, avisos = self._tomar_pendientes_locked()
+                self._escribiendo = True
+            try:
+                self._escribir_lote(lote, avisos)
+            finally:
+                with self._cond:
+                    self._escribiendo = False
+                    self._cond.notify_all()
+
+    def _escribir_lote(
+        self, lote: Dict[str, Any], avisos: Optional[List[AlEscribir]] = None
+    ) -> bool:
+        if not lote:
+            return True
+        inicio = time.perf_counter()
+        try:
+            resultado = bool(self.escribir(lote))
+        except Exception as e:
+            logger.warning("[TSC] Error escribiendo comandos encolados: %s", e)
+            resultado = False
+        self.latencia_escritura.observar((time.perf_counter() - inicio) * 1000.0)
+        self.metrics["escrituras"] += 1
+        if not resultado:
+            self.metrics["errores"] += 1
+        self.ultimo_resultado = resultado
+        for aviso in avisos or ():
+            try:
+                aviso(resultado, lote)
+            except Exception as e:
+                logger.warning("[TSC] Error en aviso de escritura de comandos: %s", e)
+        return resultado
+
+    def get_metrics(self) -> Dict[str, Any]:
+        datos = dict(self.metrics)
+        datos["profundidad"] = self.profundidad
+        for clave, valor in self.latencia_cola.resumen().items():
+            datos[f"latencia_cola_{clave}"] = valor
+        for clave, valor in self.latencia_escritura.resumen().items():
+            datos[f"latencia_escritura_{clave}"] = valor
+        return datos
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+getdata_parser.py
+Parser de una sola pasada para el archivo GetData.txt del Raildriver Interface
+
+El archivo se procesa como bytes, sin decodificar el contenido a texto, y los
+nombres de control se internan contra una tabla precompilada construida a
+partir de ``TSCIntegration.mapeo_controles``.
+"""
+
+import sys
+from typing import Any, Dict, Iterable, Optional
+
+try:
+    from logging_config import get_logger
+
+    logger = get_logger(__name__)
+except ImportError:
+    import logging
+
+    logger = logging.getLogger(__name__)
+
+# BOM UTF-8 tal y como aparece en disco
+UTF8_BOM = b"\xef\xbb\xbf"
+
+PREFIJO_NOMBRE = b"ControlName:"
+PREFIJO_VALOR = b"ControlValue:"
+_LEN_NOMBRE = len(PREFIJO_NOMBRE)
+_LEN_VALOR = len(PREFIJO_VALOR)
+
+# Límite de nombres desconocidos aprendidos en la tabla (protege frente a
+# archivos corruptos que generen nombres distintos en cada lectura)
+MAX_NOMBRES_APRENDIDOS = 4096
+
+
+class GetDataParser:
+    """Parser de GetData.txt con tabla de nombres de control precompilada.
+
+    La tabla se indexa por la línea ``ControlName:<nombre>`` completa, tal y
+    como aparece en disco, de modo que resolver un control conocido cuesta una
+    única búsqueda en diccionario sin recortes ni decodificación.
+    """
+
+    def __init__(self, nombres_conocidos: Optional[Iterable[str]] = None):
+        """Construir la tabla línea (bytes) -> nombre internado."""
+        self._tabla: Dict[bytes, str] = {}
+        self._aprendidos = 0
+        for nombre in nombres_conocidos or ():
+            nombre = sys.intern(nombre)
+            linea = PREFIJO_NOMBRE + nombre.encode("utf-8")
+            self._tabla[linea] = nombre
+            self._tabla[linea + b"\r"] = nombre
+
+    def __len__(self) -> int:
+        return len(self._tabla)
+
+    def _aprender(self, linea: bytes, nombre_raw: bytes) -> str:
+        """Decodificar un nombre desconocido y registrarlo en la tabla."""
+        nombre = sys.intern(nombre_raw.decode("utf-8", errors="replace"))
+        if self._aprendidos < MAX_NOMBRES_APRENDIDOS:
+            self._tabla[linea] = nombre
+            self._aprendidos += 1
+        return nombre
+
+    def parse(self, data: bytes) -> Dict[str, Any]:
+        """Parsear el contenido completo de GetData.txt en una sola pasada.
+
+        Mantiene la semántica del parser original: cada ``ControlName`` toma el
+        siguiente ``ControlValue`` disponible, los valores numéricos se
+        convierten a float y el resto se conserva como texto. Las entradas sin
+        valor (escrituras parciales al final del archivo) se ignoran.
+
+        Args:
+            data: Contenido del archivo en bytes
+
+        Returns:
+            Dict nombre de control -> valor
+        """
+        if data.startswith(UTF8_BOM):
+            data = data[len(UTF8_BOM) :]
+
+        datos: Dict[str, Any] = {}
+        buscar = self._tabla.get
+        # Caso habitual: un único nombre pendiente. ``extra`` solo se usa si
+        # aparecen varios ControlName seguidos sin ControlValue entre ellos.
+        pendiente = None
+        extra = []
+        for linea in data.split(b"\n"):
+            nombre = buscar(linea)
+            if nombre is not None:
+                if pendiente is not None:
+                    extra.append(pendiente)
+                pendiente = nombre
+                continue
+            if linea[:_LEN_VALOR] != PREFIJO_VALOR:
+                # Camino lento: espacios laterales o nombre aún no visto
+                limpia = linea.strip()
+                if limpia[:_LEN_NOMBRE] == PREFIJO_NOMBRE:
+                    if pendiente is not None:
+                        extra.append(pendiente)
+                    pendiente = self._aprender(linea, limpia[_LEN_NOMBRE:].strip())
+                    continue
+                if limpia[:_LEN_VALOR] != PREFIJO_VALOR:
+                    continue
+                linea = limpia
+            if pendiente is None:
+                continue
+            crudo = linea[_LEN_VALOR:]
+            try:
+                valor: Any = float(crudo)
+            except ValueError:
+                valor = crudo.strip().decode("utf-8", errors="replace")
+            datos[pendiente] = valor
+            pendiente = None
+            if extra:
+                for nombre in extra:
+                    datos[nombre] = valor
+                extra.clear()
+
+        if pendiente is not None:
+            # Valor faltante: registrar y continuar (evita crash por escrituras parciales)
+            for nombre in extra + [pendiente]:
+                logger.debug(
+                    "Ignoring ControlName '%s' without ControlValue (partial write)", nombre
+                )
+        return datos
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+loco_profile.py
+Perfiles de capacidades de locomotora cacheados por conjunto de controles
+
+Cada asset de TSC expone un conjunto distinto de controles en GetData.txt
+(Regulator o VirtualThrottle, VirtualBrake o TrainBrakeControl, RPM o
+RPMDelta...). En lugar de averiguar en cada tick qué controles existen, se
+calcula una huella del conjunto de nombres de control y, una vez por perfil, se
+compila un plan (mapeo de comandos con sus fallbacks y plan de conversión a
+formato IA). Los ticks siguientes solo comparan el conjunto de controles con el
+del perfil actual y ejecutan el plan compilado.
+
+Los planes se guardan en un archivo JSON para que un reinicio con la misma
+locomotora no tenga que volver a compilarlos.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Collection, Dict, FrozenSet, Optional, Tuple
+
+try:
+    from logging_config import get_logger
+
+    logger = get_logger(__name__)
+except ImportError:
+    import logging
+
+    logger = logging.getLogger(__name__)
+
+# Versión del formato del plan: al cambiarla se descartan los planes guardados
+VERSION_PLAN = 1
+# Perfiles conservados en el archivo (los más antiguos se descartan)
+MAX_PERFILES = 64
+# Variable de entorno con la ruta del archivo de perfiles ("" desactiva el guardado)
+ENV_RUTA_PERFILES = "TSC_LOCO_PROFILES_FILE"
+RUTA_PERFILES_POR_DEFECTO = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "loco_profiles.json"
+)
+
+
+def ruta_perfiles() -> Optional[str]:
+    """Ruta del archivo de perfiles según el entorno (None si está desactivado)."""
+    ruta = os.environ.get(ENV_RUTA_PERFILES, RUTA_PERFILES_POR_DEFECTO)
+    return ruta or None
+
+
+def huella_controles(controles: Collection[str], firma_config: str = "") -> str:
+    """Huella estable de un conjunto de nombres de control (y de la configuración)."""
+    h = hashlib.sha1(firma_config.encode("utf-8"))
+    for nombre in sorted(controles):
+        h.update(b"\n")
+        h.update(str(nombre).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+@dataclass
+class LocoProfile:
+    """Plan compilado para un conjunto de controles.
+
+    Attributes:
+        huella: Huella del conjunto de controles y de la configuración
+        controles: Nombres de control presentes en GetData.txt
+        conversion: Plan de conversión a formato IA (``IncrementalConverter``)
+        comandos: Comando IA -> control RailDriver con los fallbacks resueltos
+    """
+
+    huella: str
+    controles: FrozenSet[str]
+    conversion: Dict[str, Any] = field(default_factory=dict)
+    comandos: Dict[str, str] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "controles": sorted(self.controles),
+            "conversion": self.conversion,
+            "comandos": self.comandos,
+        }
+
+    @classmethod
+    def from_dict(cls, huella: str, data: Dict[str, Any]) -> "LocoProfile":
+        return cls(
+            huella=huella,
+            controles=frozenset(data["controles"]),
+            conversion=dict(data.get("conversion") or {}),
+            comandos=dict(data.get("comandos") or {}),
+        )
+
+
+class LocoProfileCache:
+    """Perfiles por conjunto de controles, en memoria y persistidos en disco.
+
+    Args:
+        constructor: Función ``controles -> (conversion, comandos)`` que compila
+            el plan de un perfil nuevo
+        ruta: Archivo JSON donde se guardan los planes (None = solo memoria)
+        firma_config: Texto que identifica la configuración de mapeos; un plan
+            guardado con otra configuración no se reutiliza
+        registro: Registro de métricas donde exponer las del caché
+            (None = solo ``get_metrics``)
+    """
+
+    def __init__(
+        self,
+        constructor: Callable[[FrozenSet[str]], Tuple[Dict[str, Any], Dict[str, str]]],
+        ruta: Optional[str] = None,
+        firma_config: str = "",
+        registro=None,
+    ):
+        self.constructor = constructor
+        self.ruta = ruta
+        self.firma_config = firma_config
+        self._actual: Optional[LocoProfile] = None
+        self._por_controles: Dict[FrozenSet[str], LocoProfile] = {}
+        self._guardados: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+        self.metrics: Dict[str, int] = {
+            "aciertos": 0,
+            "cambios_perfil": 0,
+            "compilados": 0,
+            "cargados_disco": 0,
+        }
+        if registro is not None:
+            self.metrics = registro.gauge_map(
+                "tsc_io_loco_profile_", "TSC I/O metric loco_profile", self.metrics
+            )
+            registro.gauge_fn(
+                "tsc_io_loco_profile_perfiles",
+                "Locomotive profiles compiled in memory",
+                lambda: len(self._por_controles),
+            )
+
+    @property
+    def actual(self) -> Optional[LocoProfile]:
+        return self._actual
+
+    def obtener(self, controles: Collection[str]) -> LocoProfile:
+        """Perfil del conjunto ``controles`` (p. ej. ``crudo.keys()``).
+
+        Camino rápido: si el conjunto es el del perfil actual solo se compara.
+        """
+        actual = self._actual
+        if actual is not None and controles == actual.controles:
+            self.metrics["aciertos"] += 1
+            return actual
+        clave = frozenset(controles)
+        with self._lock:
+            perfil = self._por_controles.get(clave)
+            if perfil is None:
+                perfil = self._cargar_o_compilar(clave)
+                self._por_controles[clave] = perfil
+            self._actual = perfil
+            self.metrics["cambios_perfil"] += 1
+            return perfil
+
+    def invalidar(self) -> None:
+        """Descartar los planes en memoria (p. ej. tras cambiar los mapeos)."""
+        with self._lock:
+            self._actual = None
+            self._por_controles.clear()
+
+    def _cargar_o_compilar(self, controles: FrozenSet[str]) -> LocoProfile:
+        huella = huella_controles(controles, self.firma_config)
+        guardado = self._planes_guardados().get(huella)
+        if guardado is not None:
+            try:
+                perfil = LocoProfile.from_dict(huella, guardado)
+                if perfil.controles == controles:
+                    self.metrics["cargados_disco"] += 1
+                    return perfil
+            except (KeyError, TypeError, ValueError):
+                pass
+        conversion, comandos = self.constructor(controles)
+        perfil = LocoProfile(huella, controles, conversion, comandos)
+        self.metrics["compilados"] += 1
+        logger.info(
+            "[TSC] Perfil de locomotora %s compilado (%d controles)", huella, len(controles)
+        )
+        self._guardar(perfil)
+        return perfil
+
+    # ------------------------------------------------------------------
+    # Persistencia
+    # ------------------------------------------------------------------
+    def _planes_guardados(self) -> Dict[str, Dict[str, Any]]:
+        if self._guardados is None:
+            self._guardados = {}
+            if self.ruta and os.path.exists(self.ruta):
+                try:
+                    with open(self.ruta, encoding="utf-8") as f:
+                        data = json.load(f)
+                    if data.get("version") == VERSION_PLAN:
+                        self._guardados = dict(data.get("perfiles") or {})
+                except (OSError, ValueError, AttributeError) as e:
+                    logger.warning("No se pudieron leer los perfiles de %s: %s", self.ruta, e)
+        return self._guardados
+
+    def _guardar(self, perfil: LocoProfile) -> None:
+        guardados = self._planes_guardados()
+        guardados.pop(perfil.huella, None)  # el más reciente al final
+        guardados[perfil.huella] = perfil.to_dict()
+        while len(guardados) > MAX_PERFILES:
+            del guardados[next(iter(guardados))]
+        if not self.ruta:
+            return
+        tmp = f"{self.ruta}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.ruta)), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": VERSION_PLAN, "perfiles": guardados}, f, ensure_ascii=False)
+            os.replace(tmp, self.ruta)
+        except OSError as e:
+            logger.warning("No se pudieron guardar los perfiles en %s: %s", self.ruta, e)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        datos: Dict[str, Any] = dict(self.metrics)
+        datos["perfiles"] = len(self._por_controles)
+        return datos
@@ -0,0 +1,544 @@
+#!/usr/bin/env python3
+"""
+metrics_registry.py
+Registro de métricas (contadores, gauges e histogramas) con exposición Prometheus
+
+Las métricas se crean una vez y los caminos calientes (lectura de GetData.txt,
+parseo, decisión de la IA, escritura de comandos, emisión por WebSocket) las
+actualizan en sitio: ``inc``, ``set`` u ``observar`` sobre un objeto ya
+existente, sin diccionarios intermedios ni formateo.
+
+La exposición en texto no recorre estructuras ni formatea cabeceras en cada
+scrape: al registrar una métrica se preformatean sus líneas ``# HELP`` /
+``# TYPE`` y el prefijo de cada muestra (nombre y etiquetas) en un buffer
+preasignado. ``render()`` solo escribe los valores actuales en sus posiciones
+del buffer, así que el coste del scrape es constante y no depende del tráfico.
+No depende de ``prometheus_client``.
+
+Los diccionarios ``metrics`` de cada subsistema son ``GaugeMap``: cada
+asignación de un valor numérico actualiza también su gauge en el registro. Los
+valores derivados (profundidad de una cola, suscriptores, uptime) se exponen
+como vistas que se evalúan al hacer el scrape (``gauge_fn``).
+"""
+
+import bisect
+import math
+import threading
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Límites superiores (ms) de las cubetas de los histogramas de latencia
+CUBETAS_LATENCIA_MS = (1.0, 2.0, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0)
+# Cubetas para operaciones de CPU submilisegundo (parseo, decisión de la IA)
+CUBETAS_RAPIDAS_MS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 100.0)
+# Rango y error relativo de los histogramas logarítmicos (LogHistogram)
+LOG_VALOR_MIN = 1e-3
+LOG_VALOR_MAX = 1e7
+LOG_PRECISION = 0.01
+# Cuantiles expuestos por los histogramas logarítmicos
+CUANTILES_EXPUESTOS = (0.5, 0.9, 0.99)
+
+Etiquetas = Tuple[Tuple[str, str], ...]
+
+
+def formatear_valor(valor: float) -> str:
+    """Valor de una muestra en formato de texto Prometheus."""
+    if valor == float("inf"):
+        return "+Inf"
+    if valor != valor:
+        return "NaN"
+    if isinstance(valor, int):
+        return str(valor)
+    return repr(float(valor))
+
+
+def _formatear_etiquetas(etiquetas: Etiquetas) -> str:
+    if not etiquetas:
+        return ""
+    pares = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in etiquetas
+    )
+    return "{" + pares + "}"
+
+
+class LatencyHistogram:
+    """Histograma acumulado de latencias con cubetas fijas (formato Prometheus)."""
+
+    tipo = "histogram"
+
+    def __init__(self, cubetas: Sequence[float] = CUBETAS_LATENCIA_MS):
+        self.cubetas = tuple(cubetas)
+        self.conteos = [0] * (len(self.cubetas) + 1)  # la última es +Inf
+        self.total = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+
+    def observar(self, valor_ms: float) -> None:
+        self.conteos[bisect.bisect_left(self.cubetas, valor_ms)] += 1
+        self.total += 1
+        self.suma += valor_ms
+        if valor_ms > self.maximo:
+            self.maximo = valor_ms
+
+    def percentil(self, q: float) -> float:
+        """Límite superior de la cubeta que contiene el percentil ``q`` (0-1)."""
+        if not self.total:
+            return 0.0
+        objetivo = q * self.total
+        acumulado = 0
+        for i, conteo in enumerate(self.conteos):
+            acumulado += conteo
+            if acumulado >= objetivo:
+                return self.cubetas[i] if i < len(self.cubetas) else self.maximo
+        return self.maximo
+
+    def acumulados(self) -> List[tuple]:
+        """Pares (límite, observaciones <= límite) incluyendo ``+Inf``."""
+        pares = []
+        acumulado = 0
+        for limite, conteo in zip(self.cubetas + (float("inf"),), self.conteos):
+            acumulado += conteo
+            pares.append((limite, acumulado))
+        return pares
+
+    def resumen(self) -> Dict[str, float]:
+        return {
+            "count": self.total,
+            "avg_ms": round(self.suma / self.total, 3) if self.total else 0.0,
+            "p50_ms": self.percentil(0.5),
+            "p95_ms": self.percentil(0.95),
+            "p99_ms": self.percentil(0.99),
+            "max_ms": round(self.maximo, 3),
+        }
+
+    # Forma de las muestras en la exposición: (sufijo, etiqueta extra)
+    def forma(self) -> List[Tuple[str, Optional[Tuple[str, str]]]]:
+        forma: List[Tuple[str, Optional[Tuple[str, str]]]] = [
+            ("_bucket", ("le", formatear_valor(limite)))
+            for limite in self.cubetas + (float("inf"),)
+        ]
+        forma.append(("_sum", None))
+        forma.append(("_count", None))
+        return forma
+
+    def valores(self) -> List[float]:
+        valores: List[float] = []
+        acumulado = 0
+        for conteo in self.conteos:
+            acumulado += conteo
+            valores.append(acumulado)
+        valores.append(self.suma)
+        valores.append(self.total)
+        return valores
+
+
+class Counter:
+    """Contador monótono (por convención el nombre termina en ``_total``)."""
+
+    tipo = "counter"
+
+    def __init__(self):
+        self.valor = 0.0
+
+    def inc(self, cantidad: float = 1.0) -> None:
+        self.valor += cantidad
+
+    def forma(self) -> List[Tuple[str, Optional[Tuple[str, str]]]]:
+        return [("", None)]
+
+    def valores(self) -> List[float]:
+        return [self.valor]
+
+
+class Gauge:
+    """Valor instantáneo que puede subir y bajar."""
+
+    tipo = "gauge"
+
+    def __init__(self):
+        self.valor = 0.0
+
+    def set(self, valor: float) -> None:
+        self.valor = valor
+
+    def inc(self, cantidad: float = 1.0) -> None:
+        self.valor += cantidad
+
+    def forma(self) -> List[Tuple[str, Optional[Tuple[str, str]]]]:
+        return [("", None)]
+
+    def valores(self) -> List[float]:
+        return [self.valor]
+
+
+class LogHistogram:
+    """Histograma de cubetas logarítmicas de memoria fija (estilo HDR).
+
+    Cada cubeta cubre un factor ``1 + 2 * precision`` respecto a la anterior,
+    de modo que cualquier percentil se obtiene con un error relativo de
+    ``precision`` en todo el rango ``[valor_min, valor_max]`` (con los valores
+    por defecto, ~1200 contadores). Los valores por debajo de ``valor_min``
+    (incluidos 0 y negativos) van a una cubeta de ceros y los que superan
+    ``valor_max`` a la última. Máximo, mínimo y suma son exactos.
+
+    Se expone como ``summary`` de Prometheus (cuantiles, ``_sum`` y ``_count``).
+    """
+
+    tipo = "summary"
+
+    def __init__(
+        self,
+        valor_min: float = LOG_VALOR_MIN,
+        valor_max: float = LOG_VALOR_MAX,
+        precision: float = LOG_PRECISION,
+    ):
+        self.valor_min = valor_min
+        self.valor_max = valor_max
+        self.precision = precision
+        self._log_factor = math.log1p(2 * precision)
+        self._num_cubetas = int(math.ceil(math.log(valor_max / valor_min) / self._log_factor)) + 2
+        self.conteos = array("q", [0]) * self._num_cubetas
+        self.reset()
+
+    def reset(self) -> None:
+        """Vaciar el histograma conservando la memoria."""
+        for i in range(self._num_cubetas):
+            self.conteos[i] = 0
+        self.total = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+        self.minimo = 0.0
+        # Cubetas ocupadas extremas: acotan el recorrido de los percentiles
+        self._indice_min = self._num_cubetas
+        self._indice_max = -1
+
+    def _indice(self, valor: float) -> int:
+        if not valor > self.valor_min:  # también NaN
+            return 0
+        if valor >= self.valor_max:
+            return self._num_cubetas - 1
+        return 1 + int(math.log(valor / self.valor_min) / self._log_factor)
+
+    def observar(self, valor: float) -> None:
+        i = self._indice(valor)
+        self.conteos[i] += 1
+        if i < self._indice_min:
+            self._indice_min = i
+        if i > self._indice_max:
+            self._indice_max = i
+        if not self.total or valor > self.maximo:
+            self.maximo = valor
+        if not self.total or valor < self.minimo:
+            self.minimo = valor
+        self.total += 1
+        self.suma += valor
+
+    def _representante(self, i: int) -> float:
+        if i == 0:
+            return self.minimo
+        # Punto medio geométrico de la cubeta, acotado a los extremos observados
+        valor = self.valor_min * math.exp((i - 0.5) * self._log_factor)
+        return min(max(valor, self.minimo), self.maximo)
+
+    def percentiles(self, cuantiles: Sequence[float]) -> List[float]:
+        """Valores de varios cuantiles (0-1) en un único recorrido."""
+        if not self.total:
+            return [0.0 for _ in cuantiles]
+        objetivos = sorted((max(1, math.ceil(q * self.total)), j) for j, q in enumerate(cuantiles))
+        resultado = [0.0] * len(cuantiles)
+        acumulado = 0
+        k = 0
+        for i in range(self._indice_min, self._indice_max + 1):
+            acumulado += self.conteos[i]
+            while k < len(objetivos) and acumulado >= objetivos[k][0]:
+                resultado[objetivos[k][1]] = self._representante(i)
+                k += 1
+            if k == len(objetivos):
+                break
+        return resultado
+
+    def percentil(self, q: float) -> float:
+        return self.percentiles((q,))[0]
+
+    def merge(self, otro: "LogHistogram") -> None:
+        """Sumar las observaciones de ``otro`` (misma configuración de cubetas)."""
+        if (otro.valor_min, otro.valor_max, otro.precision) != (
+            self.valor_min,
+            self.valor_max,
+            self.precision,
+        ):
+            raise ValueError("Solo se pueden combinar histogramas con las mismas cubetas")
+        if not otro.total:
+            return
+        for i in range(otro._indice_min, otro._indice_max + 1):
+            self.conteos[i] += otro.conteos[i]
+        self.maximo = otro.maximo if not self.total else max(self.maximo, otro.maximo)
+        self.minimo = otro.minimo if not self.total else min(self.minimo, otro.minimo)
+        self._indice_min = min(self._indice_min, otro._indice_min)
+        self._indice_max = max(self._indice_max, otro._indice_max)
+        self.total += otro.total
+        self.suma += otro.suma
+
+    def resumen(self) -> Dict[str, float]:
+        p50, p90, p99 = self.percentiles((0.5, 0.9, 0.99))
+        return {
+            "count": self.total,
+            "avg": round(self.suma / self.total, 3) if self.total else 0.0,
+            "min": round(self.minimo, 3),
+            "p50": round(p50, 3),
+            "p90": round(p90, 3),
+            "p99": round(p99, 3),
+            "max": round(self.maximo, 3),
+        }
+
+    def forma(self) -> List[Tuple[str, Optional[Tuple[str, str]]]]:
+        forma: List[Tuple[str, Optional[Tuple[str, str]]]] = [
+            ("", ("quantile", formatear_valor(q))) for q in CUANTILES_EXPUESTOS
+        ]
+        forma.append(("_sum", None))
+        forma.append(("_count", None))
+        return forma
+
+    def valores(self) -> List[float]:
+        return self.percentiles(CUANTILES_EXPUESTOS) + [self.suma, self.total]
+
+
+class _VistaMaximo:
+    """Gauge de solo lectura con el máximo exacto de un ``LogHistogram``."""
+
+    tipo = "gauge"
+
+    def __init__(self, hist: LogHistogram):
+        self.hist = hist
+
+    def forma(self) -> List[Tuple[str, Optional[Tuple[str, str]]]]:
+        return [("", None)]
+
+    def valores(self) -> List[float]:
+        return [self.hist.maximo]
+
+
+class _VistaFuncion:
+    """Gauge de solo lectura cuyo valor se calcula al hacer el scrape."""
+
+    tipo = "gauge"
+
+    def __init__(self, funcion: Callable[[], Optional[float]]):
+        self.funcion = funcion
+
+    def forma(self) -> List[Tuple[str, Optional[Tuple[str, str]]]]:
+        return [("", None)]
+
+    def valores(self) -> List[float]:
+        try:
+            valor = self.funcion()
+        except Exception:
+            valor = None
+        return [float("nan") if valor is None else valor]
+
+
+class GaugeMap(dict):
+    """Diccionario de métricas de un subsistema reflejado en gauges del registro.
+
+    Se usa como el ``dict`` de métricas de siempre (``metrics["x"] += 1``,
+    ``dict(metrics)``); cada valor numérico asignado actualiza además el gauge
+    ``<prefijo><clave>``, creado la primera vez que aparece la clave. Las claves
+    que ya empiezan por el prefijo no lo repiten.
+    """
+
+    def __init__(
+        self,
+        registro: "MetricsRegistry",
+        prefijo: str,
+        ayuda: str,
+        inicial: Optional[Dict[str, Any]] = None,
+        etiquetas: Optional[Dict[str, str]] = None,
+    ):
+        super().__init__()
+        self._registro = registro
+        self._prefijo = prefijo
+        self._ayuda = ayuda
+        self._etiquetas = etiquetas
+        self._gauges: Dict[str, Gauge] = {}
+        if inicial:
+            self.update(inicial)
+
+    def _gauge(self, clave: str) -> Gauge:
+        gauge = self._gauges.get(clave)
+        if gauge is None:
+            nombre = clave if clave.startswith(self._prefijo) else self._prefijo + clave
+            gauge = self._registro.gauge(nombre, f"{self._ayuda} {clave}", self._etiquetas)
+            self._gauges[clave] = gauge
+        return gauge
+
+    def __setitem__(self, clave: str, valor: Any) -> None:
+        dict.__setitem__(self, clave, valor)
+        if isinstance(valor, bool):
+            self._gauge(clave).set(int(valor))
+        elif isinstance(valor, (int, float)):
+            self._gauge(clave).set(valor)
+
+    def update(self, *args, **kwargs) -> None:
+        for clave, valor in dict(*args, **kwargs).items():
+            self[clave] = valor
+
+    def setdefault(self, clave: str, valor: Any = None) -> Any:
+        if clave not in self:
+            self[clave] = valor
+        return dict.__getitem__(self, clave)
+
+    def __reduce__(self):
+        # Copias y pickles son diccionarios normales, sin el registro
+        return (dict, (dict(self),))
+
+
+class MetricsRegistry:
+    """Registro de métricas con exposición desde un buffer preasignado.
+
+    ``counter``, ``gauge`` e ``histogram`` devuelven la métrica existente con
+    ese nombre y etiquetas o la crean; el llamador guarda la referencia y la
+    actualiza en sitio. ``exponer`` y ``gauge_fn`` publican métricas que
+    pertenecen a un objeto: la última instancia registrada es la expuesta.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # nombre -> (tipo, ayuda, {etiquetas: métrica}) en orden de registro
+        self._familias: Dict[str, Tuple[str, str, Dict[Etiquetas, object]]] = {}
+        self._buffer: List[str] = []
+        # (métrica, posición de su primera muestra, prefijos de sus muestras)
+        self._ranuras: List[Tuple[object, int, Tuple[str, ...]]] = []
+        self._obsoleto = False
+
+    # ------------------------------------------------------------------
+    # Registro
+    # ------------------------------------------------------------------
+    def counter(
+        self, nombre: str, ayuda: str, etiquetas: Optional[Dict[str, str]] = None
+    ) -> Counter:
+        return self._obtener(nombre, ayuda, etiquetas, Counter)
+
+    def gauge(self, nombre: str, ayuda: str, etiquetas: Optional[Dict[str, str]] = None) -> Gauge:
+        return self._obtener(nombre, ayuda, etiquetas, Gauge)
+
+    def histogram(
+        self,
+        nombre: str,
+        ayuda: str,
+        etiquetas: Optional[Dict[str, str]] = None,
+        cubetas: Sequence[float] = CUBETAS_LATENCIA_MS,
+    ) -> LatencyHistogram:
+        return self._obtener(nombre, ayuda, etiquetas, lambda: LatencyHistogram(cubetas))
+
+    def log_histogram(
+        self, nombre: str, ayuda: str, etiquetas: Optional[Dict[str, str]] = None
+    ) -> LogHistogram:
+        """Histograma logarítmico (summary) más un gauge ``<nombre>_max`` con su máximo."""
+        hist = self._obtener(nombre, ayuda, etiquetas, LogHistogram)
+        self._obtener(f"{nombre}_max", f"{ayuda} (max)", etiquetas, lambda: _VistaMaximo(hist))
+        return hist
+
+    def gauge_map(
+        self,
+        prefijo: str,
+        ayuda: str,
+        inicial: Optional[Dict[str, Any]] = None,
+        etiquetas: Optional[Dict[str, str]] = None,
+    ) -> GaugeMap:
+        """Diccionario de métricas cuyos valores numéricos se exponen como gauges."""
+        return GaugeMap(self, prefijo, ayuda, inicial, etiquetas)
+
+    def gauge_fn(
+        self,
+        nombre: str,
+        ayuda: str,
+        funcion: Callable[[], Optional[float]],
+        etiquetas: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """Gauge calculado por ``funcion`` en cada scrape (None se expone como NaN)."""
+        vista = self._obtener(nombre, ayuda, etiquetas, lambda: _VistaFuncion(funcion))
+        vista.funcion = funcion
+
+    def exponer(
+        self, nombre: str, ayuda: str, metrica, etiquetas: Optional[Dict[str, str]] = None
+    ) -> None:
+        """Exponer una métrica creada fuera del registro (sustituye a la anterior)."""
+        clave: Etiquetas = tuple(sorted((etiquetas or {}).items()))
+        with self._lock:
+            familia = self._familias.get(nombre)
+            if familia is None:
+                self._familias[nombre] = (metrica.tipo, ayuda, {clave: metrica})
+            elif metrica.tipo != familia[0]:
+                raise ValueError(f"La métrica {nombre} ya está registrada como {familia[0]}")
+            elif familia[2].get(clave) is metrica:
+                return
+            else:
+                familia[2][clave] = metrica
+            self._obsoleto = True
+
+    def _obtener(self, nombre, ayuda, etiquetas, fabrica):
+        clave: Etiquetas = tuple(sorted((etiquetas or {}).items()))
+        familia = self._familias.get(nombre)
+        if familia is not None:
+            metrica = familia[2].get(clave)
+            if metrica is not None:
+                return metrica
+        with self._lock:
+            familia = self._familias.get(nombre)
+            if familia is None:
+                metrica = fabrica()
+                self._familias[nombre] = (metrica.tipo, ayuda, {clave: metrica})
+            else:
+                metrica = familia[2].get(clave)
+                if metrica is not None:
+                    return metrica
+                metrica = fabrica()
+                if metrica.tipo != familia[0]:
+                    raise ValueError(f"La métrica {nombre} ya está registrada como {familia[0]}")
+                familia[2][clave] = metrica
+            self._obsoleto = True
+            return metrica
+
+    # ------------------------------------------------------------------
+    # Exposición
+    # ------------------------------------------------------------------
+    def _reconstruir_buffer(self) -> None:
+        buffer: List[str] = []
+        ranuras = []
+        for nombre, (tipo, ayuda, metricas) in self._familias.items():
+            buffer.append(f"# HELP {nombre} {ayuda}")
+            buffer.append(f"# TYPE {nombre} {tipo}")
+            for etiquetas, metrica in metricas.items():
+                prefijos = tuple(
+                    nombre
+                    + sufijo
+                    + _formatear_etiquetas(etiquetas + ((extra,) if extra else ()))
+                    + " "
+                    for sufijo, extra in metrica.forma()
+                )
+                ranuras.append((metrica, len(buffer), prefijos))
+                buffer.extend(prefijos)
+        self._buffer = buffer
+        self._ranuras = ranuras
+        self._obsoleto = False
+
+    def render(self) -> str:
+        """Texto de exposición Prometheus con los valores actuales."""
+        with self._lock:
+            if self._obsoleto:
+                self._reconstruir_buffer()
+            buffer = self._buffer
+            for metrica, inicio, prefijos in self._ranuras:
+                for i, valor in enumerate(metrica.valores()):
+                    buffer[inicio + i] = prefijos[i] + formatear_valor(valor)
+            return "\n".join(buffer) + "\n" if buffer else ""
+
+    def nombres(self) -> List[str]:
+        return list(self._familias)
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Obtener el registro global de métricas (singleton)."""
+    if not hasattr(get_metrics_registry, "_instance"):
+        get_metrics_registry._instance = MetricsRegistry()
+    return get_metrics_registry._instance
@@ -11,6 +11,8 @@ import threading
 import time
 from typing import Any, Dict, List
 
+from telemetry_watcher import get_telemetry_watcher
+
 
 class LocomotiveData:
     """Clase que representa los datos de una locomotora individual."""
@@ -422,13 +424,18 @@ class MultiLocomotiveIntegration:
 
     def _hilo_monitoreo_continuo(self):
         """Hilo para monitoreo continuo."""
+        # Leer solo cuando el plugin reescribe GetData.txt (watcher compartido)
+        watcher = get_telemetry_watcher(self.ruta_archivo)
+        version = 0
         while self.monitoreo_activo:
             try:
+                version = watcher.esperar_cambio(version, timeout=1.0)
+                if not self.monitoreo_activo:
+                    break
                 datos = self.leer_datos_todas_locomotoras()
                 if datos:
                     # Aquí se podrían emitir callbacks o señales
                     pass
-                time.sleep(self.intervalo_lectura)
             except Exception as e:
                 print(f"Error en monitoreo continuo: {e}")
                 time.sleep(0.1)
@@ -4,20 +4,146 @@ Mide el impacto de optimizaciones y detecta cuellos de botella.
 """
 
 import json
+import math
 import os
 import threading
 import time
 from collections import deque
 from datetime import datetime
-from typing import Any, Dict, List, Optional
-
-import psutil
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from cache_engine import CacheEngine, get_cache_engine
+from metrics_registry import LogHistogram, MetricsRegistry, get_metrics_registry
+from stream_encoding import estimar_bytes_json
+from system_sampler import SystemSampler
+
+# Muestras que cubre el reporte de rendimiento (5 minutos a 1 muestra/s)
+VENTANA_REPORTE = 300
+# Antigüedad máxima del resumen (percentiles) de un histograma del dashboard
+# que sigue recibiendo observaciones
+TTL_RESUMEN_HISTOGRAMA_S = 1.0
+
+
+def _copiar_reporte(valor: Any) -> Any:
+    """Copia de los dicts y listas del reporte (las hojas son inmutables)."""
+    if isinstance(valor, dict):
+        return {k: _copiar_reporte(v) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [_copiar_reporte(v) for v in valor]
+    return valor
+
+
+class PerformanceAggregator:
+    """Promedios y picos por métrica de las últimas ``ventana`` muestras.
+
+    Mantiene sumas, conteos y, para los picos, una deque monótona por métrica
+    (índice, valor) con valores decrecientes, de modo que cada muestra se
+    incorpora y se retira en O(1) amortizado en lugar de recorrer la ventana
+    en cada reporte.
+
+    La muestra más reciente queda "abierta": el dashboard sigue escribiendo en
+    ella (``record_dashboard_metric``) hasta que llega la siguiente, así que se
+    suma al resumen al consultarlo y solo se consolida cuando se cierra.
+    """
+
+    def __init__(self, metricas: Iterable[str], ventana: int = VENTANA_REPORTE):
+        self.metricas: Tuple[str, ...] = tuple(metricas)
+        self.ventana = max(1, ventana)
+        self._cerradas: deque = deque()
+        self._indice = 0
+        self._sumas = dict.fromkeys(self.metricas, 0.0)
+        self._conteos = dict.fromkeys(self.metricas, 0)
+        self._picos: Dict[str, deque] = {k: deque() for k in self.metricas}
+        self._bajas = 0
+        self._abierta: Optional[Dict[str, Any]] = None
+        # Cambia con cada muestra nueva o métrica registrada (invalida el reporte)
+        self.version = 0
+
+    @staticmethod
+    def _numerico(valor: Any) -> Optional[float]:
+        return valor if isinstance(valor, (int, float)) else None
+
+    def agregar(self, muestra: Dict[str, Any]) -> None:
+        """Añadir una muestra nueva (cierra la anterior)."""
+        if self._abierta is not None:
+            self._cerrar(self._abierta)
+        self._abierta = muestra
+        self.version += 1
+
+    def marcar_cambio(self) -> None:
+        """La muestra abierta cambió (métrica del dashboard registrada)."""
+        self.version += 1
+
+    def _cerrar(self, muestra: Dict[str, Any]) -> None:
+        valores = tuple(self._numerico(muestra.get(k)) for k in self.metricas)
+        indice = self._indice
+        self._indice += 1
+        self._cerradas.append(valores)
+        for k, v in zip(self.metricas, valores):
+            if v is None:
+                continue
+            self._sumas[k] += v
+            self._conteos[k] += 1
+            picos = self._picos[k]
+            while picos and picos[-1][1] <= v:
+                picos.pop()
+            picos.append((indice, v))
+
+        # La muestra abierta ocupa la última posición de la ventana
+        if len(self._cerradas) > self.ventana - 1:
+            retirada = self._cerradas.popleft()
+            indice_retirada = indice - len(self._cerradas)
+            for k, v in zip(self.metricas, retirada):
+                if v is None:
+                    continue
+                self._sumas[k] -= v
+                self._conteos[k] -= 1
+                picos = self._picos[k]
+                if picos and picos[0][0] <= indice_retirada:
+                    picos.popleft()
+            # Las restas acumulan error de redondeo: recalcular exacto una vez
+            # por ventana (coste amortizado O(1))
+            self._bajas += 1
+            if self._bajas >= self.ventana:
+                self._recalcular_sumas()
+
+    def _recalcular_sumas(self) -> None:
+        self._bajas = 0
+        for i, k in enumerate(self.metricas):
+            self._sumas[k] = math.fsum(v[i] for v in self._cerradas if v[i] is not None)
+
+    @property
+    def muestras(self) -> int:
+        return len(self._cerradas) + (1 if self._abierta is not None else 0)
+
+    @property
+    def actual(self) -> Optional[Dict[str, Any]]:
+        return self._abierta
+
+    def resumen(self) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """Promedios y picos de la ventana (incluida la muestra abierta)."""
+        promedios: Dict[str, float] = {}
+        picos: Dict[str, float] = {}
+        abierta = self._abierta or {}
+        for k in self.metricas:
+            suma = self._sumas[k]
+            conteo = self._conteos[k]
+            pico = self._picos[k][0][1] if self._picos[k] else None
+            v = self._numerico(abierta.get(k))
+            if v is not None:
+                suma += v
+                conteo += 1
+                pico = v if pico is None or v > pico else pico
+            if conteo:
+                promedios[k] = suma / conteo
+                picos[k] = pico
+        return promedios, picos
 
 
 class PerformanceMonitor:
     """Monitor de rendimiento para el dashboard web."""
 
-    def __init__(self, max_samples: int = 1000):
+    def __init__(self, max_samples: int = 1000, registry: Optional[MetricsRegistry] = None):
         self.max_samples = max_samples
         self.metrics_history = deque(maxlen=max_samples)
         self.is_monitoring = False
@@ -40,6 +166,25 @@ class PerformanceMonitor:
             "ui_frame_drops": "Caídas de frames UI (%)",
         }
 
+        # Promedios y picos incrementales; el reporte se reconstruye solo
+        # cuando cambia la versión del agregador
+        self.aggregator = PerformanceAggregator(
+            self.metric_definitions, ventana=min(VENTANA_REPORTE, max_samples)
+        )
+        self._lock = threading.Lock()
+        self._report: Optional[Dict[str, Any]] = None
+        self._report_version = -1
+
+        # Métricas del sistema: cada colector con su intervalo y presupuesto
+        self.sampler = SystemSampler()
+
+        # Distribución completa de cada métrica del dashboard (el historial solo
+        # conserva el último valor por segundo); con ``registry`` se exponen en /metrics
+        self.registry = registry
+        self.dashboard_histograms: Dict[str, LogHistogram] = {}
+        # Último resumen de cada histograma: (observaciones, instante, resumen)
+        self._resumenes_hist: Dict[str, Tuple[int, float, Dict[str, float]]] = {}
+
     def start_monitoring(self):
         """Iniciar monitoreo de rendimiento."""
         if self.is_monitoring:
@@ -61,40 +206,31 @@ class PerformanceMonitor:
         """Bucle principal de monitoreo."""
         while self.is_monitoring:
             try:
+                start = time.monotonic()
                 metrics = self._collect_system_metrics()
                 metrics["timestamp"] = datetime.now().isoformat()
 
-                self.metrics_history.append(metrics)
-                time.sleep(1)  # Muestreo cada segundo
+                self.add_sample(metrics)
+                # Muestreo cada segundo (descontando el coste de la muestra)
+                time.sleep(max(0.0, 1.0 - (time.monotonic() - start)))
 
             except Exception as e:
                 print(f"Error en monitoreo: {e}")
                 time.sleep(5)
 
     def _collect_system_metrics(self) -> Dict[str, Any]:
-        """Recopilar métricas del sistema."""
-        metrics = {}
-
-        # Métricas de CPU
-        metrics["cpu_percent"] = psutil.cpu_percent(interval=0.1)
-
-        # Métricas de memoria
-        memory = psutil.virtual_memory()
-        metrics["memory_percent"] = memory.percent
-        metrics["memory_mb"] = memory.used / 1024 / 1024
-
-        # Métricas de red
-        network = psutil.net_connections()
-        metrics["network_connections"] = len(network)
-
-        # Métricas de proceso (si está disponible)
-        try:
-            process = psutil.Process()
-            metrics["open_files"] = len(process.open_files())
-            metrics["threads_count"] = process.num_threads()
-        except Exception:
-            metrics["open_files"] = 0
-            metrics["threads_count"] = 0
+        """Recopilar métricas del sistema.
+
+        CPU, memoria e hilos se leen cada segundo sin bloquear; las conexiones
+        de red y los archivos abiertos se recorren una vez por minuto y entre
+        medias se repite el último valor (ver ``system_sampler``).
+        """
+        metrics: Dict[str, Any] = {
+            "network_connections": 0,
+            "open_files": 0,
+            "threads_count": 0,
+        }
+        metrics.update(self.sampler.muestrear())
 
         # Métricas específicas del dashboard (placeholders para integración)
         metrics["dashboard_response_time"] = 0  # Se actualizará desde el dashboard
@@ -105,13 +241,50 @@ class PerformanceMonitor:
 
         return metrics
 
+    def add_sample(self, metrics: Dict[str, Any]):
+        """Añadir una muestra al historial y al agregador del reporte."""
+        with self._lock:
+            self.metrics_history.append(metrics)
+            self.aggregator.agregar(metrics)
+
+    def _dashboard_histogram(self, metric_name: str) -> LogHistogram:
+        hist = self.dashboard_histograms.get(metric_name)
+        if hist is None:
+            with self._lock:
+                hist = self.dashboard_histograms.get(metric_name)
+                if hist is None:
+                    if self.registry is not None:
+                        hist = self.registry.log_histogram(
+                            "dashboard_metric",
+                            "Dashboard metric distribution (log-bucketed histogram)",
+                            {"metric": metric_name},
+                        )
+                    else:
+                        hist = LogHistogram()
+                    self.dashboard_histograms[metric_name] = hist
+        return hist
+
     def record_dashboard_metric(self, metric_name: str, value: float):
         """Registrar métrica específica del dashboard."""
+        try:
+            self._dashboard_histogram(metric_name).observar(float(value))
+        except (TypeError, ValueError):
+            pass
         if not self.metrics_history:
             return
 
         # Actualizar la última entrada
-        self.metrics_history[-1][metric_name] = value
+        with self._lock:
+            self.metrics_history[-1][metric_name] = value
+            self.aggregator.marcar_cambio()
+
+    def reset_dashboard_histograms(self):
+        """Vaciar los histogramas de las métricas del dashboard."""
+        with self._lock:
+            for hist in self.dashboard_histograms.values():
+                hist.reset()
+            self._resumenes_hist.clear()
+            self.aggregator.marcar_cambio()
 
     def set_baseline(self, label: str = "baseline"):
         """Establecer línea base de rendimiento."""
@@ -191,6 +364,7 @@ class PerformanceMonitor:
             "impact": impact,
             "summary": self._summarize_impact(impact),
         }
+        self.aggregator.marcar_cambio()
 
         print(f"Impacto de optimización '{optimization_name}' medido")
         return impact
@@ -216,32 +390,55 @@ class PerformanceMonitor:
         }
 
     def get_performance_report(self) -> Dict[str, Any]:
-        """Generar reporte completo de rendimiento."""
-        if not self.metrics_history:
+        """Reporte de rendimiento de los últimos 5 minutos.
+
+        El reporte se reconstruye solo cuando cambia la versión del agregador
+        (muestra nueva o métrica del dashboard registrada). Al reconstruirlo,
+        los percentiles de cada histograma se recalculan únicamente si recibió
+        observaciones y su resumen tiene más de ``TTL_RESUMEN_HISTOGRAMA_S``.
+        Cada llamada devuelve una copia que el llamador puede modificar.
+        """
+        with self._lock:
+            if self._report is None or self._report_version != self.aggregator.version:
+                self._report = self._construir_reporte()
+                self._report_version = self.aggregator.version
+            return _copiar_reporte(self._report)
+
+    def _resumen_histograma(self, nombre: str, hist: LogHistogram, ahora: float) -> Dict:
+        previo = self._resumenes_hist.get(nombre)
+        if previo is not None and (
+            previo[0] == hist.total or ahora - previo[1] < TTL_RESUMEN_HISTOGRAMA_S
+        ):
+            return previo[2]
+        resumen = hist.resumen()
+        self._resumenes_hist[nombre] = (hist.total, ahora, resumen)
+        return resumen
+
+    def _construir_reporte(self) -> Dict[str, Any]:
+        """Reporte completo (con ``self._lock`` tomado)."""
+        if self.aggregator.actual is None:
             return {"error": "No hay datos de monitoreo disponibles"}
 
-        recent_metrics = list(self.metrics_history)[-300:]  # Últimos 5 minutos
-
+        averages, peaks = self.aggregator.resumen()
+        ahora = time.monotonic()
         report = {
             "timestamp": datetime.now().isoformat(),
-            "monitoring_duration_seconds": len(recent_metrics),
-            "current_metrics": recent_metrics[-1] if recent_metrics else {},
-            "averages": {},
-            "peaks": {},
+            "version": self.aggregator.version,
+            "monitoring_duration_seconds": self.aggregator.muestras,
+            "current_metrics": dict(self.aggregator.actual),
+            "averages": averages,
+            "peaks": peaks,
             "optimization_impacts": self.optimization_impact,
+            "sampler": self.sampler.get_metrics(),
+            "histograms": {
+                name: self._resumen_histograma(name, hist, ahora)
+                for name, hist in self.dashboard_histograms.items()
+            },
             "recommendations": [],
         }
 
-        # Calcular promedios y picos
-        for key in self.metric_definitions.keys():
-            values = [m.get(key, 0) for m in recent_metrics if key in m]
-            if values:
-                report["averages"][key] = sum(values) / len(values)
-                report["peaks"][key] = max(values)
-
         # Generar recomendaciones
         report["recommendations"] = self._generate_recommendations(report)
-
         return report
 
     def _generate_recommendations(self, report: Dict) -> List[str]:
@@ -323,7 +520,7 @@ class PerformanceMonitor:
 
 
 # Instancia global del monitor
-performance_monitor = PerformanceMonitor()
+performance_monitor = PerformanceMonitor(registry=get_metrics_registry())
 
 
 def start_performance_monitoring():
@@ -389,7 +586,11 @@ if __name__ == "__main__":
 
 
 class DataCompressor:
-    """Compresor de datos para optimizar transmisión."""
+    """Compresor de datos para optimizar transmisión.
+
+    El stream del dashboard ya no lo usa (ver ``stream_encoding``); los tamaños
+    se estiman sin serializar los datos.
+    """
 
     def __init__(self):
         self.compression_enabled = True
@@ -402,9 +603,8 @@ class DataCompressor:
         if not self.compression_enabled:
             return data
 
-        # Convertir a JSON string para medir tamaño
-        json_str = json.dumps(data, default=str)
-        original_size = len(json_str.encode("utf-8"))
+        # Tamaño aproximado en JSON sin serializar
+        original_size = estimar_bytes_json(data)
 
         if original_size < self.compression_threshold:
             return data  # No comprimir datos pequeños
@@ -413,8 +613,7 @@ class DataCompressor:
         compressed = self._apply_compression(data)
 
         # Verificar si la compresión fue efectiva
-        compressed_str = json.dumps(compressed, default=str)
-        compressed_size = len(compressed_str.encode("utf-8"))
+        compressed_size = estimar_bytes_json(compressed)
 
         if compressed_size < original_size * 0.8:  # Al menos 20% de reducción
             compressed["_compressed"] = True
@@ -530,72 +729,50 @@ class DataCompressor:
 
 
 class SmartCache:
-    """Cache inteligente para gráficos y datos."""
-
-    def __init__(self, max_size: int = 100, ttl: int = 300):
+    """Cache inteligente para gráficos y datos.
+
+    Vista de compatibilidad sobre ``CacheEngine`` (LRU + TTL en O(1)): usa un
+    namespace propio del motor y conserva la API y las estadísticas antiguas.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 100,
+        ttl: int = 300,
+        engine: Optional[CacheEngine] = None,
+        namespace: str = "smart_cache",
+    ):
         self.max_size = max_size
         self.ttl = ttl  # Time to live in seconds
-        self.cache = {}
-        self.access_times = {}
-        self.hit_count = 0
-        self.miss_count = 0
+        self.engine = engine if engine is not None else CacheEngine(max_entradas=max_size)
+        self.namespace = namespace
+        # Con el motor compartido, max_size limita solo las entradas de este namespace
+        self.engine.configurar(namespace, ttl=ttl, max_entradas=max_size)
 
     def get(self, key: str) -> Optional[Any]:
         """Obtener elemento del cache."""
-        if key in self.cache:
-            # Verificar TTL
-            if time.time() - self.access_times[key] > self.ttl:
-                del self.cache[key]
-                del self.access_times[key]
-                self.miss_count += 1
-                return None
-
-            self.access_times[key] = time.time()
-            self.hit_count += 1
-            return self.cache[key]
-
-        self.miss_count += 1
-        return None
+        return self.engine.get(self.namespace, key)
 
     def put(self, key: str, value: Any):
         """Almacenar elemento en cache."""
-        current_time = time.time()
-
-        # Implementar LRU eviction si es necesario
-        if len(self.cache) >= self.max_size:
-            # Encontrar el elemento menos recientemente usado
-            oldest_key = min(self.access_times, key=lambda k: self.access_times[k])
-            del self.cache[oldest_key]
-            del self.access_times[oldest_key]
-
-        self.cache[key] = value
-        self.access_times[key] = current_time
+        self.engine.put(self.namespace, key, value)
 
     def clear_expired(self):
         """Limpiar elementos expirados."""
-        current_time = time.time()
-        expired_keys = [
-            key
-            for key, access_time in self.access_times.items()
-            if current_time - access_time > self.ttl
-        ]
-
-        for key in expired_keys:
-            del self.cache[key]
-            del self.access_times[key]
+        self.engine.limpiar_expirados()
 
     def get_stats(self) -> Dict[str, Any]:
         """Obtener estadísticas del cache."""
-        total_requests = self.hit_count + self.miss_count
-        hit_rate = (self.hit_count / total_requests) if total_requests > 0 else 0
-
+        engine_stats = self.engine.get_stats()
+        stats = engine_stats["namespaces"].get(self.namespace, {})
         return {
-            "size": len(self.cache),
+            "size": stats.get("entradas", 0),
             "max_size": self.max_size,
-            "hit_count": self.hit_count,
-            "miss_count": self.miss_count,
-            "hit_rate": hit_rate,
+            "hit_count": stats.get("aciertos", 0),
+            "miss_count": stats.get("fallos", 0),
+            "hit_rate": stats.get("hit_rate", 0.0),
             "ttl": self.ttl,
+            "engine": engine_stats,
         }
 
 
@@ -676,7 +853,7 @@ class LatencyOptimizer:
 
 # Instancias globales para optimizaciones
 data_compressor = DataCompressor()
-smart_cache = SmartCache()
+smart_cache = SmartCache(engine=get_cache_engine())
 latency_optimizer = LatencyOptimizer()
 
 
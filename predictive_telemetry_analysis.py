@@ -5,35 +5,149 @@ Sistema de análisis predictivo de telemetría usando machine learning
 para anticipar el comportamiento del tren en Train Simulator Classic
 """
 
-import json
+import multiprocessing
 import os
+import shutil
 import sys
 import threading
 import time
 from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple
 
 import joblib
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import SGDRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 from sklearn.model_selection import train_test_split
+from sklearn.multioutput import MultiOutputRegressor
 from sklearn.preprocessing import StandardScaler
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from metrics_registry import get_metrics_registry
+from telemetry_bus import POLITICA_ULTIMO, get_telemetry_bus
+from telemetry_store import COLUMNA_TIEMPO, ColumnarTelemetryStore, migrate_legacy_json
 from tsc_integration import TSCIntegration
 
+# Columnas persistidas en el historial binario (mismo orden que _extract_features)
+HISTORY_FEATURES = (
+    "velocidad_actual",
+    "acelerador",
+    "freno_tren",
+    "freno_motor",
+    "pendiente",
+    "limite_velocidad",
+    "radio_curva",
+    "senal_principal",
+    "senal_avanzada",
+)
+# Bloques del historial binario que se conservan: 8 x 65536 filas son unas 14 h
+# a 10 Hz (~42 MB); los más antiguos se borran al abrir uno nuevo
+HISTORY_MAX_CHUNKS = 8
+
+# Tipos de modelo que se actualizan por mini-lotes (partial_fit) en lugar de
+# reajustarse sobre todo el historial
+ONLINE_MODEL_TYPES = ("sgd",)
+# Entrenamiento completo de un modelo online: pasadas y tamaño de lote
+ONLINE_EPOCHS = 5
+ONLINE_CHUNK = 256
+# Suavizado de las métricas prequential (error medido antes de cada actualización)
+ONLINE_METRICS_ALPHA = 0.1
+
+
+class FeatureMatrixCache:
+    """Matriz de características (muestras x features) construida de forma incremental.
+
+    Las filas se guardan en un buffer contiguo de doble capacidad: al llenarse
+    se compactan las últimas ``capacidad`` filas al inicio (coste amortizado
+    O(1) por muestra), de modo que la ventana activa es siempre un bloque
+    contiguo sobre el que ``sliding_window_view`` genera las secuencias sin
+    copiar.
+    """
+
+    def __init__(self, capacidad: int, n_features: int):
+        self.capacidad = capacidad
+        self.n_features = n_features
+        self._buffer = np.empty((2 * capacidad, n_features), dtype=np.float64)
+        self._fin = 0
+        self._n = 0
+
+    def __len__(self) -> int:
+        return self._n
+
+    def clear(self) -> None:
+        self._fin = 0
+        self._n = 0
+
+    def append(self, fila: List[float]) -> None:
+        if self._fin == len(self._buffer):
+            # Las filas activas ocupan [fin - n, fin) con n <= capacidad: no se solapan
+            self._buffer[: self._n] = self._buffer[self._fin - self._n : self._fin]
+            self._fin = self._n
+        self._buffer[self._fin] = fila
+        self._fin += 1
+        if self._n < self.capacidad:
+            self._n += 1
+
+    def matrix(self) -> np.ndarray:
+        """Vista (sin copia) de las filas activas, de la más antigua a la más reciente."""
+        return self._buffer[self._fin - self._n : self._fin]
+
+    @staticmethod
+    def windows(
+        matriz: np.ndarray, lookback_steps: int, horizon: int = 1
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Secuencias de entrada aplanadas y objetivos a partir de una matriz contigua.
+
+        Cada fila de X son ``lookback_steps`` filas consecutivas de la matriz
+        concatenadas (mismo orden que el bucle original) y la fila de ``y``
+        son las ``horizon`` filas siguientes concatenadas. X e y son vistas de
+        solo lectura sobre la misma copia contigua de ``matriz``.
+        """
+        n, f = matriz.shape
+        total = n - lookback_steps - horizon + 1
+        if total < 1:
+            return np.array([]), np.array([])
+        plano = np.ascontiguousarray(matriz).reshape(-1)
+        # Ventanas de lookback*f (o horizon*f) valores que avanzan de f en f
+        X = sliding_window_view(plano, lookback_steps * f)[::f][:total]
+        y = sliding_window_view(plano[lookback_steps * f :], horizon * f)[::f][:total]
+        return X, y
 
-class TelemetryDataCollector:
-    """Recopila y almacena datos históricos de telemetría para análisis predictivo."""
 
-    def __init__(self, max_samples: int = 10000, data_file: str = "data/telemetry_history.json"):
+class TelemetryDataCollector:
+    """Recopila y almacena datos históricos de telemetría para análisis predictivo.
+
+    El historial se persiste en un almacén columnar binario (``telemetry_store``)
+    en el directorio ``<data_file sin extensión>/``; si existe el JSON antiguo se
+    migra una sola vez al arrancar. Solo se conservan los ``max_chunks`` bloques
+    más recientes.
+    """
+
+    def __init__(
+        self,
+        max_samples: int = 10000,
+        data_file: str = "data/telemetry_history.json",
+        max_chunks: Optional[int] = HISTORY_MAX_CHUNKS,
+    ):
         self.max_samples = max_samples
         self.data_file = data_file
+        self.max_chunks = max_chunks
+        self.store_dir = os.path.splitext(data_file)[0]
         self.telemetry_history = deque(maxlen=max_samples)
+        # Muestras añadidas en esta sesión (no se reduce al rotar el historial)
+        self.samples_added = 0
+        # Periodo de muestreo estimado (EWMA) para fechar las predicciones
+        self.sample_period_s = 0.1
+        self.last_sample_time: Optional[float] = None
+        # Matriz de características paralela a telemetry_history
+        self.feature_cache = FeatureMatrixCache(max_samples, len(HISTORY_FEATURES))
         self.lock = threading.Lock()
+        self.store: Optional[ColumnarTelemetryStore] = None
 
         # Crear directorio si no existe
         os.makedirs(os.path.dirname(data_file), exist_ok=True)
@@ -42,77 +156,131 @@ class TelemetryDataCollector:
         self._load_historical_data()
 
     def _load_historical_data(self):
-        """Carga datos históricos desde archivo."""
+        """Abre el almacén columnar (migrando el JSON antiguo) y carga la cola reciente."""
         try:
-            if os.path.exists(self.data_file):
-                with open(self.data_file, encoding="utf-8-sig") as f:
-                    data = json.load(f)
-                    # Convertir a deque manteniendo el límite
-                    for entry in data[-self.max_samples :]:
-                        self.telemetry_history.append(entry)
+            self.store = ColumnarTelemetryStore(
+                self.store_dir, HISTORY_FEATURES, max_bloques=self.max_chunks
+            )
+            if os.path.exists(self.data_file) and len(self.store) == 0:
+                migradas = migrate_legacy_json(self.data_file, self.store)
+                print(f"✅ Migradas {migradas} muestras de {self.data_file} al historial binario")
+
+            cola = self.store.tail(self.max_samples)
+            columnas = [c for c in self.store.columnas if c != COLUMNA_TIEMPO]
+            for i, ts in enumerate(cola[COLUMNA_TIEMPO]):
+                # Los valores ausentes (NaN) se omiten para que apliquen los defaults
+                data = {c: float(cola[c][i]) for c in columnas if not np.isnan(cola[c][i])}
+                self.telemetry_history.append(
+                    {"timestamp": datetime.fromtimestamp(float(ts)).isoformat(), "data": data}
+                )
+                self.feature_cache.append(self._feature_row(data))
+            if self.telemetry_history:
                 print(f"✅ Cargados {len(self.telemetry_history)} muestras históricas")
-        except json.JSONDecodeError as e:
-            print(f"⚠️  Archivo de datos históricos corrupto ({self.data_file}): {e}")
-            print("   Creando archivo nuevo con datos vacíos...")
-            # Crear archivo vacío válido
-            self._save_historical_data()
         except Exception as e:
             print(f"⚠️  Error cargando datos históricos: {e}")
             print("   Continuando sin datos históricos...")
 
     def _save_historical_data(self):
-        """Guarda datos históricos en archivo."""
+        """Persiste las muestras pendientes del historial."""
         try:
             with self.lock:
-                data_to_save = list(self.telemetry_history)
-            with open(self.data_file, "w", encoding="utf-8-sig") as f:
-                json.dump(data_to_save, f, indent=2, default=str)
+                if self.store is not None:
+                    self.store.flush()
         except Exception as e:
             print(f"❌ Error guardando datos históricos: {e}")
 
     def add_telemetry_sample(self, telemetry_data: Dict[str, Any]):
         """Agrega una nueva muestra de telemetría al historial."""
-        sample = {"timestamp": datetime.now().isoformat(), "data": telemetry_data}
+        ahora = datetime.now()
+        sample = {"timestamp": ahora.isoformat(), "data": telemetry_data}
+
+        fila = self._feature_row(telemetry_data)
 
         with self.lock:
             self.telemetry_history.append(sample)
-
-        # Guardar periódicamente (cada 100 muestras)
-        if len(self.telemetry_history) % 100 == 0:
-            threading.Thread(target=self._save_historical_data, daemon=True).start()
+            self.feature_cache.append(fila)
+            self.samples_added += 1
+            instante = ahora.timestamp()
+            if self.last_sample_time is not None:
+                periodo = instante - self.last_sample_time
+                if 0 < periodo < 10:  # ignorar pausas largas del simulador
+                    self.sample_period_s += 0.1 * (periodo - self.sample_period_s)
+            self.last_sample_time = instante
+            # Anexar al almacén; se escribe en disco por lotes de 100 filas
+            if self.store is not None:
+                try:
+                    self.store.append(ahora.timestamp(), telemetry_data)
+                except Exception as e:
+                    print(f"❌ Error guardando datos históricos: {e}")
 
     def get_recent_samples(self, n_samples: int = 100) -> List[Dict]:
         """Obtiene las n muestras más recientes."""
         with self.lock:
             return list(self.telemetry_history)[-n_samples:]
 
-    def get_training_data(self, lookback_steps: int = 10) -> Tuple[np.ndarray, np.ndarray]:
-        """Prepara datos para entrenamiento de modelos predictivos."""
-        if len(self.telemetry_history) < lookback_steps + 1:
+    def get_training_data(
+        self, lookback_steps: int = 10, last_n: Optional[int] = None, horizon: int = 1
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Prepara datos para entrenamiento de modelos predictivos.
+
+        Usa la matriz de características mantenida incrementalmente: se copia
+        una vez (n x features) bajo el lock y las secuencias de entrada son
+        vistas de ventana deslizante sobre esa copia. Los objetivos son las
+        ``horizon`` muestras siguientes a cada ventana. Con ``last_n`` solo se
+        devuelven los ``last_n`` pares más recientes (actualizaciones online).
+        """
+        if len(self.telemetry_history) < lookback_steps + horizon:
             return np.array([]), np.array([])
 
-        samples = []
-        targets = []
-
         with self.lock:
-            history_list = list(self.telemetry_history)
+            matriz = self._feature_matrix_locked()
+            if last_n is not None:
+                matriz = matriz[-(last_n + lookback_steps + horizon - 1) :]
+            matriz = matriz.copy()
+
+        return FeatureMatrixCache.windows(matriz, lookback_steps, horizon)
 
-        for i in range(len(history_list) - lookback_steps):
-            # Crear secuencia de entrada (últimos lookback_steps)
-            sequence = []
-            for j in range(lookback_steps):
-                data = history_list[i + j]["data"]
-                features = self._extract_features(data)
-                sequence.extend(features)
+    def get_recent_features(self, n_rows: int) -> Tuple[int, Optional[np.ndarray]]:
+        """Últimas ``n_rows`` filas de características junto a ``samples_added``.
 
-            # Target: valores en el siguiente paso
-            target_data = history_list[i + lookback_steps]["data"]
-            target_features = self._extract_features(target_data)
+        Ambos valores se leen bajo el mismo lock para que quien desplaza una
+        ventana propia sepa exactamente a qué muestra corresponde la última fila.
 
-            samples.append(sequence)
-            targets.append(target_features)
+        Returns:
+            (samples_added, copia de las filas o None si no hay suficientes)
+        """
+        with self.lock:
+            matriz = self._feature_matrix_locked()
+            if len(matriz) < n_rows:
+                return self.samples_added, None
+            return self.samples_added, matriz[len(matriz) - n_rows :].copy()
 
-        return np.array(samples), np.array(targets)
+    def get_recent_feature_sequence(self, lookback_steps: int) -> Optional[np.ndarray]:
+        """Últimas ``lookback_steps`` filas de características aplanadas (entrada del modelo)."""
+        with self.lock:
+            matriz = self._feature_matrix_locked()
+            if len(matriz) < lookback_steps:
+                return None
+            return matriz[-lookback_steps:].reshape(-1).copy()
+
+    def _feature_matrix_locked(self) -> np.ndarray:
+        """Matriz de características alineada con el historial (llamar con el lock tomado)."""
+        if len(self.feature_cache) != len(self.telemetry_history):
+            # El historial se modificó por fuera de add_telemetry_sample: reconstruir
+            self.feature_cache.clear()
+            for sample in self.telemetry_history:
+                self.feature_cache.append(self._feature_row(sample["data"]))
+        return self.feature_cache.matrix()
+
+    def _feature_row(self, telemetry_data: Dict[str, Any]) -> List[float]:
+        """``_extract_features`` convertido a float (valores no numéricos -> NaN)."""
+        fila = []
+        for valor in self._extract_features(telemetry_data):
+            try:
+                fila.append(float(valor))
+            except (TypeError, ValueError):
+                fila.append(np.nan)
+        return fila
 
     def _extract_features(self, telemetry_data: Dict[str, Any]) -> List[float]:
         """Extrae características relevantes de los datos de telemetría."""
@@ -145,6 +313,8 @@ class TelemetryDataCollector:
             "total_samples": total_samples,
             "max_samples": self.max_samples,
             "data_file": self.data_file,
+            "stored_samples": len(self.store) if self.store is not None else 0,
+            "store_dir": self.store_dir,
         }
 
 
@@ -167,12 +337,52 @@ class PredictiveModel:
             "senal_avanzada",
         ]
         self.is_trained = False
+        # Versión publicada (0 = modelo sin versionar) y métricas de validación
+        self.version = 0
+        self.metrics: Dict[str, float] = {}
+        # Modelos online: escalado de objetivos y muestras vistas
+        self.target_scaler = StandardScaler()
+        self.samples_seen = 0
+        # Pasos futuros que predice cada llamada (objetivo de horizon x features)
+        self.horizon = 1
+
+    def _horizon_of(self, y: np.ndarray) -> int:
+        return max(1, y.shape[1] // len(self.feature_names)) if y.ndim == 2 else 1
+
+    @property
+    def is_online(self) -> bool:
+        """True si el modelo se actualiza por mini-lotes con ``partial_fit``."""
+        return self.model_type in ONLINE_MODEL_TYPES
+
+    def _create_model(self):
+        if self.model_type == "random_forest":
+            return RandomForestRegressor(n_estimators=100, max_depth=10, random_state=42, n_jobs=-1)
+        if self.model_type == "gradient_boosting":
+            return GradientBoostingRegressor(n_estimators=100, max_depth=5, random_state=42)
+        if self.model_type == "sgd":
+            # Tasa constante: el modelo debe seguir adaptándose durante la sesión
+            return MultiOutputRegressor(
+                SGDRegressor(learning_rate="constant", eta0=0.001, alpha=1e-4, random_state=42)
+            )
+        return None
+
+    def _predict_scaled(self, X_scaled: np.ndarray) -> np.ndarray:
+        if not self.is_online:
+            return self.model.predict(X_scaled)
+        y_scaled = self.model.predict(np.nan_to_num(X_scaled))
+        return self.target_scaler.inverse_transform(y_scaled)
+
+    def _partial_fit_scaled(self, X_scaled: np.ndarray, y: np.ndarray) -> None:
+        y_scaled = np.nan_to_num(self.target_scaler.transform(y))
+        self.model.partial_fit(np.nan_to_num(X_scaled), y_scaled)
 
     def train(self, X: np.ndarray, y: np.ndarray) -> Dict[str, Any]:
         """Entrena el modelo con datos históricos."""
         if len(X) == 0 or len(y) == 0:
             return {"error": "No hay suficientes datos para entrenar"}
 
+        self.horizon = self._horizon_of(y)
+
         # Dividir datos en entrenamiento y validación
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
@@ -181,20 +391,23 @@ class PredictiveModel:
         X_test_scaled = self.scaler.transform(X_test)
 
         # Crear modelo
-        if self.model_type == "random_forest":
-            self.model = RandomForestRegressor(
-                n_estimators=100, max_depth=10, random_state=42, n_jobs=-1
-            )
-        elif self.model_type == "gradient_boosting":
-            self.model = GradientBoostingRegressor(n_estimators=100, max_depth=5, random_state=42)
-        else:
+        self.model = self._create_model()
+        if self.model is None:
             return {"error": f"Tipo de modelo no soportado: {self.model_type}"}
 
         # Entrenar modelo
-        self.model.fit(X_train_scaled, y_train)
+        if self.is_online:
+            self.target_scaler = StandardScaler().fit(y_train)
+            for _ in range(ONLINE_EPOCHS):
+                for inicio in range(0, len(X_train_scaled), ONLINE_CHUNK):
+                    fin = inicio + ONLINE_CHUNK
+                    self._partial_fit_scaled(X_train_scaled[inicio:fin], y_train[inicio:fin])
+            self.samples_seen = len(X_train)
+        else:
+            self.model.fit(X_train_scaled, y_train)
 
         # Evaluar modelo
-        y_pred = self.model.predict(X_test_scaled)
+        y_pred = self._predict_scaled(X_test_scaled)
         mae = mean_absolute_error(y_test, y_pred)
         mse = mean_squared_error(y_test, y_pred)
         rmse = np.sqrt(mse)
@@ -218,10 +431,58 @@ class PredictiveModel:
         sequence_scaled = self.scaler.transform(current_sequence.reshape(1, -1))
 
         # Realizar predicción
-        prediction = self.model.predict(sequence_scaled)
+        prediction = self._predict_scaled(sequence_scaled)
 
         return prediction[0]
 
+    def partial_fit(self, X: np.ndarray, y: np.ndarray) -> Dict[str, Any]:
+        """Actualiza un modelo online con un mini-lote de muestras nuevas.
+
+        El coste depende solo del tamaño del lote, no del historial. El error
+        se mide antes de actualizar (evaluación prequential) y se suaviza en
+        ``self.metrics`` para poder compararlo con un modelo por lotes.
+        """
+        if not self.is_online:
+            return {"error": f"El modelo {self.model_type} no admite actualización online"}
+        if len(X) == 0 or len(y) == 0:
+            return {"error": "No hay muestras nuevas"}
+
+        metrics: Dict[str, Any] = {"samples": len(X)}
+        if self.is_trained and self.model is not None:
+            error = self.predict_batch(X) - y
+            metrics["mae"] = float(np.nanmean(np.abs(error)))
+            metrics["rmse"] = float(np.sqrt(np.nanmean(error**2)))
+            for k in ("mae", "rmse"):
+                previo = self.metrics.get(k, metrics[k])
+                self.metrics[k] = previo + ONLINE_METRICS_ALPHA * (metrics[k] - previo)
+
+        if self.model is None:
+            self.model = self._create_model()
+            self.horizon = self._horizon_of(y)
+        self.scaler.partial_fit(X)
+        self.target_scaler.partial_fit(y)
+        self._partial_fit_scaled(self.scaler.transform(X), y)
+
+        self.samples_seen += len(X)
+        self.is_trained = True
+        metrics["samples_seen"] = self.samples_seen
+        return metrics
+
+    def predict_horizon(self, current_sequence: np.ndarray) -> Optional[np.ndarray]:
+        """Predicción de los ``horizon`` pasos siguientes en una sola llamada.
+
+        Returns:
+            Matriz (horizon x features) o None si el modelo no está entrenado
+        """
+        prediction = self.predict(current_sequence)
+        if prediction is None:
+            return None
+        return prediction.reshape(self.horizon, -1)
+
+    def predict_batch(self, X: np.ndarray) -> np.ndarray:
+        """Predicción para varias secuencias de entrada (una por fila)."""
+        return self._predict_scaled(self.scaler.transform(X))
+
     def save_model(self, filepath: str):
         """Guarda el modelo entrenado."""
         if not self.is_trained:
@@ -233,6 +494,11 @@ class PredictiveModel:
             "feature_names": self.feature_names,
             "model_type": self.model_type,
             "is_trained": self.is_trained,
+            "version": self.version,
+            "metrics": self.metrics,
+            "target_scaler": self.target_scaler,
+            "samples_seen": self.samples_seen,
+            "horizon": self.horizon,
         }
 
         try:
@@ -251,42 +517,168 @@ class PredictiveModel:
             self.feature_names = model_data["feature_names"]
             self.model_type = model_data["model_type"]
             self.is_trained = model_data["is_trained"]
+            self.version = model_data.get("version", 0)
+            self.metrics = model_data.get("metrics", {})
+            self.target_scaler = model_data.get("target_scaler", StandardScaler())
+            self.samples_seen = model_data.get("samples_seen", 0)
+            self.horizon = model_data.get("horizon", 1)
             return True
         except Exception as e:
             print(f"❌ Error cargando modelo: {e}")
             return False
 
 
-class PredictiveTelemetryAnalyzer:
-    """Sistema completo de análisis predictivo de telemetría."""
+def _inicializar_proceso_entrenamiento():
+    """Bajar la prioridad del proceso de reentrenamiento (POSIX)."""
+    if hasattr(os, "nice"):
+        try:
+            os.nice(5)
+        except OSError:
+            pass
+
+
+def _entrenar_modelo_candidato(
+    model_type: str, X: np.ndarray, y: np.ndarray, ruta_candidato: str
+) -> Dict[str, Any]:
+    """Entrenar un modelo candidato y guardarlo en ``ruta_candidato``.
+
+    Se ejecuta en el proceso de reentrenamiento: recibe una copia de los datos
+    y devuelve solo las métricas; el proceso principal carga el candidato
+    desde disco para validarlo antes de activarlo.
+    """
+    inicio = time.perf_counter()
+    modelo = PredictiveModel(model_type)
+    metrics = modelo.train(X, y)
+    if "error" not in metrics:
+        modelo.metrics = {k: float(v) for k, v in metrics.items()}
+        if not modelo.save_model(ruta_candidato):
+            return {"error": "No se pudo guardar el modelo candidato"}
+    metrics["training_time_s"] = time.perf_counter() - inicio
+    return metrics
 
-    def __init__(self, lookback_steps: int = 10, prediction_horizon: int = 5):
+
+class PredictiveTelemetryAnalyzer:
+    """Sistema completo de análisis predictivo de telemetría.
+
+    Args:
+        lookback_steps: Muestras de entrada de cada predicción
+        prediction_horizon: Pasos futuros que predice cada llamada
+        model_type: Tipo de modelo (``random_forest``, ``gradient_boosting`` o ``sgd``)
+        data_collector: Recolector del historial (None = uno nuevo sobre ``data_file``)
+        data_file: Archivo base del historial si no se pasa ``data_collector``
+        model_file: Modelo publicado que se carga al arrancar
+    """
+
+    def __init__(
+        self,
+        lookback_steps: int = 10,
+        prediction_horizon: int = 5,
+        model_type: str = "random_forest",
+        data_collector: Optional[TelemetryDataCollector] = None,
+        data_file: str = "data/telemetry_history.json",
+        model_file: str = "data/predictive_model.pkl",
+    ):
         self.lookback_steps = lookback_steps
         self.prediction_horizon = prediction_horizon
 
         # Componentes del sistema
-        self.data_collector = TelemetryDataCollector()
-        self.predictive_model = PredictiveModel()
+        if data_collector is None:
+            data_collector = TelemetryDataCollector(data_file=data_file)
+        self.data_collector = data_collector
+        self.predictive_model = PredictiveModel(model_type)
 
         # Estado del sistema
         self.is_running = False
         self.prediction_thread = None
         self.last_predictions: Dict[str, Any] = {}
+        # Cambia con cada predicción publicada (invalida las cachés del dashboard)
+        self.predictions_version = 0
+
+        # Ventana de entrada preasignada (lookback x features) que se desplaza
+        # con las muestras nuevas en lugar de reconstruirse en cada ciclo
+        self._window = np.zeros((lookback_steps, len(HISTORY_FEATURES)))
+        self._window_samples: Optional[int] = None
 
         # Configuración de modelos
-        self.model_file = "data/predictive_model.pkl"
+        self.model_file = model_file
         self.min_samples_for_training = 1000
 
+        # Reentrenamiento en segundo plano: el modelo activo sigue prediciendo
+        # hasta que el candidato se valida y se sustituye de forma atómica
+        self.retrain_interval_samples = 5000
+        self.retrain_in_process = True
+        self.max_rmse_ratio = 1.25  # rechazar candidatos mucho peores que el activo
+        self.model_versions_to_keep = 3
+        self.model_version = 0
+        self._samples_at_last_train: Optional[int] = None
+        self._retrain_lock = threading.Lock()
+        self._retrain_executor = None
+        self._retrain_future: Optional[Future] = None
+        self._retrain_done = threading.Event()
+        self._retrain_done.set()
+        self._candidate_seq = 0
+        # Modelo online: tamaño mínimo de mini-lote y tope de muestras por
+        # actualización (acota el coste si el bucle se retrasa)
+        self.online_batch_size = 50
+        self.online_max_batch = 1000
+        self._samples_at_last_checkpoint = 0
+        registro = get_metrics_registry()
+        self.retrain_metrics: Dict[str, Any] = registro.gauge_map(
+            "predictive_",
+            "Predictive model retraining metric",
+            {
+                "actualizaciones_online": 0,
+                "actualizacion_ultima_ms": 0.0,
+                "actualizacion_max_ms": 0.0,
+                "entrenamientos": 0,
+                "entrenamientos_fallidos": 0,
+                "candidatos_rechazados": 0,
+                "swaps": 0,
+                "en_curso": 0,
+                "duracion_ultima_s": 0.0,
+                "duracion_max_s": 0.0,
+            },
+        )
+        registro.gauge_fn(
+            "predictive_model_version",
+            "Version of the active predictive model",
+            lambda: self.model_version,
+        )
+
         # Cargar modelo si existe
         self._load_existing_model()
 
     def _load_existing_model(self):
         """Carga modelo existente si está disponible."""
         if os.path.exists(self.model_file):
-            if self.predictive_model.load_model(self.model_file):
-                print("✅ Modelo predictivo cargado exitosamente")
-            else:
+            modelo = PredictiveModel(self.predictive_model.model_type)
+            if not modelo.load_model(self.model_file):
                 print("⚠️  No se pudo cargar el modelo existente")
+            elif modelo.model_type != self.predictive_model.model_type:
+                print(
+                    f"⚠️  El modelo guardado es {modelo.model_type}; "
+                    f"se entrenará uno nuevo de tipo {self.predictive_model.model_type}"
+                )
+            elif modelo.horizon != self.prediction_horizon and modelo.is_online:
+                # Un modelo online no puede seguir ajustándose con otro horizonte
+                print(
+                    f"⚠️  El modelo guardado predice {modelo.horizon} paso(s); "
+                    f"se entrenará uno nuevo de {self.prediction_horizon}"
+                )
+            else:
+                self.predictive_model = modelo
+                self.model_version = modelo.version
+                print("✅ Modelo predictivo cargado exitosamente")
+                if modelo.horizon == self.prediction_horizon:
+                    # Contar las muestras para el siguiente reentrenamiento desde ahora
+                    self._samples_at_last_train = self.data_collector.samples_added
+                else:
+                    # P. ej. guardado antes de las predicciones multi-horizonte: sigue
+                    # activo hasta que termine el reentrenamiento con el horizonte actual
+                    print(
+                        f"⚠️  El modelo cargado predice {modelo.horizon} paso(s) y el análisis "
+                        f"usa {self.prediction_horizon}; se reentrenará"
+                    )
 
     def start_analysis(self) -> bool:
         """Inicia el análisis predictivo."""
@@ -305,34 +697,34 @@ class PredictiveTelemetryAnalyzer:
         self.is_running = False
         if self.prediction_thread:
             self.prediction_thread.join(timeout=2.0)
+        with self._retrain_lock:
+            executor, self._retrain_executor = self._retrain_executor, None
+            future = self._retrain_future
+        if executor is not None:
+            # Cancelar a mano el reentrenamiento aún no iniciado
+            # (``shutdown(cancel_futures=True)`` requiere Python 3.9)
+            if future is not None:
+                future.cancel()
+            executor.shutdown(wait=False)
         print("[STOP] Análisis predictivo detenido")
 
     def _prediction_loop(self):
         """Bucle principal de predicciones."""
         while self.is_running:
             try:
-                # Verificar si hay suficientes datos para predicción
-                recent_samples = self.data_collector.get_recent_samples(self.lookback_steps)
-
-                if len(recent_samples) >= self.lookback_steps:
-                    # Preparar secuencia para predicción
-                    sequence = []
-                    for sample in recent_samples:
-                        features = self.data_collector._extract_features(sample["data"])
-                        sequence.extend(features)
-
-                    sequence_array = np.array(sequence)
-
-                    # Realizar predicción
-                    prediction = self.predictive_model.predict(sequence_array)
+                # Predecir todo el horizonte solo cuando llegan muestras nuevas
+                if self._refresh_window():
+                    prediction = self.predictive_model.predict_horizon(self._window.reshape(-1))
 
                     if prediction is not None:
                         # Convertir predicción a diccionario
                         self.last_predictions = self._prediction_to_dict(prediction)
-                        self.last_predictions["timestamp"] = datetime.now().isoformat()
+                        self.predictions_version += 1
 
-                # Verificar si es necesario reentrenar el modelo
-                if len(self.data_collector.telemetry_history) >= self.min_samples_for_training:
+                # Actualizar el modelo online o verificar si es necesario reentrenarlo
+                if self.predictive_model.is_online:
+                    self._update_online_model()
+                elif len(self.data_collector.telemetry_history) >= self.min_samples_for_training:
                     self._retrain_model_if_needed()
 
             except Exception as e:
@@ -340,35 +732,333 @@ class PredictiveTelemetryAnalyzer:
 
             time.sleep(0.1)  # 10 Hz
 
-    def _prediction_to_dict(self, prediction: np.ndarray) -> Dict[str, float]:
-        """Convierte array de predicción a diccionario."""
-        return dict(zip(self.predictive_model.feature_names, prediction))
+    def _refresh_window(self) -> bool:
+        """Desplaza la ventana de entrada con las muestras llegadas desde el último ciclo.
+
+        Returns:
+            True si la ventana cambió y está completa
+        """
+        lookback = self.lookback_steps
+        previas = self._window_samples
+        if previas is not None and self.data_collector.samples_added == previas:
+            return False
+        nuevas = lookback if previas is None else self.data_collector.samples_added - previas
+        if not 0 < nuevas < lookback:
+            nuevas = lookback  # ventana vacía, hueco grande o colector reemplazado
+
+        añadidas, filas = self.data_collector.get_recent_features(nuevas)
+        if filas is not None and nuevas < lookback and añadidas - previas != nuevas:
+            # Llegaron más muestras entre ambas lecturas: rellenar la ventana completa
+            nuevas = lookback
+            añadidas, filas = self.data_collector.get_recent_features(lookback)
+        if filas is None:
+            self._window_samples = None
+            return False
+
+        if nuevas == lookback:
+            self._window[:] = filas
+        else:
+            self._window[:-nuevas] = self._window[nuevas:]
+            self._window[-nuevas:] = filas
+        self._window_samples = añadidas
+        return True
+
+    def _prediction_to_dict(self, prediction: np.ndarray) -> Dict[str, Any]:
+        """Convierte la predicción (horizon x features) a diccionario.
+
+        Las claves de primer nivel son el paso siguiente (compatibilidad con
+        los consumidores existentes); ``horizon`` contiene todos los pasos con
+        su instante previsto según el periodo de muestreo observado.
+        """
+        prediction = np.atleast_2d(prediction)
+        nombres = self.predictive_model.feature_names
+        periodo = self.data_collector.sample_period_s
+        base = self.data_collector.last_sample_time or time.time()
+
+        horizon = []
+        for paso, fila in enumerate(prediction, start=1):
+            entrada: Dict[str, Any] = dict(zip(nombres, fila.tolist()))
+            entrada["step"] = paso
+            entrada["offset_s"] = paso * periodo
+            entrada["timestamp"] = datetime.fromtimestamp(base + paso * periodo).isoformat()
+            horizon.append(entrada)
+
+        resultado: Dict[str, Any] = dict(zip(nombres, prediction[0].tolist()))
+        resultado["timestamp"] = datetime.now().isoformat()
+        resultado["horizon"] = horizon
+        return resultado
 
     def _retrain_model_if_needed(self):
-        """Reentrena el modelo si es necesario."""
-        # Reentrenar cada 5000 muestras nuevas
-        if len(self.data_collector.telemetry_history) % 5000 == 0:
-            print("🔄 Reentrenando modelo predictivo...")
-            self.train_model()
+        """Lanza un reentrenamiento en segundo plano si es necesario."""
+        # Reentrenar cada 5000 muestras nuevas, o una vez si aún no hay modelo o
+        # el cargado predice otro horizonte
+        if self._samples_at_last_train is None:
+            modelo = self.predictive_model
+            necesario = not modelo.is_trained or modelo.horizon != self.prediction_horizon
+        else:
+            nuevas = self.data_collector.samples_added - self._samples_at_last_train
+            necesario = nuevas >= self.retrain_interval_samples
+        if necesario and self.start_background_retrain():
+            print("🔄 Reentrenando modelo predictivo en segundo plano...")
+
+    def _update_online_model(self) -> Optional[Dict[str, Any]]:
+        """Actualiza el modelo online con las muestras llegadas desde la última vez.
+
+        Sin modelo previo se usa como arranque la cola del historial (como
+        mucho ``online_max_batch`` muestras), de modo que ninguna
+        actualización recorre el historial completo.
+        """
+        modelo = self.predictive_model
+        añadidas = self.data_collector.samples_added
+        if modelo.is_trained and self._samples_at_last_train is not None:
+            nuevas = añadidas - self._samples_at_last_train
+        else:
+            nuevas = (
+                len(self.data_collector.telemetry_history)
+                - self.lookback_steps
+                - self.prediction_horizon
+                + 1
+            )
+        if nuevas < self.online_batch_size:
+            return None
+
+        X, y = self.data_collector.get_training_data(
+            self.lookback_steps,
+            last_n=min(nuevas, self.online_max_batch),
+            horizon=self.prediction_horizon,
+        )
+        if len(X) == 0:
+            return None
+        inicio = time.perf_counter()
+        metrics = modelo.partial_fit(X, y)
+        duracion_ms = (time.perf_counter() - inicio) * 1000.0
+        self._samples_at_last_train = añadidas
+
+        self.retrain_metrics["actualizaciones_online"] += 1
+        self.retrain_metrics["actualizacion_ultima_ms"] = duracion_ms
+        if duracion_ms > self.retrain_metrics["actualizacion_max_ms"]:
+            self.retrain_metrics["actualizacion_max_ms"] = duracion_ms
+
+        # Publicar una versión del modelo cada retrain_interval_samples muestras
+        if añadidas - self._samples_at_last_checkpoint >= self.retrain_interval_samples:
+            self._samples_at_last_checkpoint = añadidas
+            with self._retrain_lock:
+                self.model_version += 1
+                modelo.version = self.model_version
+            self._publish_model_version(modelo)
+        return metrics
+
+    @property
+    def model_dir(self) -> str:
+        """Directorio con las versiones publicadas del modelo."""
+        return os.path.join(os.path.dirname(self.model_file) or ".", "models")
+
+    def _get_retrain_executor(self):
+        if self._retrain_executor is None:
+            if self.retrain_in_process:
+                # spawn: el hijo no hereda hilos ni locks del proceso principal
+                self._retrain_executor = ProcessPoolExecutor(
+                    max_workers=1,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_inicializar_proceso_entrenamiento,
+                )
+            else:
+                self._retrain_executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="PredictiveRetrain"
+                )
+        return self._retrain_executor
+
+    def start_background_retrain(self) -> bool:
+        """Entrena un modelo candidato sin bloquear las predicciones.
+
+        Los datos de entrenamiento se copian en este momento; el ajuste se hace
+        en un proceso aparte y al terminar el candidato se valida y, si se
+        acepta, sustituye al modelo activo.
+
+        Returns:
+            True si se lanzó el reentrenamiento (False si ya hay uno en curso
+            o no hay datos suficientes)
+        """
+        with self._retrain_lock:
+            if self._retrain_future is not None:
+                return False
+            X, y = self.data_collector.get_training_data(
+                self.lookback_steps, horizon=self.prediction_horizon
+            )
+            if len(X) == 0:
+                return False
+            self._samples_at_last_train = self.data_collector.samples_added
+
+            os.makedirs(self.model_dir, exist_ok=True)
+            self._candidate_seq += 1
+            ruta_candidato = os.path.join(
+                self.model_dir, f"candidate_{os.getpid()}_{self._candidate_seq}.pkl"
+            )
+            args = (self.predictive_model.model_type, np.ascontiguousarray(X), y, ruta_candidato)
+            inicio = time.perf_counter()
+            try:
+                future = self._get_retrain_executor().submit(_entrenar_modelo_candidato, *args)
+            except Exception as e:
+                # Sin procesos disponibles (p. ej. entorno congelado): usar un hilo
+                print(f"⚠️  Reentrenamiento en proceso no disponible ({e}); usando un hilo")
+                self.retrain_in_process = False
+                self._retrain_executor = None
+                future = self._get_retrain_executor().submit(_entrenar_modelo_candidato, *args)
+            self._retrain_future = future
+            self._retrain_done.clear()
+            self.retrain_metrics["en_curso"] = 1
+
+        future.add_done_callback(lambda f: self._on_retrain_done(f, ruta_candidato, inicio))
+        return True
+
+    def _on_retrain_done(self, future: Future, ruta_candidato: str, inicio: float) -> None:
+        try:
+            metrics = future.result()
+            candidato = PredictiveModel(self.predictive_model.model_type)
+            if "error" not in metrics and not candidato.load_model(ruta_candidato):
+                metrics = {"error": "No se pudo cargar el modelo candidato"}
+            resultado = self._finish_training(candidato, metrics, inicio, forzar=False)
+            if "error" in resultado:
+                print(f"⚠️  Reentrenamiento descartado: {resultado['error']}")
+            else:
+                print(f"✅ Modelo predictivo v{resultado['model_version']} activado")
+        except Exception as e:
+            # Cancelado al detener el análisis o proceso de entrenamiento caído
+            self.retrain_metrics["entrenamientos_fallidos"] += 1
+            print(f"❌ Error en reentrenamiento en segundo plano: {e!r}")
+            with self._retrain_lock:
+                if self._retrain_executor is not None and getattr(
+                    self._retrain_executor, "_broken", False
+                ):
+                    self._retrain_executor = None
+        finally:
+            try:
+                os.remove(ruta_candidato)
+            except OSError:
+                pass
+            with self._retrain_lock:
+                self._retrain_future = None
+                self.retrain_metrics["en_curso"] = 0
+            self._retrain_done.set()
+
+    def wait_for_retrain(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que termine el reentrenamiento en curso (True si no queda ninguno)."""
+        return self._retrain_done.wait(timeout)
 
     def train_model(self) -> Dict[str, Any]:
-        """Entrena el modelo con datos disponibles."""
-        X, y = self.data_collector.get_training_data(self.lookback_steps)
+        """Entrena el modelo con datos disponibles (en el hilo que llama)."""
+        X, y = self.data_collector.get_training_data(
+            self.lookback_steps, horizon=self.prediction_horizon
+        )
 
         if len(X) == 0:
             return {"error": "No hay suficientes datos para entrenar"}
 
         print(f"🏋️  Entrenando modelo con {len(X)} muestras...")
 
-        metrics = self.predictive_model.train(X, y)
+        inicio = time.perf_counter()
+        candidato = PredictiveModel(self.predictive_model.model_type)
+        metrics = candidato.train(X, y)
+        self._samples_at_last_train = self.data_collector.samples_added
+        # Entrenamiento pedido explícitamente: no se compara con el modelo activo
+        metrics = self._finish_training(candidato, metrics, inicio, forzar=True)
 
         if "error" not in metrics:
-            # Guardar modelo entrenado
-            self.predictive_model.save_model(self.model_file)
             print("✅ Modelo entrenado y guardado")
 
         return metrics
 
+    def _finish_training(
+        self, candidato: PredictiveModel, metrics: Dict[str, Any], inicio: float, forzar: bool
+    ) -> Dict[str, Any]:
+        """Registra el entrenamiento y activa el candidato si supera la validación."""
+        duracion = time.perf_counter() - inicio
+        self.retrain_metrics["entrenamientos"] += 1
+        self.retrain_metrics["duracion_ultima_s"] = duracion
+        if duracion > self.retrain_metrics["duracion_max_s"]:
+            self.retrain_metrics["duracion_max_s"] = duracion
+
+        if "error" in metrics:
+            self.retrain_metrics["entrenamientos_fallidos"] += 1
+            return metrics
+
+        motivo = self._validate_candidate(candidato, metrics, forzar)
+        if motivo:
+            self.retrain_metrics["candidatos_rechazados"] += 1
+            return {**metrics, "error": f"Modelo candidato rechazado: {motivo}"}
+
+        if not candidato.metrics:
+            candidato.metrics = {
+                k: float(v) for k, v in metrics.items() if isinstance(v, (int, float, np.number))
+            }
+        with self._retrain_lock:
+            self.model_version += 1
+            candidato.version = self.model_version
+            # Sustitución atómica: el bucle de predicción toma la referencia una
+            # vez por iteración y nunca ve un modelo a medio entrenar
+            self.predictive_model = candidato
+            self.retrain_metrics["swaps"] += 1
+        self._publish_model_version(candidato)
+
+        metrics["model_version"] = candidato.version
+        return metrics
+
+    def _validate_candidate(
+        self, candidato: PredictiveModel, metrics: Dict[str, Any], forzar: bool
+    ) -> Optional[str]:
+        """Motivo de rechazo del candidato o None si puede activarse."""
+        if not candidato.is_trained:
+            return "modelo no entrenado"
+        if not all(np.isfinite(metrics.get(k, np.nan)) for k in ("mae", "rmse")):
+            return "métricas no finitas"
+        secuencia = self.data_collector.get_recent_feature_sequence(self.lookback_steps)
+        if secuencia is not None:
+            prediccion = candidato.predict(secuencia)
+            if prediccion is None or not np.all(np.isfinite(prediccion)):
+                return "predicción no finita"
+        # Solo es comparable con el modelo activo si predice el mismo horizonte
+        rmse_activo = self.predictive_model.metrics.get("rmse")
+        if (
+            not forzar
+            and self.predictive_model.is_trained
+            and self.predictive_model.horizon == candidato.horizon
+            and rmse_activo
+            and metrics["rmse"] > rmse_activo * self.max_rmse_ratio
+        ):
+            return f"RMSE {metrics['rmse']:.3f} peor que el del modelo activo ({rmse_activo:.3f})"
+        return None
+
+    def _publish_model_version(self, modelo: PredictiveModel) -> bool:
+        """Guarda la versión en ``model_dir`` y la publica en ``model_file`` de forma atómica."""
+        try:
+            os.makedirs(self.model_dir, exist_ok=True)
+            ruta_version = os.path.join(
+                self.model_dir, f"predictive_model_v{modelo.version:06d}.pkl"
+            )
+            if not modelo.save_model(ruta_version):
+                return False
+            temporal = f"{self.model_file}.tmp"
+            shutil.copyfile(ruta_version, temporal)
+            os.replace(temporal, self.model_file)
+
+            versiones = sorted(
+                f
+                for f in os.listdir(self.model_dir)
+                if f.startswith("predictive_model_v") and f.endswith(".pkl")
+            )
+            for antigua in versiones[: -self.model_versions_to_keep]:
+                os.remove(os.path.join(self.model_dir, antigua))
+            return True
+        except OSError as e:
+            print(f"❌ Error publicando versión del modelo: {e}")
+            return False
+
+    def get_retrain_metrics(self) -> Dict[str, Any]:
+        """Métricas de reentrenamiento (duración, versión y sustituciones del modelo)."""
+        datos = dict(self.retrain_metrics)
+        datos["model_version"] = self.model_version
+        return datos
+
     def add_telemetry_sample(self, telemetry_data: Dict[str, Any]):
         """Agrega nueva muestra de telemetría."""
         self.data_collector.add_telemetry_sample(telemetry_data)
@@ -382,6 +1072,8 @@ class PredictiveTelemetryAnalyzer:
         return {
             "is_running": self.is_running,
             "model_trained": self.predictive_model.is_trained,
+            "model_version": self.model_version,
+            "retraining": self.get_retrain_metrics(),
             "data_collector_stats": self.data_collector.get_statistics(),
             "last_predictions": self.last_predictions,
             "lookback_steps": self.lookback_steps,
@@ -392,9 +1084,15 @@ class PredictiveTelemetryAnalyzer:
 class PredictiveAutopilotController:
     """Controlador de piloto automático con capacidades predictivas."""
 
-    def __init__(self, tsc_integration: TSCIntegration):
+    def __init__(
+        self,
+        tsc_integration: TSCIntegration,
+        predictive_analyzer: Optional[PredictiveTelemetryAnalyzer] = None,
+    ):
         self.tsc = tsc_integration
-        self.predictive_analyzer = PredictiveTelemetryAnalyzer()
+        if predictive_analyzer is None:
+            predictive_analyzer = PredictiveTelemetryAnalyzer()
+        self.predictive_analyzer = predictive_analyzer
 
         # Estado del controlador
         self.is_active = False
@@ -432,10 +1130,15 @@ class PredictiveAutopilotController:
 
     def _control_loop(self):
         """Bucle principal de control predictivo."""
+        # Despertar con cada snapshot del bus compartido en lugar de sondear a
+        # 10 Hz; al control solo le interesa el último estado
+        sub = get_telemetry_bus(self.tsc).subscribe("predictive_control", politica=POLITICA_ULTIMO)
         while self.is_active:
+            snapshot = sub.get(timeout=1.0)
+            if snapshot is None or not self.is_active:
+                continue
             try:
-                # Leer datos actuales
-                datos_actuales = self.tsc.leer_datos_archivo()
+                datos_actuales = dict(snapshot.raw)
 
                 if datos_actuales:
                     # Agregar a análisis predictivo
@@ -453,8 +1156,7 @@ class PredictiveAutopilotController:
 
             except Exception as e:
                 print(f"❌ Error en control predictivo: {e}")
-
-            time.sleep(0.1)  # 10 Hz
+        sub.cerrar()
 
     def _calculate_predictive_commands(
         self, current_data: Dict[str, Any], predictions: Dict[str, Any]
@@ -467,8 +1169,12 @@ class PredictiveAutopilotController:
         limite_velocidad = current_data.get("limite_velocidad", 160)
         pendiente = current_data.get("pendiente", 0)
 
-        # Usar predicción de velocidad futura
-        velocidad_predicha = predictions.get("velocidad_actual", velocidad_actual)
+        # Pasos futuros ya calculados por el analizador (sin llamadas extra al
+        # modelo); sin horizonte se usa la predicción del paso siguiente
+        horizonte = predictions.get("horizon") or [predictions]
+
+        # Usar la velocidad futura más alta dentro del horizonte
+        velocidad_predicha = max(p.get("velocidad_actual", velocidad_actual) for p in horizonte)
 
         # Lógica de control predictiva
         if velocidad_predicha > limite_velocidad * self.safety_margin:
@@ -485,10 +1191,10 @@ class PredictiveAutopilotController:
             freno_tren = 0.0
 
         # Ajustes por pendiente usando predicciones
-        pendiente_predicha = predictions.get("pendiente", pendiente)
-        if pendiente_predicha > 5:  # Subida pronunciada
+        pendientes_predichas = [p.get("pendiente", pendiente) for p in horizonte]
+        if max(pendientes_predichas) > 5:  # Subida pronunciada
             acelerador = min(acelerador + 0.2, 1.0)
-        elif pendiente_predicha < -5:  # Bajada pronunciada
+        elif min(pendientes_predichas) < -5:  # Bajada pronunciada
             freno_tren = min(freno_tren + 0.1, 0.5)
 
         return {
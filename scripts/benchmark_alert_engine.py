@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+benchmark_alert_engine.py
+Micro-benchmark del ciclo de alertas con un historial grande
+
+Compara las operaciones de cada ciclo sobre la lista plana anterior
+(duplicados, resolución de transitorias, alertas activas y resumen recorriendo
+todo el historial) con el historial indexado ``AlertIndex``.
+
+Uso:
+    python scripts/benchmark_alert_engine.py [--historial 100000] [--activas 200]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alert_system import Alert, AlertIndex, AlertSeverity, AlertSystem, AlertType
+
+
+def generar_historial(num_alertas: int, num_activas: int):
+    """Historial de un día con ``num_activas`` alertas sin reconocer."""
+    rnd = random.Random(42)
+    ahora = datetime.now()
+    tipos = list(AlertType)
+    severidades = list(AlertSeverity)
+    alertas = []
+    for i in range(num_alertas):
+        momento = ahora - timedelta(seconds=(num_alertas - i) * 86400 / num_alertas)
+        activa = i >= num_alertas - num_activas
+        alertas.append(
+            Alert(
+                alert_id=f"hist_{i}",
+                alert_type=rnd.choice(tipos),
+                severity=rnd.choice(severidades),
+                title="Histórica",
+                message="",
+                timestamp=momento,
+                data={"max_speed": 120, "threshold": 0.5, "temperature_threshold": 90},
+                acknowledged=not activa,
+                acknowledged_at=None if activa else momento,
+            )
+        )
+    return alertas
+
+
+def nuevas_alertas():
+    ahora = datetime.now()
+    return [
+        Alert(f"nueva_{t.value}", t, AlertSeverity.HIGH, "Nueva", "", ahora, {})
+        for t in (AlertType.SPEED_VIOLATION, AlertType.WHEELSLIP, AlertType.OVERHEATING)
+    ]
+
+
+def ciclo_lista(alertas, telemetria):
+    """Operaciones de un ciclo con la implementación anterior (lista plana)."""
+    cutoff = datetime.now() - timedelta(minutes=5)
+    recientes = [a for a in alertas if a.timestamp > cutoff]
+    for nueva in nuevas_alertas():
+        any(
+            r.alert_type == nueva.alert_type
+            and abs((r.timestamp - nueva.timestamp).total_seconds()) < 60
+            for r in recientes
+        )
+    for alerta in alertas:
+        if alerta.acknowledged:
+            continue
+        if alerta.alert_type == AlertType.SPEED_VIOLATION:
+            _ = telemetria["velocidad_actual"] <= float(alerta.data.get("max_speed", 120))
+    activas = [a for a in alertas if not a.acknowledged]
+    activas.sort(key=lambda x: (x.severity.value, -x.timestamp.timestamp()))
+    for severidad in AlertSeverity:
+        len([a for a in alertas if not a.acknowledged and a.severity == severidad])
+    for tipo in AlertType:
+        len([a for a in activas if a.alert_type == tipo])
+
+
+def ciclo_indexado(system: AlertSystem, telemetria):
+    """Las mismas operaciones con el historial indexado."""
+    system._filter_duplicate_alerts(nuevas_alertas())
+    system._resolve_transient_alerts(telemetria)
+    system.get_active_alerts()
+    system.get_alerts_summary()
+
+
+def medir(funcion, repeticiones: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) * 1000.0 / repeticiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--historial", type=int, default=100000)
+    parser.add_argument("--activas", type=int, default=200)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    historial = generar_historial(args.historial, args.activas)
+    # Velocidad alta: ninguna alerta transitoria se resuelve y el estado no cambia
+    telemetria = {"velocidad_actual": 200.0, "deslizamiento_ruedas": 0.9, "temperatura_motor": 120}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        system = AlertSystem(
+            alerts_file=os.path.join(tmp, "alerts.json"),
+            config_file=os.path.join(tmp, "alert_config.json"),
+        )
+        inicio = time.perf_counter()
+        system.alerts = AlertIndex(historial, max_alertas=len(historial))
+        indexado_ms = (time.perf_counter() - inicio) * 1000.0
+
+        lista_ms = medir(lambda: ciclo_lista(historial, telemetria), args.repeticiones)
+        indice_ms = medir(lambda: ciclo_indexado(system, telemetria), args.repeticiones)
+
+        podado = AlertIndex(historial)
+        print(f"Historial: {args.historial} alertas ({args.activas} activas)")
+        print(f"  Indexar historial:       {indexado_ms:9.1f} ms (una vez al cargar)")
+        print(f"  Ciclo con lista plana:   {lista_ms:9.3f} ms")
+        print(f"  Ciclo con AlertIndex:    {indice_ms:9.3f} ms")
+        print(f"  Aceleración:             {lista_ms / max(indice_ms, 1e-9):9.0f}x")
+        print(f"  Retenidas con límite por defecto: {len(podado)} de {len(historial)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+benchmark_conversion.py
+Micro-benchmark del coste por tick de ``convertir_datos_ia``
+
+Compara la conversión completa (estado incremental descartado en cada tick,
+equivalente al comportamiento anterior) con la conversión incremental sobre
+una secuencia de snapshots realista en la que solo cambian unos pocos controles
+por tick (velocidad, aceleración, tiempo de simulación, distancia).
+
+Uso:
+    python scripts/benchmark_conversion.py [--ticks 20000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tsc_integration import TSCIntegration
+
+SNAPSHOT_BASE = {
+    "CurrentSpeed": 15.0,
+    "SpeedometerMPH": 33.5,
+    "SpeedoType": 1.0,
+    "Acceleration": 0.12,
+    "Gradient": 0.4,
+    "CurrentSpeedLimit": 26.8,
+    "NextSpeedLimitSpeed": 17.9,
+    "NextSpeedLimitDistance": 1500.0,
+    "SimulationTime": 36000.0,
+    "DistanceTravelled": 12000.0,
+    "TractiveEffort": 120.0,
+    "RPM": 820.0,
+    "Ammeter": 450.0,
+    "Wheelslip": 1.0,
+    "AirBrakePipePressurePSI": 90.0,
+    "LocoBrakeCylinderPressurePSI": 0.0,
+    "TrainBrakeCylinderPressurePSI": 0.0,
+    "Regulator": 0.5,
+    "Reverser": 1.0,
+    "VirtualBrake": 0.0,
+    "DynamicBrake": 0.0,
+    "HandBrake": 0.0,
+    "EmergencyBrake": 0.0,
+    "CompressorState": 1.0,
+    "SignalAspect": 2.0,
+    "KVB_SignalAspect": -1.0,
+    "Headlights": 1.0,
+    "VirtualThrottle": 0.5,
+    "MainReservoirPressurePSIDisplayed": 140.0,
+}
+
+
+def generar_ticks(num_ticks: int):
+    """Secuencia de snapshots donde cada tick modifica pocos controles."""
+    rnd = random.Random(42)
+    actual = dict(SNAPSHOT_BASE)
+    ticks = []
+    for i in range(num_ticks):
+        actual = dict(actual)
+        actual["SimulationTime"] += 0.1
+        actual["DistanceTravelled"] += actual["CurrentSpeed"] * 0.1
+        actual["CurrentSpeed"] = round(actual["CurrentSpeed"] + rnd.uniform(-0.05, 0.05), 3)
+        if i % 10 == 0:
+            actual["Acceleration"] = round(rnd.uniform(-0.2, 0.2), 3)
+        if i % 50 == 0:
+            actual["Regulator"] = actual["VirtualThrottle"] = rnd.choice([0.375, 0.5, 0.625])
+        ticks.append(actual)
+    return ticks
+
+
+def medir(tsc: TSCIntegration, ticks, completa: bool) -> float:
+    """Coste medio por tick en microsegundos."""
+    convertir = tsc.convertir_datos_ia
+    reiniciar = tsc.conversor.reiniciar
+    inicio = time.perf_counter()
+    for snapshot in ticks:
+        if completa:
+            reiniciar()
+        convertir(snapshot)
+    return (time.perf_counter() - inicio) / len(ticks) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de convertir_datos_ia")
+    parser.add_argument("--ticks", type=int, default=20000, help="número de snapshots")
+    args = parser.parse_args()
+
+    ticks = generar_ticks(args.ticks)
+    tsc = TSCIntegration(ruta_archivo=os.devnull)
+    medir(tsc, ticks[:500], completa=False)  # calentamiento
+
+    completa = medir(tsc, ticks, completa=True)
+    tsc.conversor.reiniciar()
+    tsc.conversor.stats.update(conversiones=0, etapas_recalculadas=0, etapas_reutilizadas=0)
+    incremental = medir(tsc, ticks, completa=False)
+    stats = tsc.conversor.stats
+
+    print("🔬 BENCHMARK convertir_datos_ia (µs por tick)")
+    print("=" * 60)
+    print(f"Ticks:                    {len(ticks)}")
+    print(f"Conversión completa:      {completa:8.2f} µs")
+    print(f"Conversión incremental:   {incremental:8.2f} µs")
+    print(f"Mejora:                   {completa / incremental:8.2f}x")
+    total = stats["etapas_recalculadas"] + stats["etapas_reutilizadas"]
+    print(f"Etapas reutilizadas:      {stats['etapas_reutilizadas'] / total * 100:8.1f} %")
+    print("=" * 60)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
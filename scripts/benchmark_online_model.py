@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+benchmark_online_model.py
+Benchmark del modelo predictivo online (``sgd``) frente al reajuste por lotes
+
+Reproduce una sesión grabada muestra a muestra, en mini-lotes como los que
+recibe el bucle de predicción, y compara:
+
+- Reajuste por lotes (``random_forest``): política actual, reentrenar con todo
+  el historial (máx. 10000 muestras) cada 5000 muestras nuevas.
+- Modelo online (``sgd``): ``partial_fit`` con cada mini-lote.
+
+Para cada política se mide la latencia de actualización por mini-lote y el
+error prequential (predicción hecha antes de ver el lote) sobre la velocidad.
+
+Uso:
+    python scripts/benchmark_online_model.py [--sesion data/telemetry_history] [--muestras 20000]
+
+``--sesion`` acepta un almacén columnar (``telemetry_store``) o un historial
+JSON antiguo; sin él se genera una sesión sintética.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from predictive_telemetry_analysis import HISTORY_FEATURES, FeatureMatrixCache, PredictiveModel
+from telemetry_store import ColumnarTelemetryStore, migrate_legacy_json
+
+
+def cargar_sesion(ruta: str) -> np.ndarray:
+    """Matriz (muestras x HISTORY_FEATURES) de una sesión grabada."""
+    if os.path.isdir(ruta):
+        store = ColumnarTelemetryStore(ruta, HISTORY_FEATURES)
+        datos = store.tail(len(store))
+        store.close()
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ColumnarTelemetryStore(tmp, HISTORY_FEATURES)
+            migrate_legacy_json(ruta, store, renombrar=False)
+            datos = store.tail(len(store))
+            store.close()
+    return np.column_stack([datos[c] for c in HISTORY_FEATURES])
+
+
+def generar_sesion(num_muestras: int) -> np.ndarray:
+    """Sesión sintética: tramos de aceleración/frenado con límites y pendiente variables."""
+    rnd = np.random.default_rng(42)
+    filas = np.zeros((num_muestras, len(HISTORY_FEATURES)))
+    velocidad, limite, pendiente = 0.0, 80.0, 0.0
+    for i in range(num_muestras):
+        if i % 1500 == 0:
+            limite = float(rnd.choice([40, 60, 80, 100, 120]))
+        if i % 400 == 0:
+            pendiente = float(rnd.uniform(-3, 3))
+        acelerador = 0.7 if velocidad < limite * 0.95 else 0.0
+        freno = 0.4 if velocidad > limite * 1.02 else 0.0
+        velocidad = max(0.0, velocidad + 0.3 * acelerador - 0.8 * freno - 0.02 * pendiente)
+        velocidad += rnd.normal(0, 0.05)
+        filas[i] = [velocidad, acelerador, freno, 0.0, pendiente, limite, 1000.0, 1.0, 0.0]
+    return filas
+
+
+def reproducir(matriz, model_type, lookback, lote, intervalo, max_muestras, calentamiento):
+    """Latencias de actualización (ms por lote) y errores prequential de velocidad."""
+    X, y = FeatureMatrixCache.windows(matriz, lookback)
+    modelo = PredictiveModel(model_type)
+    latencias, errores = [], []
+    ultimo_reajuste = 0
+    for inicio in range(0, len(X) - lote + 1, lote):
+        fin = inicio + lote
+        if modelo.is_trained and fin > calentamiento:
+            prediccion = modelo.predict_batch(X[inicio:fin])
+            errores.append(np.abs(prediccion[:, 0] - y[inicio:fin, 0]))
+
+        t0 = time.perf_counter()
+        if modelo.is_online:
+            modelo.partial_fit(X[inicio:fin], y[inicio:fin])
+        elif fin >= calentamiento and (not modelo.is_trained or fin - ultimo_reajuste >= intervalo):
+            desde = max(0, fin - max_muestras)
+            modelo.train(X[desde:fin], y[desde:fin])
+            ultimo_reajuste = fin
+        latencias.append((time.perf_counter() - t0) * 1000.0)
+    return np.array(latencias), np.concatenate(errores) if errores else np.array([])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark modelo online vs reajuste por lotes")
+    parser.add_argument("--sesion", help="almacén columnar o historial JSON grabado")
+    parser.add_argument("--muestras", type=int, default=20000, help="tamaño de la sesión sintética")
+    parser.add_argument("--lookback", type=int, default=10)
+    parser.add_argument("--lote", type=int, default=50, help="muestras por actualización")
+    parser.add_argument("--intervalo", type=int, default=5000, help="reajuste por lotes cada N")
+    parser.add_argument("--calentamiento", type=int, default=1000)
+    args = parser.parse_args()
+
+    matriz = cargar_sesion(args.sesion) if args.sesion else generar_sesion(args.muestras)
+    origen = args.sesion or "sintética"
+
+    print("🔬 BENCHMARK modelo online vs reajuste por lotes")
+    print("=" * 70)
+    print(f"Sesión:                 {origen} ({len(matriz)} muestras, lote {args.lote})")
+    print(f"{'Política':<22}{'p50 ms':>9}{'p99 ms':>9}{'máx ms':>10}{'total s':>9}{'MAE vel':>10}")
+    for etiqueta, model_type in (
+        ("Lotes (random_forest)", "random_forest"),
+        ("Online (sgd)", "sgd"),
+    ):
+        latencias, errores = reproducir(
+            matriz, model_type, args.lookback, args.lote, args.intervalo, 10000, args.calentamiento
+        )
+        mae = float(np.mean(errores)) if errores.size else float("nan")
+        print(
+            f"{etiqueta:<22}{np.percentile(latencias, 50):9.2f}{np.percentile(latencias, 99):9.2f}"
+            f"{latencias.max():10.1f}{latencias.sum() / 1000:9.2f}{mae:10.3f}"
+        )
+    print("=" * 70)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+benchmark_parser.py
+Benchmark de throughput del parser de GetData.txt (snapshots/segundo)
+
+Compara el parser de una sola pasada (``GetDataParser`` vía
+``TSCIntegration.leer_datos_archivo``) con el algoritmo de líneas original
+sobre archivos sintéticos de 50 a 5.000 controles.
+
+Uso:
+    python scripts/benchmark_parser.py [--duracion 1.0]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tsc_integration import TSCIntegration
+
+TAMANOS = (50, 200, 1000, 5000)
+
+
+def generar_getdata(ruta: str, num_controles: int, nombres_reales) -> None:
+    """Escribir un GetData.txt sintético con ``num_controles`` controles."""
+    lineas = ["\ufeff"]
+    for i in range(num_controles):
+        nombre = nombres_reales[i] if i < len(nombres_reales) else f"CustomControl{i}"
+        lineas.append(f"ControlName:{nombre}\nControlValue:{i * 0.137:.6f}\n")
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write("".join(lineas))
+
+
+def leer_lineas(ruta: str):
+    """Lectura de texto original (readlines + BOM)."""
+    with open(ruta, encoding="utf-8") as f:
+        lineas = f.readlines()
+    if lineas and lineas[0].startswith("\ufeff"):
+        lineas[0] = lineas[0].lstrip("\ufeff")
+    return lineas
+
+
+def parse_legacy(lineas):
+    """Algoritmo original de ``leer_datos_archivo`` (referencia)."""
+    datos = {}
+    i = 0
+    while i < len(lineas):
+        linea = lineas[i].strip()
+        if linea.startswith("ControlName:"):
+            nombre_control = linea.split(":", 1)[1].strip()
+            j = i + 1
+            while j < len(lineas) and not lineas[j].strip().startswith("ControlValue:"):
+                j += 1
+            if j < len(lineas):
+                valor_str = lineas[j].strip().split(":", 1)[1].strip()
+                try:
+                    datos[nombre_control] = float(valor_str)
+                except ValueError:
+                    datos[nombre_control] = valor_str
+        i += 1
+    return datos
+
+
+def medir(func, duracion: float) -> float:
+    """Ejecutar ``func`` durante ``duracion`` segundos y devolver llamadas/segundo."""
+    func()  # calentamiento (tabla de nombres, caché del sistema de archivos)
+    llamadas = 0
+    inicio = time.perf_counter()
+    while True:
+        func()
+        llamadas += 1
+        transcurrido = time.perf_counter() - inicio
+        if transcurrido >= duracion:
+            return llamadas / transcurrido
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del parser de GetData.txt")
+    parser.add_argument("--duracion", type=float, default=1.0, help="segundos por medición")
+    args = parser.parse_args()
+
+    print("🔬 BENCHMARK PARSER GetData.txt (snapshots/segundo)")
+    print("=" * 78)
+    print(f"{'Controles':>10}{'Parse legacy':>16}{'Parse nuevo':>16}{'Mejora':>10}{'Lectura+parse':>18}")
+    print("-" * 78)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "GetData.txt")
+        tsc = TSCIntegration(ruta_archivo=ruta)
+        nombres_reales = list(tsc.mapeo_controles)
+        for num in TAMANOS:
+            generar_getdata(ruta, num, nombres_reales)
+            lineas = leer_lineas(ruta)
+            with open(ruta, "rb") as f:
+                crudo = f.read()
+            if parse_legacy(lineas) != tsc.parser.parse(crudo):
+                print(f"❌ Resultados distintos para {num} controles")
+                return 1
+            legacy = medir(lambda lineas=lineas: parse_legacy(lineas), args.duracion)
+            nuevo = medir(lambda crudo=crudo: tsc.parser.parse(crudo), args.duracion)
+            extremo = medir(tsc.leer_datos_archivo, args.duracion)
+            print(f"{num:>10}{legacy:>16.1f}{nuevo:>16.1f}{nuevo / legacy:>9.2f}x{extremo:>18.1f}")
+
+    print("=" * 78)
+    print("✅ BENCHMARK COMPLETADO")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+benchmark_training_data.py
+Micro-benchmark de ``TelemetryDataCollector.get_training_data``
+
+Compara el bucle original (extraer características muestra a muestra y
+concatenar ventanas en listas) con la matriz de características incremental y
+las ventanas deslizantes de NumPy sobre un historial completo.
+
+Uso:
+    python scripts/benchmark_training_data.py [--muestras 10000] [--lookback 10]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from predictive_telemetry_analysis import TelemetryDataCollector
+
+
+def generar_muestras(num_muestras: int):
+    rnd = random.Random(42)
+    muestras = []
+    for i in range(num_muestras):
+        muestras.append(
+            {
+                "velocidad_actual": 40 + 20 * np.sin(i / 200) + rnd.uniform(-1, 1),
+                "acelerador": rnd.uniform(0, 1),
+                "freno_tren": rnd.uniform(0, 0.3),
+                "freno_motor": 0.0,
+                "pendiente": rnd.uniform(-2, 2),
+                "limite_velocidad": 80,
+                "radio_curva": 1000,
+                "senal_principal": rnd.choice([0, 1, 2]),
+                "senal_avanzada": rnd.choice([0, 1, 2]),
+            }
+        )
+    return muestras
+
+
+def training_data_bucle(collector: TelemetryDataCollector, lookback_steps: int):
+    """Implementación anterior de ``get_training_data``."""
+    history_list = list(collector.telemetry_history)
+    samples, targets = [], []
+    for i in range(len(history_list) - lookback_steps):
+        sequence = []
+        for j in range(lookback_steps):
+            sequence.extend(collector._extract_features(history_list[i + j]["data"]))
+        samples.append(sequence)
+        targets.append(collector._extract_features(history_list[i + lookback_steps]["data"]))
+    return np.array(samples), np.array(targets)
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Tiempo medio por llamada en milisegundos."""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de get_training_data")
+    parser.add_argument("--muestras", type=int, default=10000, help="tamaño del historial")
+    parser.add_argument("--lookback", type=int, default=10, help="pasos de la ventana")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        collector = TelemetryDataCollector(
+            max_samples=args.muestras, data_file=os.path.join(tmp, "telemetry_history.json")
+        )
+        for muestra in generar_muestras(args.muestras):
+            collector.add_telemetry_sample(muestra)
+
+        X_ref, y_ref = training_data_bucle(collector, args.lookback)
+        X, y = collector.get_training_data(args.lookback)
+        assert np.array_equal(X, X_ref) and np.array_equal(y, y_ref), "resultados distintos"
+
+        bucle = medir(lambda: training_data_bucle(collector, args.lookback), args.repeticiones)
+        vectorizado = medir(lambda: collector.get_training_data(args.lookback), args.repeticiones)
+        if collector.store is not None:
+            collector.store.close()
+
+    print("🔬 BENCHMARK get_training_data (ms por llamada)")
+    print("=" * 60)
+    print(f"Muestras / lookback:      {args.muestras} / {args.lookback}")
+    print(f"Forma X / y:              {X.shape} / {y.shape}")
+    print(f"Bucle original:           {bucle:8.2f} ms")
+    print(f"Ventanas vectorizadas:    {vectorizado:8.2f} ms")
+    print(f"Mejora:                   {bucle / vectorizado:8.1f}x")
+    print("=" * 60)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
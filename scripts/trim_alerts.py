@@ -29,4 +29,11 @@ minimal = [
 with open(alerts_path, 'w', encoding='utf-8') as f:
     json.dump(minimal, f, indent=2, ensure_ascii=False)
 
+# El diario (alerts.jsonl) tiene prioridad sobre alerts.json: quitarlo para que
+# el siguiente arranque importe el alerts.json recortado
+journal_path = alerts_path.with_suffix('.jsonl')
+if journal_path.exists():
+    journal_path.unlink()
+    print('Removed alerts.jsonl')
+
 print('Wrote minimal alerts.json')
@@ -10,22 +10,29 @@ import pandas as pd
 import seaborn as sns
 
 # Importar integración TSC
+from telemetry_bus import POLITICA_DESCARTAR_NUEVO
 from tsc_integration import TSCIntegration
 
 
 class SeabornAnalysis:
     """Análisis estadístico de datos de telemetría usando Seaborn"""
 
-    def __init__(self, data_file=None, use_tsc_integration=True):
+    def __init__(self, data_file=None, use_tsc_integration=True, telemetry_bus=None):
         self.df = None
         self.tsc_integration = None
+        # Bus de telemetría compartido: si se indica, las lecturas se recopilan
+        # de sus snapshots en lugar de leer GetData.txt directamente
+        self.telemetry_bus = telemetry_bus
 
         # Configurar estilo de Seaborn
         sns.set_style("whitegrid")
         sns.set_palette("husl")
 
         # Inicializar integración TSC si se solicita
-        if use_tsc_integration:
+        if telemetry_bus is not None:
+            self.tsc_integration = telemetry_bus.tsc
+            print("Bus de telemetría compartido conectado para análisis estadístico")
+        elif use_tsc_integration:
             self.tsc_integration = TSCIntegration()
             print("Integración TSC inicializada para análisis estadístico")
 
@@ -33,6 +40,61 @@ class SeabornAnalysis:
         if data_file:
             self.load_data(data_file)
 
+    def _collect_from_bus(self, max_records, collection_time):
+        """Recopilar snapshots del bus durante ``collection_time`` segundos."""
+        import time
+
+        # Buffer acotado: si el análisis se retrasa se conservan las primeras
+        # lecturas de la ventana, igual que el bucle de sondeo original
+        capacidad = max_records or max(1, int(collection_time * 20))
+        sub = self.telemetry_bus.subscribe(
+            "seaborn_analysis", capacidad=capacidad, politica=POLITICA_DESCARTAR_NUEVO
+        )
+        datos_recopilados = []
+        fin = time.time() + collection_time
+        try:
+            while True:
+                restante = fin - time.time()
+                if restante <= 0 or (max_records and len(datos_recopilados) >= max_records):
+                    break
+                snapshot = sub.get(timeout=restante)
+                if snapshot is None:
+                    continue
+                datos_actuales = dict(snapshot.raw)
+                datos_actuales["timestamp"] = snapshot.timestamp
+                datos_recopilados.append(datos_actuales)
+                print(f"✓ Lectura {len(datos_recopilados)}: {len(datos_actuales)} variables")
+        finally:
+            sub.cerrar()
+        return datos_recopilados
+
+    def _collect_polling(self, max_records, collection_time):
+        """Recopilar lecturas sondeando GetData.txt cada 100 ms (sin bus)."""
+        import time
+
+        datos_recopilados = []
+        start_time = time.time()
+
+        while time.time() - start_time < collection_time:
+            # Leer datos actuales
+            datos_actuales = self.tsc_integration.leer_datos_archivo()
+
+            if datos_actuales and isinstance(datos_actuales, dict):
+                # Agregar timestamp
+                datos_actuales["timestamp"] = time.time()
+                datos_recopilados.append(datos_actuales)
+                print(f"✓ Lectura {len(datos_recopilados)}: {len(datos_actuales)} variables")
+            else:
+                print(f"⚠ Lectura fallida o datos inválidos: {type(datos_actuales)}")
+
+            # Pequeña pausa entre lecturas
+            time.sleep(0.1)  # 100ms
+
+            # Verificar límite de registros
+            if max_records and len(datos_recopilados) >= max_records:
+                break
+        return datos_recopilados
+
     def load_data_from_tsc(self, max_records=None, collection_time=30):
         """Cargar datos directamente desde TSC recopilando múltiples lecturas"""
         if not self.tsc_integration:
@@ -42,29 +104,10 @@ class SeabornAnalysis:
         try:
             print(f"Recopilando datos desde TSC durante {collection_time} segundos...")
 
-            import time
-
-            datos_recopilados = []
-            start_time = time.time()
-
-            while time.time() - start_time < collection_time:
-                # Leer datos actuales
-                datos_actuales = self.tsc_integration.leer_datos_archivo()
-
-                if datos_actuales and isinstance(datos_actuales, dict):
-                    # Agregar timestamp
-                    datos_actuales["timestamp"] = time.time()
-                    datos_recopilados.append(datos_actuales)
-                    print(f"✓ Lectura {len(datos_recopilados)}: {len(datos_actuales)} variables")
-                else:
-                    print(f"⚠ Lectura fallida o datos inválidos: {type(datos_actuales)}")
-
-                # Pequeña pausa entre lecturas
-                time.sleep(0.1)  # 100ms
-
-                # Verificar límite de registros
-                if max_records and len(datos_recopilados) >= max_records:
-                    break
+            if self.telemetry_bus is not None:
+                datos_recopilados = self._collect_from_bus(max_records, collection_time)
+            else:
+                datos_recopilados = self._collect_polling(max_records, collection_time)
 
             if not datos_recopilados:
                 print("No se pudieron recopilar datos desde TSC")
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+stream_encoding.py
+Codificación negociada de los mensajes del stream WebSocket (JSON, MessagePack o zlib)
+
+Cada cliente elige al suscribirse, por orden de preferencia, las codificaciones
+que sabe decodificar:
+
+- ``json``: el mensaje tal cual; Socket.IO lo serializa a texto (por defecto)
+- ``msgpack``: frame binario MessagePack (requiere el paquete ``msgpack``)
+- ``zlib``: frame binario con el JSON comprimido con deflate (formato zlib,
+  el que entiende ``DecompressionStream('deflate')`` en el navegador)
+
+Cada mensaje se codifica una sola vez por codificación en uso y se publica en
+una sala por (topic, codificación), en lugar de que ``DataCompressor`` lo
+serialice a JSON dos veces por tick para medirlo. El tamaño de referencia (lo
+que ocuparía en JSON) sale del propio texto en ``zlib``; en el resto se mide
+serializando uno de cada ``MUESTREO_TAMANO_JSON`` mensajes de cada topic y
+contabilizando esa medida para los siguientes. Por codificación se cuentan
+mensajes, bytes y coste de CPU de codificar.
+"""
+
+import json
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional
+
+from metrics_registry import CUBETAS_RAPIDAS_MS
+
+try:
+    import msgpack
+
+    HAS_MSGPACK = True
+except ImportError:
+    msgpack = None
+    HAS_MSGPACK = False
+
+try:
+    from logging_config import get_logger
+
+    logger = get_logger(__name__)
+except ImportError:
+    import logging
+
+    logger = logging.getLogger(__name__)
+
+JSON = "json"
+MSGPACK = "msgpack"
+ZLIB = "zlib"
+CODIFICACIONES = (JSON, MSGPACK, ZLIB)
+NIVEL_ZLIB = 6
+# Bytes supuestos para un float en JSON (la mayoría de valores de telemetría
+# son decimales cortos; el estimador no llega a formatearlos)
+BYTES_FLOAT = 10
+PROFUNDIDAD_MAX = 32
+# Cada cuántos mensajes de un topic se mide su tamaño real en JSON (los
+# mensajes de un mismo topic tienen tamaños parecidos)
+MUESTREO_TAMANO_JSON = 32
+
+
+def estimar_bytes_json(valor: Any, _profundidad: int = 0) -> int:
+    """Tamaño aproximado de ``valor`` en JSON compacto, sin serializarlo."""
+    if valor is None or valor is True:
+        return 4
+    if valor is False:
+        return 5
+    if isinstance(valor, str):
+        return len(valor) + 2
+    if isinstance(valor, int):
+        return len(str(valor))
+    if isinstance(valor, float):
+        return BYTES_FLOAT
+    if _profundidad >= PROFUNDIDAD_MAX:
+        return 2
+    if isinstance(valor, dict):
+        total = 1 + len(valor)  # llaves y separadores
+        for clave, item in valor.items():
+            total += len(str(clave)) + 3 + estimar_bytes_json(item, _profundidad + 1)
+        return total
+    if isinstance(valor, (list, tuple)):
+        total = 1 + max(len(valor), 1)
+        for item in valor:
+            total += estimar_bytes_json(item, _profundidad + 1)
+        return total
+    return len(str(valor)) + 2  # ``default=str``
+
+
+def disponibles(compresion: bool = True) -> List[str]:
+    """Codificaciones que este servidor puede producir."""
+    return [
+        c for c in CODIFICACIONES if (c != MSGPACK or HAS_MSGPACK) and (c != ZLIB or compresion)
+    ]
+
+
+class StreamEncoder:
+    """Codificación por cliente de los mensajes del stream y sus estadísticas.
+
+    Args:
+        nivel_zlib: Nivel de compresión de los frames ``zlib``
+        registro: Registro de métricas donde exponer bytes y coste por
+            codificación (None = solo ``get_metrics``)
+    """
+
+    def __init__(self, nivel_zlib: int = NIVEL_ZLIB, registro=None):
+        self.nivel_zlib = nivel_zlib
+        self.compresion_habilitada = True
+        self._clientes: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        # topic -> [mensajes contabilizados con la última medida, bytes medidos]
+        self._tamanos: Dict[Any, List[int]] = {}
+        self.metrics: Dict[str, Dict[str, float]] = {
+            c: {"mensajes": 0, "bytes": 0, "bytes_json": 0, "cpu_ms": 0.0, "errores": 0}
+            for c in CODIFICACIONES
+        }
+        self._hist = {}
+        self._bytes = {}
+        if registro is not None:
+            for c in CODIFICACIONES:
+                self._hist[c] = registro.histogram(
+                    "dashboard_stream_encode_ms",
+                    "Stream message encoding time per encoding in ms",
+                    {"encoding": c},
+                    cubetas=CUBETAS_RAPIDAS_MS,
+                )
+                self._bytes[c] = registro.counter(
+                    "dashboard_stream_encoded_bytes_total",
+                    "Stream bytes produced per encoding",
+                    {"encoding": c},
+                )
+
+    # ------------------------------------------------------------------
+    # Negociación
+    # ------------------------------------------------------------------
+    def negociar(self, cliente: str, aceptadas: Optional[Iterable[str]]) -> str:
+        """Fijar la codificación de ``cliente``: la primera de ``aceptadas`` disponible.
+
+        Sin coincidencias (o sin lista) el cliente recibe JSON.
+        """
+        posibles = disponibles(self.compresion_habilitada)
+        elegida = next((c for c in (aceptadas or ()) if c in posibles), JSON)
+        with self._lock:
+            self._clientes[cliente] = elegida
+        return elegida
+
+    def codificacion(self, cliente: str) -> str:
+        return self._clientes.get(cliente, JSON)
+
+    def quitar(self, cliente: str) -> None:
+        with self._lock:
+            self._clientes.pop(cliente, None)
+
+    def activas(self) -> List[str]:
+        """Codificaciones con algún cliente (en el orden de ``CODIFICACIONES``)."""
+        usadas = set(self._clientes.values())
+        return [c for c in CODIFICACIONES if c in usadas]
+
+    @staticmethod
+    def sala(sala_base: str, codificacion: str) -> str:
+        """Sala de un topic para una codificación (JSON conserva la sala original)."""
+        return sala_base if codificacion == JSON else f"{sala_base}|{codificacion}"
+
+    # ------------------------------------------------------------------
+    # Codificación
+    # ------------------------------------------------------------------
+    def codificar(self, mensaje: Dict[str, Any], codificacion: str = JSON) -> Any:
+        """Mensaje listo para ``emit``: el propio dict (JSON) o un frame binario."""
+        inicio = time.perf_counter()
+        texto = None
+        try:
+            if codificacion == MSGPACK and HAS_MSGPACK:
+                salida = msgpack.packb(mensaje, use_bin_type=True, default=str)
+            elif codificacion == ZLIB:
+                texto = json.dumps(mensaje, default=str, separators=(",", ":")).encode("utf-8")
+                salida = zlib.compress(texto, self.nivel_zlib)
+            else:
+                codificacion = JSON
+                salida = mensaje
+        except (TypeError, ValueError) as e:
+            logger.debug("No se pudo codificar el mensaje en %s: %s", codificacion, e)
+            self.metrics[codificacion]["errores"] += 1
+            codificacion = JSON
+            salida = mensaje
+        coste_ms = (time.perf_counter() - inicio) * 1000.0
+        bytes_json = self._tamano_json(mensaje, texto)
+        tamano = bytes_json if salida is mensaje else len(salida)
+        datos = self.metrics[codificacion]
+        datos["mensajes"] += 1
+        datos["bytes"] += tamano
+        datos["bytes_json"] += bytes_json
+        datos["cpu_ms"] += coste_ms
+        if self._hist:
+            self._hist[codificacion].observar(coste_ms)
+            self._bytes[codificacion].inc(tamano)
+        return salida
+
+    def _tamano_json(self, mensaje: Dict[str, Any], texto: Optional[bytes]) -> int:
+        """Bytes de ``mensaje`` en JSON compacto: exactos o la última medida de su topic."""
+        muestra = self._tamanos.get(mensaje.get("topic"))
+        if texto is None and muestra is not None and muestra[0] < MUESTREO_TAMANO_JSON:
+            muestra[0] += 1
+            return muestra[1]
+        if texto is None:
+            try:
+                texto = json.dumps(mensaje, default=str, separators=(",", ":")).encode("utf-8")
+            except (TypeError, ValueError):
+                return estimar_bytes_json(mensaje)
+        self._tamanos[mensaje.get("topic")] = [1, len(texto)]
+        return len(texto)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Por codificación: clientes, mensajes, bytes, ratio frente a JSON y coste."""
+        clientes = list(self._clientes.values())
+        por_codificacion = {}
+        for c, m in self.metrics.items():
+            datos: Dict[str, Any] = dict(m)
+            datos["clientes"] = clientes.count(c)
+            datos["ratio_bytes"] = m["bytes"] / m["bytes_json"] if m["bytes_json"] else 0.0
+            datos["cpu_us_medio"] = (
+                round(m["cpu_ms"] * 1000.0 / m["mensajes"], 2) if m["mensajes"] else 0.0
+            )
+            datos["cpu_ms"] = round(m["cpu_ms"], 3)
+            por_codificacion[c] = datos
+        return {
+            "disponibles": disponibles(self.compresion_habilitada),
+            "compresion_habilitada": self.compresion_habilitada,
+            "codificaciones": por_codificacion,
+        }
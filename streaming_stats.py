@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+streaming_stats.py
+Estadísticas incrementales por variable de telemetría para detectar anomalías
+
+Sustituye el recálculo de media y desviación sobre un DataFrame completo (que
+además exigía una fase previa de recogida de datos) por estadísticas que se
+actualizan con cada snapshot:
+
+- ``RollingWelford``: media y varianza de una ventana deslizante con el
+  algoritmo de Welford (alta y baja de muestras en O(1))
+- ``EWMA``: media y varianza exponenciales, sin ventana
+- ``RollingQuantiles``: cuantiles exactos de la ventana (lista ordenada con
+  búsqueda binaria)
+
+El z-score de cada muestra se calcula contra las estadísticas anteriores a
+incluirla, de modo que una muestra anómala no diluye su propia detección.
+"""
+
+import bisect
+import math
+from collections import deque
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+# Ventana por defecto: 5 minutos de telemetría a 10 Hz
+VENTANA_POR_DEFECTO = 3000
+ALPHA_EWMA = 0.01
+CUANTILES = (0.05, 0.5, 0.95)
+
+
+class RollingWelford:
+    """Media y varianza muestral de las últimas ``ventana`` muestras."""
+
+    def __init__(self, ventana: int = VENTANA_POR_DEFECTO):
+        self.ventana = ventana
+        self._valores: deque = deque()
+        self.n = 0
+        self.media = 0.0
+        self._m2 = 0.0
+        self._bajas = 0
+
+    def actualizar(self, x: float) -> Optional[float]:
+        """Añadir ``x`` (y retirar la más antigua si la ventana está llena).
+
+        Returns:
+            La muestra retirada, si la hubo
+        """
+        retirada = None
+        if self.n >= self.ventana:
+            retirada = self._valores.popleft()
+            self._quitar(retirada)
+        self._valores.append(x)
+        self.n += 1
+        delta = x - self.media
+        self.media += delta / self.n
+        self._m2 += delta * (x - self.media)
+        # Las bajas acumulan error de redondeo: recalcular exacto una vez por
+        # ventana (coste amortizado O(1))
+        if retirada is not None:
+            self._bajas += 1
+            if self._bajas >= self.ventana:
+                self._recalcular()
+        return retirada
+
+    def _recalcular(self) -> None:
+        self._bajas = 0
+        self.media = math.fsum(self._valores) / self.n
+        self._m2 = math.fsum((v - self.media) ** 2 for v in self._valores)
+
+    def _quitar(self, x: float) -> None:
+        if self.n <= 1:
+            self.n, self.media, self._m2 = 0, 0.0, 0.0
+            return
+        media_previa = (self.n * self.media - x) / (self.n - 1)
+        self._m2 -= (x - self.media) * (x - media_previa)
+        self.media = media_previa
+        self.n -= 1
+        if self._m2 < 0.0:  # error de redondeo acumulado
+            self._m2 = 0.0
+
+    @property
+    def varianza(self) -> float:
+        return self._m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def desviacion(self) -> float:
+        return math.sqrt(self.varianza)
+
+    def zscore(self, x: float) -> float:
+        desviacion = self.desviacion
+        return abs(x - self.media) / desviacion if desviacion > 0 else 0.0
+
+
+class EWMA:
+    """Media y varianza con decaimiento exponencial (``alpha`` = peso de la muestra nueva)."""
+
+    def __init__(self, alpha: float = ALPHA_EWMA):
+        self.alpha = alpha
+        self.media: Optional[float] = None
+        self.varianza = 0.0
+
+    def actualizar(self, x: float) -> None:
+        if self.media is None:
+            self.media = x
+            return
+        delta = x - self.media
+        self.media += self.alpha * delta
+        self.varianza = (1 - self.alpha) * (self.varianza + self.alpha * delta * delta)
+
+    @property
+    def desviacion(self) -> float:
+        return math.sqrt(self.varianza)
+
+
+class RollingQuantiles:
+    """Cuantiles exactos de una ventana deslizante.
+
+    Mantiene los valores de la ventana en una lista ordenada. La posición de
+    alta y baja se busca por bisección (O(log n)), pero insertar y borrar
+    desplazan la lista, así que cada actualización cuesta O(ventana); con
+    ventanas de unos cientos de valores es un ``memmove`` barato. La consulta
+    es O(1).
+    """
+
+    def __init__(self, ventana: int = VENTANA_POR_DEFECTO):
+        self.ventana = ventana
+        self._ordenados: List[float] = []
+
+    def actualizar(self, x: float, retirada: Optional[float] = None) -> None:
+        if retirada is not None:
+            i = bisect.bisect_left(self._ordenados, retirada)
+            if i < len(self._ordenados) and self._ordenados[i] == retirada:
+                del self._ordenados[i]
+        bisect.insort(self._ordenados, x)
+
+    def cuantil(self, q: float) -> Optional[float]:
+        if not self._ordenados:
+            return None
+        posicion = q * (len(self._ordenados) - 1)
+        inferior = int(posicion)
+        superior = min(inferior + 1, len(self._ordenados) - 1)
+        fraccion = posicion - inferior
+        return self._ordenados[inferior] * (1 - fraccion) + self._ordenados[superior] * fraccion
+
+
+class VariableStats:
+    """Estadísticas incrementales de una variable."""
+
+    def __init__(self, ventana: int = VENTANA_POR_DEFECTO, alpha: float = ALPHA_EWMA):
+        self.ventana = RollingWelford(ventana)
+        self.ewma = EWMA(alpha)
+        self.cuantiles = RollingQuantiles(ventana)
+        self.ultimo_valor: Optional[float] = None
+        self.ultimo_zscore = 0.0
+        # Media y desviación contra las que se calculó el último z-score
+        self.referencia = (0.0, 0.0)
+
+    def actualizar(self, x: float) -> float:
+        """Añadir una muestra y devolver su z-score respecto a la ventana previa."""
+        z = self.ventana.zscore(x)
+        self.referencia = (self.ventana.media, self.ventana.desviacion)
+        retirada = self.ventana.actualizar(x)
+        self.cuantiles.actualizar(x, retirada)
+        self.ewma.actualizar(x)
+        self.ultimo_valor = x
+        self.ultimo_zscore = z
+        return z
+
+    @property
+    def n(self) -> int:
+        return self.ventana.n
+
+    def resumen(self, cuantiles: Sequence[float] = CUANTILES) -> Dict[str, Any]:
+        datos: Dict[str, Any] = {
+            "n": self.ventana.n,
+            "media": self.ventana.media,
+            "desviacion": self.ventana.desviacion,
+            "ewma_media": self.ewma.media,
+            "ewma_desviacion": self.ewma.desviacion,
+            "ultimo_valor": self.ultimo_valor,
+            "ultimo_zscore": self.ultimo_zscore,
+        }
+        for q in cuantiles:
+            datos[f"p{int(round(q * 100))}"] = self.cuantiles.cuantil(q)
+        return datos
+
+    def estadistica(self, nombre: str) -> Optional[float]:
+        """Una entrada de ``resumen`` (``"media"``, ``"p95"``...) sin calcular las demás."""
+        if nombre[0] == "p" and nombre[1:].isdigit():
+            return self.cuantiles.cuantil(int(nombre[1:]) / 100.0)
+        return self.resumen(())[nombre]
+
+
+class StreamingTelemetryStats:
+    """Estadísticas incrementales de varias variables de telemetría.
+
+    Args:
+        variables: Nombre de la variable -> clave en el diccionario de
+            telemetría (p. ej. ``{"velocidad": "velocidad_actual"}``)
+        ventana: Muestras de la ventana deslizante
+        alpha: Peso de la muestra nueva en la EWMA
+    """
+
+    def __init__(
+        self,
+        variables: Mapping[str, str],
+        ventana: int = VENTANA_POR_DEFECTO,
+        alpha: float = ALPHA_EWMA,
+    ):
+        self.variables = dict(variables)
+        self.stats: Dict[str, VariableStats] = {
+            nombre: VariableStats(ventana, alpha) for nombre in self.variables
+        }
+        self.muestras = 0
+
+    def actualizar(self, datos: Mapping[str, Any]) -> Dict[str, float]:
+        """Actualizar con un snapshot y devolver el z-score de cada variable presente."""
+        zscores = {}
+        for nombre, clave in self.variables.items():
+            valor = datos.get(clave)
+            if valor is None or isinstance(valor, bool):
+                continue
+            try:
+                x = float(valor)
+            except (TypeError, ValueError):
+                continue
+            if not math.isfinite(x):
+                continue
+            zscores[nombre] = self.stats[nombre].actualizar(x)
+        self.muestras += 1
+        return zscores
+
+    def resumen(self) -> Dict[str, Dict[str, Any]]:
+        return {nombre: s.resumen() for nombre, s in self.stats.items()}
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+system_sampler.py
+Muestreador de métricas del sistema con colectores de intervalo propio y retención por niveles
+
+Cada colector declara cada cuánto debe ejecutarse y cuánto puede costar. Los
+contadores baratos del proceso (CPU sin bloquear, memoria, hilos) se leen cada
+segundo; los recorridos caros de todo el sistema (``net_connections``,
+``open_files``) una vez por minuto. Si un colector supera su presupuesto de
+coste, su intervalo efectivo se alarga hasta que vuelva a cumplirlo.
+
+Los valores se guardan en arrays de tamaño fijo: una hora a resolución de 1 s
+y un día a 1 min (promedio de las muestras de cada minuto). El muestreador
+mide su propio coste y lo expone como porcentaje del tiempo transcurrido.
+"""
+
+import math
+import threading
+import time
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metrics_registry import CUBETAS_RAPIDAS_MS, get_metrics_registry
+
+try:
+    import psutil
+
+    HAS_PSUTIL = True
+except ImportError:
+    psutil = None
+    HAS_PSUTIL = False
+
+try:
+    from logging_config import get_logger
+
+    logger = get_logger(__name__)
+except ImportError:
+    import logging
+
+    logger = logging.getLogger(__name__)
+
+# Niveles de retención: (segundos por punto, puntos)
+NIVEL_SEGUNDOS = (1, 3600)  # 1 hora a 1 s
+NIVEL_MINUTOS = (60, 1440)  # 1 día a 1 min
+# Un colector que excede su presupuesto puede espaciarse hasta este factor
+FACTOR_ESPACIADO_MAX = 8.0
+
+_COSTE_TICK = get_metrics_registry().histogram(
+    "system_sampler_tick_ms",
+    "System metrics sampler cost per tick in ms",
+    cubetas=CUBETAS_RAPIDAS_MS,
+)
+
+
+class RingSeries:
+    """Serie de tamaño fijo (timestamps y valores en ``array('d')`` preasignados)."""
+
+    def __init__(self, capacidad: int):
+        self.capacidad = capacidad
+        self._ts = array("d", [0.0]) * capacidad
+        self._valores = array("d", [math.nan]) * capacidad
+        self._siguiente = 0
+        self.n = 0
+
+    def agregar(self, ts: float, valor: float) -> None:
+        self._ts[self._siguiente] = ts
+        self._valores[self._siguiente] = valor
+        self._siguiente = (self._siguiente + 1) % self.capacidad
+        if self.n < self.capacidad:
+            self.n += 1
+
+    def ultimos(self, n: Optional[int] = None) -> List[Tuple[float, float]]:
+        """Pares (timestamp, valor) en orden cronológico."""
+        n = self.n if n is None else min(n, self.n)
+        inicio = (self._siguiente - n) % self.capacidad
+        return [
+            (self._ts[(inicio + i) % self.capacidad], self._valores[(inicio + i) % self.capacidad])
+            for i in range(n)
+        ]
+
+
+class TieredSeries:
+    """Serie de una métrica en dos niveles: segundos (1 h) y minutos (1 día)."""
+
+    def __init__(self, segundos: Tuple[int, int] = NIVEL_SEGUNDOS, minutos=NIVEL_MINUTOS):
+        self.paso_minutos = minutos[0]
+        self.segundos = RingSeries(segundos[1])
+        self.minutos = RingSeries(minutos[1])
+        self._cubeta: Optional[int] = None
+        self._suma = 0.0
+        self._conteo = 0
+
+    def agregar(self, ts: float, valor: float) -> None:
+        self.segundos.agregar(ts, valor)
+        cubeta = int(ts // self.paso_minutos)
+        if self._cubeta is not None and cubeta != self._cubeta:
+            self._cerrar_cubeta()
+        self._cubeta = cubeta
+        self._suma += valor
+        self._conteo += 1
+
+    def _cerrar_cubeta(self) -> None:
+        if self._conteo:
+            self.minutos.agregar(self._cubeta * self.paso_minutos, self._suma / self._conteo)
+        self._suma = 0.0
+        self._conteo = 0
+
+
+class Collector:
+    """Fuente de métricas con intervalo y presupuesto de coste propios.
+
+    Args:
+        nombre: Identificador del colector
+        funcion: Devuelve un diccionario ``métrica -> valor``
+        intervalo_s: Cada cuántos segundos debe ejecutarse
+        presupuesto_ms: Coste máximo esperado por ejecución
+    """
+
+    def __init__(
+        self,
+        nombre: str,
+        funcion: Callable[[], Dict[str, float]],
+        intervalo_s: float = 1.0,
+        presupuesto_ms: float = 5.0,
+    ):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.intervalo_s = intervalo_s
+        self.presupuesto_ms = presupuesto_ms
+        self.intervalo_efectivo_s = intervalo_s
+        self.proxima: float = 0.0
+        self.ultimos: Dict[str, float] = {}
+        self.ejecuciones = 0
+        self.errores = 0
+        self.excesos_presupuesto = 0
+        self.coste_total_ms = 0.0
+        self.coste_max_ms = 0.0
+
+    def ejecutar(self, ahora: float) -> Dict[str, float]:
+        inicio = time.perf_counter()
+        try:
+            self.ultimos = dict(self.funcion())
+        except Exception as e:
+            self.errores += 1
+            logger.debug("Colector %s falló: %s", self.nombre, e)
+        coste_ms = (time.perf_counter() - inicio) * 1000.0
+        self.ejecuciones += 1
+        self.coste_total_ms += coste_ms
+        if coste_ms > self.coste_max_ms:
+            self.coste_max_ms = coste_ms
+        # Fuera de presupuesto: espaciar; dentro: volver poco a poco al nominal
+        if coste_ms > self.presupuesto_ms:
+            self.excesos_presupuesto += 1
+            self.intervalo_efectivo_s = min(
+                self.intervalo_efectivo_s * 2, self.intervalo_s * FACTOR_ESPACIADO_MAX
+            )
+        elif self.intervalo_efectivo_s > self.intervalo_s:
+            self.intervalo_efectivo_s = max(self.intervalo_efectivo_s / 2, self.intervalo_s)
+        self.proxima = ahora + self.intervalo_efectivo_s
+        return self.ultimos
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "intervalo_s": self.intervalo_s,
+            "intervalo_efectivo_s": self.intervalo_efectivo_s,
+            "presupuesto_ms": self.presupuesto_ms,
+            "ejecuciones": self.ejecuciones,
+            "errores": self.errores,
+            "excesos_presupuesto": self.excesos_presupuesto,
+            "coste_medio_ms": (
+                round(self.coste_total_ms / self.ejecuciones, 3) if self.ejecuciones else 0.0
+            ),
+            "coste_max_ms": round(self.coste_max_ms, 3),
+        }
+
+
+class SystemSampler:
+    """Ejecuta los colectores que tocan y guarda sus valores con retención por niveles."""
+
+    def __init__(self, collectors: Optional[List[Collector]] = None, periodo_s: float = 1.0):
+        self.collectors: List[Collector] = (
+            list(collectors) if collectors is not None else default_collectors()
+        )
+        self.periodo_s = periodo_s
+        self.series: Dict[str, TieredSeries] = {}
+        self._lock = threading.Lock()
+        self._activo = False
+        self._parar = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._inicio: Optional[float] = None
+        self.ticks = 0
+        self.coste_total_ms = 0.0
+        self.ultimo_coste_ms = 0.0
+
+    def muestrear(self, ahora: Optional[float] = None) -> Dict[str, float]:
+        """Ejecutar los colectores pendientes y devolver los últimos valores de todos."""
+        inicio = time.perf_counter()
+        ahora = time.monotonic() if ahora is None else ahora
+        ts = time.time()
+        if self._inicio is None:
+            self._inicio = time.monotonic()
+        muestra: Dict[str, float] = {}
+        with self._lock:
+            for collector in self.collectors:
+                if ahora >= collector.proxima:
+                    for clave, valor in collector.ejecutar(ahora).items():
+                        serie = self.series.get(clave)
+                        if serie is None:
+                            serie = self.series[clave] = TieredSeries()
+                        serie.agregar(ts, float(valor))
+                muestra.update(collector.ultimos)
+            self.ticks += 1
+            self.ultimo_coste_ms = (time.perf_counter() - inicio) * 1000.0
+            self.coste_total_ms += self.ultimo_coste_ms
+        _COSTE_TICK.observar(self.ultimo_coste_ms)
+        return muestra
+
+    def historial(self, metrica: str, nivel: str = "segundos", n: Optional[int] = None):
+        """Pares (timestamp, valor) de ``metrica`` en el nivel ``segundos`` o ``minutos``."""
+        serie = self.series.get(metrica)
+        if serie is None:
+            return []
+        return getattr(serie, nivel).ultimos(n)
+
+    # ------------------------------------------------------------------
+    # Hilo propio (opcional: PerformanceMonitor lo llama desde su bucle)
+    # ------------------------------------------------------------------
+    def iniciar(self) -> None:
+        if self._activo:
+            return
+        self._activo = True
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="SystemSampler", daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout: float = 2.0) -> None:
+        self._activo = False
+        self._parar.set()
+        if self._hilo and self._hilo is not threading.current_thread():
+            self._hilo.join(timeout=timeout)
+        self._hilo = None
+
+    def _bucle(self) -> None:
+        while not self._parar.is_set():
+            inicio = time.monotonic()
+            self.muestrear(inicio)
+            self._parar.wait(max(0.0, self.periodo_s - (time.monotonic() - inicio)))
+
+    def get_metrics(self) -> Dict[str, Any]:
+        transcurrido_s = (time.monotonic() - self._inicio) if self._inicio is not None else 0.0
+        return {
+            "ticks": self.ticks,
+            "ultimo_coste_ms": round(self.ultimo_coste_ms, 3),
+            "coste_medio_ms": round(self.coste_total_ms / self.ticks, 3) if self.ticks else 0.0,
+            "overhead_percent": (
+                round(self.coste_total_ms / (transcurrido_s * 10.0), 4)
+                if transcurrido_s > 0
+                else 0.0
+            ),
+            "series": len(self.series),
+            "collectors": {c.nombre: c.get_metrics() for c in self.collectors},
+        }
+
+
+# ----------------------------------------------------------------------
+# Colectores por defecto (psutil)
+# ----------------------------------------------------------------------
+def default_collectors() -> List[Collector]:
+    """Contadores baratos cada segundo y recorridos del sistema cada minuto."""
+    if not HAS_PSUTIL:
+        return []
+    proceso = psutil.Process()
+    # La primera llamada sin intervalo devuelve 0.0 y fija la referencia
+    psutil.cpu_percent(interval=None)
+
+    def baratos() -> Dict[str, float]:
+        memoria = psutil.virtual_memory()
+        return {
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "memory_percent": memoria.percent,
+            "memory_mb": memoria.used / 1024 / 1024,
+            "threads_count": proceso.num_threads(),
+        }
+
+    def conexiones() -> Dict[str, float]:
+        return {"network_connections": len(psutil.net_connections())}
+
+    def archivos() -> Dict[str, float]:
+        return {"open_files": len(proceso.open_files())}
+
+    return [
+        Collector("proceso", baratos, intervalo_s=1.0, presupuesto_ms=5.0),
+        Collector("conexiones", conexiones, intervalo_s=60.0, presupuesto_ms=50.0),
+        Collector("archivos", archivos, intervalo_s=60.0, presupuesto_ms=20.0),
+    ]
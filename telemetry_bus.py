@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+telemetry_bus.py
+Bus de telemetría en proceso: un único productor, muchos consumidores
+
+El productor es el watcher compartido de GetData.txt (``telemetry_watcher``):
+cada escritura del plugin se lee y se convierte al formato IA una sola vez y
+el snapshot resultante, inmutable, se reparte a todos los suscriptores. Cada
+suscriptor tiene su propio buffer circular acotado con política de descarte
+propia, de modo que un consumidor lento (análisis, alertas) no frena a los
+rápidos (control, dashboard) ni obliga a releer el archivo.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional
+
+from metrics_registry import get_metrics_registry
+
+try:
+    from logging_config import get_logger
+
+    logger = get_logger(__name__)
+except ImportError:
+    import logging
+
+    logger = logging.getLogger(__name__)
+
+# Políticas de descarte cuando el buffer de un suscriptor está lleno
+POLITICA_DESCARTAR_ANTIGUO = "descartar_antiguo"  # conservar los más recientes
+POLITICA_DESCARTAR_NUEVO = "descartar_nuevo"  # conservar los más antiguos
+POLITICA_ULTIMO = "ultimo"  # solo interesa el último snapshot (capacidad 1)
+POLITICAS = (POLITICA_DESCARTAR_ANTIGUO, POLITICA_DESCARTAR_NUEVO, POLITICA_ULTIMO)
+
+CAPACIDAD_POR_DEFECTO = 64
+
+
+class TelemetrySnapshot(NamedTuple):
+    """Snapshot inmutable compartido por todos los suscriptores.
+
+    ``raw`` son los controles tal y como los parsea ``leer_datos_archivo`` y
+    ``datos`` el resultado de ``convertir_datos_ia``; ambos son vistas de solo
+    lectura. Los consumidores que necesiten modificarlos deben copiarlos con
+    ``dict(...)``.
+    """
+
+    seq: int
+    timestamp: float
+    raw: Mapping[str, Any]
+    datos: Mapping[str, Any]
+
+
+class TelemetrySubscription:
+    """Buffer circular acotado de un consumidor del bus."""
+
+    def __init__(self, bus: "TelemetryBus", nombre: str, capacidad: int, politica: str):
+        if politica not in POLITICAS:
+            raise ValueError(f"Política de descarte desconocida: {politica}")
+        if politica == POLITICA_ULTIMO:
+            capacidad = 1
+        if capacidad < 1:
+            raise ValueError("La capacidad del buffer debe ser >= 1")
+        self.bus = bus
+        self.nombre = nombre
+        self.capacidad = capacidad
+        self.politica = politica
+        self._buffer: deque = deque()
+        self._cond = threading.Condition()
+        self._cerrada = False
+        self._ultimo_seq_consumido = 0
+
+        registro = get_metrics_registry()
+        etiquetas = {"subscriber": nombre}
+        self.metrics: Dict[str, Any] = registro.gauge_map(
+            "tsc_bus_subscriber_",
+            "Telemetry bus subscriber metric",
+            {
+                "recibidos": 0,
+                "entregados": 0,
+                "descartados": 0,
+                "lag_max": 0,
+                "edad_ultima_ms": 0.0,
+            },
+            etiquetas,
+        )
+        registro.gauge_fn(
+            "tsc_bus_subscriber_pendientes",
+            "Telemetry bus subscriber metric pendientes",
+            lambda: len(self._buffer),
+            etiquetas,
+        )
+        registro.gauge_fn(
+            "tsc_bus_subscriber_lag", "Telemetry bus subscriber metric lag", self._lag, etiquetas
+        )
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def _ofrecer(self, snapshot: TelemetrySnapshot) -> None:
+        """Encolar un snapshot aplicando la política de descarte (hilo productor)."""
+        with self._cond:
+            if self._cerrada:
+                return
+            self.metrics["recibidos"] += 1
+            if len(self._buffer) >= self.capacidad:
+                self.metrics["descartados"] += 1
+                if self.politica == POLITICA_DESCARTAR_NUEVO:
+                    return
+                self._buffer.popleft()
+            self._buffer.append(snapshot)
+            lag = snapshot.seq - self._ultimo_seq_consumido
+            if lag > self.metrics["lag_max"]:
+                self.metrics["lag_max"] = lag
+            self._cond.notify()
+
+    def _consumir(self) -> TelemetrySnapshot:
+        snapshot = self._buffer.popleft()
+        self._ultimo_seq_consumido = snapshot.seq
+        self.metrics["entregados"] += 1
+        self.metrics["edad_ultima_ms"] = (time.time() - snapshot.timestamp) * 1000.0
+        return snapshot
+
+    def get(self, timeout: Optional[float] = None) -> Optional[TelemetrySnapshot]:
+        """Extraer el siguiente snapshot, esperando hasta ``timeout`` segundos.
+
+        Returns:
+            El snapshot o None si venció el timeout o la suscripción se cerró
+        """
+        with self._cond:
+            if not self._buffer and not self._cerrada:
+                self._cond.wait_for(lambda: self._buffer or self._cerrada, timeout)
+            if not self._buffer:
+                return None
+            return self._consumir()
+
+    def get_nowait(self) -> Optional[TelemetrySnapshot]:
+        """Extraer el siguiente snapshot sin bloquear (None si no hay)."""
+        return self.get(timeout=0)
+
+    def drain(self) -> List[TelemetrySnapshot]:
+        """Extraer todos los snapshots pendientes en orden."""
+        with self._cond:
+            pendientes = []
+            while self._buffer:
+                pendientes.append(self._consumir())
+            return pendientes
+
+    def cerrar(self) -> None:
+        """Dejar de recibir snapshots y despertar a quien espere en ``get``."""
+        self.bus.unsubscribe(self)
+        with self._cond:
+            self._cerrada = True
+            self._buffer.clear()
+            self._cond.notify_all()
+
+    @property
+    def cerrada(self) -> bool:
+        return self._cerrada
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Métricas del suscriptor, incluido el retraso respecto al productor."""
+        with self._cond:
+            datos = dict(self.metrics)
+            datos["pendientes"] = len(self._buffer)
+            datos["lag"] = self._lag()
+        return datos
+
+    def _lag(self) -> int:
+        """Snapshots publicados que este suscriptor aún no ha consumido."""
+        return max(0, self.bus.seq - self._ultimo_seq_consumido) if self.bus.seq else 0
+
+
+class TelemetryBus:
+    """Productor único de snapshots de telemetría.
+
+    Args:
+        tsc_integration: Instancia ``TSCIntegration`` que lee y convierte
+            GetData.txt; es la única que accede al archivo para el bus.
+    """
+
+    def __init__(self, tsc_integration):
+        self.tsc = tsc_integration
+        self.seq = 0
+        self.ultimo: Optional[TelemetrySnapshot] = None
+        self._suscripciones: List[TelemetrySubscription] = []
+        self._lock = threading.Lock()
+        self._watcher = None
+
+        registro = get_metrics_registry()
+        self.metrics: Dict[str, Any] = registro.gauge_map(
+            "tsc_bus_",
+            "Telemetry bus metric",
+            {"publicados": 0, "errores_conversion": 0, "publicacion_ultima_ms": 0.0},
+        )
+        registro.gauge_fn("tsc_bus_seq", "Telemetry bus metric seq", lambda: self.seq)
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+    def iniciar(self) -> None:
+        """Conectar el bus al watcher compartido del archivo (idempotente)."""
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self._watcher = self.tsc.obtener_watcher()
+        self._watcher.suscribir(self.publicar)
+        # Publicar de inmediato el estado actual si el watcher ya lo había leído
+        if self._watcher.ultimo_snapshot and self.ultimo is None:
+            self.publicar(self._watcher.ultimo_snapshot)
+
+    def detener(self) -> None:
+        """Desconectar el bus del watcher y cerrar todas las suscripciones."""
+        with self._lock:
+            watcher, self._watcher = self._watcher, None
+            suscripciones = list(self._suscripciones)
+        if watcher is not None:
+            watcher.desuscribir(self.publicar)
+        for sub in suscripciones:
+            sub.cerrar()
+
+    # ------------------------------------------------------------------
+    # Suscripciones
+    # ------------------------------------------------------------------
+    def subscribe(
+        self,
+        nombre: str,
+        capacidad: int = CAPACIDAD_POR_DEFECTO,
+        politica: str = POLITICA_DESCARTAR_ANTIGUO,
+    ) -> TelemetrySubscription:
+        """Crear una suscripción con buffer y política propios y arrancar el bus.
+
+        Si ya se publicó algún snapshot, la suscripción empieza con el último
+        (con el simulador en pausa GetData.txt puede tardar en volver a cambiar).
+        """
+        sub = TelemetrySubscription(self, nombre, capacidad, politica)
+        with self._lock:
+            self._suscripciones.append(sub)
+            # Bajo el lock: cualquier publicación que ya incluya a ``sub`` es posterior
+            if self.ultimo is not None:
+                sub._ofrecer(self.ultimo)
+        self.iniciar()
+        return sub
+
+    def unsubscribe(self, sub: TelemetrySubscription) -> None:
+        with self._lock:
+            if sub in self._suscripciones:
+                self._suscripciones.remove(sub)
+
+    # ------------------------------------------------------------------
+    # Publicación (hilo del watcher)
+    # ------------------------------------------------------------------
+    def publicar(self, raw: Optional[Dict[str, Any]]) -> Optional[TelemetrySnapshot]:
+        """Convertir una lectura cruda una sola vez y repartirla a los suscriptores."""
+        if not raw:
+            return None
+        inicio = time.perf_counter()
+        # Sin obtener_datos_telemetria de por medio, el bus es quien fija la
+        # última lectura: de ella dependen el perfil de controles (fallbacks de
+        # comandos) y el estado de conexión
+        self.tsc.datos_anteriores = dict(raw)
+        try:
+            datos = self.tsc.convertir_datos_ia(raw)
+        except Exception as e:
+            self.metrics["errores_conversion"] += 1
+            logger.warning("Error convirtiendo snapshot para el bus de telemetría: %s", e)
+            return None
+
+        with self._lock:
+            self.seq += 1
+            snapshot = TelemetrySnapshot(
+                seq=self.seq,
+                timestamp=time.time(),
+                raw=MappingProxyType(dict(raw)),
+                datos=MappingProxyType(datos),
+            )
+            self.ultimo = snapshot
+            suscripciones = list(self._suscripciones)
+
+        for sub in suscripciones:
+            sub._ofrecer(snapshot)
+        self.metrics["publicados"] += 1
+        self.metrics["publicacion_ultima_ms"] = (time.perf_counter() - inicio) * 1000.0
+        return snapshot
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Métricas del productor y de cada suscriptor (por nombre)."""
+        with self._lock:
+            suscripciones = list(self._suscripciones)
+        datos: Dict[str, Any] = dict(self.metrics)
+        datos["seq"] = self.seq
+        datos["suscriptores"] = {sub.nombre: sub.get_metrics() for sub in suscripciones}
+        return datos
+
+
+# ----------------------------------------------------------------------
+# Bus compartido del proceso
+# ----------------------------------------------------------------------
+_buses: Dict[str, TelemetryBus] = {}
+_buses_lock = threading.Lock()
+
+
+def get_telemetry_bus(tsc_integration=None) -> TelemetryBus:
+    """Obtener el bus compartido del archivo de ``tsc_integration``.
+
+    La primera instancia ``TSCIntegration`` registrada para un archivo pasa a
+    ser el productor. Sin argumento se devuelve el primer bus creado en el
+    proceso (el del dashboard, si está en marcha) o se crea uno con la ruta
+    por defecto.
+    """
+    if tsc_integration is None:
+        with _buses_lock:
+            if _buses:
+                return next(iter(_buses.values()))
+        from tsc_integration import TSCIntegration
+
+        tsc_integration = TSCIntegration()
+    clave = os.path.normcase(os.path.abspath(tsc_integration.ruta_archivo))
+    with _buses_lock:
+        bus = _buses.get(clave)
+        if bus is None:
+            bus = TelemetryBus(tsc_integration)
+            _buses[clave] = bus
+    return bus
+
+
+def find_telemetry_bus(ruta_archivo: str) -> Optional[TelemetryBus]:
+    """Bus compartido de ``ruta_archivo`` si existe (sin crearlo)."""
+    with _buses_lock:
+        return _buses.get(os.path.normcase(os.path.abspath(ruta_archivo)))
+
+
+def detener_buses() -> None:
+    """Detener y olvidar todos los buses compartidos."""
+    with _buses_lock:
+        buses = list(_buses.values())
+        _buses.clear()
+    for bus in buses:
+        bus.detener()
@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+"""
+telemetry_converter.py
+Conversión incremental de datos de GetData.txt al formato que espera la IA
+
+El conversor divide la conversión en etapas con dependencias explícitas sobre
+los controles crudos. En cada tick se calcula el diff del snapshot crudo frente
+al anterior y solo se recalculan las etapas cuyas entradas cambiaron; el resto
+reutiliza su salida previa.
+
+Qué controles existen (RPM o RPMDelta, VirtualBrake o TrainBrakeControl,
+sensores de presión...) se decide una vez por perfil de locomotora en un plan
+compilado (``compilar_plan``); las etapas leen el plan en lugar de comprobar la
+presencia de cada control en cada tick.
+"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, FrozenSet, List, NamedTuple, Optional
+
+try:
+    from logging_config import get_logger
+
+    logger = get_logger(__name__)
+except ImportError:
+    logger = logging.getLogger(__name__)
+
+_AUSENTE = object()
+
+# Campos constantes que la IA necesita pero que ningún control del archivo aporta
+CAMPOS_CONSTANTES = {
+    "freno_motor": 0.0,
+    "freno_motor_control": 0.0,
+    "presion_aire": 90.0,
+    "distancia_parada": 1000.0,
+    "presion_deposito_equalizacion": 0.0,
+    "presion_deposito_principal": 0.0,
+    "presion_tubo_freno_mostrada": 0.0,
+    "presion_deposito_auxiliar": 0.0,
+    "presion_freno_loco_mostrada": 0.0,
+    "presion_freno_loco_avanzada": 0.0,
+    # Fuel telemetry removed: keep compatibility keys but filled with None
+    "combustible_porcentaje": None,
+    "combustible_galones": None,
+    "combustible": None,
+}
+
+# Valores por defecto de campos mapeados directamente (sin lógica derivada)
+DEFAULTS_MAPEADOS = {
+    "velocimetro_mph": 0.0,
+    "tipo_velocimetro": 1,
+    "reverser": 1,
+    "freno_dinamico": 0.0,
+    "freno_mano": 0.0,
+    "freno_emergencia": 0.0,
+    "estado_compresor": 0.0,
+    "distancia_recorrida": 0.0,
+    "esfuerzo_traccion": 0.0,
+}
+
+# Controles de presión cuya presencia se informa en el resultado
+_PRESENCIA_PRESIONES = {
+    "presion_tubo_freno_presente": "AirBrakePipePressurePSI",
+    "presion_freno_loco_presente": "LocoBrakeCylinderPressurePSI",
+    "presion_freno_tren_presente": "TrainBrakeCylinderPressurePSI",
+    "presion_deposito_principal_presente": "MainReservoirPressurePSIDisplayed",
+    "eq_reservoir_presente": "EqReservoirPressurePSIAdvanced",
+    "presion_freno_loco_avanzada_presente": "LocoBrakeCylinderPressurePSIAdvanced",
+    "presion_tubo_freno_mostrada_presente": "AirBrakePipePressurePSIDisplayed",
+    "presion_freno_loco_mostrada_presente": "LocoBrakeCylinderPressurePSIDisplayed",
+    "presion_deposito_auxiliar_presente": "AuxReservoirPressure",
+    "presion_tubo_freno_cola_presente": "BrakePipePressureTailEnd",
+}
+
+
+class Etapa(NamedTuple):
+    """Etapa de conversión: función pura de los controles crudos ``entradas``."""
+
+    nombre: str
+    entradas: FrozenSet[str]
+    funcion: Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]
+
+
+def _to_float(val: Any, default: float = 0.0) -> float:
+    """Safely convert a value to float, returning default on failure."""
+    try:
+        if val is None:
+            return default
+        return float(val)
+    except Exception:
+        return default
+
+
+def _clamp01(val: float) -> float:
+    return max(0.0, min(1.0, val))
+
+
+class IncrementalConverter:
+    """Conversor de datos crudos a formato IA con recálculo por etapas.
+
+    ``owner`` es la ``TSCIntegration`` propietaria; de ella se leen el mapeo de
+    controles, ``max_engine_rpm`` y las constantes de señal.
+    """
+
+    def __init__(self, owner):
+        self.owner = owner
+        self._lock = threading.Lock()
+        # Campos mapeados cuyo valor calcula una etapa (no se copian tal cual)
+        self._campos_derivados = {
+            "velocidad_actual",
+            "acelerador",
+            "posicion_freno_tren",
+            "rpm",
+            "senal_principal",
+            "senal_avanzada",
+            "amperaje",
+            "deslizamiento_ruedas",
+            "presion_tubo_freno",
+            "presion_freno_loco",
+            "presion_freno_tren",
+            "presion_tubo_freno_cola",
+        }
+        self.etapas: List[Etapa] = self._construir_etapas()
+        self.stats = {"conversiones": 0, "etapas_recalculadas": 0, "etapas_reutilizadas": 0}
+        self.reiniciar()
+
+    def reiniciar(self) -> None:
+        """Descartar el estado incremental (la próxima conversión es completa)."""
+        self._crudo_prev: Optional[Dict[str, Any]] = None
+        self._resultado: Dict[str, Any] = {}
+        self._salidas: Dict[str, Dict[str, Any]] = {}
+        self._config_prev: Optional[tuple] = None
+        self._plan_prev: Optional[Dict[str, Any]] = None
+        self._plan: Dict[str, Any] = {}
+
+    def compilar_plan(self, controles: FrozenSet[str]) -> Dict[str, Any]:
+        """Plan de conversión para un conjunto de controles (serializable en JSON)."""
+        mapeo = self.owner.mapeo_controles
+        mapeados = {}
+        retirar = []
+        for nombre_archivo, campo in mapeo.items():
+            if campo in self._campos_derivados:
+                continue
+            if nombre_archivo in controles:
+                mapeados[nombre_archivo] = campo
+            elif campo not in DEFAULTS_MAPEADOS:
+                retirar.append(campo)
+
+        if "RPMDelta" in controles:
+            fuente_rpm = "RPMDelta"
+        elif "RPM" in controles:
+            fuente_rpm = "RPM"
+        else:
+            fuente_rpm = None
+        if "VirtualBrake" in controles:
+            fuente_freno = "VirtualBrake"
+        elif "TrainBrakeControl" in controles:
+            fuente_freno = "TrainBrakeControl"
+        else:
+            fuente_freno = None
+
+        presencias = {flag: control in controles for flag, control in _PRESENCIA_PRESIONES.items()}
+        presencias["posicion_freno_tren_presente"] = fuente_freno is not None
+        return {
+            "mapeados": mapeados,
+            "retirar": retirar,
+            "velocidad": "CurrentSpeed" in controles,
+            "regulator": "Regulator" in controles,
+            "aceleracion": "Acceleration" in controles,
+            "fuente_freno": fuente_freno,
+            "fuente_rpm": fuente_rpm,
+            "fuentes_acelerador_rpm": [
+                c for c in ("Regulator", "VirtualThrottle") if c in controles
+            ],
+            "rpm_fuente": "RPMSource" in controles,
+            "presencias": presencias,
+        }
+
+    def _construir_etapas(self) -> List[Etapa]:
+        """Declarar las etapas en orden de ejecución con sus controles de entrada.
+
+        Las entradas de cada etapa incluyen las de las etapas cuyo resultado lee.
+        """
+
+        def etapa(nombre, entradas, funcion, usa=()):
+            total = set(entradas)
+            for previa in etapas:
+                if previa.nombre in usa:
+                    total |= previa.entradas
+            etapas.append(Etapa(nombre, frozenset(total), funcion))
+
+        etapas: List[Etapa] = []
+        etapa("velocidad", {"CurrentSpeed"}, self._etapa_velocidad)
+        etapa(
+            "mandos",
+            {"Acceleration", "Regulator", "VirtualBrake", "TrainBrakeControl"},
+            self._etapa_mandos,
+        )
+        etapa(
+            "rpm",
+            {"RPM", "RPMDelta", "Regulator", "VirtualThrottle", "RPMSource"},
+            self._etapa_rpm,
+            usa=("mandos",),
+        )
+        etapa("senales", {"SignalAspect", "KVB_SignalAspect"}, self._etapa_senales)
+        etapa("amperaje", {"Ammeter"}, self._etapa_amperaje)
+        etapa(
+            "patinaje",
+            {"Wheelslip", "TractiveEffort"},
+            self._etapa_patinaje,
+            usa=("velocidad", "rpm"),
+        )
+        etapa(
+            "presiones",
+            set(_PRESENCIA_PRESIONES.values()) | {"TrainBrakeControl", "VirtualBrake"},
+            self._etapa_presiones,
+            usa=("mandos",),
+        )
+        return etapas
+
+    # ------------------------------------------------------------------
+    # Etapas
+    # ------------------------------------------------------------------
+    def _etapa_velocidad(self, crudo: Dict[str, Any], ia: Dict[str, Any]) -> Dict[str, Any]:
+        # CurrentSpeed del RailDriver viene en m/s: convertir a km/h para el dashboard
+        if not self._plan["velocidad"]:
+            return {}
+        return {"velocidad_actual": round(abs(crudo["CurrentSpeed"]) * 3.6, 2)}
+
+    def _etapa_mandos(self, crudo: Dict[str, Any], ia: Dict[str, Any]) -> Dict[str, Any]:
+        """Acelerador, freno de tren y posición del control de freno."""
+        plan = self._plan
+        salida: Dict[str, Any] = {}
+        if plan["regulator"]:
+            salida["acelerador"] = crudo["Regulator"]
+
+        # Separar la aceleración en acelerador / freno
+        if plan["aceleracion"]:
+            accel = crudo["Acceleration"]
+            if accel > 0:
+                salida["acelerador"] = accel
+                salida["freno_tren"] = 0.0
+            elif accel < 0:
+                salida["acelerador"] = 0.0
+                salida["freno_tren"] = -accel  # Convertir a positivo para freno
+            else:
+                salida["acelerador"] = 0.0
+                salida["freno_tren"] = 0.0
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Aceleración cruda: %s -> acelerador=%s, freno=%s",
+                    accel,
+                    salida["acelerador"],
+                    salida["freno_tren"],
+                )
+
+        # VirtualBrake tiene prioridad; TrainBrakeControl unifica el manejo si falta
+        if plan["fuente_freno"] == "VirtualBrake":
+            salida["posicion_freno_tren"] = crudo["VirtualBrake"]
+        elif plan["fuente_freno"] == "TrainBrakeControl":
+            salida["posicion_freno_tren"] = _to_float(crudo["TrainBrakeControl"])
+
+        # Priorizar el control de freno real sobre la inferencia por aceleración
+        if "posicion_freno_tren" in salida:
+            salida["freno_tren"] = _clamp01(_to_float(salida["posicion_freno_tren"]))
+
+        salida.setdefault("acelerador", 0.0)
+        salida.setdefault("freno_tren", 0.0)
+        salida.setdefault("posicion_freno_tren", 0.0)
+        return salida
+
+    def _etapa_rpm(self, crudo: Dict[str, Any], ia: Dict[str, Any]) -> Dict[str, Any]:
+        """RPM directa (RPM/RPMDelta) o inferida desde Regulator/VirtualThrottle/acelerador."""
+        plan = self._plan
+        max_rpm = self.owner.max_engine_rpm
+        salida: Dict[str, Any] = {}
+        fuente_rpm = plan["fuente_rpm"]
+        rpm = crudo[fuente_rpm] if fuente_rpm else 0.0
+
+        if rpm == 0.0:
+            # Primer control de acelerador con valor (Regulator, luego VirtualThrottle)
+            for control in plan["fuentes_acelerador_rpm"]:
+                if crudo[control] is not None:
+                    valor = _to_float(crudo[control])
+                    if valor > 0.0:
+                        rpm = valor * max_rpm
+                        salida["rpm_inferida"] = True
+                    break
+
+        # Normalizar y validar RPM
+        rpm = _to_float(rpm)
+        if rpm < 0:
+            rpm = 0.0
+        if rpm > 5000:
+            rpm = 5000.0
+
+        # Infer RPM from regulator (Regulator -> acelerador) when RPM not provided
+        if rpm == 0.0:
+            reg = _to_float(ia.get("acelerador", 0.0))
+            if reg and reg > 0.0:
+                rpm = reg * float(max_rpm)
+                salida["rpm_inferida"] = True
+            else:
+                salida.setdefault("rpm_inferida", False)
+        salida["rpm"] = rpm
+
+        # Mapear RPMSource (depuración) si existe en el archivo
+        if plan["rpm_fuente"]:
+            salida["rpm_fuente"] = crudo["RPMSource"]
+        return salida
+
+    def _etapa_senales(self, crudo: Dict[str, Any], ia: Dict[str, Any]) -> Dict[str, Any]:
+        """Señal principal/avanzada y la señal procesada usada por IA/UI."""
+        desconocida = int(self.owner.SIGNAL_UNKNOWN)
+        se_pr = crudo.get("SignalAspect", desconocida)
+        se_av = crudo.get("KVB_SignalAspect", desconocida)
+        # Preferir la avanzada si no es UNKNOWN (-1). Si ambas no están, usar UNKNOWN
+        try:
+            if se_av is not None and se_av != desconocida:
+                procesada = int(se_av)
+            elif se_pr is not None and se_pr != desconocida:
+                procesada = int(se_pr)
+            else:
+                procesada = desconocida
+        except Exception:
+            procesada = desconocida
+        logger.debug(
+            "[TSC] SignalAspect=%s, KVB_SignalAspect=%s, senal_procesada=%s",
+            se_pr,
+            se_av,
+            procesada,
+        )
+        return {"senal_principal": se_pr, "senal_avanzada": se_av, "senal_procesada": procesada}
+
+    def _etapa_amperaje(self, crudo: Dict[str, Any], ia: Dict[str, Any]) -> Dict[str, Any]:
+        # Amperaje (A) is the primary metric name; keep 'corriente' and 'amps' as aliases
+        amperaje = _to_float(crudo.get("Ammeter", 0.0))
+        return {"amperaje": amperaje, "corriente": amperaje, "amps": amperaje}
+
+    def _etapa_patinaje(self, crudo: Dict[str, Any], ia: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalizar wheelslip a una intensidad 0..1 compatible entre assets."""
+        bruto = crudo.get("Wheelslip", 0.0)
+        raw_ws = _to_float(bruto)
+        tractive = _to_float(crudo.get("TractiveEffort", 0.0))
+        speed_kmh = _to_float(ia.get("velocidad_actual", 0.0))
+        rpm_val = _to_float(ia.get("rpm", 0.0))
+        # Heurísticas conservadoras que indican posible patinamiento
+        evidencia = (speed_kmh < 5.0 and tractive > 300.0) or (
+            rpm_val > 2000.0 and speed_kmh < 10.0 and tractive > 300.0
+        )
+
+        # - 0..1 => normalizado por asset (0=bueno, 1=máx deslizamiento)
+        # - Base 1 (1 = normal, >1 = deslizamiento): mapear 1..2 -> 0..1 y 1..3 -> 0..1
+        # - El valor EXACTO 1.0 es ambiguo: solo se considera deslizamiento si la
+        #   telemetría de tracción/velocidad/RPM lo sugiere
+        if raw_ws < 1.0:
+            intensity = raw_ws
+        elif raw_ws == 1.0:
+            intensity = 1.0 if evidencia else 0.0
+        elif raw_ws <= 2.0:
+            intensity = _clamp01(raw_ws - 1.0)
+        elif raw_ws <= 3.0:
+            intensity = _clamp01((raw_ws - 1.0) / 2.0)
+        else:
+            # Valores extremos: escalar conservadoramente
+            intensity = _clamp01((raw_ws - 1.0) / max(1.0, raw_ws))
+
+        salida = {
+            "deslizamiento_ruedas": bruto,
+            "deslizamiento_ruedas_raw": raw_ws,
+            "deslizamiento_ruedas_intensidad": round(float(intensity), 3),
+        }
+        # Sin control de wheelslip (o a cero): inferir desde el esfuerzo de tracción
+        if raw_ws == 0.0 and evidencia:
+            inferred = min(1.0, (tractive - 300.0) / 1000.0)
+            if inferred > 0.0:
+                salida["deslizamiento_ruedas_intensidad"] = round(
+                    max(float(salida["deslizamiento_ruedas_intensidad"]), inferred), 3
+                )
+                salida["deslizamiento_ruedas_interpretacion"] = "inferred_from_tractive"
+                salida["deslizamiento_ruedas_inferida"] = True
+        return salida
+
+    def _etapa_presiones(self, crudo: Dict[str, Any], ia: Dict[str, Any]) -> Dict[str, Any]:
+        """Presiones de freno, flags de presencia e inferencias si faltan sensores."""
+        salida: Dict[str, Any] = dict(self._plan["presencias"])
+        salida["presion_tubo_freno_cola"] = crudo.get("BrakePipePressureTailEnd", 0.0)
+
+        # Sin sensor de tubo de freno se asume el valor mostrado (0.0 si el asset no lo reporta)
+        if salida["presion_tubo_freno_presente"]:
+            salida["presion_tubo_freno"] = crudo["AirBrakePipePressurePSI"]
+            salida["presion_tubo_freno_inferida"] = False
+        else:
+            salida["presion_tubo_freno"] = ia.get("presion_tubo_freno_mostrada", 0.0)
+            salida["presion_tubo_freno_inferida"] = True
+
+        if salida["presion_freno_loco_presente"]:
+            salida["presion_freno_loco"] = crudo["LocoBrakeCylinderPressurePSI"]
+            salida["presion_freno_loco_inferida"] = False
+        else:
+            salida["presion_freno_loco"] = ia.get("presion_freno_loco_mostrada", 0.0)
+            salida["presion_freno_loco_inferida"] = True
+
+        # Inferir presion_freno_tren en función del TrainBrakeControl / VirtualBrake:
+        # presión de cilindro proporcional a la posición del control (30..90 PSI)
+        if salida["presion_freno_tren_presente"]:
+            salida["presion_freno_tren"] = crudo["TrainBrakeCylinderPressurePSI"]
+            salida["presion_freno_tren_inferida"] = False
+        else:
+            train_brake_val = _to_float(
+                ia.get("posicion_freno_tren")
+                or crudo.get("TrainBrakeControl")
+                or crudo.get("VirtualBrake")
+                or 0.0
+            )
+            salida["presion_freno_tren"] = (
+                30.0 + (train_brake_val * 60.0) if train_brake_val > 0.0 else 0.0
+            )
+            salida["presion_freno_tren_inferida"] = True
+        return salida
+
+    # ------------------------------------------------------------------
+    # Conversión
+    # ------------------------------------------------------------------
+    def _cambios(self, crudo: Dict[str, Any]) -> Optional[set]:
+        """Controles añadidos, eliminados o con valor distinto; None = conversión completa."""
+        prev = self._crudo_prev
+        if prev is None:
+            return None
+        try:
+            return {clave for clave, _ in crudo.items() ^ prev.items()}
+        except TypeError:
+            # Valores no hashables: comparar clave a clave
+            return {
+                clave
+                for clave in crudo.keys() | prev.keys()
+                if crudo.get(clave, _AUSENTE) != prev.get(clave, _AUSENTE)
+            }
+
+    def _aplicar_mapeados(self, crudo: Dict[str, Any], datos_ia: Dict[str, Any], claves) -> None:
+        """Copiar los controles mapeados sin lógica derivada presentes en ``claves``."""
+        mapeados = self._plan["mapeados"]
+        for nombre_archivo in claves:
+            campo = mapeados.get(nombre_archivo)
+            if campo is not None:
+                datos_ia[campo] = crudo[nombre_archivo]
+
+    def convertir(self, crudo: Dict[str, Any]) -> Dict[str, Any]:
+        """Convertir un snapshot crudo recalculando solo las etapas afectadas.
+
+        Args:
+            crudo: Datos leídos del archivo (nombre de control -> valor)
+
+        Returns:
+            Datos en formato IA (dict nuevo en cada llamada)
+        """
+        with self._lock:
+            config = (self.owner.max_engine_rpm, self.owner.SIGNAL_UNKNOWN)
+            if config != self._config_prev:
+                self.reiniciar()
+                self._config_prev = config
+
+            # Plan del perfil de locomotora; con otro conjunto de controles la
+            # conversión es completa
+            plan = self.owner.perfiles.obtener(crudo.keys()).conversion
+            self._plan = plan
+            cambios = self._cambios(crudo) if plan is self._plan_prev else None
+            self._plan_prev = plan
+            if cambios is None:
+                datos_ia = dict(CAMPOS_CONSTANTES)
+                datos_ia.update(DEFAULTS_MAPEADOS)
+                for campo in plan["retirar"]:
+                    datos_ia.pop(campo, None)
+                self._aplicar_mapeados(crudo, datos_ia, plan["mapeados"].keys())
+            else:
+                # Partir del resultado anterior y sobrescribir solo lo afectado
+                datos_ia = dict(self._resultado)
+                if cambios:
+                    self._aplicar_mapeados(crudo, datos_ia, cambios & plan["mapeados"].keys())
+
+            recalculadas = 0
+            if cambios is None or cambios:
+                for etapa in self.etapas:
+                    if cambios is not None and etapa.entradas.isdisjoint(cambios):
+                        continue
+                    salida = etapa.funcion(crudo, datos_ia)
+                    anterior = self._salidas.get(etapa.nombre)
+                    if anterior:
+                        for clave in anterior.keys() - salida.keys():
+                            datos_ia.pop(clave, None)
+                    self._salidas[etapa.nombre] = salida
+                    datos_ia.update(salida)
+                    recalculadas += 1
+
+            datos_ia["fecha_hora"] = datetime.now().isoformat()
+            self._resultado = datos_ia
+            self._crudo_prev = dict(crudo)
+            self.stats["conversiones"] += 1
+            self.stats["etapas_recalculadas"] += recalculadas
+            self.stats["etapas_reutilizadas"] += len(self.etapas) - recalculadas
+            return dict(datos_ia)
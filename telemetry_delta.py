@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+telemetry_delta.py
+Protocolo delta para el stream de telemetría del dashboard (evento ``telemetry_stream``)
+
+En lugar de emitir el payload completo en cada tick (telemetría, predicciones,
+estado del sistema, alertas e informe de rendimiento), el servidor mantiene el
+último estado enviado y emite:
+
+- ``keyframe``: estado completo, periódicamente y cuando un cliente lo pide
+  (``telemetry_resync``)::
+
+      {"type": "keyframe", "seq": 120, "data": {...}}
+
+- ``delta``: solo lo que cambió respecto al mensaje ``base``::
+
+      {"type": "delta", "seq": 121, "base": 120,
+       "set": {"telemetry": {"velocidad_actual": 51.2}},
+       "del": [["predictions", "horizon"]]}
+
+  ``set`` se aplica como fusión recursiva: un objeto sobre otro objeto se
+  fusiona clave a clave y cualquier otro valor (números, cadenas, listas)
+  reemplaza al anterior. ``del`` son rutas de claves eliminadas.
+
+El cliente que detecta un hueco (``base`` distinto de su último ``seq``) o que
+no tiene estado descarta el delta y pide un keyframe. La codificación se hace
+una vez por tick para todos los clientes.
+
+El stream se divide en topics (``TelemetryTopicHub``) con codificador, ritmo de
+publicación y suscriptores propios; cada mensaje lleva su ``topic`` y los
+clientes solo reciben los topics a los que se suscriben.
+"""
+
+import functools
+import json
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from stream_encoding import estimar_bytes_json
+
+try:
+    from logging_config import get_logger
+
+    logger = get_logger(__name__)
+except ImportError:
+    import logging
+
+    logger = logging.getLogger(__name__)
+
+TIPO_KEYFRAME = "keyframe"
+TIPO_DELTA = "delta"
+
+# Un keyframe cada 50 mensajes (5 s a 10 Hz) acota lo que tarda en
+# recuperarse un cliente que perdió mensajes sin pedir resync
+INTERVALO_KEYFRAME = 50
+SEGUNDOS_KEYFRAME = 5.0
+
+# Topics del stream y periodo mínimo entre publicaciones (segundos). Alertas,
+# rendimiento y estado cambian en escalas de segundos a minutos
+TOPICS_POR_DEFECTO: Dict[str, float] = {
+    "telemetry": 0.1,
+    "predictions": 0.5,
+    "multi_loco": 1.0,
+    "alerts": 1.0,
+    "status": 1.0,
+    "performance": 5.0,
+}
+# Margen sobre el periodo: una fuente que escribe justo al ritmo del topic (el
+# plugin a 10 Hz con jitter) no debe perder la mitad de las publicaciones
+TOLERANCIA_INTERVALO = 0.1
+
+
+def _normalizar(valor: Any) -> Any:
+    """Copia del estado con tipos JSON, desacoplada de los dicts globales.
+
+    Equivale a ``json.loads(json.dumps(valor, default=str))`` sin serializar:
+    solo se convierten las claves no textuales, las tuplas (a listas) y las
+    hojas que JSON no representa (a texto).
+    """
+    if isinstance(valor, dict):
+        return {_clave_json(k): _normalizar(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_normalizar(v) for v in valor]
+    if valor is None or isinstance(valor, (str, int, float)):
+        return valor
+    return str(valor)
+
+
+def _clave_json(clave: Any) -> str:
+    if isinstance(clave, str):
+        return clave
+    if clave is None or isinstance(clave, (bool, int, float)):
+        return json.dumps(clave)
+    return str(clave)
+
+
+def _diff(
+    previo: Dict[str, Any], actual: Dict[str, Any], ruta: List[str], borrados: List[List[str]]
+) -> Dict[str, Any]:
+    """Claves nuevas o cambiadas de ``actual`` respecto a ``previo`` (recursivo en dicts)."""
+    cambios: Dict[str, Any] = {}
+    for clave, valor in actual.items():
+        if clave not in previo:
+            cambios[clave] = valor
+            continue
+        anterior = previo[clave]
+        if isinstance(valor, dict) and isinstance(anterior, dict):
+            sub = _diff(anterior, valor, ruta + [clave], borrados)
+            if sub:
+                cambios[clave] = sub
+        elif valor != anterior or type(valor) is not type(anterior):
+            cambios[clave] = valor
+    for clave in previo:
+        if clave not in actual:
+            borrados.append(ruta + [clave])
+    return cambios
+
+
+def aplicar_delta(estado: Dict[str, Any], cambios: Dict[str, Any]) -> None:
+    """Fusionar ``cambios`` (campo ``set`` de un delta) sobre ``estado`` in situ."""
+    for clave, valor in cambios.items():
+        actual = estado.get(clave)
+        if isinstance(valor, dict) and isinstance(actual, dict):
+            aplicar_delta(actual, valor)
+        else:
+            estado[clave] = valor
+
+
+def _borrar(estado: Dict[str, Any], ruta: List[str]) -> None:
+    for clave in ruta[:-1]:
+        estado = estado.get(clave)
+        if not isinstance(estado, dict):
+            return
+    estado.pop(ruta[-1], None)
+
+
+class TelemetryDeltaEncoder:
+    """Codificador compartido del stream: un estado y una secuencia para todos los clientes.
+
+    Args:
+        intervalo_keyframe: Mensajes entre keyframes programados
+        registro: Registro de métricas donde exponer las del stream
+            (None = solo ``get_metrics``)
+        etiquetas: Etiquetas de sus métricas en el registro (p. ej. el topic)
+    """
+
+    def __init__(
+        self,
+        intervalo_keyframe: int = INTERVALO_KEYFRAME,
+        registro=None,
+        etiquetas: Optional[Dict[str, str]] = None,
+    ):
+        self.intervalo_keyframe = max(1, intervalo_keyframe)
+        self.seq = 0
+        self._estado: Optional[Dict[str, Any]] = None
+        self._bytes_estado = 0
+        self._desde_keyframe = 0
+        self._lock = threading.Lock()
+
+        self.metrics: Dict[str, Any] = {
+            "mensajes": 0,
+            "keyframes": 0,
+            "deltas": 0,
+            "resyncs": 0,
+            "bytes_enviados": 0,
+            # Lo que habría costado enviar el estado completo en cada mensaje
+            "bytes_completos": 0,
+            "bytes_ultimo_mensaje": 0,
+        }
+        if registro is not None:
+            self.metrics = registro.gauge_map(
+                "dashboard_stream_", "Telemetry delta stream metric", self.metrics, etiquetas
+            )
+            registro.gauge_fn(
+                "dashboard_stream_seq",
+                "Telemetry delta stream sequence",
+                lambda: self.seq,
+                etiquetas,
+            )
+            registro.gauge_fn(
+                "dashboard_stream_ratio_bytes",
+                "Bytes sent over bytes of full payloads",
+                self._ratio_bytes,
+                etiquetas,
+            )
+
+    def _ratio_bytes(self) -> float:
+        completos = self.metrics["bytes_completos"]
+        return self.metrics["bytes_enviados"] / completos if completos else 0.0
+
+    def codificar(self, estado: Dict[str, Any]) -> Dict[str, Any]:
+        """Registrar el estado de este tick y devolver el mensaje a emitir."""
+        normalizado = _normalizar(estado)
+        tamano = estimar_bytes_json(normalizado)
+        with self._lock:
+            self.seq += 1
+            previo = self._estado
+            self._estado = normalizado
+            self._bytes_estado = tamano
+
+            mensaje: Optional[Dict[str, Any]] = None
+            if previo is not None and self._desde_keyframe < self.intervalo_keyframe:
+                borrados: List[List[str]] = []
+                cambios = _diff(previo, normalizado, [], borrados)
+                mensaje = {"type": TIPO_DELTA, "seq": self.seq, "base": self.seq - 1}
+                mensaje["set"] = cambios
+                if borrados:
+                    mensaje["del"] = borrados
+                bytes_mensaje = estimar_bytes_json(mensaje)
+                if bytes_mensaje >= tamano:
+                    mensaje = None  # cambió casi todo: un keyframe sale igual o más barato
+
+            if mensaje is None:
+                mensaje = {"type": TIPO_KEYFRAME, "seq": self.seq, "data": normalizado}
+                bytes_mensaje = tamano + 40
+                self._desde_keyframe = 0
+                self.metrics["keyframes"] += 1
+            else:
+                self._desde_keyframe += 1
+                self.metrics["deltas"] += 1
+
+            self.metrics["mensajes"] += 1
+            self.metrics["bytes_enviados"] += bytes_mensaje
+            self.metrics["bytes_completos"] += tamano
+            self.metrics["bytes_ultimo_mensaje"] = bytes_mensaje
+        return mensaje
+
+    def keyframe(self) -> Optional[Dict[str, Any]]:
+        """Keyframe del último estado para un cliente que pide resync (None si aún no hay).
+
+        No avanza la secuencia: el siguiente delta difundido sigue siendo
+        aplicable por el cliente que lo recibe.
+        """
+        with self._lock:
+            if self._estado is None:
+                return None
+            self.metrics["resyncs"] += 1
+            self.metrics["bytes_enviados"] += self._bytes_estado
+            # El mensaje comparte el estado con el codificador, que nunca lo
+            # modifica (cada tick lo reemplaza por una copia nueva)
+            return {"type": TIPO_KEYFRAME, "seq": self.seq, "data": self._estado}
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Métricas del stream, incluida la relación bytes enviados / bytes completos."""
+        with self._lock:
+            datos = dict(self.metrics)
+            datos["seq"] = self.seq
+            datos["ratio_bytes"] = self._ratio_bytes()
+        return datos
+
+
+class TelemetryDeltaDecoder:
+    """Reconstrucción del estado en el cliente (misma lógica que ``dashboard.js``)."""
+
+    def __init__(self):
+        self.seq: Optional[int] = None
+        self.estado: Optional[Dict[str, Any]] = None
+        self.necesita_resync = True
+
+    def aplicar(self, mensaje: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Aplicar un mensaje del stream.
+
+        Returns:
+            El estado reconstruido, o None si el mensaje no se pudo aplicar
+            (hueco en la secuencia o delta sin keyframe previo); en ese caso
+            ``necesita_resync`` queda a True.
+        """
+        if mensaje.get("type") == TIPO_KEYFRAME:
+            if self.seq is not None and mensaje["seq"] < self.seq:
+                return None  # keyframe de resync más antiguo que lo ya aplicado
+            self.estado = json.loads(json.dumps(mensaje["data"]))
+            self.seq = mensaje["seq"]
+            self.necesita_resync = False
+            return self.estado
+
+        if self.estado is None or mensaje.get("base") != self.seq:
+            self.necesita_resync = True
+            return None
+        aplicar_delta(self.estado, mensaje.get("set", {}))
+        for ruta in mensaje.get("del", []):
+            _borrar(self.estado, ruta)
+        self.seq = mensaje["seq"]
+        return self.estado
+
+
+class TelemetryTopicHub:
+    """Canales del stream por topic, cada uno con su codificador, ritmo y suscriptores.
+
+    Args:
+        topics: Nombre de cada topic y periodo mínimo entre publicaciones (s)
+        segundos_keyframe: Tiempo aproximado entre keyframes de cada topic
+        registro: Registro de métricas donde exponer las de cada topic
+            (None = solo ``get_metrics``)
+    """
+
+    def __init__(
+        self,
+        topics: Optional[Dict[str, float]] = None,
+        segundos_keyframe: float = SEGUNDOS_KEYFRAME,
+        registro=None,
+    ):
+        self.intervalos = dict(topics or TOPICS_POR_DEFECTO)
+        self.encoders = {
+            topic: TelemetryDeltaEncoder(
+                max(1, round(segundos_keyframe / intervalo)), registro, {"topic": topic}
+            )
+            for topic, intervalo in self.intervalos.items()
+        }
+        if registro is not None:
+            for topic in self.intervalos:
+                registro.gauge_fn(
+                    "dashboard_stream_suscriptores",
+                    "Clients subscribed to the topic",
+                    functools.partial(self.num_suscriptores, topic),
+                    {"topic": topic},
+                )
+                registro.gauge_fn(
+                    "dashboard_stream_intervalo_s",
+                    "Minimum seconds between publications of the topic",
+                    functools.partial(self.intervalos.get, topic),
+                    {"topic": topic},
+                )
+        self._suscriptores: Dict[str, Set[str]] = {topic: set() for topic in self.intervalos}
+        self._ultima_publicacion: Dict[str, float] = dict.fromkeys(self.intervalos, 0.0)
+        self._lock = threading.Lock()
+
+    @property
+    def topics(self) -> List[str]:
+        return list(self.intervalos)
+
+    @staticmethod
+    def sala(topic: str) -> str:
+        """Nombre de la sala Socket.IO del topic."""
+        return f"topic:{topic}"
+
+    # ------------------------------------------------------------------
+    # Suscripciones
+    # ------------------------------------------------------------------
+    def suscribir(self, cliente: str, topics: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """Reemplazar los topics de ``cliente`` (los desconocidos se ignoran).
+
+        Returns:
+            (topics añadidos, topics quitados)
+        """
+        deseados = {t for t in topics if t in self.intervalos}
+        with self._lock:
+            actuales = {t for t, clientes in self._suscriptores.items() if cliente in clientes}
+            for topic in deseados - actuales:
+                self._suscriptores[topic].add(cliente)
+            for topic in actuales - deseados:
+                self._suscriptores[topic].discard(cliente)
+        orden = self.topics
+        return (
+            [t for t in orden if t in deseados - actuales],
+            [t for t in orden if t in actuales - deseados],
+        )
+
+    def desuscribir(self, cliente: str) -> List[str]:
+        """Quitar todas las suscripciones de ``cliente`` (desconexión)."""
+        return self.suscribir(cliente, ())[1]
+
+    def suscripciones(self, cliente: str) -> List[str]:
+        with self._lock:
+            return [t for t in self.topics if cliente in self._suscriptores[t]]
+
+    def num_suscriptores(self, topic: str) -> int:
+        with self._lock:
+            return len(self._suscriptores.get(topic, ()))
+
+    # ------------------------------------------------------------------
+    # Publicación
+    # ------------------------------------------------------------------
+    def pendientes(self, ahora: Optional[float] = None) -> List[str]:
+        """Topics que toca publicar ahora y tienen suscriptores (se marcan como publicados).
+
+        Los topics sin suscriptores no se publican: quien llama no necesita
+        calcular su estado.
+        """
+        ahora = time.time() if ahora is None else ahora
+        listos = []
+        with self._lock:
+            for topic, intervalo in self.intervalos.items():
+                if not self._suscriptores[topic]:
+                    continue
+                if ahora - self._ultima_publicacion[topic] >= intervalo * (
+                    1 - TOLERANCIA_INTERVALO
+                ):
+                    self._ultima_publicacion[topic] = ahora
+                    listos.append(topic)
+        return listos
+
+    def codificar(self, topic: str, estado: Dict[str, Any]) -> Dict[str, Any]:
+        """Mensaje (keyframe o delta) del topic para su sala."""
+        mensaje = self.encoders[topic].codificar(estado)
+        mensaje["topic"] = topic
+        return mensaje
+
+    def keyframe(self, topic: str) -> Optional[Dict[str, Any]]:
+        """Keyframe del último estado publicado del topic (None si aún no hay)."""
+        encoder = self.encoders.get(topic)
+        mensaje = encoder.keyframe() if encoder is not None else None
+        if mensaje is not None:
+            mensaje["topic"] = topic
+        return mensaje
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Métricas por topic: las del codificador más suscriptores e intervalo."""
+        datos = {}
+        for topic, encoder in self.encoders.items():
+            m = encoder.get_metrics()
+            m["suscriptores"] = self.num_suscriptores(topic)
+            m["intervalo_s"] = self.intervalos[topic]
+            datos[topic] = m
+        return datos
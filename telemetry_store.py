@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+telemetry_store.py
+Almacén columnar binario, solo-anexar, para el historial de telemetría
+
+Sustituye a ``data/telemetry_history.json`` (reescrito completo cada 100
+muestras). Cada columna se guarda como un array NumPy de tipo fijo en su
+propio archivo dentro de bloques (chunks) de tamaño acotado::
+
+    data/telemetry_history/
+        header.json                 # versión, columnas, dtype, filas por bloque
+        chunk_000000/timestamp.f8   # una columna por archivo, solo se anexa
+        chunk_000000/velocidad_actual.f8
+        ...
+
+Las escrituras se acumulan en memoria y se anexan por lotes; las lecturas usan
+``np.memmap`` sin cargar el historial completo. Si el proceso muere a mitad de
+un lote, las columnas pueden quedar con longitudes distintas: al abrir se
+recortan todas a la longitud común (recuperación de cola).
+"""
+
+import json
+import os
+import shutil
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    from logging_config import get_logger
+
+    logger = get_logger(__name__)
+except ImportError:
+    import logging
+
+    logger = logging.getLogger(__name__)
+
+FORMATO_VERSION = 1
+DTYPE = np.dtype("<f8")
+COLUMNA_TIEMPO = "timestamp"
+FILAS_POR_BLOQUE = 65536
+FILAS_POR_LOTE = 100
+
+
+class ColumnarTelemetryStore:
+    """Historial de telemetría en columnas float64 por bloques.
+
+    Args:
+        directorio: Carpeta del almacén (se crea si no existe)
+        columnas: Nombres de las columnas de datos (``timestamp`` se añade
+            siempre como primera columna, en segundos epoch)
+        filas_por_bloque: Filas máximas por bloque antes de abrir otro
+        filas_por_lote: Filas acumuladas en memoria antes de escribir
+        max_bloques: Bloques completos a conservar (None = sin límite)
+    """
+
+    def __init__(
+        self,
+        directorio: str,
+        columnas: Sequence[str],
+        filas_por_bloque: int = FILAS_POR_BLOQUE,
+        filas_por_lote: int = FILAS_POR_LOTE,
+        max_bloques: Optional[int] = None,
+    ):
+        self.directorio = directorio
+        self.columnas: List[str] = [COLUMNA_TIEMPO] + [c for c in columnas if c != COLUMNA_TIEMPO]
+        self.filas_por_bloque = filas_por_bloque
+        self.filas_por_lote = filas_por_lote
+        self.max_bloques = max_bloques
+
+        self._pendientes: List[List[float]] = []
+        self._primer_bloque = 0
+        # Filas persistidas por bloque, en orden
+        self._bloques: List[int] = []
+        self._columnas_recortadas = 0
+
+        os.makedirs(directorio, exist_ok=True)
+        self._abrir()
+
+    # ------------------------------------------------------------------
+    # Apertura y recuperación
+    # ------------------------------------------------------------------
+    @property
+    def _ruta_header(self) -> str:
+        return os.path.join(self.directorio, "header.json")
+
+    def _ruta_bloque(self, indice: int) -> str:
+        return os.path.join(self.directorio, f"chunk_{indice:06d}")
+
+    def _ruta_columna(self, indice: int, columna: str) -> str:
+        return os.path.join(self._ruta_bloque(indice), f"{columna}.f8")
+
+    def _abrir(self) -> None:
+        if os.path.exists(self._ruta_header):
+            with open(self._ruta_header, encoding="utf-8") as f:
+                header = json.load(f)
+            if header.get("version") != FORMATO_VERSION or header.get("dtype") != DTYPE.str:
+                raise ValueError(
+                    f"Formato de historial no soportado en {self.directorio}: {header}"
+                )
+            # Las columnas persistidas mandan; las nuevas se ignoran hasta migrar
+            self.columnas = list(header["columnas"])
+            self.filas_por_bloque = int(header.get("filas_por_bloque", self.filas_por_bloque))
+        else:
+            self._escribir_header()
+
+        indices = sorted(
+            int(nombre[len("chunk_") :])
+            for nombre in os.listdir(self.directorio)
+            if nombre.startswith("chunk_") and nombre[len("chunk_") :].isdigit()
+        )
+        if indices:
+            self._primer_bloque = indices[0]
+        # Los bloques que exceden la retención se borran sin recorrerlos
+        if self.max_bloques is not None and len(indices) > self.max_bloques:
+            for indice in indices[: len(indices) - self.max_bloques]:
+                shutil.rmtree(self._ruta_bloque(indice), ignore_errors=True)
+            indices = indices[len(indices) - self.max_bloques :]
+            self._primer_bloque = indices[0]
+        for indice in indices:
+            self._bloques.append(self._recuperar_bloque(indice))
+
+    def _escribir_header(self) -> None:
+        header = {
+            "version": FORMATO_VERSION,
+            "dtype": DTYPE.str,
+            "columnas": self.columnas,
+            "filas_por_bloque": self.filas_por_bloque,
+        }
+        tmp = self._ruta_header + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(header, f, indent=2)
+        os.replace(tmp, self._ruta_header)
+
+    def _recuperar_bloque(self, indice: int) -> int:
+        """Recortar las columnas de un bloque a la longitud común (tail recovery)."""
+        tamanos = []
+        for columna in self.columnas:
+            ruta = self._ruta_columna(indice, columna)
+            tamanos.append(os.path.getsize(ruta) if os.path.exists(ruta) else 0)
+        filas = min(tamanos) // DTYPE.itemsize if tamanos else 0
+        esperado = filas * DTYPE.itemsize
+        recortadas = 0
+        for columna, tam in zip(self.columnas, tamanos):
+            if tam != esperado:
+                with open(self._ruta_columna(indice, columna), "ab") as f:
+                    f.truncate(esperado)
+                recortadas += 1
+        if recortadas:
+            self._columnas_recortadas += recortadas
+            logger.warning(
+                "Historial %s: cola incompleta recortada en el bloque %d a %d filas (%d columnas)",
+                self.directorio,
+                indice,
+                filas,
+                recortadas,
+            )
+        return filas
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+    def append(self, timestamp: float, valores: Dict[str, float]) -> None:
+        """Anexar una fila; se persiste al completar el lote o con ``flush``."""
+        fila = [float(timestamp)]
+        for columna in self.columnas[1:]:
+            valor = valores.get(columna)
+            try:
+                fila.append(float(valor) if valor is not None else np.nan)
+            except (TypeError, ValueError):
+                fila.append(np.nan)
+        self._pendientes.append(fila)
+        if len(self._pendientes) >= self.filas_por_lote:
+            self.flush()
+
+    def flush(self) -> int:
+        """Persistir las filas pendientes. Devuelve cuántas se escribieron."""
+        if not self._pendientes:
+            return 0
+        lote = np.asarray(self._pendientes, dtype=DTYPE)
+        self._pendientes = []
+        escritas = 0
+        while escritas < len(lote):
+            if not self._bloques or self._bloques[-1] >= self.filas_por_bloque:
+                self._nuevo_bloque()
+            indice = self._primer_bloque + len(self._bloques) - 1
+            hueco = self.filas_por_bloque - self._bloques[-1]
+            parte = lote[escritas : escritas + hueco]
+            # Columna a columna: cada archivo solo crece por el final
+            for j, columna in enumerate(self.columnas):
+                with open(self._ruta_columna(indice, columna), "ab") as f:
+                    f.write(np.ascontiguousarray(parte[:, j]).tobytes())
+            self._bloques[-1] += len(parte)
+            escritas += len(parte)
+        return escritas
+
+    def _nuevo_bloque(self) -> None:
+        indice = self._primer_bloque + len(self._bloques)
+        os.makedirs(self._ruta_bloque(indice), exist_ok=True)
+        self._bloques.append(0)
+        self._aplicar_retencion()
+
+    def _aplicar_retencion(self) -> None:
+        """Borrar los bloques más antiguos que exceden ``max_bloques``."""
+        if self.max_bloques is None:
+            return
+        while len(self._bloques) > self.max_bloques:
+            shutil.rmtree(self._ruta_bloque(self._primer_bloque), ignore_errors=True)
+            self._bloques.pop(0)
+            self._primer_bloque += 1
+
+    def close(self) -> None:
+        self.flush()
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return sum(self._bloques) + len(self._pendientes)
+
+    @property
+    def columnas_recortadas(self) -> int:
+        """Archivos de columna recortados por la recuperación de cola al abrir."""
+        return self._columnas_recortadas
+
+    def _columna_bloque(self, indice_rel: int, columna: str) -> np.ndarray:
+        filas = self._bloques[indice_rel]
+        if filas == 0:
+            return np.empty(0, dtype=DTYPE)
+        ruta = self._ruta_columna(self._primer_bloque + indice_rel, columna)
+        return np.memmap(ruta, dtype=DTYPE, mode="r", shape=(filas,))
+
+    def _leer_rango(self, inicio: int, fin: int, columnas: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Filas globales [inicio, fin) de las columnas pedidas (copias en memoria)."""
+        columnas = list(columnas)
+        partes: Dict[str, List[np.ndarray]] = {c: [] for c in columnas}
+        base = 0
+        for rel, filas in enumerate(self._bloques):
+            desde, hasta = max(inicio - base, 0), min(fin - base, filas)
+            if desde < hasta:
+                for columna in columnas:
+                    partes[columna].append(self._columna_bloque(rel, columna)[desde:hasta])
+            base += filas
+        persistidas = base
+        if fin > persistidas and self._pendientes:
+            pend = np.asarray(self._pendientes, dtype=DTYPE)
+            desde, hasta = max(inicio - persistidas, 0), fin - persistidas
+            for columna in columnas:
+                partes[columna].append(pend[desde:hasta, self.columnas.index(columna)])
+        return {
+            c: (np.concatenate(p) if p else np.empty(0, dtype=DTYPE)) for c, p in partes.items()
+        }
+
+    def tail(self, n: int, columnas: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+        """Últimas ``n`` filas."""
+        total = len(self)
+        return self._leer_rango(max(0, total - n), total, columnas or self.columnas)
+
+    def slice_time(
+        self, desde: float, hasta: float, columnas: Optional[Iterable[str]] = None
+    ) -> Dict[str, np.ndarray]:
+        """Filas con ``desde <= timestamp < hasta`` (búsqueda binaria por bloque)."""
+        columnas = list(columnas or self.columnas)
+        inicio_global: Optional[int] = None
+        fin_global = 0
+        base = 0
+        for rel, filas in enumerate(self._bloques):
+            if filas:
+                ts = self._columna_bloque(rel, COLUMNA_TIEMPO)
+                i = int(np.searchsorted(ts, desde, side="left"))
+                j = int(np.searchsorted(ts, hasta, side="left"))
+                if i < j:
+                    if inicio_global is None:
+                        inicio_global = base + i
+                    fin_global = base + j
+            base += filas
+        if self._pendientes:
+            ts = np.asarray([fila[0] for fila in self._pendientes], dtype=DTYPE)
+            i = int(np.searchsorted(ts, desde, side="left"))
+            j = int(np.searchsorted(ts, hasta, side="left"))
+            if i < j:
+                if inicio_global is None:
+                    inicio_global = base + i
+                fin_global = base + j
+        if inicio_global is None:
+            return {c: np.empty(0, dtype=DTYPE) for c in columnas}
+        return self._leer_rango(inicio_global, fin_global, columnas)
+
+
+def _iterar_json_legacy(texto: str):
+    """Iterar las muestras de un array JSON, tolerando un final truncado o corrupto."""
+    decoder = json.JSONDecoder()
+    pos = texto.find("[")
+    if pos < 0:
+        return
+    pos += 1
+    longitud = len(texto)
+    while pos < longitud:
+        while pos < longitud and texto[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= longitud or texto[pos] == "]":
+            return
+        try:
+            muestra, pos = decoder.raw_decode(texto, pos)
+        except json.JSONDecodeError:
+            logger.warning(
+                "Historial JSON truncado en la posición %d; se conserva lo anterior", pos
+            )
+            return
+        yield muestra
+
+
+def migrate_legacy_json(
+    ruta_json: str, store: ColumnarTelemetryStore, renombrar: bool = True
+) -> int:
+    """Migrar (una sola vez) ``telemetry_history.json`` al almacén columnar.
+
+    Las muestras ``{"timestamp": iso, "data": {...}}`` se convierten a filas;
+    si el archivo está truncado se migra la parte válida. Tras migrar, el JSON
+    se renombra a ``<ruta>.migrated`` para no volver a procesarlo.
+
+    Returns:
+        Número de muestras migradas
+    """
+    from datetime import datetime
+
+    with open(ruta_json, encoding="utf-8-sig") as f:
+        texto = f.read()
+
+    migradas = 0
+    for muestra in _iterar_json_legacy(texto):
+        if not isinstance(muestra, dict):
+            continue
+        try:
+            ts = datetime.fromisoformat(str(muestra.get("timestamp"))).timestamp()
+        except (TypeError, ValueError):
+            continue
+        datos = muestra.get("data") or {}
+        if isinstance(datos, dict):
+            store.append(ts, datos)
+            migradas += 1
+    store.flush()
+
+    if renombrar:
+        os.replace(ruta_json, ruta_json + ".migrated")
+    logger.info("Migradas %d muestras de %s a %s", migradas, ruta_json, store.directorio)
+    return migradas
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+telemetry_watcher.py
+Servicio de ingesta de GetData.txt dirigido por eventos del sistema de archivos
+
+Sustituye los bucles de sondeo fijo (``time.sleep(0.1)``) de los distintos
+consumidores por un único hilo por archivo que despierta con los eventos de
+escritura (watchdog: inotify / ReadDirectoryChangesW / FSEvents). Si los
+eventos no están disponibles se usa sondeo adaptativo: el intervalo se reduce
+al mínimo tras cada cambio y crece exponencialmente mientras el archivo no
+cambia (simulador en pausa), de modo que el coste en reposo es casi nulo.
+
+Cada snapshot nuevo se publica a los suscriptores y se expone con un número de
+versión para que los bucles existentes puedan esperar al siguiente cambio con
+``esperar_cambio`` en lugar de dormir un intervalo fijo.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metrics_registry import get_metrics_registry
+
+try:
+    from logging_config import get_logger
+
+    logger = get_logger(__name__)
+except ImportError:
+    import logging
+
+    logger = logging.getLogger(__name__)
+
+# watchdog es opcional: sin él se usa el sondeo adaptativo
+try:
+    from watchdog.events import FileSystemEventHandler  # type: ignore[reportMissingImports]
+    from watchdog.observers import Observer  # type: ignore[reportMissingImports]
+
+    HAS_WATCHDOG = True
+except Exception:
+    FileSystemEventHandler = object  # type: ignore[assignment,misc]
+    Observer = None
+    HAS_WATCHDOG = False
+
+MODO_EVENTOS = "eventos"
+MODO_SONDEO = "sondeo"
+
+# Intervalos del sondeo adaptativo (segundos)
+INTERVALO_MIN = 0.005
+INTERVALO_MAX = 0.5
+FACTOR_BACKOFF = 2.0
+# Con eventos activos se sigue comprobando la firma cada cierto tiempo por si
+# algún evento se pierde (p. ej. sistemas de archivos de red)
+INTERVALO_SEGURIDAD_EVENTOS = 1.0
+
+
+class _ManejadorEventos(FileSystemEventHandler):  # type: ignore[misc,valid-type]
+    """Traducir eventos de watchdog del directorio a avisos del archivo vigilado."""
+
+    def __init__(self, watcher: "TelemetryFileWatcher"):
+        super().__init__()
+        self._watcher = watcher
+        self._objetivo = os.path.normcase(os.path.abspath(watcher.ruta_archivo))
+
+    def _es_objetivo(self, ruta: Any) -> bool:
+        if not ruta:
+            return False
+        if isinstance(ruta, bytes):
+            ruta = os.fsdecode(ruta)
+        return os.path.normcase(os.path.abspath(ruta)) == self._objetivo
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        if self._es_objetivo(getattr(event, "src_path", None)) or self._es_objetivo(
+            getattr(event, "dest_path", None)
+        ):
+            self._watcher.notificar()
+
+
+class TelemetryFileWatcher:
+    """Vigilante de GetData.txt que publica cada snapshot nuevo a sus suscriptores.
+
+    Args:
+        ruta_archivo: Archivo a vigilar
+        lector: Callable que produce el snapshot a publicar cuando el archivo
+            cambia (p. ej. ``TSCIntegration.leer_datos_archivo``). Si es None
+            solo se publican avisos de cambio (snapshot None).
+        usar_eventos: Intentar usar eventos del sistema de archivos
+    """
+
+    def __init__(
+        self,
+        ruta_archivo: str,
+        lector: Optional[Callable[[], Any]] = None,
+        usar_eventos: bool = True,
+        intervalo_min: float = INTERVALO_MIN,
+        intervalo_max: float = INTERVALO_MAX,
+    ):
+        self.ruta_archivo = ruta_archivo
+        self.lector = lector
+        self.usar_eventos = usar_eventos
+        self.intervalo_min = intervalo_min
+        self.intervalo_max = intervalo_max
+        self.modo: Optional[str] = None
+
+        self.version = 0
+        self.ultimo_snapshot: Any = None
+        self._firma_prev: Optional[Tuple[int, int, int]] = None
+        # Firma cuya lectura falló (error o snapshot vacío): se reintenta pronto
+        # aunque el archivo no vuelva a cambiar
+        self._firma_fallida: Optional[Tuple[int, int, int]] = None
+
+        self._suscriptores: List[Callable[[Any], None]] = []
+        self._cond = threading.Condition()
+        self._evento = threading.Event()
+        self._activo = False
+        self._hilo: Optional[threading.Thread] = None
+        self._observer = None
+
+        registro = get_metrics_registry()
+        self.metrics: Dict[str, Any] = registro.gauge_map(
+            "tsc_watcher_",
+            "Telemetry file watcher metric",
+            {
+                "eventos_fs": 0,
+                "comprobaciones": 0,
+                "cambios_publicados": 0,
+                "errores_lector": 0,
+                "lecturas_vacias": 0,
+                "errores_suscriptor": 0,
+                "latencia_ultima_ms": 0.0,
+                "latencia_max_ms": 0.0,
+            },
+        )
+        registro.gauge_fn(
+            "tsc_watcher_modo_eventos",
+            "Telemetry file watcher metric modo_eventos",
+            lambda: 1 if self.modo == MODO_EVENTOS else 0,
+        )
+        registro.gauge_fn(
+            "tsc_watcher_version", "Telemetry file watcher metric version", lambda: self.version
+        )
+        registro.gauge_fn(
+            "tsc_watcher_suscriptores",
+            "Telemetry file watcher metric suscriptores",
+            lambda: len(self._suscriptores),
+        )
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+    def iniciar(self) -> bool:
+        """Arrancar el hilo de ingesta (idempotente)."""
+        with self._cond:
+            if self._activo:
+                return True
+            self._activo = True
+        self.modo = MODO_EVENTOS if self._iniciar_observer() else MODO_SONDEO
+        self._hilo = threading.Thread(target=self._bucle, name="TelemetryFileWatcher", daemon=True)
+        self._hilo.start()
+        logger.info("Vigilancia de %s iniciada (modo %s)", self.ruta_archivo, self.modo)
+        return True
+
+    def detener(self, timeout: float = 2.0) -> None:
+        """Detener el hilo y el observer de eventos."""
+        with self._cond:
+            self._activo = False
+            self._cond.notify_all()
+        self._evento.set()
+        if self._observer is not None:
+            try:
+                self._observer.stop()
+                self._observer.join(timeout=timeout)
+            except Exception:
+                pass
+            self._observer = None
+        if self._hilo and self._hilo is not threading.current_thread():
+            self._hilo.join(timeout=timeout)
+        self._hilo = None
+
+    @property
+    def activo(self) -> bool:
+        return self._activo
+
+    def _iniciar_observer(self) -> bool:
+        """Intentar suscribirse a eventos del directorio del archivo."""
+        if not (self.usar_eventos and HAS_WATCHDOG):
+            return False
+        directorio = os.path.dirname(os.path.abspath(self.ruta_archivo))
+        if not os.path.isdir(directorio):
+            return False
+        try:
+            observer = Observer()
+            observer.schedule(_ManejadorEventos(self), directorio, recursive=False)
+            observer.daemon = True
+            observer.start()
+            self._observer = observer
+            return True
+        except Exception as e:
+            logger.warning("Eventos de archivo no disponibles (%s); usando sondeo adaptativo", e)
+            return False
+
+    # ------------------------------------------------------------------
+    # Suscripción y espera
+    # ------------------------------------------------------------------
+    def suscribir(self, callback: Callable[[Any], None]) -> None:
+        """Registrar un callback que recibe cada snapshot nuevo.
+
+        Los callbacks se ejecutan en el hilo del watcher y deben ser rápidos;
+        el trabajo pesado debe hacerse en el hilo del consumidor con
+        ``esperar_cambio``.
+        """
+        with self._cond:
+            if callback not in self._suscriptores:
+                self._suscriptores.append(callback)
+
+    def desuscribir(self, callback: Callable[[Any], None]) -> None:
+        with self._cond:
+            if callback in self._suscriptores:
+                self._suscriptores.remove(callback)
+
+    def esperar_cambio(self, version_conocida: int, timeout: Optional[float] = None) -> int:
+        """Bloquear hasta que haya una versión posterior a ``version_conocida``.
+
+        Returns:
+            La versión actual (igual a ``version_conocida`` si venció el timeout)
+        """
+        with self._cond:
+            if self.version != version_conocida:
+                return self.version
+            if not self._activo:
+                # Watcher detenido: degradar a una espera simple sin girar en vacío
+                self._cond.wait(timeout)
+            else:
+                self._cond.wait_for(
+                    lambda: self.version != version_conocida or not self._activo, timeout
+                )
+            return self.version
+
+    def notificar(self) -> None:
+        """Avisar de una posible escritura en el archivo (eventos o llamadas externas)."""
+        self.metrics["eventos_fs"] += 1
+        self._evento.set()
+
+    # ------------------------------------------------------------------
+    # Hilo de ingesta
+    # ------------------------------------------------------------------
+    def _firma_archivo(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.ruta_archivo)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _bucle(self) -> None:
+        intervalo = self.intervalo_min
+        self.comprobar()  # publicar el estado actual al arrancar
+        while self._activo:
+            if self.modo == MODO_EVENTOS and self._firma_fallida is None:
+                espera = INTERVALO_SEGURIDAD_EVENTOS
+            else:
+                espera = intervalo
+            self._evento.wait(espera)
+            self._evento.clear()
+            if not self._activo:
+                break
+            if self.comprobar():
+                intervalo = self.intervalo_min
+            else:
+                intervalo = min(intervalo * FACTOR_BACKOFF, self.intervalo_max)
+
+    def comprobar(self) -> bool:
+        """Comprobar la firma del archivo y publicar si cambió.
+
+        Returns:
+            True si se publicó un snapshot nuevo
+        """
+        self.metrics["comprobaciones"] += 1
+        firma = self._firma_archivo()
+        # Un archivo vacío es una escritura en curso (el plugin trunca antes de
+        # escribir): esperar al siguiente evento en lugar de publicarlo
+        if firma is None or firma == self._firma_prev or firma[1] == 0:
+            return False
+
+        # La firma solo se da por vista tras una lectura válida: si falla, la
+        # siguiente comprobación vuelve a leer el mismo archivo
+        snapshot = None
+        if self.lector is not None:
+            try:
+                snapshot = self.lector()
+            except Exception as e:
+                self.metrics["errores_lector"] += 1
+                if firma != self._firma_fallida:
+                    logger.warning("Error leyendo snapshot de %s: %s", self.ruta_archivo, e)
+                self._firma_fallida = firma
+                return False
+            if not snapshot:
+                self.metrics["lecturas_vacias"] += 1
+                self._firma_fallida = firma
+                return False
+
+        self._firma_prev = firma
+        self._firma_fallida = None
+        self._publicar(snapshot, firma[0])
+        return True
+
+    def _publicar(self, snapshot: Any, mtime_ns: int) -> None:
+        with self._cond:
+            self.version += 1
+            self.ultimo_snapshot = snapshot
+            suscriptores = list(self._suscriptores)
+            self._cond.notify_all()
+
+        # Latencia escritura del plugin -> publicación
+        latencia_ms = max(0.0, (time.time_ns() - mtime_ns) / 1e6)
+        self.metrics["cambios_publicados"] += 1
+        self.metrics["latencia_ultima_ms"] = latencia_ms
+        if latencia_ms > self.metrics["latencia_max_ms"]:
+            self.metrics["latencia_max_ms"] = latencia_ms
+
+        for callback in suscriptores:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                self.metrics["errores_suscriptor"] += 1
+                logger.warning("Error en suscriptor de telemetría: %s", e)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Copia de las métricas del watcher (incluye modo y versión)."""
+        datos = dict(self.metrics)
+        datos["modo_eventos"] = 1 if self.modo == MODO_EVENTOS else 0
+        datos["version"] = self.version
+        datos["suscriptores"] = len(self._suscriptores)
+        return datos
+
+
+# ----------------------------------------------------------------------
+# Registro compartido: un watcher por archivo para todos los consumidores
+# ----------------------------------------------------------------------
+_watchers: Dict[str, TelemetryFileWatcher] = {}
+_watchers_lock = threading.Lock()
+
+
+def get_telemetry_watcher(
+    ruta_archivo: str, lector: Optional[Callable[[], Any]] = None
+) -> TelemetryFileWatcher:
+    """Obtener (y arrancar) el watcher compartido de ``ruta_archivo``.
+
+    El primer consumidor que aporta un ``lector`` fija cómo se produce el
+    snapshot publicado; los demás reciben ese mismo snapshot.
+    """
+    clave = os.path.normcase(os.path.abspath(ruta_archivo))
+    with _watchers_lock:
+        watcher = _watchers.get(clave)
+        if watcher is None:
+            watcher = TelemetryFileWatcher(ruta_archivo, lector=lector)
+            _watchers[clave] = watcher
+        elif watcher.lector is None and lector is not None:
+            watcher.lector = lector
+    watcher.iniciar()
+    return watcher
+
+
+def find_telemetry_watcher(ruta_archivo: str) -> Optional[TelemetryFileWatcher]:
+    """Watcher compartido de ``ruta_archivo`` si existe (sin crearlo)."""
+    with _watchers_lock:
+        return _watchers.get(os.path.normcase(os.path.abspath(ruta_archivo)))
+
+
+def detener_watchers() -> None:
+    """Detener y olvidar todos los watchers compartidos."""
+    with _watchers_lock:
+        watchers = list(_watchers.values())
+        _watchers.clear()
+    for watcher in watchers:
+        watcher.detener()
@@ -8,10 +8,17 @@ self-contained for running locally and in CI where installing editable deps
 isn't always done.
 """
 
+import os
 import sys
+import tempfile
 from pathlib import Path
 
 # Ensure repository root is on sys.path for tests so tests can import project modules
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+# Loco profile plans compiled during tests must not land in the repository's data/
+os.environ.setdefault(
+    "TSC_LOCO_PROFILES_FILE", os.path.join(tempfile.mkdtemp(), "loco_profiles.json")
+)
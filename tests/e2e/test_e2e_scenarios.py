@@ -25,16 +25,23 @@ class TestEndToEndScenarios:
     """Tests end-to-end que simulan escenarios completos de uso"""
 
     @pytest.fixture
-    def autopilot_controller(self):
+    def autopilot_controller(self, tmp_path):
         """Fixture que crea un controlador de piloto automático completo"""
         tsc_integration = TSCIntegration()
-        controller = PredictiveAutopilotController(tsc_integration)
-        return controller
+        # Historial y modelo del test fuera de data/
+        analyzer = PredictiveTelemetryAnalyzer(
+            data_file=str(tmp_path / "telemetry_history.json"),
+            model_file=str(tmp_path / "predictive_model.pkl"),
+        )
+        return PredictiveAutopilotController(tsc_integration, analyzer)
 
     @pytest.fixture
-    def predictive_analyzer(self):
+    def predictive_analyzer(self, tmp_path):
         """Fixture que crea un analizador predictivo"""
-        return PredictiveTelemetryAnalyzer()
+        return PredictiveTelemetryAnalyzer(
+            data_file=str(tmp_path / "telemetry_history.json"),
+            model_file=str(tmp_path / "predictive_model.pkl"),
+        )
 
     @pytest.mark.skipif(
         not PREDICTIVE_AVAILABLE, reason="predictive_telemetry_analysis dependencies not available"
@@ -19,9 +19,13 @@ class TestTSCIntegration:
         return TSCIntegration()
 
     @pytest.fixture
-    def predictive_analyzer(self):
+    def predictive_analyzer(self, tmp_path):
         """Fixture que crea una instancia del analizador predictivo"""
-        return PredictiveTelemetryAnalyzer()
+        # Historial y modelo del test fuera de data/
+        return PredictiveTelemetryAnalyzer(
+            data_file=str(tmp_path / "telemetry_history.json"),
+            model_file=str(tmp_path / "predictive_model.pkl"),
+        )
 
     def test_tsc_telemetry_data_flow(self, tsc_integration, predictive_analyzer):
         """Test que verifica el flujo de datos de telemetría entre TSC y analizador"""
@@ -52,11 +52,11 @@ def test_locked_file_retries_and_returns_none(monkeypatch, tmp_path):
     # Replace the HAS_PORTALOCKER flag to False to force fallback behavior
     monkeypatch.setattr(t, "archivo_existe", lambda: True)
 
-    # Also monkeypatch the _robust_read_lines to simulate underlying PermissionError
+    # Also monkeypatch the raw reader to simulate underlying PermissionError
     def raise_on_read(*args, **kwargs):
         raise PermissionError("locked by simulator")
 
-    monkeypatch.setattr(t, "_robust_read_lines", raise_on_read)
+    monkeypatch.setattr(t, "_robust_read_bytes", raise_on_read)
 
     # leer_datos_archivo should catch the error and return None
     assert t.leer_datos_archivo() is None
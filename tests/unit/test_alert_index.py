@@ -0,0 +1,86 @@
+"""Tests del historial de alertas indexado"""
+
+from datetime import datetime, timedelta
+
+from alert_system import Alert, AlertIndex, AlertSeverity, AlertSystem, AlertType
+
+
+def _alerta(i, tipo=AlertType.SPEED_VIOLATION, segundos=0, reconocida=False):
+    momento = datetime(2026, 1, 1, 12, 0) + timedelta(seconds=segundos)
+    return Alert(
+        alert_id=f"a{i}",
+        alert_type=tipo,
+        severity=AlertSeverity.HIGH,
+        title="t",
+        message="m",
+        timestamp=momento,
+        data={},
+        acknowledged=reconocida,
+    )
+
+
+def test_indices_por_tipo_estado_y_minuto():
+    indice = AlertIndex()
+    alertas = [_alerta(i, segundos=i * 30, reconocida=i % 2 == 0) for i in range(10)]
+    alertas.append(_alerta(10, AlertType.WHEELSLIP, segundos=400))
+    indice.extend(alertas)
+
+    assert len(indice) == 11 and list(indice) == alertas
+    assert {a.alert_id for a in indice.activas(AlertType.SPEED_VIOLATION)} == {
+        "a1",
+        "a3",
+        "a5",
+        "a7",
+        "a9",
+    }
+    assert indice.ultima(AlertType.SPEED_VIOLATION).alert_id == "a9"
+    assert [a.alert_id for a in indice.recientes(alertas[8].timestamp)] == ["a9", "a10"]
+
+    version = indice.version
+    assert indice.reconocer(indice.buscar("a1"))
+    assert not indice.reconocer(indice.buscar("a1"))
+    assert indice.num_activas(AlertType.SPEED_VIOLATION) == 4
+    assert indice.version > version
+    # Reconocida por fuera del índice: se omite al consultar, que no cambia la versión
+    version = indice.version
+    indice.buscar("a3").acknowledged = True
+    assert indice.num_activas(AlertType.SPEED_VIOLATION) == 3
+    assert len(indice.activas()) == 4
+    assert indice.version == version
+
+    # Duplicada: misma categoría a menos de un minuto de la última
+    assert indice.es_duplicada(_alerta(99, segundos=9 * 30 + 10))
+    assert not indice.es_duplicada(_alerta(99, segundos=9 * 30 + 90))
+    assert not indice.es_duplicada(_alerta(99, AlertType.OVERHEATING, segundos=9 * 30))
+
+
+def test_poda_descarta_reconocidas_antiguas_y_conserva_activas():
+    indice = AlertIndex(max_alertas=100)
+    activa = _alerta("activa", AlertType.OVERHEATING, segundos=0)
+    indice.append(activa)
+    for i in range(200):
+        indice.append(_alerta(i, segundos=60 + i, reconocida=True))
+
+    assert len(indice) <= 110
+    assert activa in indice and indice.buscar("aactiva") is activa
+    # Se conservan las más recientes
+    assert indice.ultima(AlertType.SPEED_VIOLATION).alert_id == "a199"
+    assert indice.buscar("a0") is None
+
+
+def test_sistema_resuelve_y_deduplica_con_el_indice(tmp_path):
+    system = AlertSystem(
+        alerts_file=str(tmp_path / "alerts.json"),
+        config_file=str(tmp_path / "alert_config.json"),
+    )
+    system.config["speed_violation"]["max_speed"] = 120
+
+    assert len(system.evaluate_snapshot({"velocidad_actual": 150.0})) == 1
+    # Mismo tipo en el mismo minuto: duplicada
+    assert system.evaluate_snapshot({"velocidad_actual": 160.0}) == []
+    assert len(system.get_active_alerts()) == 1
+    assert system.get_alerts_summary()["type_breakdown"]["speed_violation"] == 1
+
+    system.evaluate_snapshot({"velocidad_actual": 90.0})
+    assert system.get_active_alerts() == []
+    assert system.get_alerts_summary()["acknowledged_alerts"] == 1
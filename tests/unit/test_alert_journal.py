@@ -0,0 +1,138 @@
+"""Tests del diario de alertas solo-anexar"""
+
+import json
+import threading
+from datetime import datetime, timedelta
+
+from alert_journal import AlertJournal
+
+
+def _alerta(i, dias=0, reconocida=False):
+    momento = datetime.now() - timedelta(days=dias)
+    return {
+        "alert_id": f"a{i}",
+        "alert_type": "speed_violation",
+        "severity": "high",
+        "title": "t",
+        "message": "m",
+        "timestamp": momento.isoformat(),
+        "data": {},
+        "acknowledged": reconocida,
+        "acknowledged_at": momento.isoformat() if reconocida else None,
+    }
+
+
+def test_escrituras_solo_anexan_y_se_reproducen(tmp_path):
+    ruta = tmp_path / "alerts.jsonl"
+    diario = AlertJournal(str(ruta))
+    diario.registrar_alta(_alerta(1))
+    diario.registrar_alta(_alerta(2))
+    tamano = ruta.stat().st_size
+    diario.registrar_reconocimiento("a1")
+    diario.cerrar()
+
+    lineas = ruta.read_text(encoding="utf-8").splitlines()
+    assert len(lineas) == 3 and ruta.stat().st_size > tamano
+    assert json.loads(lineas[-1])["op"] == "ack"
+
+    # Una escritura interrumpida deja una línea truncada que se ignora
+    with open(ruta, "a", encoding="utf-8") as f:
+        f.write('{"op": "add", "alert": {"alert_')
+    nuevo = AlertJournal(str(ruta))
+    alertas = nuevo.cargar()
+    assert [a["alert_id"] for a in alertas] == ["a1", "a2"]
+    assert alertas[0]["acknowledged"] and not alertas[1]["acknowledged"]
+    assert nuevo.get_metrics()["lineas_corruptas"] == 1
+
+
+def test_compactacion_aplica_retencion_por_edad_y_numero(tmp_path):
+    ruta = tmp_path / "alerts.jsonl"
+    diario = AlertJournal(str(ruta), max_alertas=5, max_edad_dias=30)
+    diario.registrar_alta(_alerta("vieja", dias=40, reconocida=True))
+    diario.registrar_alta(_alerta("vieja_activa", dias=40))
+    for i in range(10):
+        diario.registrar_alta(_alerta(i, dias=10 - i * 0.1, reconocida=True))
+    diario.compactar()
+
+    alertas = AlertJournal(str(ruta)).cargar()
+    ids = [a["alert_id"] for a in alertas]
+    # Las activas nunca se descartan; de las reconocidas quedan las más recientes
+    assert ids == ["avieja_activa", "a6", "a7", "a8", "a9"]
+    assert len(ruta.read_text(encoding="utf-8").splitlines()) == 5
+
+
+def test_compactacion_en_segundo_plano_no_pierde_registros(tmp_path):
+    ruta = tmp_path / "alerts.jsonl"
+    diario = AlertJournal(str(ruta))
+    for i in range(2000):
+        diario.registrar_alta(_alerta(i % 50))
+
+    hilos = [
+        threading.Thread(target=lambda k=k: diario.registrar_alta(_alerta(f"extra{k}")))
+        for k in range(20)
+    ]
+    diario.compactar(bloquear=False)
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    diario.esperar_compactacion()
+    diario.cerrar()
+
+    assert diario.get_metrics()["compactaciones"] >= 1
+    registros = len(ruta.read_text(encoding="utf-8").splitlines())
+    assert registros < 200
+    alertas = AlertJournal(str(ruta)).cargar()
+    assert len(alertas) == 70
+
+
+def test_sistema_importa_alerts_json_sin_reescribirlo(tmp_path):
+    from alert_system import AlertSystem
+
+    legado = tmp_path / "alerts.json"
+    contenido = json.dumps([_alerta(1), dict(_alerta(2), alert_type="fuel_low")], indent=2)
+    legado.write_text(contenido, encoding="utf-8")
+
+    system = AlertSystem(alerts_file=str(legado), config_file=str(tmp_path / "config.json"))
+    assert [a.alert_id for a in system.alerts] == ["a1"]
+    assert not (tmp_path / "alerts.jsonl").exists()
+
+    assert system.acknowledge_alert("a1")
+    system.journal.cerrar()
+    assert legado.read_text(encoding="utf-8") == contenido
+
+    recargado = AlertSystem(alerts_file=str(legado), config_file=str(tmp_path / "config.json"))
+    assert [(a.alert_id, a.acknowledged) for a in recargado.alerts] == [("a1", True)]
+
+
+def test_anexar_no_consulta_el_sistema_de_archivos(tmp_path, monkeypatch):
+    ruta = tmp_path / "alerts.jsonl"
+    diario = AlertJournal(str(ruta))
+    diario.registrar_alta(_alerta(1))  # vuelca el diario
+    diario.registrar_alta(_alerta(2))  # abre el archivo para anexar
+
+    consultas = []
+    monkeypatch.setattr("os.path.exists", lambda p: consultas.append(p) or True)
+    for i in range(3, 10):
+        diario.registrar_alta(_alerta(i))
+    diario.cerrar()
+    assert consultas == []
+    assert len(ruta.read_text(encoding="utf-8").splitlines()) == 9
+
+
+def test_alertas_del_mismo_segundo_sobreviven_a_la_reproduccion(tmp_path):
+    from alert_system import AlertSystem
+
+    system = AlertSystem(
+        alerts_file=str(tmp_path / "alerts.json"), config_file=str(tmp_path / "config.json")
+    )
+    system.config["speed_violation"]["max_speed"] = 100
+    datos = {"velocidad_actual": 130.0}
+    alertas = [system.check_speed_violation(datos) for _ in range(3)]
+    assert len({a.alert_id for a in alertas}) == 3
+
+    for alerta in alertas:
+        system.journal.registrar_alta(alerta.to_dict())
+    system.journal.cerrar()
+    ids = [a["alert_id"] for a in AlertJournal(system.journal.ruta).cargar()]
+    assert ids == [a.alert_id for a in alertas]
@@ -0,0 +1,131 @@
+"""Tests del worker de alertas: evaluación fuera del bucle del dashboard"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+from alert_system import Alert, AlertSeverity, AlertSystem, AlertType, AlertWorker
+
+
+def _sistema(tmp_path) -> AlertSystem:
+    system = AlertSystem(
+        alerts_file=str(tmp_path / "alerts.json"),
+        config_file=str(tmp_path / "alert_config.json"),
+    )
+    system.config["speed_violation"]["max_speed"] = 120
+    system.config["performance_degradation"]["enabled"] = False
+    system.analyzer = None
+    return system
+
+
+def test_worker_evalua_el_snapshot_y_versiona_el_resumen(tmp_path):
+    telemetria = {"velocidad_actual": 150.0}
+    worker = AlertWorker(_sistema(tmp_path), lambda: telemetria)
+
+    resumen = worker.evaluar_ahora()
+    assert resumen["version"] == 1
+    assert resumen["new_alerts"] == 1
+    assert resumen["alerts"][0]["alert_type"] == AlertType.SPEED_VIOLATION.value
+    assert (tmp_path / "alerts.jsonl").exists()
+
+    # Sin cambios en las alertas el resumen (y su versión) se reutiliza tal cual
+    assert worker.evaluar_ahora() is resumen
+
+    # La velocidad vuelve bajo el límite: la alerta se resuelve y hay versión nueva
+    telemetria = {"velocidad_actual": 80.0}
+    resumen = worker.evaluar_ahora()
+    assert resumen["version"] == 2
+    assert resumen["active_alerts"] == 0
+
+
+def test_analisis_lento_no_bloquea_el_ciclo(tmp_path):
+    system = _sistema(tmp_path)
+    liberar = threading.Event()
+
+    class AnalizadorLento:
+        df = None
+
+        def load_data_from_tsc(self, max_records, collection_time):
+            liberar.wait(5.0)
+            return False
+
+    system.analyzer = AnalizadorLento()
+    worker = AlertWorker(system, lambda: {"velocidad_actual": 50.0})
+    try:
+        inicio = time.perf_counter()
+        worker.evaluar_ahora()
+        worker.evaluar_ahora()
+        assert time.perf_counter() - inicio < 1.0
+        assert worker.get_metrics()["analisis_en_curso"] == 1
+    finally:
+        liberar.set()
+    worker._analisis_hilo.join(timeout=5.0)
+    assert worker.get_metrics()["analisis_ejecutados"] == 1
+
+
+def test_reconocer_desde_otro_hilo_mientras_el_worker_registra(tmp_path):
+    system = _sistema(tmp_path)
+    inicio = datetime(2026, 1, 1)
+    alertas = [
+        Alert(
+            alert_id=f"a{i}",
+            alert_type=AlertType.SPEED_VIOLATION,
+            severity=AlertSeverity.HIGH,
+            title="t",
+            message="m",
+            timestamp=inicio + timedelta(minutes=2 * i),
+            data={},
+        )
+        for i in range(500)
+    ]
+    errores = []
+
+    def registrar():
+        try:
+            for i in range(0, len(alertas), 10):
+                system.registrar_alertas(alertas[i : i + 10])
+                system._resolve_transient_alerts({"velocidad_actual": 200.0})
+        except Exception as e:  # pragma: no cover - solo si hay carrera
+            errores.append(e)
+
+    hilo = threading.Thread(target=registrar)
+    hilo.start()
+    reconocidas = 0
+    while hilo.is_alive() or system.alerts.activas():
+        for alerta in system.get_active_alerts():
+            reconocidas += system.acknowledge_alert(alerta.alert_id)
+    hilo.join()
+
+    assert errores == []
+    assert reconocidas == len(alertas)
+    assert system.get_alerts_summary()["acknowledged_alerts"] == len(alertas)
+
+
+def test_degradacion_usa_la_latencia_del_watcher_sin_releer_el_archivo(tmp_path):
+    from telemetry_bus import TelemetryBus
+    from tsc_integration import TSCIntegration
+
+    tsc = TSCIntegration(ruta_archivo=str(tmp_path / "GetData.txt"))
+    bus = TelemetryBus(tsc)
+    system = AlertSystem(
+        alerts_file=str(tmp_path / "alerts.json"),
+        config_file=str(tmp_path / "alert_config.json"),
+        telemetry_bus=bus,
+    )
+
+    def no_leer():
+        raise AssertionError("el chequeo no debe leer GetData.txt")
+
+    tsc.leer_datos_archivo = no_leer
+    watcher = tsc.obtener_watcher()
+    try:
+        watcher.metrics["latencia_ultima_ms"] = 5.0
+        assert system.check_performance_degradation() is None
+
+        watcher.metrics["latencia_ultima_ms"] = 2500.0
+        alerta = system.check_performance_degradation()
+        assert alerta.alert_type == AlertType.PERFORMANCE_DEGRADATION
+        assert alerta.data["response_time_ms"] == 2500.0
+    finally:
+        watcher.detener()
+        system.journal.cerrar()
@@ -0,0 +1,86 @@
+"""Tests de la caché LRU + TTL con rueda de tiempo"""
+
+from cache_engine import CacheEngine
+from performance_monitor import SmartCache
+
+
+class Reloj:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+def test_lru_desaloja_la_entrada_menos_usada():
+    cache = CacheEngine(max_entradas=2, reloj=Reloj())
+    cache.put("api", "a", 1)
+    cache.put("api", "b", 2)
+    assert cache.get("api", "a") == 1  # "b" pasa a ser la menos usada
+    cache.put("api", "c", 3)
+    assert cache.get("api", "b") is None
+    assert cache.get("api", "a") == 1 and cache.get("api", "c") == 3
+    assert cache.get_stats()["namespaces"]["api"]["desalojos"] == 1
+
+
+def test_rueda_de_tiempo_expira_sin_recorrer_la_cache():
+    reloj = Reloj()
+    cache = CacheEngine(resolucion_s=1.0, ranuras=8, reloj=reloj)
+    cache.configurar("corto", ttl=2.0)
+    cache.configurar("largo", ttl=30.0)  # más de una vuelta de la rueda
+    cache.put("corto", "x", "valor")
+    cache.put("largo", "y", "valor")
+
+    reloj.t += 3.0
+    assert cache.limpiar_expirados() == 1
+    assert len(cache) == 1
+    reloj.t += 20.0
+    assert cache.limpiar_expirados() == 0
+    reloj.t += 8.0
+    assert cache.limpiar_expirados() == 1
+    assert len(cache) == 0 and cache.get_stats()["bytes"] == 0
+
+
+def test_limite_en_bytes_y_version_del_namespace():
+    version = {"telemetria": 1}
+    cache = CacheEngine(max_bytes=100, reloj=Reloj())
+    cache.configurar("status", ttl=60.0, version=lambda: version["telemetria"])
+
+    assert cache.put("status", "grande", "x" * 101) is False
+    cache.put("status", "a", "x" * 60)
+    cache.put("status", "b", "x" * 60)  # no caben los dos: se desaloja "a"
+    assert cache.get("status", "a") is None and cache.get_stats()["bytes"] == 60
+
+    calculos = []
+
+    def obtener():
+        return cache.obtener_o_calcular("status", "b", lambda: calculos.append(1) or len(calculos))
+
+    assert obtener() == "x" * 60
+    version["telemetria"] = 2  # snapshot nuevo: la entrada deja de ser válida
+    assert obtener() == 1 and obtener() == 1
+    stats = cache.get_stats()["namespaces"]["status"]
+    assert stats["invalidaciones"] == 1 and stats["aciertos"] == 2
+
+
+def test_smart_cache_conserva_su_api_sobre_el_motor():
+    cache = SmartCache(max_size=2, ttl=300)
+    cache.put("k", {"v": 1})
+    assert cache.get("k") == {"v": 1} and cache.get("otra") is None
+    stats = cache.get_stats()
+    assert stats["size"] == 1 and stats["hit_count"] == 1 and stats["miss_count"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_smart_cache_limita_su_namespace_en_el_motor_compartido():
+    motor = CacheEngine(max_entradas=100)
+    motor.put("otro", "x", 1)
+    cache = SmartCache(max_size=2, ttl=300, engine=motor)
+    for clave in ("a", "b", "c"):
+        cache.put(clave, {"v": clave})
+        cache.get("a")  # "a" es la más usada: el desalojo cae sobre "b"
+
+    assert cache.get_stats()["size"] == 2
+    assert cache.get("a") == {"v": "a"} and cache.get("b") is None
+    assert motor.get("otro", "x") == 1
+    assert motor.get_stats()["namespaces"]["smart_cache"]["desalojos"] == 1
@@ -0,0 +1,75 @@
+"""Tests del escritor asíncrono de comandos con coalescencia por control"""
+
+from command_writer import CommandWriter, LatencyHistogram
+from tsc_integration import TSCIntegration
+
+
+def test_ultimo_valor_gana_y_una_escritura_por_ventana():
+    escritos = []
+    writer = CommandWriter(lambda lote: escritos.append(dict(lote)) or True, ventana_flush=0.05)
+    writer.iniciar()
+    try:
+        writer.encolar({"acelerador": 0.8})
+        writer.encolar({"freno_tren": 0.0})
+        writer.encolar({"acelerador": 0.5})  # mitigación de patinaje en el mismo ciclo
+        assert writer.vaciar(timeout=2.0) is True
+    finally:
+        writer.detener()
+
+    assert escritos == [{"freno_tren": 0.0, "acelerador": 0.5}]
+    metrics = writer.get_metrics()
+    assert metrics["encolados"] == 3 and metrics["coalescidos"] == 1
+    assert metrics["escrituras"] == 1 and metrics["profundidad"] == 0
+    assert metrics["profundidad_max"] == 2
+    assert metrics["latencia_cola_count"] == 1
+
+
+def test_envio_sincrono_absorbe_los_pendientes():
+    escritos = []
+    writer = CommandWriter(lambda lote: escritos.append(dict(lote)) or True, ventana_flush=10.0)
+    writer.iniciar()
+    try:
+        writer.encolar({"acelerador": 0.8, "freno_tren": 0.1})
+        assert writer.enviar_ahora({"freno_tren": 1.0}) is True
+        # Nada queda pendiente que pueda sobrescribir el freno después
+        assert writer.profundidad == 0
+    finally:
+        writer.detener()
+    assert escritos == [{"acelerador": 0.8, "freno_tren": 1.0}]
+
+
+def test_histograma_acumula_por_cubetas():
+    hist = LatencyHistogram(cubetas=(1.0, 10.0))
+    for valor in (0.5, 2.0, 3.0, 50.0):
+        hist.observar(valor)
+    assert hist.acumulados() == [(1.0, 1), (10.0, 3), (float("inf"), 4)]
+    assert hist.percentil(0.5) == 10.0
+    assert hist.percentil(1.0) == 50.0
+
+
+def test_aviso_de_escritura_recibe_resultado_y_lote_real():
+    avisos = []
+    writer = CommandWriter(lambda lote: False, ventana_flush=10.0)
+    writer.iniciar()
+    try:
+        writer.encolar({"acelerador": 0.8}, lambda ok, lote: avisos.append((ok, dict(lote))))
+        writer.encolar({"acelerador": 0.5})
+    finally:
+        writer.detener()
+    # El aviso llega tras la escritura (fallida) y con el valor que la sustituyó
+    assert avisos == [(False, {"acelerador": 0.5})]
+
+
+def test_tsc_integration_encola_y_escribe_en_segundo_plano(tmp_path):
+    tsc = TSCIntegration(ruta_archivo=str(tmp_path / "GetData.txt"))
+    tsc.ruta_archivo_comandos = str(tmp_path / "autopilot_commands.txt")
+    tsc.tsc_interface_file = str(tmp_path / "SendCommand.txt")
+    try:
+        assert tsc.encolar_comandos({"freno_tren": 0.25}) is True
+        assert tsc.vaciar_comandos() is True
+    finally:
+        tsc.detener_command_writer()
+
+    contenido = (tmp_path / "autopilot_commands.txt").read_text(encoding="utf-8")
+    assert "TrainBrakeControl:0.250" in contenido
+    assert tsc.get_io_metrics()["command_writer_escrituras"] == 1
@@ -0,0 +1,42 @@
+"""Tests del parser de una sola pasada para GetData.txt"""
+
+from getdata_parser import GetDataParser
+
+
+def test_parse_valores_numericos_y_texto():
+    parser = GetDataParser(["CurrentSpeed", "RPM"])
+    data = b"ControlName:CurrentSpeed\nControlValue:10.5\nControlName:RPMSource\nControlValue:Regulator\n"
+    datos = parser.parse(data)
+    assert datos == {"CurrentSpeed": 10.5, "RPMSource": "Regulator"}
+
+
+def test_parse_bom_crlf_y_espacios():
+    parser = GetDataParser(["SignalAspect"])
+    data = b"\xef\xbb\xbfControlName:SignalAspect\r\nControlValue:2\r\n  ControlName: KVB_SignalAspect \r\n ControlValue: -1 \r\n"
+    datos = parser.parse(data)
+    assert datos == {"SignalAspect": 2.0, "KVB_SignalAspect": -1.0}
+
+
+def test_parse_ignora_entrada_parcial_al_final():
+    parser = GetDataParser()
+    datos = parser.parse(b"ControlName:CurrentSpeed\nControlValue:1\nControlName:Acceleration\n")
+    assert datos == {"CurrentSpeed": 1.0}
+
+
+def test_parse_nombres_sin_valor_toman_el_siguiente_valor():
+    """Compatibilidad con el parser original: cada nombre usa el siguiente ControlValue."""
+    parser = GetDataParser()
+    datos = parser.parse(b"ControlName:A\nControlName:B\nControlValue:3\n")
+    assert datos == {"A": 3.0, "B": 3.0}
+
+
+def test_nombres_se_internan_y_se_aprenden():
+    parser = GetDataParser(["CurrentSpeed"])
+    tamano_inicial = len(parser)
+    data = b"ControlName:CurrentSpeed\nControlValue:1\nControlName:Wheelslip\nControlValue:0\n"
+    primero = parser.parse(data)
+    segundo = parser.parse(data)
+    assert len(parser) == tamano_inicial + 1
+    nombres_1 = sorted(primero)
+    nombres_2 = sorted(segundo)
+    assert all(a is b for a, b in zip(nombres_1, nombres_2))
@@ -30,8 +30,64 @@ def test_ia_sends_accelerator(tmp_path: Path):
     # Run one control cycle
     res = system.ejecutar_ciclo_control()
     assert res is not None
+    # The control cycle only enqueues; wait for the command writer thread
+    system.tsc.vaciar_comandos()
 
     # Check that commands file was written and contains Regulator/VirtualThrottle
     assert commands.exists()
     content = commands.read_text(encoding="utf-8")
     assert "Regulator:" in content or "VirtualThrottle:" in content
+
+
+def test_ia_accel_failed_write_is_retried(tmp_path: Path, monkeypatch):
+    getdata = tmp_path / "GetData.txt"
+    write_getdata(getdata)
+
+    system = AutopilotSystem()
+    system.tsc.ruta_archivo = str(getdata)
+    system.tsc.ruta_archivo_comandos = str(tmp_path / "autopilot_commands.txt")
+    assert system.iniciar_sesion() is True
+    assert system.activar_modo_automatico() is True
+    system.ia.procesar_telemetria = lambda _datos: {"decision": "ACELERAR", "acelerador": 0.8}
+
+    attempts = []
+
+    def failing_write(comandos):
+        attempts.append(dict(comandos))
+        return False
+
+    # The writer is created on the first enqueue and binds the patched method
+    monkeypatch.setattr(system.tsc, "_escribir_comandos", failing_write)
+    try:
+        system.ejecutar_ciclo_control()
+        assert system.tsc.vaciar_comandos() is False
+        # A queued-but-failed command must not start the cooldown
+        assert system._last_ai_accel_sent_value is None
+        assert system._last_ai_accel_sent_ts == 0.0
+
+        # Next cycle (skip the read-rate limit): the same value is sent again
+        system.tsc.timestamp_ultima_lectura = 0.0
+        system.ejecutar_ciclo_control()
+        system.tsc.vaciar_comandos()
+        assert [a["acelerador"] for a in attempts] == [0.8, 0.8]
+    finally:
+        system.tsc.detener_command_writer()
+
+
+def test_stop_flushes_queued_commands(tmp_path: Path):
+    getdata = tmp_path / "GetData.txt"
+    commands = tmp_path / "autopilot_commands.txt"
+    write_getdata(getdata)
+
+    system = AutopilotSystem()
+    system.tsc.ruta_archivo = str(getdata)
+    system.tsc.ruta_archivo_comandos = str(commands)
+    assert system.iniciar_sesion() is True
+
+    # A long flush window keeps the command pending until stop()
+    system.tsc.obtener_command_writer().ventana_flush = 30.0
+    system.tsc.encolar_comandos({"freno_tren": 0.4})
+    system.stop()
+
+    assert not system.tsc.command_writer.activo
+    assert "TrainBrakeControl:0.400" in commands.read_text(encoding="utf-8")
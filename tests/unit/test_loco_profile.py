@@ -0,0 +1,59 @@
+"""Tests de los perfiles de locomotora cacheados por conjunto de controles"""
+
+from loco_profile import LocoProfileCache, huella_controles
+from tsc_integration import TSCIntegration
+
+SNAPSHOT = {
+    "CurrentSpeed": 15.0,
+    "Acceleration": 0.1,
+    "VirtualThrottle": 0.5,
+    "TrainBrakeControl": 0.25,
+    "RPMDelta": 0.0,
+    "Ammeter": 450.0,
+    "AirBrakePipePressurePSI": 90.0,
+}
+
+
+def _sin_fecha(datos):
+    datos = dict(datos)
+    datos.pop("fecha_hora", None)
+    return datos
+
+
+def test_huella_no_depende_del_orden():
+    assert huella_controles(["b", "a"]) == huella_controles({"a", "b"})
+    assert huella_controles(["a", "b"]) != huella_controles(["a", "b"], firma_config="x")
+
+
+def test_perfil_se_compila_una_vez_y_se_reutiliza_del_disco(tmp_path, monkeypatch):
+    ruta = tmp_path / "loco_profiles.json"
+    monkeypatch.setenv("TSC_LOCO_PROFILES_FILE", str(ruta))
+
+    tsc = TSCIntegration(ruta_archivo="nonexistent.txt")
+    for velocidad in (15.0, 16.0, 17.0):
+        primera = tsc.convertir_datos_ia(dict(SNAPSHOT, CurrentSpeed=velocidad))
+    metrics = tsc.perfiles.get_metrics()
+    assert metrics["compilados"] == 1 and metrics["aciertos"] == 2
+    assert ruta.exists()
+
+    # Reinicio con la misma locomotora: el plan se carga del disco sin compilar
+    reiniciado = TSCIntegration(ruta_archivo="nonexistent.txt")
+    segunda = reiniciado.convertir_datos_ia(dict(SNAPSHOT, CurrentSpeed=17.0))
+    metrics = reiniciado.perfiles.get_metrics()
+    assert metrics["compilados"] == 0 and metrics["cargados_disco"] == 1
+    assert _sin_fecha(segunda) == _sin_fecha(primera)
+    assert segunda["posicion_freno_tren"] == 0.25
+    assert segunda["rpm"] == 0.5 * reiniciado.max_engine_rpm
+
+
+def test_archivo_corrupto_se_ignora(tmp_path):
+    ruta = tmp_path / "loco_profiles.json"
+    ruta.write_text("{no es json", encoding="utf-8")
+    compilados = []
+    cache = LocoProfileCache(
+        lambda controles: compilados.append(controles) or ({}, {}), ruta=str(ruta)
+    )
+    perfil = cache.obtener({"Regulator": 0.0}.keys())
+    assert compilados == [frozenset({"Regulator"})]
+    assert cache.obtener({"Regulator": 1.0}.keys()) is perfil
+    assert '"version"' in ruta.read_text(encoding="utf-8")
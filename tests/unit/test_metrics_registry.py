@@ -0,0 +1,135 @@
+"""Tests del registro de métricas con exposición Prometheus preasignada"""
+
+import copy
+import random
+
+import numpy as np
+
+from metrics_registry import LogHistogram, MetricsRegistry, get_metrics_registry
+from performance_monitor import PerformanceMonitor
+from tsc_integration import TSCIntegration
+
+
+def test_render_escribe_valores_actuales_en_el_buffer():
+    registro = MetricsRegistry()
+    lecturas = registro.counter("reads_total", "Reads")
+    latencia = registro.histogram("read_latency_ms", "Read latency", cubetas=(1.0, 10.0))
+    emision = registro.gauge("emit_ms", "Emit", {"topic": 'te"lemetry'})
+
+    lecturas.inc()
+    latencia.observar(0.5)
+    latencia.observar(5.0)
+    emision.set(2.5)
+    texto = registro.render()
+
+    assert "# TYPE reads_total counter\nreads_total 1.0\n" in texto
+    assert 'read_latency_ms_bucket{le="1.0"} 1\n' in texto
+    assert 'read_latency_ms_bucket{le="10.0"} 2\n' in texto
+    assert 'read_latency_ms_bucket{le="+Inf"} 2\n' in texto
+    assert "read_latency_ms_sum 5.5\nread_latency_ms_count 2\n" in texto
+    assert 'emit_ms{topic="te\\"lemetry"} 2.5\n' in texto
+
+    # Mismo buffer, valores nuevos: las líneas no cambian de posición
+    lecturas.inc(2)
+    assert registro.render().splitlines().index("reads_total 3.0") == texto.splitlines().index(
+        "reads_total 1.0"
+    )
+
+
+def test_obtener_devuelve_la_misma_metrica_y_nuevas_etiquetas_amplian_la_familia():
+    registro = MetricsRegistry()
+    a = registro.histogram("emit_ms", "Emit", {"topic": "alerts"})
+    assert registro.histogram("emit_ms", "Emit", {"topic": "alerts"}) is a
+    registro.render()
+    registro.histogram("emit_ms", "Emit", {"topic": "status"}).observar(3.0)
+
+    texto = registro.render()
+    assert texto.count("# TYPE emit_ms histogram") == 1
+    assert 'emit_ms_count{topic="status"} 1' in texto
+    assert 'emit_ms_count{topic="alerts"} 0' in texto
+
+
+def test_lecturas_y_escrituras_actualizan_el_registro_global(tmp_path):
+    registro = get_metrics_registry()
+    lectura = registro.histogram("tsc_read_latency_ms", "")
+    parseo = registro.histogram("tsc_parse_duration_ms", "")
+    escritura = registro.histogram("tsc_write_latency_ms", "")
+    previos = (lectura.total, parseo.total, escritura.total)
+
+    getdata = tmp_path / "GetData.txt"
+    getdata.write_text("ControlType:CurrentSpeed\nControlValue:10.0\n", encoding="utf-8")
+    tsc = TSCIntegration(ruta_archivo=str(getdata))
+    tsc.ruta_archivo_comandos = str(tmp_path / "SendCommand.txt")
+    tsc.write_lua_commands = False
+    tsc.tsc_interface_file = str(tmp_path / "SendCommandTSC.txt")
+    assert tsc.leer_datos_archivo() is not None
+    assert tsc.enviar_comandos({"freno_tren": 0.5}) is True
+
+    assert lectura.total == previos[0] + 1
+    assert parseo.total == previos[1] + 1
+    assert escritura.total >= previos[2] + 1
+    assert "tsc_read_latency_ms_count" in registro.render()
+
+
+def test_log_histogram_percentiles_con_error_relativo_acotado():
+    rnd = random.Random(2)
+    valores = [rnd.lognormvariate(2.0, 1.0) for _ in range(20000)]
+    a, b = LogHistogram(), LogHistogram()
+    for i, v in enumerate(valores):
+        (a if i % 2 else b).observar(v)
+    a.merge(b)
+
+    assert a.total == len(valores) and a.maximo == max(valores)
+    for q in (0.5, 0.9, 0.99):
+        exacto = float(np.percentile(valores, q * 100, method="inverted_cdf"))
+        assert abs(a.percentil(q) - exacto) / exacto < 0.011
+    a.reset()
+    assert a.total == 0 and a.percentil(0.99) == 0.0
+
+
+def test_metricas_del_dashboard_con_percentiles_en_reporte_y_metrics():
+    registro = MetricsRegistry()
+    monitor = PerformanceMonitor(max_samples=10, registry=registro)
+    monitor.add_sample({"websocket_latency": 0})
+    for i in range(100):
+        monitor.record_dashboard_metric("websocket_latency", 1.0 if i < 98 else 80.0)
+
+    histograma = monitor.get_performance_report()["histograms"]["websocket_latency"]
+    assert histograma["count"] == 100 and histograma["max"] == 80.0
+    assert histograma["p50"] == 1.0 and histograma["p99"] == 80.0
+
+    texto = registro.render()
+    assert 'dashboard_metric{metric="websocket_latency",quantile="0.99"} 80.0' in texto
+    assert 'dashboard_metric_count{metric="websocket_latency"} 100' in texto
+    assert 'dashboard_metric_max{metric="websocket_latency"} 80.0' in texto
+
+
+def test_gauge_map_refleja_cada_asignacion_y_las_vistas_se_evaluan_al_renderizar():
+    registro = MetricsRegistry()
+    metricas = registro.gauge_map("sub_", "Subsystem metric", {"errores": 0, "sub_listo": True})
+    cola = [1, 2]
+    registro.gauge_fn("sub_profundidad", "Queue depth", lambda: len(cola))
+
+    metricas["errores"] += 2
+    metricas["nombre"] = "no numérico"
+    cola.append(3)
+    texto = registro.render()
+    assert "sub_errores 2\n" in texto and "sub_listo 1\n" in texto
+    assert "sub_profundidad 3\n" in texto and "nombre" not in texto
+    assert dict(metricas) == {"errores": 2, "sub_listo": True, "nombre": "no numérico"}
+    assert type(copy.deepcopy(metricas)) is dict
+
+    # Una instancia nueva sustituye a la anterior en la exposición
+    registro.gauge_fn("sub_profundidad", "Queue depth", lambda: None)
+    assert "sub_profundidad NaN\n" in registro.render()
+
+
+def test_metrics_endpoint_sale_del_registro_sin_familias_duplicadas():
+    import web_dashboard
+
+    with web_dashboard.app.test_client() as client:
+        texto = client.get("/metrics").get_data(as_text=True)
+    ayudas = [linea.split()[2] for linea in texto.splitlines() if linea.startswith("# HELP")]
+    assert len(ayudas) == len(set(ayudas))
+    assert "dashboard_uptime_seconds" in ayudas and "autopilot_plugin_retry_total" in ayudas
+    assert not any(nombre.startswith("tsc_io_command_writer_latencia") for nombre in ayudas)
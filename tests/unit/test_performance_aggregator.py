@@ -0,0 +1,92 @@
+"""Tests del reporte de rendimiento incremental"""
+
+import random
+
+from performance_monitor import (
+    TTL_RESUMEN_HISTOGRAMA_S,
+    PerformanceAggregator,
+    PerformanceMonitor,
+)
+
+
+def _reporte_por_fuerza_bruta(historial, metricas, ventana):
+    recientes = list(historial)[-ventana:]
+    promedios, picos = {}, {}
+    for k in metricas:
+        valores = [m[k] for m in recientes if k in m]
+        if valores:
+            promedios[k] = sum(valores) / len(valores)
+            picos[k] = max(valores)
+    return promedios, picos
+
+
+def test_promedios_y_picos_coinciden_con_el_recalculo_completo():
+    rnd = random.Random(11)
+    metricas = ("cpu_percent", "websocket_latency")
+    agregador = PerformanceAggregator(metricas, ventana=50)
+    historial = []
+    for i in range(400):
+        muestra = {"cpu_percent": rnd.uniform(0, 100)}
+        if i % 3:
+            muestra["websocket_latency"] = rnd.expovariate(0.1)
+        historial.append(muestra)
+        agregador.agregar(muestra)
+        # El dashboard sigue escribiendo en la muestra abierta
+        if i % 5 == 0:
+            muestra["websocket_latency"] = rnd.uniform(0, 500)
+            agregador.marcar_cambio()
+
+        promedios, picos = agregador.resumen()
+        esperados = _reporte_por_fuerza_bruta(historial, metricas, 50)
+        assert picos == esperados[1]
+        for k, v in esperados[0].items():
+            assert abs(promedios[k] - v) < 1e-9
+
+
+def test_reporte_cacheado_hasta_que_cambia_la_version():
+    monitor = PerformanceMonitor(max_samples=100)
+    assert "error" in monitor.get_performance_report()
+
+    monitor.add_sample({"cpu_percent": 90.0, "memory_percent": 10.0})
+    primero = monitor.get_performance_report()
+    repetido = monitor.get_performance_report()
+    assert repetido == primero and repetido is not primero
+    # Modificar la copia devuelta no altera el reporte cacheado
+    repetido["averages"]["cpu_percent"] = -1.0
+    repetido["recommendations"].clear()
+    assert monitor.get_performance_report() == primero
+    assert primero["averages"]["cpu_percent"] == 90.0
+    assert "CPU alto: Considerar reducir frecuencia de actualización" in primero["recommendations"]
+
+    monitor.record_dashboard_metric("websocket_latency", 30.0)
+    segundo = monitor.get_performance_report()
+    assert segundo is not primero and segundo["version"] > primero["version"]
+    assert segundo["peaks"]["websocket_latency"] == 30.0
+    assert segundo["current_metrics"]["websocket_latency"] == 30.0
+
+    monitor.add_sample({"cpu_percent": 10.0})
+    tercero = monitor.get_performance_report()
+    assert tercero["averages"]["cpu_percent"] == 50.0
+    assert tercero["monitoring_duration_seconds"] == 2
+
+
+def test_resumen_de_histograma_se_reutiliza_dentro_del_ttl():
+    monitor = PerformanceMonitor(max_samples=100)
+    monitor.add_sample({"cpu_percent": 10.0})
+    monitor.record_dashboard_metric("websocket_latency", 10.0)
+    assert monitor.get_performance_report()["histograms"]["websocket_latency"]["count"] == 1
+
+    # Dentro del TTL el reporte cambia pero los percentiles no se recalculan
+    monitor.record_dashboard_metric("websocket_latency", 20.0)
+    reporte = monitor.get_performance_report()
+    assert reporte["current_metrics"]["websocket_latency"] == 20.0
+    assert reporte["histograms"]["websocket_latency"]["count"] == 1
+
+    nombre = "websocket_latency"
+    total, instante, resumen = monitor._resumenes_hist[nombre]
+    monitor._resumenes_hist[nombre] = (total, instante - TTL_RESUMEN_HISTOGRAMA_S, resumen)
+    monitor.record_dashboard_metric(nombre, 30.0)
+    assert monitor.get_performance_report()["histograms"][nombre]["count"] == 3
+
+    monitor.reset_dashboard_histograms()
+    assert monitor.get_performance_report()["histograms"][nombre]["count"] == 0
@@ -4,21 +4,32 @@ Tests unitarios para el módulo Predictive Telemetry Analysis
 
 import os
 
+import numpy as np
 import pytest
+
 # Skip if joblib is not available (heavy ML dependency)
 pytest.importorskip("joblib")
 
 pytestmark = pytest.mark.integration  # requires joblib/scikit-learn
-from predictive_telemetry_analysis import PredictiveTelemetryAnalyzer
+from predictive_telemetry_analysis import (
+    PredictiveAutopilotController,
+    PredictiveModel,
+    PredictiveTelemetryAnalyzer,
+    TelemetryDataCollector,
+)
 
 
 class TestPredictiveTelemetryAnalyzer:
     """Tests para la clase PredictiveTelemetryAnalyzer"""
 
     @pytest.fixture
-    def analyzer(self):
+    def analyzer(self, tmp_path):
         """Fixture que crea una instancia del analizador"""
-        return PredictiveTelemetryAnalyzer()
+        # Historial y modelo aislados por test: nada se escribe en data/
+        return PredictiveTelemetryAnalyzer(
+            data_file=str(tmp_path / "telemetry_history.json"),
+            model_file=str(tmp_path / "predictive_model.pkl"),
+        )
 
     @pytest.fixture
     def sample_telemetry_data(self):
@@ -206,7 +217,9 @@ class TestPredictiveTelemetryAnalyzer:
         assert os.path.exists(analyzer.model_file)
 
         # Crear nueva instancia y verificar carga automática del modelo
-        new_analyzer = PredictiveTelemetryAnalyzer()
+        new_analyzer = PredictiveTelemetryAnalyzer(
+            data_collector=analyzer.data_collector, model_file=analyzer.model_file
+        )
         assert new_analyzer.predictive_model.is_trained
 
         # Verificar que puede hacer predicciones
@@ -262,6 +275,203 @@ class TestPredictiveTelemetryAnalyzer:
         # Verificar que ambos datos se agregaron
         assert len(analyzer.data_collector.telemetry_history) >= 2
 
+    def test_training_data_matches_sample_loop(self, tmp_path):
+        """Test que las ventanas vectorizadas coinciden con el bucle muestra a muestra"""
+        collector = TelemetryDataCollector(
+            max_samples=50, data_file=str(tmp_path / "telemetry_history.json")
+        )
+        # Más muestras que la capacidad para forzar la compactación del buffer
+        for i in range(130):
+            collector.add_telemetry_sample(
+                {"velocidad_actual": float(i), "acelerador": i * 0.01, "pendiente": "n/a"}
+            )
+
+        lookback = 4
+        history = list(collector.telemetry_history)
+        esperado_X = [
+            sum((collector._feature_row(history[i + j]["data"]) for j in range(lookback)), [])
+            for i in range(len(history) - lookback)
+        ]
+        esperado_y = [
+            collector._feature_row(history[i]["data"]) for i in range(lookback, len(history))
+        ]
+
+        X, y = collector.get_training_data(lookback)
+        assert X.shape == (46, lookback * 9) and y.shape == (46, 9)
+        np.testing.assert_array_equal(X, np.array(esperado_X))
+        np.testing.assert_array_equal(y, np.array(esperado_y))
+        assert np.isnan(y[:, 4]).all()  # pendiente no numérica -> NaN
+        # X son vistas sobre una única copia de la matriz, no una copia por ventana
+        assert np.shares_memory(X, y)
+
+        secuencia = collector.get_recent_feature_sequence(lookback)
+        np.testing.assert_array_equal(secuencia, X[-1][9:].tolist() + y[-1].tolist())
+
+    def test_training_data_after_external_history_change(self, analyzer, sample_telemetry_data):
+        """Test que la matriz se reconstruye si el historial se modifica por fuera"""
+        for _ in range(15):
+            analyzer.add_telemetry_sample(sample_telemetry_data)
+        analyzer.data_collector.telemetry_history.clear()
+        X, y = analyzer.data_collector.get_training_data(10)
+        assert len(X) == 0 and len(y) == 0
+
+        for _ in range(12):
+            analyzer.add_telemetry_sample(sample_telemetry_data)
+        X, y = analyzer.data_collector.get_training_data(10)
+        assert X.shape == (2, 90)
+
+    def _fill_history(self, analyzer, n=200):
+        for i in range(n):
+            analyzer.add_telemetry_sample(
+                {"velocidad_actual": 40 + (i % 50), "acelerador": 0.1 * (i % 7), "pendiente": 1.5}
+            )
+
+    def test_background_retrain_swaps_model(self, analyzer):
+        """Test que el reentrenamiento en otro proceso activa y versiona el modelo"""
+        self._fill_history(analyzer)
+        modelo_previo = analyzer.predictive_model
+
+        assert analyzer.start_background_retrain()
+        # Un solo reentrenamiento a la vez; el modelo activo sigue siendo el previo
+        assert not analyzer.start_background_retrain()
+        assert analyzer.predictive_model is modelo_previo
+        assert analyzer.wait_for_retrain(timeout=120)
+
+        metrics = analyzer.get_retrain_metrics()
+        assert metrics["swaps"] == 1 and metrics["en_curso"] == 0
+        assert metrics["model_version"] == analyzer.predictive_model.version
+        assert metrics["duracion_ultima_s"] > 0
+        assert analyzer.predictive_model is not modelo_previo
+        assert analyzer.predictive_model.is_trained
+        version = f"predictive_model_v{metrics['model_version']:06d}.pkl"
+        assert os.listdir(analyzer.model_dir) == [version]
+        assert os.path.exists(analyzer.model_file)
+        analyzer.stop_analysis()
+
+    def test_background_retrain_rejects_worse_candidate(self, analyzer):
+        """Test que un candidato peor que el modelo activo no lo sustituye"""
+        analyzer.retrain_in_process = False
+        self._fill_history(analyzer)
+        assert "error" not in analyzer.train_model()
+        activo = analyzer.predictive_model
+        version = analyzer.model_version
+
+        analyzer.max_rmse_ratio = 0.0  # ningún candidato puede mejorar un RMSE > 0
+        activo.metrics["rmse"] = max(activo.metrics["rmse"], 1e-6)
+        assert analyzer.start_background_retrain()
+        assert analyzer.wait_for_retrain(timeout=60)
+
+        assert analyzer.predictive_model is activo
+        assert analyzer.model_version == version
+        assert analyzer.get_retrain_metrics()["candidatos_rechazados"] == 1
+
+    def test_loaded_model_retrains_after_interval(self, analyzer):
+        """Test que un modelo cargado de disco se reentrena al acumular muestras nuevas"""
+        analyzer.retrain_in_process = False
+        self._fill_history(analyzer)
+        assert "error" not in analyzer.train_model()
+
+        # Estado de un arranque nuevo con el modelo guardado en disco
+        analyzer.predictive_model = PredictiveModel()
+        analyzer._samples_at_last_train = None
+        analyzer._load_existing_model()
+        assert analyzer.predictive_model.is_trained
+        analyzer.retrain_interval_samples = 100
+        self._fill_history(analyzer, 50)
+        analyzer._retrain_model_if_needed()
+        assert analyzer._retrain_future is None
+
+        self._fill_history(analyzer, 60)
+        analyzer._retrain_model_if_needed()
+        assert analyzer._retrain_future is not None
+        assert analyzer.wait_for_retrain(timeout=60)
+
+    def test_loaded_model_with_other_horizon_is_retrained(self, analyzer):
+        """Test que un modelo guardado con otro horizonte se sustituye al reentrenar"""
+        analyzer.retrain_in_process = False
+        self._fill_history(analyzer)
+        analyzer.prediction_horizon = 1  # modelo de un solo paso (formato anterior)
+        assert "error" not in analyzer.train_model()
+
+        analyzer.prediction_horizon = 5
+        analyzer.predictive_model = PredictiveModel()
+        analyzer._samples_at_last_train = None
+        analyzer._load_existing_model()
+        assert analyzer.predictive_model.horizon == 1  # sigue activo mientras tanto
+
+        analyzer._retrain_model_if_needed()
+        assert analyzer._retrain_future is not None
+        assert analyzer.wait_for_retrain(timeout=60)
+        assert analyzer.predictive_model.horizon == 5
+        secuencia = analyzer.data_collector.get_recent_feature_sequence(analyzer.lookback_steps)
+        assert analyzer.predictive_model.predict_horizon(secuencia).shape == (5, 9)
+
+    def test_online_model_updates_incrementally(self, tmp_path):
+        """Test que el modelo online se actualiza por mini-lotes sin reajuste completo"""
+        analyzer = PredictiveTelemetryAnalyzer(
+            model_type="sgd",
+            data_file=str(tmp_path / "telemetry_history.json"),
+            model_file=str(tmp_path / "predictive_model.pkl"),
+        )
+        modelo = analyzer.predictive_model
+        assert modelo.is_online and not modelo.is_trained
+
+        self._fill_history(analyzer, 200)
+        primera = analyzer._update_online_model()
+        # 200 muestras -> 186 ventanas de 10 pasos con 5 pasos de horizonte
+        assert modelo.is_trained and modelo.samples_seen == 186 and modelo.horizon == 5
+        assert "mae" not in primera  # sin modelo previo no hay error prequential
+
+        # Menos muestras nuevas que el mini-lote: no se actualiza
+        self._fill_history(analyzer, 20)
+        assert analyzer._update_online_model() is None
+
+        self._fill_history(analyzer, 40)
+        segunda = analyzer._update_online_model()
+        assert segunda["samples"] == 60 and np.isfinite(segunda["mae"])
+        assert modelo.samples_seen == 246
+        assert analyzer.get_retrain_metrics()["actualizaciones_online"] == 2
+        assert analyzer.predictive_model is modelo
+
+        secuencia = analyzer.data_collector.get_recent_feature_sequence(analyzer.lookback_steps)
+        assert modelo.predict_horizon(secuencia).shape == (5, 9)
+        assert "error" in PredictiveModel("random_forest").partial_fit(
+            np.ones((1, 90)), np.ones((1, 9))
+        )
+
+    def test_horizon_predictions_with_rolling_window(self, analyzer):
+        """Test que una sola llamada predice todo el horizonte sobre la ventana desplazada"""
+        self._fill_history(analyzer, 200)
+        assert "error" not in analyzer.train_model()
+        assert analyzer.predictive_model.horizon == analyzer.prediction_horizon == 5
+
+        assert analyzer._refresh_window()
+        assert not analyzer._refresh_window()  # sin muestras nuevas no hay que predecir
+        for i in range(3):
+            analyzer.add_telemetry_sample({"velocidad_actual": 100.0 + i, "pendiente": 7.0})
+        assert analyzer._refresh_window()
+        esperado = analyzer.data_collector.get_recent_feature_sequence(analyzer.lookback_steps)
+        np.testing.assert_array_equal(analyzer._window.reshape(-1), esperado)
+
+        prediccion = analyzer.predictive_model.predict_horizon(analyzer._window.reshape(-1))
+        resultado = analyzer._prediction_to_dict(prediccion)
+        horizonte = resultado["horizon"]
+        assert [p["step"] for p in horizonte] == [1, 2, 3, 4, 5]
+        assert resultado["velocidad_actual"] == horizonte[0]["velocidad_actual"]
+        assert horizonte[0]["timestamp"] < horizonte[-1]["timestamp"]
+
+        # El control mira todo el horizonte sin volver a llamar al modelo
+        controlador = PredictiveAutopilotController.__new__(PredictiveAutopilotController)
+        controlador.safety_margin = 0.9
+        predicciones = {
+            "velocidad_actual": 50.0,
+            "horizon": [{"velocidad_actual": 50.0}, {"velocidad_actual": 95.0}],
+        }
+        comandos = controlador._calculate_predictive_commands(
+            {"velocidad_actual": 50.0, "limite_velocidad": 100}, predicciones
+        )
+        assert comandos["acelerador"] == 0.0 and comandos["freno_tren"] > 0
+
     @pytest.mark.slow
     def test_large_dataset_training(self, analyzer, sample_telemetry_data):
         """Test de rendimiento con conjunto de datos grande"""
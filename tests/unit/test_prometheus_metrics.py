@@ -4,15 +4,15 @@ from web_dashboard import app
 
 def test_metrics_endpoint_includes_tsc_io_and_uptime(monkeypatch):
     tsc = TSCIntegration()
-    # Set deterministic metrics
-    tsc.io_metrics = {
+    # Set deterministic metrics (io_metrics mirrors each value into the registry)
+    tsc.io_metrics.update({
         "read_total_retries": 2,
         "read_last_latency_ms": 1.23,
         "read_attempts_last": 1,
         "write_total_retries": 3,
         "write_last_latency_ms": 2.34,
         "write_attempts_last": 2,
-    }
+    })
 
     # Inject into web app
     monkeypatch.setattr('web_dashboard.tsc_integration', tsc)
@@ -0,0 +1,116 @@
+"""Tests de la codificación negociada del stream WebSocket"""
+
+import json
+import zlib
+
+import pytest
+
+import stream_encoding
+from metrics_registry import MetricsRegistry
+from stream_encoding import StreamEncoder, estimar_bytes_json
+
+
+def _mensaje(seq: int) -> dict:
+    telemetria = {f"control_{i}": 0.5 for i in range(40)}
+    telemetria.update(velocidad_actual=50.0 + seq, timestamp="2026-01-01T00:00:00", activo=True)
+    return {"type": "keyframe", "topic": "telemetry", "seq": seq, "data": telemetria}
+
+
+def test_estimacion_sin_serializar_se_acerca_al_json_real():
+    datos = {"a": 1, "b": "hola", "c": [1, 2, 3], "d": {"x": None, "y": True, "z": False}}
+    assert estimar_bytes_json(datos) == len(json.dumps(datos, separators=(",", ":")))
+
+    mensaje = _mensaje(3)
+    real = len(json.dumps(mensaje, separators=(",", ":")))
+    assert abs(estimar_bytes_json(mensaje) - real) / real < 0.5
+
+
+def test_negociacion_elige_la_primera_disponible():
+    encoder = StreamEncoder()
+    assert encoder.negociar("a", ["brotli", "zlib", "json"]) == "zlib"
+    assert encoder.negociar("b", None) == "json"
+    assert encoder.negociar("c", ["brotli"]) == "json"
+    assert encoder.activas() == ["json", "zlib"]
+    assert encoder.sala("topic:telemetry", "json") == "topic:telemetry"
+    assert encoder.sala("topic:telemetry", "zlib") == "topic:telemetry|zlib"
+
+    # Sin compresión, zlib deja de ofrecerse en las negociaciones siguientes
+    encoder.compresion_habilitada = False
+    assert encoder.negociar("d", ["zlib", "json"]) == "json"
+    assert encoder.codificacion("a") == "zlib"
+    encoder.quitar("a")
+    assert encoder.activas() == ["json"]
+
+
+def test_zlib_reduce_bytes_y_se_decodifica():
+    registro = MetricsRegistry()
+    encoder = StreamEncoder(registro=registro)
+    mensaje = _mensaje(1)
+    frame = encoder.codificar(mensaje, "zlib")
+    assert json.loads(zlib.decompress(frame)) == mensaje
+    assert encoder.codificar(mensaje, "json") is mensaje
+
+    metricas = encoder.get_metrics()["codificaciones"]
+    assert metricas["zlib"]["mensajes"] == 1 and metricas["zlib"]["bytes"] == len(frame)
+    assert metricas["zlib"]["ratio_bytes"] < 0.5
+    assert metricas["json"]["bytes"] == len(json.dumps(mensaje, separators=(",", ":")))
+    assert 'dashboard_stream_encoded_bytes_total{encoding="zlib"}' in registro.render()
+
+
+def test_tamano_json_se_mide_por_muestreo(monkeypatch):
+    encoder = StreamEncoder()
+    llamadas = []
+    dumps = json.dumps
+    monkeypatch.setattr(
+        stream_encoding.json, "dumps", lambda *a, **k: llamadas.append(1) or dumps(*a, **k)
+    )
+    real = len(dumps(_mensaje(1), separators=(",", ":")))
+    for seq in range(stream_encoding.MUESTREO_TAMANO_JSON * 2):
+        encoder.codificar(_mensaje(seq % 10), "json")
+    assert len(llamadas) == 2
+    metricas = encoder.get_metrics()["codificaciones"]["json"]
+    assert (
+        metricas["bytes"]
+        == metricas["bytes_json"]
+        == real * stream_encoding.MUESTREO_TAMANO_JSON * 2
+    )
+
+
+@pytest.mark.skipif(not stream_encoding.HAS_MSGPACK, reason="msgpack no instalado")
+def test_msgpack_produce_frames_binarios():
+    encoder = StreamEncoder()
+    mensaje = _mensaje(2)
+    frame = encoder.codificar(mensaje, "msgpack")
+    assert stream_encoding.msgpack.unpackb(frame, raw=False) == mensaje
+    assert encoder.get_metrics()["codificaciones"]["msgpack"]["bytes"] == len(frame)
+
+
+def test_cliente_websocket_negocia_zlib_y_recibe_frames_binarios():
+    import web_dashboard
+
+    topics = web_dashboard.telemetry_topics
+    encoder = web_dashboard.stream_encoder
+    topics.codificar("telemetry", {"telemetry": _mensaje(5)["data"]})
+    cliente = web_dashboard.socketio.test_client(web_dashboard.app)
+    cliente.get_received()
+
+    cliente.emit("subscribe_topics", {"topics": ["telemetry"], "encodings": ["zlib", "json"]})
+    recibidos = cliente.get_received()
+    respuesta = [m["args"][0] for m in recibidos if m["name"] == "topics_subscribed"]
+    assert respuesta[-1]["encoding"] == "zlib"
+
+    # El topic ya estaba suscrito en JSON: al cambiar de formato solo cambia de sala
+    web_dashboard.socketio.emit(
+        "telemetry_stream",
+        encoder.codificar(topics.keyframe("telemetry"), "zlib"),
+        to=encoder.sala(topics.sala("telemetry"), "zlib"),
+    )
+    web_dashboard.socketio.emit(
+        "telemetry_stream", topics.keyframe("telemetry"), to=topics.sala("telemetry")
+    )
+    frames = [m["args"][0] for m in cliente.get_received() if m["name"] == "telemetry_stream"]
+    assert len(frames) == 1 and isinstance(frames[0], bytes)
+    mensaje = json.loads(zlib.decompress(frames[0]))
+    assert mensaje["topic"] == "telemetry" and mensaje["type"] == "keyframe"
+    cliente.disconnect()
+    assert "zlib" not in encoder.activas()
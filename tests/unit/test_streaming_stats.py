@@ -0,0 +1,67 @@
+"""Tests de las estadísticas incrementales para la detección de anomalías"""
+
+import random
+
+import numpy as np
+
+from alert_system import AlertSystem, AlertType
+from streaming_stats import EWMA, RollingWelford, StreamingTelemetryStats, VariableStats
+
+
+def test_ventana_deslizante_coincide_con_numpy():
+    rnd = random.Random(3)
+    valores = [rnd.gauss(80.0, 5.0) for _ in range(2500)]
+    stats = VariableStats(ventana=500)
+    for x in valores:
+        stats.actualizar(x)
+
+    ventana = np.asarray(valores[-500:])
+    assert stats.n == 500
+    assert abs(stats.ventana.media - ventana.mean()) < 1e-9
+    assert abs(stats.ventana.desviacion - ventana.std(ddof=1)) < 1e-9
+    for q, clave in ((0.05, "p5"), (0.5, "p50"), (0.95, "p95")):
+        assert abs(stats.resumen()[clave] - np.quantile(ventana, q)) < 1e-9
+
+
+def test_zscore_se_calcula_contra_la_ventana_previa():
+    welford = RollingWelford(ventana=100)
+    for i in range(100):
+        welford.actualizar(50.0 + (i % 2))
+    # Un pico no diluye su propia detección
+    assert welford.zscore(80.0) > 50
+    assert welford.zscore(50.5) < 0.1
+
+    ewma = EWMA(alpha=0.5)
+    for x in (10.0, 20.0):
+        ewma.actualizar(x)
+    assert ewma.media == 15.0
+
+
+def test_variables_no_numericas_se_ignoran():
+    stats = StreamingTelemetryStats({"velocidad": "velocidad_actual", "rpm": "rpm"})
+    zscores = stats.actualizar({"velocidad_actual": "n/a", "rpm": float("nan")})
+    assert zscores == {}
+    assert stats.actualizar({"velocidad_actual": 10, "rpm": True}) == {"velocidad": 0.0}
+    assert stats.stats["rpm"].n == 0
+
+
+def test_alert_system_detecta_anomalias_por_snapshot(tmp_path):
+    system = AlertSystem(
+        alerts_file=str(tmp_path / "alerts.json"),
+        config_file=str(tmp_path / "alert_config.json"),
+    )
+    system.config["speed_violation"]["enabled"] = False
+    rnd = random.Random(5)
+    for _ in range(200):
+        nuevas = system.evaluate_snapshot({"velocidad_actual": rnd.uniform(59.0, 61.0)})
+        assert nuevas == []
+
+    nuevas = system.evaluate_snapshot({"velocidad_actual": 75.0})
+    assert len(nuevas) == 1
+    alerta = nuevas[0]
+    assert alerta.alert_type == AlertType.ANOMALY_DETECTED
+    assert alerta.data["variable"] == "velocidad"
+    assert alerta.data["anomalous_value"] == 75.0
+    assert abs(alerta.data["mean"] - 60.0) < 0.5
+    assert alerta.data["z_score"] > 4.0
+    assert system.streaming_stats.muestras == 201
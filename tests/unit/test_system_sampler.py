@@ -0,0 +1,68 @@
+"""Tests del muestreador de métricas del sistema con retención por niveles"""
+
+import time
+
+from system_sampler import Collector, SystemSampler, TieredSeries, default_collectors
+
+
+def test_cada_colector_respeta_su_intervalo():
+    llamadas = {"baratos": 0, "caros": 0}
+
+    def baratos():
+        llamadas["baratos"] += 1
+        return {"cpu_percent": 10.0}
+
+    def caros():
+        llamadas["caros"] += 1
+        return {"network_connections": 42}
+
+    sampler = SystemSampler(
+        [Collector("baratos", baratos, 1.0), Collector("caros", caros, 60.0, presupuesto_ms=1e6)]
+    )
+    for segundo in range(125):
+        muestra = sampler.muestrear(ahora=1000.0 + segundo)
+        # Entre ejecuciones del colector caro se repite su último valor
+        assert muestra["network_connections"] == 42
+
+    assert llamadas == {"baratos": 125, "caros": 3}
+    assert len(sampler.historial("cpu_percent")) == 125
+    assert len(sampler.historial("network_connections")) == 3
+    metrics = sampler.get_metrics()
+    assert metrics["ticks"] == 125
+    assert metrics["collectors"]["caros"]["ejecuciones"] == 3
+    assert metrics["overhead_percent"] >= 0.0
+
+
+def test_colector_fuera_de_presupuesto_se_espacia():
+    def lento():
+        time.sleep(0.005)
+        return {"open_files": 3}
+
+    collector = Collector("lento", lento, intervalo_s=1.0, presupuesto_ms=0.1)
+    sampler = SystemSampler([collector])
+    for segundo in range(20):
+        sampler.muestrear(ahora=float(segundo))
+    assert collector.intervalo_efectivo_s == 8.0
+    assert collector.ejecuciones < 20
+    assert collector.excesos_presupuesto == collector.ejecuciones
+
+
+def test_retencion_por_niveles_en_arrays_fijos():
+    serie = TieredSeries(segundos=(1, 120), minutos=(60, 3))
+    for segundo in range(300):
+        serie.agregar(float(segundo), float(segundo // 60))
+
+    # Nivel de segundos: solo los 120 últimos puntos
+    puntos = serie.segundos.ultimos()
+    assert len(puntos) == 120 and puntos[0] == (180.0, 3.0) and puntos[-1] == (299.0, 4.0)
+    # Nivel de minutos: promedio por minuto cerrado, capacidad 3
+    assert serie.minutos.ultimos() == [(60.0, 1.0), (120.0, 2.0), (180.0, 3.0)]
+
+
+def test_colectores_por_defecto_no_bloquean():
+    sampler = SystemSampler(default_collectors())
+    sampler.muestrear()  # la primera pasada incluye los recorridos caros
+    inicio = time.perf_counter()
+    muestra = sampler.muestrear()
+    assert time.perf_counter() - inicio < 0.09  # antes: cpu_percent(interval=0.1)
+    assert "cpu_percent" in muestra and "memory_mb" in muestra
@@ -0,0 +1,94 @@
+"""Tests del bus de telemetría compartido (un productor, varios consumidores)"""
+
+import pytest
+
+from telemetry_bus import (
+    POLITICA_DESCARTAR_ANTIGUO,
+    POLITICA_DESCARTAR_NUEVO,
+    POLITICA_ULTIMO,
+    TelemetryBus,
+)
+from tsc_integration import TSCIntegration
+
+
+@pytest.fixture
+def bus(tmp_path):
+    tsc = TSCIntegration(ruta_archivo=str(tmp_path / "GetData.txt"))
+    bus = TelemetryBus(tsc)
+    yield bus
+    bus.detener()
+    tsc.obtener_watcher().detener()
+
+
+def test_mismo_snapshot_inmutable_para_todos(bus):
+    a = bus.subscribe("a")
+    b = bus.subscribe("b")
+    bus.publicar({"CurrentSpeed": 10.0})
+    snap_a = a.get(timeout=1.0)
+    snap_b = b.get(timeout=1.0)
+    assert snap_a is snap_b
+    assert snap_a.raw["CurrentSpeed"] == 10.0
+    assert snap_a.datos["velocidad_actual"] == pytest.approx(36.0)
+    with pytest.raises(TypeError):
+        snap_a.datos["velocidad_actual"] = 0.0
+
+
+def test_politicas_de_descarte_y_metricas_de_lag(bus):
+    antiguo = bus.subscribe("antiguo", capacidad=2, politica=POLITICA_DESCARTAR_ANTIGUO)
+    nuevo = bus.subscribe("nuevo", capacidad=2, politica=POLITICA_DESCARTAR_NUEVO)
+    ultimo = bus.subscribe("ultimo", politica=POLITICA_ULTIMO)
+    for i in range(5):
+        bus.publicar({"CurrentSpeed": float(i)})
+
+    assert [s.seq for s in antiguo.drain()] == [4, 5]
+    assert [s.seq for s in nuevo.drain()] == [1, 2]
+    assert [s.seq for s in ultimo.drain()] == [5]
+
+    metricas = bus.get_metrics()["suscriptores"]
+    assert metricas["antiguo"]["descartados"] == 3
+    assert metricas["nuevo"]["descartados"] == 3
+    assert metricas["ultimo"]["descartados"] == 4
+    assert metricas["nuevo"]["lag"] == 3  # consumió hasta seq 2 de 5
+    assert metricas["antiguo"]["lag"] == 0
+    assert metricas["antiguo"]["lag_max"] == 5
+
+
+def test_cerrar_despierta_y_deja_de_recibir(bus):
+    sub = bus.subscribe("temporal")
+    sub.cerrar()
+    assert sub.get(timeout=0.5) is None
+    bus.publicar({"CurrentSpeed": 1.0})
+    assert len(sub) == 0
+    assert "temporal" not in bus.get_metrics()["suscriptores"]
+
+
+def test_publica_escrituras_del_archivo(bus, tmp_path):
+    sub = bus.subscribe("e2e")
+    (tmp_path / "GetData.txt").write_text(
+        "ControlName:CurrentSpeed\nControlValue:5\n", encoding="utf-8"
+    )
+    snapshot = sub.get(timeout=3.0)
+    assert snapshot is not None
+    assert snapshot.raw == {"CurrentSpeed": 5.0}
+
+
+def test_suscripcion_tardia_recibe_el_ultimo_snapshot(bus):
+    bus.publicar({"CurrentSpeed": 1.0})
+    bus.publicar({"CurrentSpeed": 2.0})
+    tardia = bus.subscribe("tardia", politica=POLITICA_ULTIMO)
+    snapshot = tardia.get(timeout=0)
+    assert snapshot is not None and snapshot.seq == 2
+    assert tardia.get(timeout=0) is None
+
+
+def test_comandos_se_resuelven_con_el_perfil_publicado_por_el_bus(bus):
+    escrituras = []
+    bus.tsc._atomic_write_lines = lambda ruta, lineas, **kw: escrituras.append(list(lineas))
+    bus.publicar({"VirtualBrake": 0.0, "VirtualEngineBrakeControl": 0.0, "CurrentSpeed": 5.0})
+
+    assert bus.tsc._resolver_control("freno_tren") == "VirtualBrake"
+    assert bus.tsc._resolver_control("freno_dinamico") == "VirtualEngineBrakeControl"
+    assert bus.tsc.estado_conexion()["controles_leidos"] == 3
+    bus.tsc.enviar_comandos({"freno_tren": 0.5, "freno_dinamico": 0.4})
+    assert "VirtualBrake:0.500" in escrituras[-1]
+    assert "VirtualEngineBrakeControl:0.400" in escrituras[-1]
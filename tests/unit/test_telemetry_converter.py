@@ -0,0 +1,57 @@
+"""Tests de la conversión incremental de telemetría (IncrementalConverter)"""
+
+from tsc_integration import TSCIntegration
+
+SNAPSHOT = {
+    "CurrentSpeed": 15.0,
+    "Acceleration": 0.1,
+    "Regulator": 0.5,
+    "VirtualBrake": 0.0,
+    "RPM": 820.0,
+    "SignalAspect": 2.0,
+    "Ammeter": 450.0,
+    "Wheelslip": 1.0,
+    "AirBrakePipePressurePSI": 90.0,
+    "SimulationTime": 36000.0,
+}
+
+
+def _sin_fecha(datos):
+    datos = dict(datos)
+    datos.pop("fecha_hora", None)
+    return datos
+
+
+def test_incremental_equivale_a_conversion_completa():
+    tsc = TSCIntegration(ruta_archivo="nonexistent.txt")
+    referencia = TSCIntegration(ruta_archivo="nonexistent.txt")
+    secuencia = [
+        SNAPSHOT,
+        dict(SNAPSHOT, CurrentSpeed=16.0),
+        dict(SNAPSHOT, CurrentSpeed=16.0, Wheelslip=2.0, Regulator=0.8),
+        {k: v for k, v in SNAPSHOT.items() if k != "RPM"},
+        dict(SNAPSHOT, VirtualBrake=None, SignalAspect="abc"),
+    ]
+    for snapshot in secuencia:
+        incremental = tsc.convertir_datos_ia(snapshot)
+        referencia.conversor.reiniciar()
+        completa = referencia.convertir_datos_ia(snapshot)
+        assert _sin_fecha(incremental) == _sin_fecha(completa)
+
+
+def test_reutiliza_etapas_si_solo_cambia_el_tiempo():
+    tsc = TSCIntegration(ruta_archivo="nonexistent.txt")
+    tsc.convertir_datos_ia(SNAPSHOT)
+    antes = dict(tsc.conversor.stats)
+    datos = tsc.convertir_datos_ia(dict(SNAPSHOT, SimulationTime=36000.1))
+    stats = tsc.conversor.stats
+    assert stats["etapas_recalculadas"] == antes["etapas_recalculadas"]
+    assert stats["etapas_reutilizadas"] == antes["etapas_reutilizadas"] + len(tsc.conversor.etapas)
+    assert datos["tiempo_simulacion"] == 36000.1
+
+
+def test_conversion_no_escribe_en_stdout(capsys):
+    tsc = TSCIntegration(ruta_archivo="nonexistent.txt")
+    tsc.convertir_datos_ia(SNAPSHOT)
+    tsc.convertir_datos_ia(dict(SNAPSHOT, CurrentSpeed=20.0))
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,155 @@
+"""Tests del protocolo delta del stream de telemetría del dashboard"""
+
+import copy
+import json
+import random
+from datetime import datetime
+
+from telemetry_delta import TelemetryDeltaDecoder, TelemetryDeltaEncoder, TelemetryTopicHub
+
+
+def _payload(tick: int) -> dict:
+    """Payload con la forma del de telemetry_update_loop: pocos campos cambian por tick."""
+    telemetria = {f"control_{i}": float(i) for i in range(40)}
+    telemetria.update(velocidad_actual=50.0 + tick * 0.1, timestamp=f"2026-01-01T00:00:{tick:02d}")
+    return {
+        "telemetry": telemetria,
+        "predictions": {"velocidad_actual": 50.5 + tick * 0.1},
+        "multi_loco": {},
+        "system_status": {"telemetry_updates": tick, "tsc_connected": True},
+        "active_alerts": [{"alert_id": "a1", "alert_type": "speed", "message": "x" * 80}],
+        "performance": {f"metric_{i}": {"avg": i * 1.5, "max": i * 3.0} for i in range(60)},
+        "reports": {"status": "not_available", "scheduled_reports": []},
+    }
+
+
+def test_decoder_reconstruye_el_estado_con_deltas_y_borrados():
+    encoder = TelemetryDeltaEncoder(intervalo_keyframe=10)
+    decoder = TelemetryDeltaDecoder()
+    rnd = random.Random(7)
+    estado = _payload(0)
+    for tick in range(60):
+        estado = copy.deepcopy(estado)
+        estado["telemetry"]["velocidad_actual"] = rnd.random()
+        if tick % 7 == 0:
+            estado["predictions"].pop("horizon", None)
+        elif tick % 7 == 3:
+            estado["predictions"]["horizon"] = [{"step": 1, "v": rnd.random()}]
+        if tick % 11 == 5:
+            estado["multi_loco"] = "no disponible"  # cambio de tipo: dict -> str
+        elif tick % 11 == 6:
+            estado["multi_loco"] = {"loco_1": {"v": tick}}
+
+        mensaje = encoder.codificar(estado)
+        assert decoder.aplicar(mensaje) == estado
+
+    metrics = encoder.get_metrics()
+    assert metrics["mensajes"] == 60
+    # Un keyframe cada 10 deltas (más el primero)
+    assert metrics["keyframes"] == 6 and metrics["deltas"] == 54
+
+
+def test_hueco_en_la_secuencia_pide_resync():
+    encoder = TelemetryDeltaEncoder()
+    decoder = TelemetryDeltaDecoder()
+    decoder.aplicar(encoder.codificar(_payload(0)))
+    encoder.codificar(_payload(1))  # mensaje perdido
+    delta = encoder.codificar(_payload(2))
+
+    assert decoder.aplicar(delta) is None
+    assert decoder.necesita_resync
+
+    # El keyframe de resync no avanza la secuencia: el siguiente delta difundido aplica
+    assert decoder.aplicar(encoder.keyframe()) == _payload(2)
+    assert decoder.aplicar(encoder.codificar(_payload(3))) == _payload(3)
+    assert encoder.get_metrics()["resyncs"] == 1
+
+    # Un cliente nuevo sin estado tampoco puede aplicar deltas
+    nuevo = TelemetryDeltaDecoder()
+    assert nuevo.aplicar(encoder.codificar(_payload(4))) is None
+
+
+def test_bytes_por_tick_bajan_un_orden_de_magnitud():
+    encoder = TelemetryDeltaEncoder()
+    for tick in range(200):
+        encoder.codificar(_payload(tick))
+    metrics = encoder.get_metrics()
+    assert metrics["ratio_bytes"] < 0.1
+
+
+def test_topics_publican_a_su_ritmo_y_solo_con_suscriptores():
+    hub = TelemetryTopicHub({"telemetry": 0.1, "performance": 5.0}, segundos_keyframe=1.0)
+    assert hub.pendientes(100.0) == []  # sin suscriptores no se calcula nada
+
+    assert hub.suscribir("a", ["telemetry", "desconocido"]) == (["telemetry"], [])
+    assert hub.suscribir("b", ["telemetry", "performance"]) == (
+        ["telemetry", "performance"],
+        [],
+    )
+    publicados = {"telemetry": 0, "performance": 0}
+    for paso in range(100):  # 10 s a 10 Hz
+        for topic in hub.pendientes(100.0 + paso * 0.1 + 1e-6):
+            publicados[topic] += 1
+            mensaje = hub.codificar(topic, {topic: _payload(paso)["telemetry"]})
+            assert mensaje["topic"] == topic
+    assert publicados == {"telemetry": 100, "performance": 3}
+
+    metrics = hub.get_metrics()
+    # Keyframe cada ~1 s en telemetry; un topic más lento alterna keyframe y delta
+    assert metrics["telemetry"]["keyframes"] == 10
+    assert metrics["telemetry"]["suscriptores"] == 2
+    assert metrics["performance"]["keyframes"] == 2
+
+    assert hub.desuscribir("b") == ["telemetry", "performance"]
+    assert hub.suscripciones("a") == ["telemetry"]
+    assert hub.num_suscriptores("performance") == 0
+
+
+def test_resync_por_websocket_envia_keyframe_solo_al_cliente():
+    import web_dashboard
+
+    topics = web_dashboard.telemetry_topics
+    topics.codificar("telemetry", {"telemetry": _payload(5)["telemetry"]})
+    cliente = web_dashboard.socketio.test_client(web_dashboard.app)
+    # Al conectar se suscribe a todos los topics y recibe el keyframe de los que tienen estado
+    conexion = [m["args"][0] for m in cliente.get_received() if m["name"] == "telemetry_stream"]
+    assert [m["topic"] for m in conexion] == ["telemetry"]
+
+    cliente.emit("telemetry_resync", {"topic": "telemetry", "seq": None})
+    recibidos = [m for m in cliente.get_received() if m["name"] == "telemetry_stream"]
+
+    assert len(recibidos) == 1
+    mensaje = recibidos[0]["args"][0]
+    assert mensaje["type"] == "keyframe" and mensaje["topic"] == "telemetry"
+    assert mensaje["seq"] == topics.encoders["telemetry"].seq
+    assert (
+        mensaje["data"]["telemetry"]["velocidad_actual"]
+        == _payload(5)["telemetry"]["velocidad_actual"]
+    )
+
+    # Tras dejar el topic, lo publicado en su sala ya no llega al cliente
+    cliente.emit("subscribe_topics", {"topics": ["alerts"]})
+    respuesta = [m for m in cliente.get_received() if m["name"] == "topics_subscribed"]
+    assert respuesta[-1]["args"][0]["topics"] == ["alerts"]
+    web_dashboard.socketio.emit(
+        "telemetry_stream",
+        topics.codificar("telemetry", {"telemetry": _payload(6)["telemetry"]}),
+        to=topics.sala("telemetry"),
+    )
+    assert not [m for m in cliente.get_received() if m["name"] == "telemetry_stream"]
+    cliente.disconnect()
+
+
+def test_estado_normalizado_sin_serializar_equivale_a_json():
+    estado = {
+        "telemetry": {"velocidad_actual": 50.0, "activo": True, "senal": None},
+        "horizon": ({"step": 1}, {"step": 2}),
+        "timestamp": datetime(2026, 1, 1, 12, 0),
+        3: "clave numérica",
+    }
+    encoder = TelemetryDeltaEncoder()
+    mensaje = encoder.codificar(estado)
+    assert mensaje["data"] == json.loads(json.dumps(estado, default=str))
+    # Copia desacoplada: modificar el origen no altera el estado del codificador
+    estado["telemetry"]["velocidad_actual"] = 60.0
+    assert encoder.keyframe()["data"]["telemetry"]["velocidad_actual"] == 50.0
@@ -0,0 +1,95 @@
+"""Tests del almacén columnar del historial de telemetría"""
+
+import json
+import os
+
+import numpy as np
+
+from telemetry_store import ColumnarTelemetryStore, migrate_legacy_json
+
+COLUMNAS = ("velocidad_actual", "acelerador")
+
+
+def _llenar(store, n, t0=1000.0):
+    for i in range(n):
+        store.append(t0 + i, {"velocidad_actual": float(i), "acelerador": i / 10})
+
+
+def test_append_tail_y_reapertura(tmp_path):
+    store = ColumnarTelemetryStore(str(tmp_path / "hist"), COLUMNAS, filas_por_bloque=8, filas_por_lote=5)
+    _llenar(store, 23)
+    assert len(store) == 23
+    # Las filas aún no persistidas también se leen
+    assert list(store.tail(3)["velocidad_actual"]) == [20.0, 21.0, 22.0]
+    store.close()
+
+    reabierto = ColumnarTelemetryStore(str(tmp_path / "hist"), COLUMNAS, filas_por_bloque=8)
+    assert len(reabierto) == 23
+    assert sorted(os.listdir(tmp_path / "hist")) == [
+        "chunk_000000",
+        "chunk_000001",
+        "chunk_000002",
+        "header.json",
+    ]
+    cola = reabierto.tail(10)
+    np.testing.assert_array_equal(cola["timestamp"], np.arange(1013.0, 1023.0))
+    np.testing.assert_allclose(cola["acelerador"], np.arange(13, 23) / 10)
+
+
+def test_slice_time_entre_bloques(tmp_path):
+    store = ColumnarTelemetryStore(str(tmp_path / "hist"), COLUMNAS, filas_por_bloque=4, filas_por_lote=3)
+    _llenar(store, 14)
+    rango = store.slice_time(1002.5, 1011.0, columnas=["velocidad_actual"])
+    assert list(rango) == ["velocidad_actual"]
+    assert list(rango["velocidad_actual"]) == [3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0]
+    assert len(store.slice_time(0, 10)["timestamp"]) == 0
+
+
+def test_retencion_borra_los_bloques_antiguos(tmp_path):
+    directorio = tmp_path / "hist"
+    store = ColumnarTelemetryStore(str(directorio), COLUMNAS, filas_por_bloque=4, filas_por_lote=1)
+    _llenar(store, 20)
+    assert len(os.listdir(directorio)) == 6  # header + 5 bloques
+
+    # Al reabrir con retención se borran los sobrantes sin leerlos
+    reabierto = ColumnarTelemetryStore(str(directorio), COLUMNAS, filas_por_lote=1, max_bloques=2)
+    assert sorted(os.listdir(directorio)) == ["chunk_000003", "chunk_000004", "header.json"]
+    assert list(reabierto.tail(8)["velocidad_actual"]) == [float(i) for i in range(12, 20)]
+
+    # Y al abrir un bloque nuevo se descarta el más antiguo
+    _llenar(reabierto, 1, t0=2000.0)
+    assert sorted(os.listdir(directorio)) == ["chunk_000004", "chunk_000005", "header.json"]
+    assert len(reabierto) == 5
+
+
+def test_recuperacion_de_cola_tras_escritura_parcial(tmp_path):
+    directorio = tmp_path / "hist"
+    store = ColumnarTelemetryStore(str(directorio), COLUMNAS, filas_por_lote=1)
+    _llenar(store, 5)
+    # Simular un cierre abrupto a mitad de lote: una columna con una fila
+    # completa de más y otra con medio valor escrito
+    with open(directorio / "chunk_000000" / "timestamp.f8", "ab") as f:
+        f.write(np.float64(2000.0).tobytes())
+    with open(directorio / "chunk_000000" / "acelerador.f8", "ab") as f:
+        f.write(b"\x00\x01\x02")
+
+    reabierto = ColumnarTelemetryStore(str(directorio), COLUMNAS)
+    assert len(reabierto) == 5
+    assert reabierto.columnas_recortadas == 2
+    assert os.path.getsize(directorio / "chunk_000000" / "timestamp.f8") == 5 * 8
+
+
+def test_migracion_json_legacy_truncado(tmp_path):
+    muestras = [
+        {"timestamp": f"2025-11-09T22:51:{i:02d}", "data": {"velocidad_actual": i, "acelerador": "0.5"}}
+        for i in range(3)
+    ]
+    texto = json.dumps(muestras, indent=2)
+    ruta = tmp_path / "telemetry_history.json"
+    # Cortar el archivo a mitad de la última muestra
+    ruta.write_text(texto[: texto.rindex("velocidad_actual")], encoding="utf-8-sig")
+
+    store = ColumnarTelemetryStore(str(tmp_path / "hist"), COLUMNAS)
+    assert migrate_legacy_json(str(ruta), store) == 2
+    assert not ruta.exists() and (tmp_path / "telemetry_history.json.migrated").exists()
+    assert list(store.tail(5)["acelerador"]) == [0.5, 0.5]
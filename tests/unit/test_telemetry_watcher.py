@@ -0,0 +1,107 @@
+"""Tests del servicio de ingesta de GetData.txt dirigido por eventos"""
+
+import os
+import time
+
+import pytest
+
+from telemetry_watcher import HAS_WATCHDOG, MODO_EVENTOS, MODO_SONDEO, TelemetryFileWatcher
+
+
+def _escribir(ruta, contenido):
+    # Preparar el archivo aparte y sustituirlo de una vez: el watcher ve un solo
+    # cambio aunque el mtime se ajuste después de escribir
+    tmp = f"{ruta}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(contenido)
+    # Forzar un mtime distinto aunque la resolución del sistema de archivos sea gruesa
+    previo = os.stat(ruta).st_mtime_ns if os.path.exists(ruta) else 0
+    st = os.stat(tmp)
+    os.utime(tmp, ns=(st.st_atime_ns, max(st.st_mtime_ns, previo) + 1_000_000))
+    os.replace(tmp, ruta)
+
+
+@pytest.mark.parametrize("usar_eventos", [False, True])
+def test_publica_snapshot_a_suscriptores(tmp_path, usar_eventos):
+    if usar_eventos and not HAS_WATCHDOG:
+        pytest.skip("watchdog no instalado")
+    ruta = tmp_path / "GetData.txt"
+    _escribir(ruta, "v1")
+    recibidos = []
+    watcher = TelemetryFileWatcher(
+        str(ruta), lector=lambda: ruta.read_text(encoding="utf-8"), usar_eventos=usar_eventos
+    )
+    watcher.suscribir(recibidos.append)
+    watcher.iniciar()
+    try:
+        assert watcher.modo == (MODO_EVENTOS if usar_eventos else MODO_SONDEO)
+        version = watcher.esperar_cambio(0, timeout=2.0)
+        assert version == 1 and watcher.ultimo_snapshot == "v1"
+
+        _escribir(ruta, "v2")
+        version = watcher.esperar_cambio(version, timeout=2.0)
+        assert version == 2
+        assert recibidos == ["v1", "v2"]
+    finally:
+        watcher.detener()
+
+
+def test_sin_cambios_no_publica_y_espera_vence(tmp_path):
+    ruta = tmp_path / "GetData.txt"
+    _escribir(ruta, "v1")
+    watcher = TelemetryFileWatcher(str(ruta), usar_eventos=False)
+    watcher.iniciar()
+    try:
+        version = watcher.esperar_cambio(0, timeout=2.0)
+        inicio = time.monotonic()
+        assert watcher.esperar_cambio(version, timeout=0.2) == version
+        assert time.monotonic() - inicio >= 0.15
+        assert watcher.metrics["cambios_publicados"] == 1
+    finally:
+        watcher.detener()
+
+
+def test_errores_de_lector_y_suscriptor_no_detienen_la_ingesta(tmp_path):
+    ruta = tmp_path / "GetData.txt"
+    _escribir(ruta, "v1")
+    llamadas = {"n": 0}
+
+    def lector():
+        llamadas["n"] += 1
+        if llamadas["n"] == 1:
+            raise OSError("archivo bloqueado")
+        return llamadas["n"]
+
+    def suscriptor_roto(_snapshot):
+        raise RuntimeError("boom")
+
+    watcher = TelemetryFileWatcher(str(ruta), lector=lector, usar_eventos=False)
+    watcher.suscribir(suscriptor_roto)
+    assert watcher.comprobar() is False
+    _escribir(ruta, "v2")
+    assert watcher.comprobar() is True
+    assert watcher.ultimo_snapshot == 2
+    assert watcher.metrics["errores_lector"] == 1
+    assert watcher.metrics["errores_suscriptor"] == 1
+
+
+def test_lectura_fallida_se_reintenta_sin_nueva_escritura(tmp_path):
+    ruta = tmp_path / "GetData.txt"
+    _escribir(ruta, "v1")
+    respuestas = [OSError("archivo bloqueado"), {}, "v1"]
+
+    def lector():
+        respuesta = respuestas.pop(0)
+        if isinstance(respuesta, Exception):
+            raise respuesta
+        return respuesta
+
+    watcher = TelemetryFileWatcher(str(ruta), lector=lector, usar_eventos=False)
+    # El plugin no vuelve a escribir: el mismo archivo se relee hasta publicarse
+    assert watcher.comprobar() is False
+    assert watcher.comprobar() is False
+    assert watcher.comprobar() is True
+    assert watcher.ultimo_snapshot == "v1" and watcher.version == 1
+    assert watcher.metrics["errores_lector"] == 1 and watcher.metrics["lecturas_vacias"] == 1
+    # Ya publicado: sin cambios no se vuelve a leer
+    assert watcher.comprobar() is False
@@ -264,3 +264,93 @@ def test_leer_datos_ignora_entrada_parcial(tmp_path):
     assert datos is not None
     assert datos.get("CurrentSpeed") == 10.0
     assert "Acceleration" not in datos
+
+
+def test_obtener_datos_telemetria_reutiliza_snapshot_si_archivo_no_cambia(tmp_path, monkeypatch):
+    """Si mtime/tamaño/inode no cambian, no se debe volver a leer ni parsear GetData.txt."""
+    temp = tmp_path / "GetData.txt"
+    temp.write_text("ControlName:CurrentSpeed\nControlValue:10.0\n", encoding="utf-8")
+    tsc = TSCIntegration(ruta_archivo=str(temp))
+
+    primero = tsc.obtener_datos_telemetria()
+    assert primero["velocidad_actual"] == 36.0
+
+    def no_leer():
+        raise AssertionError("GetData.txt no debería leerse si no cambió")
+
+    monkeypatch.setattr(tsc, "leer_datos_archivo", no_leer)
+    tsc.timestamp_ultima_lectura = 0
+    segundo = tsc.obtener_datos_telemetria()
+    assert segundo is not primero
+    # Mismos valores; solo la marca de tiempo corresponde a esta lectura
+    assert segundo["fecha_hora"] >= primero["fecha_hora"]
+    assert {**segundo, "fecha_hora": None} == {**primero, "fecha_hora": None}
+
+    metrics = tsc.get_io_metrics()
+    assert metrics["snapshot_cache_hits"] == 1
+    assert metrics["snapshot_cache_misses"] == 1
+
+
+def test_obtener_datos_telemetria_relee_si_archivo_cambia(tmp_path):
+    temp = tmp_path / "GetData.txt"
+    temp.write_text("ControlName:CurrentSpeed\nControlValue:10.0\n", encoding="utf-8")
+    tsc = TSCIntegration(ruta_archivo=str(temp))
+    assert tsc.obtener_datos_telemetria()["velocidad_actual"] == 36.0
+
+    temp.write_text("ControlName:CurrentSpeed\nControlValue:20.00\n", encoding="utf-8")
+    tsc.timestamp_ultima_lectura = 0
+    assert tsc.obtener_datos_telemetria()["velocidad_actual"] == 72.0
+    assert tsc.get_io_metrics()["snapshot_cache_misses"] == 2
+
+
+def test_enviar_comandos_banda_muerta_evita_reescrituras(tmp_path, monkeypatch):
+    tsc = TSCIntegration()
+    tsc.ruta_archivo_comandos = str(tmp_path / "autopilot_commands.txt")
+    tsc.tsc_interface_file = str(tmp_path / "SendCommand.txt")
+    escrituras = []
+    monkeypatch.setattr(
+        tsc, "_atomic_write_lines", lambda ruta, lineas, **kw: escrituras.append(list(lineas))
+    )
+
+    assert tsc.enviar_comandos({"freno_tren": 0.300, "acelerador": 0.5}) is True
+    primeras = len(escrituras)
+    assert primeras > 0
+
+    # Crucero estable: valores dentro de la banda muerta no tocan ningún archivo
+    for _ in range(20):
+        assert tsc.enviar_comandos({"freno_tren": 0.305, "acelerador": 0.52}) is True
+    assert len(escrituras) == primeras
+    metrics = tsc.get_io_metrics()
+    assert metrics["commands_suppressed"] == 40
+    assert metrics["command_writes_suppressed"] == 20
+
+    # Solo el control que cambió se reescribe; las directivas nunca se suprimen
+    tsc.enviar_comandos({"freno_tren": 0.5, "acelerador": 0.5, "predictive": True})
+    assert "TrainBrakeControl:0.500" in escrituras[-1]
+    assert not any(linea.startswith("Regulator") for linea in escrituras[-1])
+
+    # Pasado el intervalo de refresco se vuelve a escribir aunque no cambie
+    tsc.comandos_refresco_s = 0.0
+    tsc.enviar_comandos({"freno_tren": 0.5})
+    assert escrituras[-1][0] == "TrainBrakeControl:0.500"
+
+
+def test_fallback_de_controles_se_resuelve_por_perfil():
+    tsc = TSCIntegration()
+
+    tsc.datos_anteriores = {"VirtualEngineBrakeControl": 0.2, "CurrentSpeed": 10.0}
+    assert tsc._resolver_control("freno_dinamico") == "VirtualEngineBrakeControl"
+    # Nueva lectura con los mismos controles: se reutiliza el perfil compilado
+    tsc.datos_anteriores = {"VirtualEngineBrakeControl": 0.4, "CurrentSpeed": 12.0}
+    assert tsc._resolver_control("freno_dinamico") == "VirtualEngineBrakeControl"
+    assert tsc.perfiles.get_metrics()["compilados"] == 1
+
+    # Otra locomotora (otros controles): se compila su perfil
+    tsc.datos_anteriores = {"DynamicBrake": 0.0, "CurrentSpeed": 12.0}
+    assert tsc._resolver_control("freno_dinamico") == "DynamicBrake"
+    assert tsc.perfiles.get_metrics()["compilados"] == 2
+    assert tsc.get_io_metrics()["control_profile_changes"] == 2
+
+    # Los comandos resueltos fuera del perfil no modifican el perfil cacheado
+    assert tsc._resolver_control("Bell") == "Bell"
+    assert "Bell" not in tsc.perfiles.obtener(tsc.datos_anteriores.keys()).comandos
@@ -9,7 +9,14 @@ import json
 import os
 import time
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional
+
+from command_writer import CommandWriter
+from getdata_parser import GetDataParser
+from loco_profile import LocoProfileCache, ruta_perfiles
+from metrics_registry import CUBETAS_RAPIDAS_MS, get_metrics_registry
+from telemetry_converter import IncrementalConverter
+from telemetry_watcher import TelemetryFileWatcher, get_telemetry_watcher
 
 # Importar sistema de logging centralizado
 try:
@@ -32,6 +39,28 @@ except Exception:
     HAS_PORTALOCKER = False
 
 
+# Controles alternativos por orden de preferencia cuando el asset no expone el principal
+FALLBACK_CONTROLES = {
+    "Regulator": ("Regulator", "VirtualThrottle", "SimpleThrottle"),
+    "TrainBrakeControl": ("TrainBrakeControl", "VirtualBrake"),
+    "DynamicBrake": ("DynamicBrake", "VirtualEngineBrakeControl"),
+}
+
+# Métricas de los caminos calientes de E/S (registro Prometheus, actualizadas en sitio)
+_registro = get_metrics_registry()
+_LATENCIA_LECTURA = _registro.histogram("tsc_read_latency_ms", "GetData.txt read latency in ms")
+_FALLOS_LECTURA = _registro.counter("tsc_read_failures_total", "GetData.txt reads that failed")
+_DURACION_PARSEO = _registro.histogram(
+    "tsc_parse_duration_ms", "GetData.txt parse time in ms", cubetas=CUBETAS_RAPIDAS_MS
+)
+_LATENCIA_ESCRITURA = _registro.histogram(
+    "tsc_write_latency_ms", "Atomic command file write latency in ms"
+)
+_FALLOS_ESCRITURA = _registro.counter(
+    "tsc_write_failures_total", "Command file writes that failed after retries"
+)
+
+
 class TSCIntegration:
     """Clase principal para la integración con Train Simulator Classic."""
 
@@ -53,6 +82,10 @@ class TSCIntegration:
         # If True, also write the file that the Lua plugin reads (autopilot_commands.txt).
         # Can be disabled for environments where only the SendCommand file is desired.
         self.write_lua_commands = True
+        # Comando IA -> control RailDriver con los fallbacks resueltos para el
+        # perfil de locomotora actual (los controles presentes en GetData.txt)
+        self._comandos_perfil: Dict[str, str] = {}
+        self._datos_anteriores: Dict[str, Any] = {}
         self.datos_anteriores = {}
         self.timestamp_ultima_lectura = 0
         self.intervalo_lectura = 0.1  # 100ms entre lecturas
@@ -109,6 +142,9 @@ class TSCIntegration:
             "Headlights": "luces",
         }
 
+        # Parser de GetData.txt con tabla de nombres precompilada a partir del mapeo
+        self.parser = GetDataParser(self.mapeo_controles)
+
         # Mapeo de comandos IA a nombres de control Raildriver
         self.mapeo_comandos = {
             "acelerador": "Regulator",  # Para SD40
@@ -121,8 +157,14 @@ class TSCIntegration:
             "freno_emergencia": "EmergencyBrake",  # Changed to EmergencyBrake,
         }
 
-        # Valores anteriores de comandos para evitar envíos innecesarios
+        # Valores anteriores de comandos para evitar envíos innecesarios: un valor
+        # numérico dentro de la banda muerta del último confirmado no se reescribe,
+        # salvo que hayan pasado más de comandos_refresco_s desde que se confirmó
+        # (por si el control se movió a mano en el simulador)
         self.comandos_anteriores = {}
+        self._comandos_confirmados_ts: Dict[str, float] = {}
+        self.banda_muerta_comandos = 0.01
+        self.comandos_refresco_s = 5.0
         # Fuel capacity handling removed; keep placeholder for compatibility
         self.fuel_capacity_gallons = None
         # Maximum RPM used for inferring RPM when direct RPM control isn't provided
@@ -130,18 +172,50 @@ class TSCIntegration:
         self.max_engine_rpm = 5000.0
         # Fuel capacity option ignored by integration; configuration removed
 
+        # Conversor incremental de datos crudos -> formato IA
+        self.conversor = IncrementalConverter(self)
+
+        # Planes compilados (conversión y fallbacks de comandos) por conjunto de
+        # controles, guardados en disco para reutilizarlos entre reinicios
+        self.perfiles = LocoProfileCache(
+            self._construir_perfil,
+            ruta=ruta_perfiles(),
+            firma_config=json.dumps([self.mapeo_controles, self.mapeo_comandos], sort_keys=True),
+            registro=_registro,
+        )
+
         # I/O metrics for monitoring and diagnostics
         # - read_total_retries/write_total_retries: cumulative retry counts
         # - read_last_latency_ms/write_last_latency_ms: latency of last successful op in ms
         # - read_attempts_last/write_attempts_last: attempts used in last call
-        self.io_metrics = {
-            "read_total_retries": 0,
-            "read_last_latency_ms": 0.0,
-            "read_attempts_last": 0,
-            "write_total_retries": 0,
-            "write_last_latency_ms": 0.0,
-            "write_attempts_last": 0,
-        }
+        self.io_metrics = _registro.gauge_map(
+            "tsc_io_",
+            "TSC I/O metric",
+            {
+                "read_total_retries": 0,
+                "read_last_latency_ms": 0.0,
+                "read_attempts_last": 0,
+                "write_total_retries": 0,
+                "write_last_latency_ms": 0.0,
+                "write_attempts_last": 0,
+                # Caché de snapshot por firma de archivo (mtime_ns, size, inode):
+                # hits = lecturas evitadas porque GetData.txt no cambió
+                "snapshot_cache_hits": 0,
+                "snapshot_cache_misses": 0,
+                # Comandos dentro de la banda muerta no escritos, envíos que no
+                # tocaron ningún archivo y cambios de perfil de controles detectados
+                "commands_suppressed": 0,
+                "command_writes_suppressed": 0,
+                "control_profile_changes": 0,
+            },
+        )
+
+        # Última firma de GetData.txt convertida y su resultado en formato IA
+        self._firma_snapshot: Optional[tuple] = None
+        self._datos_ia_snapshot: Optional[Dict[str, Any]] = None
+
+        # Escritor asíncrono de comandos (se crea con el primer encolar_comandos)
+        self.command_writer: Optional[CommandWriter] = None
 
     def _to_float(self, val: Any, default: float = 0.0) -> float:
         """Safely convert a value to float, returning default on failure."""
@@ -194,6 +268,14 @@ class TSCIntegration:
         """Verificar si el archivo GetData.txt existe."""
         return os.path.exists(self.ruta_archivo)
 
+    def _firma_archivo(self) -> Optional[tuple]:
+        """Firma barata de GetData.txt (mtime_ns, tamaño, inode) o None si no existe."""
+        try:
+            st = os.stat(self.ruta_archivo)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
     def get_autopilot_plugin_state(self) -> Optional[str]:
         """Leer el archivo de estado escrito por el plugin Lua (on/off).
 
@@ -241,13 +323,12 @@ class TSCIntegration:
             time.sleep(0.1)
         return False
 
-    def _robust_read_lines(self, retries: int = 3, wait: float = 0.05) -> list[str]:
-        """Leer líneas del archivo GetData.txt con reintentos y saneamiento.
+    def _robust_read_bytes(self, retries: int = 3, wait: float = 0.05) -> bytes:
+        """Leer el contenido crudo de GetData.txt con reintentos.
 
         - Reintenta ante errores de E/S (ej. PermissionError por bloqueo del simulador)
-        - Normaliza BOM UTF-8 en la primera línea
-        - Retorna la lista de líneas leídas (puede estar incompleta; el parser
-          ignorará entradas parciales)
+        - Retorna los bytes leídos tal cual (puede estar incompleto; el parser
+          ignorará entradas parciales). El BOM se elimina en el parser.
         """
         last_exc = None
         start = time.time()
@@ -270,48 +351,31 @@ class TSCIntegration:
                         # files). We then perform the actual read under portalocker
                         # to respect platform locking semantics.
                         try:
-                            with open(self.ruta_archivo, encoding="utf-8"):
+                            with open(self.ruta_archivo, "rb"):
                                 pass
                         except PermissionError:
                             attempt_pre_failures += 1
 
                         try:
-                            with portalocker.Lock(self.ruta_archivo, 'r', timeout=0.1) as f:
-                                lines = f.readlines()
+                            with portalocker.Lock(self.ruta_archivo, 'rb', timeout=0.1) as f:
+                                data = f.read()
                         except Exception:
                             # Fallback to plain open if the provided Lock object
                             # isn't file-like (e.g., test DummyLock) or raises.
-                            with open(self.ruta_archivo, encoding="utf-8") as f:
-                                lines = f.readlines()
+                            with open(self.ruta_archivo, "rb") as f:
+                                data = f.read()
                     else:
-                        with open(self.ruta_archivo, encoding="utf-8") as f:
-                            lines = f.readlines()
+                        with open(self.ruta_archivo, "rb") as f:
+                            data = f.read()
                 except Exception:
                     attempt_pre_failures += 1
                     if HAS_PORTALOCKER and portalocker is not None:
-                        with portalocker.Lock(self.ruta_archivo, 'r', timeout=0.1) as f:
-                            lines = f.readlines()
+                        with portalocker.Lock(self.ruta_archivo, 'rb', timeout=0.1) as f:
+                            data = f.read()
                     else:
                         # Re-raise to be handled by the outer retry logic
                         raise
 
-                if lines:
-                    # Normalizar BOM si existe. Some readers (e.g., portalocker.Lock)
-                    # may return text decoded with a windows/latin-1 codec which turns
-                    # the UTF-8 BOM (bytes EF BB BF) into the three characters
-                    # 'ï»¿' instead of a single '\ufeff' codepoint. Accept and strip
-                    # both variants so parsing is robust regardless of the underlying
-                    # file reader's decoding.
-                    if lines[0].startswith("\ufeff"):
-                        lines[0] = lines[0].lstrip("\ufeff")
-                    else:
-                        # Create misdecoded BOM by encoding the BOM to bytes and
-                        # decoding with latin-1; omit explicit 'utf-8' argument because
-                        # it's the default and ruff flags redundant encoding args.
-                        misdecoded_bom = "\ufeff".encode().decode("latin-1")
-                        if lines[0].startswith(misdecoded_bom):
-                            lines[0] = lines[0][len(misdecoded_bom) :]
-
                 elapsed_ms = (time.time() - start) * 1000.0
                 # update metrics
                 self.io_metrics["read_attempts_last"] = attempt
@@ -322,7 +386,8 @@ class TSCIntegration:
                 if attempt > 1:
                     self.io_metrics["read_total_retries"] += (attempt - 1)
                 self.io_metrics["read_last_latency_ms"] = round(elapsed_ms, 3)
-                return lines
+                _LATENCIA_LECTURA.observar(elapsed_ms)
+                return data
             except Exception as e:
                 last_exc = e
                 logger.warning(
@@ -339,12 +404,31 @@ class TSCIntegration:
         self.io_metrics["read_attempts_last"] = retries
         self.io_metrics["read_total_retries"] += retries
         self.io_metrics["read_last_latency_ms"] = round(elapsed_ms, 3)
+        _FALLOS_LECTURA.inc()
         logger.exception("Failed to read file %s after %d attempts", self.ruta_archivo, retries)
         if last_exc is None:
             raise RuntimeError(f"Failed to read file {self.ruta_archivo}")
         else:
             raise last_exc
 
+    def _robust_read_lines(self, retries: int = 3, wait: float = 0.05) -> list[str]:
+        """Leer líneas del archivo GetData.txt con reintentos y saneamiento.
+
+        Compatibilidad para scripts de diagnóstico; el camino de lectura
+        principal usa ``_robust_read_bytes`` + ``GetDataParser``.
+        Normaliza el BOM UTF-8 en la primera línea (también su variante mal
+        decodificada 'ï»¿').
+        """
+        lines = self._robust_read_bytes(retries=retries, wait=wait).decode("utf-8").splitlines(keepends=True)
+        if lines:
+            if lines[0].startswith("\ufeff"):
+                lines[0] = lines[0].lstrip("\ufeff")
+            else:
+                misdecoded_bom = "\ufeff".encode().decode("latin-1")
+                if lines[0].startswith(misdecoded_bom):
+                    lines[0] = lines[0][len(misdecoded_bom) :]
+        return lines
+
     def leer_datos_archivo(self) -> Optional[Dict[str, Any]]:
         """
         Leer datos del archivo GetData.txt.
@@ -356,32 +440,11 @@ class TSCIntegration:
             return None
 
         try:
-            lineas = self._robust_read_lines()
-
-            datos = {}
-            i = 0
-            while i < len(lineas):
-                linea = lineas[i].strip()
-                if linea.startswith("ControlName:"):
-                    nombre_control = linea.split(":", 1)[1].strip()
-                    # Buscar el valor correspondiente (si falta, ignorar la entrada)
-                    j = i + 1
-                    while j < len(lineas) and not lineas[j].strip().startswith("ControlValue:"):
-                        j += 1
-                    if j < len(lineas):
-                        valor_str = lineas[j].strip().split(":", 1)[1].strip()
-                        try:
-                            valor = float(valor_str)
-                            datos[nombre_control] = valor
-                        except ValueError:
-                            datos[nombre_control] = valor_str
-                    else:
-                        # Valor faltante: registrar y continuar (evita crash por escrituras parciales)
-                        logger.debug("Ignoring ControlName '%s' without ControlValue (partial write)", nombre_control)
-                i += 1
-
+            contenido = self._robust_read_bytes()
+            inicio = time.perf_counter()
+            datos = self.parser.parse(contenido)
+            _DURACION_PARSEO.observar((time.perf_counter() - inicio) * 1000.0)
             return datos
-
         except Exception as e:
             logger.exception("Error leyendo archivo GetData.txt: %s", e)
             return None
@@ -390,407 +453,17 @@ class TSCIntegration:
         """
         Convertir datos del archivo al formato que espera la IA.
 
+        La conversión es incremental (``IncrementalConverter``): solo se
+        recalculan los campos derivados cuyos controles de entrada cambiaron
+        respecto al snapshot anterior.
+
         Args:
             datos_archivo: Datos leídos del archivo
 
         Returns:
             Datos en formato IA
         """
-        datos_ia = {}
-
-        # Mapear controles conocidos
-        for nombre_archivo, nombre_ia in self.mapeo_controles.items():
-            if nombre_archivo in datos_archivo:
-                datos_ia[nombre_ia] = datos_archivo[nombre_archivo]
-
-        # CurrentSpeed del RailDriver viene en m/s (metros por segundo)
-        # Convertir de m/s a km/h para mostrar en el dashboard
-        if "velocidad_actual" in datos_ia:
-            velocidad_ms = abs(datos_ia["velocidad_actual"])  # En m/s
-            velocidad_kmh = velocidad_ms * 3.6  # Convertir m/s a km/h (1 m/s = 3.6 km/h)
-            datos_ia["velocidad_actual"] = round(velocidad_kmh, 2)
-
-        # Procesar aceleración para separar acelerador y freno
-        if "aceleracion" in datos_ia:
-            accel = datos_ia["aceleracion"]
-            print(f"[DEBUG] Aceleración cruda: {accel}")
-
-            # TEMPORAL: Mostrar valores sin filtro para debugging
-            if accel > 0:
-                datos_ia["acelerador"] = accel
-                datos_ia["freno_tren"] = 0.0
-                print(f"[DEBUG] Acelerador: {accel}, Freno: 0.0")
-            elif accel < 0:
-                datos_ia["acelerador"] = 0.0
-                datos_ia["freno_tren"] = -accel  # Convertir a positivo para freno
-                print(f"[DEBUG] Acelerador: 0.0, Freno: {-accel}")
-            else:
-                datos_ia["acelerador"] = 0.0
-                datos_ia["freno_tren"] = 0.0
-                print("[DEBUG] Acelerador: 0.0, Freno: 0.0")
-            # Si rpm es 0, intentar usar RPMDelta (alias) del archivo
-            if datos_ia.get("rpm", 0.0) == 0.0 and "RPMDelta" in datos_archivo:
-                try:
-                    rpm_alt = self._to_float(datos_archivo.get("RPMDelta", 0.0))
-                    if rpm_alt != 0.0:
-                        datos_ia["rpm"] = rpm_alt
-                except Exception as e:
-                    print(f"[WARN] Failed to parse RPMDelta for rpm inference: {e}")
-                    import traceback
-
-                    traceback.print_exc()
-
-            # Si RPM aún es 0, inferir desde Regulator o VirtualThrottle (si están presentes)
-            if datos_ia.get("rpm", 0.0) == 0.0:
-                try:
-                    if "Regulator" in datos_archivo and datos_archivo.get("Regulator", None) is not None:
-                        reg_val = self._to_float(datos_archivo.get("Regulator", 0.0))
-                        if reg_val > 0.0:
-                            datos_ia["rpm"] = reg_val * self.max_engine_rpm
-                            datos_ia["rpm_inferida"] = True
-                    elif "VirtualThrottle" in datos_archivo and datos_archivo.get("VirtualThrottle", None) is not None:
-                        vt = self._to_float(datos_archivo.get("VirtualThrottle", 0.0))
-                        if vt > 0.0:
-                            datos_ia["rpm"] = vt * self.max_engine_rpm
-                            datos_ia["rpm_inferida"] = True
-                except Exception as e:
-                    print(f"[WARN] RPM inference failed: {e}")
-                    import traceback
-
-                    traceback.print_exc()
-
-            # Mapear RPMSource (depuración) si existe en el archivo
-            if "RPMSource" in datos_archivo:
-                datos_ia["rpm_fuente"] = datos_archivo.get("RPMSource")
-
-        # Si se proporciona TrainBrakeControl directamente, mapearlo a posicion_freno_tren
-        # para unificar el manejo con VirtualBrake y permitir inferencias posteriores.
-        try:
-            if "TrainBrakeControl" in datos_archivo and "posicion_freno_tren" not in datos_ia:
-                try:
-                    datos_ia["posicion_freno_tren"] = self._to_float(datos_archivo.get("TrainBrakeControl", 0.0))
-                except Exception:
-                    datos_ia["posicion_freno_tren"] = 0.0
-        except Exception:
-            # No bloquear si falla el mapeo; continuar
-            pass
-
-        # Priorizar control de freno real (posicion_freno_tren/VirtualBrake) si está disponible
-        try:
-            if datos_ia.get("posicion_freno_tren") is not None:
-                val = datos_ia.get("posicion_freno_tren")
-                try:
-                    val = self._to_float(val)
-                except Exception:
-                    val = 0.0
-                # Clamp entre 0 y 1
-                val = max(0.0, min(1.0, val))
-                datos_ia["freno_tren"] = val
-            elif "VirtualBrake" in datos_archivo:
-                try:
-                    vb = self._to_float(datos_archivo.get("VirtualBrake", 0.0))
-                    datos_ia["freno_tren"] = max(0.0, min(1.0, vb))
-                except Exception as e:
-                    print(f"[WARN] VirtualBrake parsing failed: {e}")
-                    import traceback
-
-                    traceback.print_exc()
-        except Exception as e:
-            # No bloquear si hay error; registrar para diagnóstico
-            print(f"[WARN] Error processing brake/virtual brake fields: {e}")
-            import traceback
-
-            traceback.print_exc()
-
-        # Agregar campos que la IA necesita pero que pueden no estar en el archivo
-        datos_ia.setdefault("acelerador", 0.0)
-        datos_ia.setdefault("freno_tren", 0.0)
-        datos_ia.setdefault("freno_motor", 0.0)
-        datos_ia.setdefault("freno_motor_control", 0.0)
-        datos_ia.setdefault("freno_dinamico", 0.0)
-        datos_ia.setdefault("reverser", 1)
-        datos_ia.setdefault("presion_aire", 90.0)
-        datos_ia.setdefault("rpm", 0.0)
-        datos_ia.setdefault("distancia_parada", 1000.0)
-        datos_ia.setdefault("senal_principal", int(self.SIGNAL_UNKNOWN))
-        datos_ia.setdefault("senal_avanzada", int(self.SIGNAL_UNKNOWN))
-        # Normalizar y procesar la señal que vamos a usar en IA/UI: preferimos la señal avanzada si está disponible
-        try:
-            se_av = datos_ia.get("senal_avanzada", None)
-            se_pr = datos_ia.get("senal_principal", None)
-            # Preferir la avanzada si no es UNKNOWN (-1). Si ambas no están, usar UNKNOWN
-            if se_av is not None and se_av != self.SIGNAL_UNKNOWN:
-                datos_ia["senal_procesada"] = int(se_av)
-            elif se_pr is not None and se_pr != self.SIGNAL_UNKNOWN:
-                datos_ia["senal_procesada"] = int(se_pr)
-            else:
-                datos_ia["senal_procesada"] = int(self.SIGNAL_UNKNOWN)
-        except Exception:
-            datos_ia["senal_procesada"] = int(self.SIGNAL_UNKNOWN)
-        # Debug log for signal values (useful to diagnose why signals are -1)
-        try:
-            logger.debug(
-                f"[TSC] SignalAspect={se_pr}, KVB_SignalAspect={se_av}, senal_procesada={datos_ia.get('senal_procesada')}"
-            )
-        except Exception:
-            # Don't crash on logging error
-            pass
-        datos_ia.setdefault("velocimetro_mph", 0.0)
-        datos_ia.setdefault("tipo_velocimetro", 1)
-        # If RPM still zero here, try inferring from Regulator or VirtualThrottle and set flags
-        if datos_ia.get("rpm", 0.0) == 0.0:
-            try:
-                if "Regulator" in datos_archivo and datos_archivo.get("Regulator", 0) is not None:
-                    reg_val = self._to_float(datos_archivo.get("Regulator", 0.0))
-                    if reg_val > 0.0:
-                        datos_ia["rpm"] = reg_val * self.max_engine_rpm
-                        datos_ia["rpm_inferida"] = True
-                elif "VirtualThrottle" in datos_archivo and datos_archivo.get("VirtualThrottle", 0) is not None:
-                    vt = self._to_float(datos_archivo.get("VirtualThrottle", 0.0))
-                    if vt > 0.0:
-                        datos_ia["rpm"] = vt * self.max_engine_rpm
-                        datos_ia["rpm_inferida"] = True
-            except Exception:
-                print("[WARN] RPM inference failed (secondary block): unknown error")
-                import traceback
-
-                traceback.print_exc()
-        # Mapear RPMSource (depuración) si existe en el archivo
-        if "RPMSource" in datos_archivo:
-            datos_ia["rpm_fuente"] = datos_archivo.get("RPMSource")
-        datos_ia.setdefault("distancia_recorrida", 0.0)
-        datos_ia.setdefault("esfuerzo_traccion", 0.0)
-        # Amperaje (A) is the primary metric name; keep 'corriente' and 'amps' as aliases
-        datos_ia.setdefault("amperaje", 0.0)
-        datos_ia.setdefault("corriente", datos_ia.get("amperaje", 0.0))
-        # Normalizar y validar RPM y corriente
-        try:
-            datos_ia["rpm"] = self._to_float(datos_ia.get("rpm", 0.0))
-            if datos_ia["rpm"] < 0:
-                datos_ia["rpm"] = 0.0
-            if datos_ia["rpm"] > 5000:
-                datos_ia["rpm"] = 5000.0
-        except Exception:
-            datos_ia["rpm"] = 0.0
-
-        # Infer RPM from regulator (Regulator -> acelerador) when RPM not provided
-        try:
-            if datos_ia.get("rpm", 0.0) == 0.0:
-                reg = self._to_float(datos_ia.get("acelerador", 0.0))
-                if reg and reg > 0.0:
-                    datos_ia["rpm"] = reg * float(self.max_engine_rpm)
-                    datos_ia["rpm_inferida"] = True
-                else:
-                    datos_ia.setdefault("rpm_inferida", False)
-        except Exception:
-            datos_ia.setdefault("rpm_inferida", False)
-
-        try:
-            datos_ia["amperaje"] = self._to_float(datos_ia.get("amperaje", 0.0))
-            # keep legacy alias
-            datos_ia["corriente"] = datos_ia["amperaje"]
-        except Exception:
-            datos_ia["corriente"] = 0.0
-        # Alias para compatibilidad con front-end y pruebas (amps -> corriente)
-        datos_ia.setdefault("amps", datos_ia.get("amperaje", 0.0))
-        datos_ia.setdefault("deslizamiento_ruedas", 0.0)
-        # Normalizar wheelslip a una intensidad 0..1 compatible entre assets
-        try:
-            raw_ws = self._to_float(datos_ia.get("deslizamiento_ruedas", 0.0))
-            datos_ia["deslizamiento_ruedas_raw"] = raw_ws
-            # Heurística de normalización:
-            # - Si el valor está en 0..1 => es normalizado por asset (0=bueno, 1=máx deslizamiento)
-            # - Si el valor tiene base 1 (1 = normal, >1 = deslizamiento) mapear 1..2 -> 0..1 y 1..3 -> 0..1
-            # - El valor EXACTO 1.0 es ambiguo (puede ser "normal" en assets base-1 o "máx" en assets normalizados)
-            #   Si el valor es exactamente 1.0, se considera ambiguo y la presencia de
-            #   deslizamiento (intensidad = 1.0) se infiere usando heurísticas basadas
-            #   en otros indicadores de telemetría (esfuerzo de tracción, RPM, velocidad).
-            #   Solo si estas heurísticas no sugieren patinamiento, se asume
-            #   conservadoramente "no deslizamiento" (0.0) por defecto.
-            if raw_ws is None:
-                intensity = 0.0
-                interpretation = "missing"
-            elif raw_ws < 1.0:
-                intensity = raw_ws
-                interpretation = "0-1"
-            elif raw_ws == 1.0:
-                # Ambiguo: inferir a partir de otros indicadores conservadores
-                tractive = self._to_float(datos_ia.get("esfuerzo_traccion", 0.0))
-                speed_kmh = self._to_float(datos_ia.get("velocidad_actual", 0.0))
-                rpm_val = self._to_float(datos_ia.get("rpm", 0.0))
-                # Heurísticas que indican posible patinamiento
-                if (speed_kmh < 5.0 and tractive > 300.0) or (
-                    rpm_val > 2000.0 and speed_kmh < 10.0 and tractive > 300.0
-                ):
-                    intensity = 1.0
-                    interpretation = "1.0-inferred-slip"
-                else:
-                    intensity = 0.0
-                    interpretation = "1.0-assumed-normal"
-            elif raw_ws <= 2.0:
-                # Base 1, max 2
-                intensity = max(0.0, min(1.0, raw_ws - 1.0))
-                interpretation = "base-1-max-2"
-            elif raw_ws <= 3.0:
-                # Base 1, max 3 => mapear 1..3 -> 0..1
-                intensity = max(0.0, min(1.0, (raw_ws - 1.0) / 2.0))
-                interpretation = "base-1-max-3"
-            else:
-                # Valores extremos: escalar conservadoramente
-                intensity = max(0.0, min(1.0, (raw_ws - 1.0) / max(1.0, raw_ws)))
-                interpretation = "unknown-large-scale"
-            datos_ia["deslizamiento_ruedas_intensidad"] = round(float(intensity), 3)
-        except Exception:
-            datos_ia.setdefault("deslizamiento_ruedas_intensidad", 0.0)
-            datos_ia.setdefault("deslizamiento_ruedas_raw", datos_ia.get("deslizamiento_ruedas", 0.0))
-
-        # If wheelslip control not present or raw is zero, try to infer from other telemetry
-        try:
-            if datos_ia.get("deslizamiento_ruedas_raw", 0.0) == 0.0:
-                tractive = self._to_float(datos_ia.get("esfuerzo_traccion", 0.0))
-                speed_kmh = self._to_float(datos_ia.get("velocidad_actual", 0.0))
-                rpm_val = self._to_float(datos_ia.get("rpm", 0.0))
-                inferred = 0.0
-                # Heurística simple y conservadora:
-                # - Si la velocidad es baja (<5 km/h) y el esfuerzo de tracción es alto, hay probabilidad de patinamiento.
-                if speed_kmh < 5.0 and tractive > 300.0:
-                    inferred = min(1.0, (tractive - 300.0) / 1000.0)
-                # - Si RPM es alto y la velocidad baja, también puede indicar patinamiento
-                elif rpm_val > 2000.0 and speed_kmh < 10.0 and tractive > 300.0:
-                    inferred = min(1.0, (tractive - 300.0) / 1000.0)
-                if inferred > 0.0:
-                    # Keep higher of observed intensity and inferred
-                    current_int = datos_ia.get("deslizamiento_ruedas_intensidad", 0.0)
-                    datos_ia["deslizamiento_ruedas_intensidad"] = round(max(float(current_int), inferred), 3)
-                    datos_ia["deslizamiento_ruedas_interpretacion"] = (
-                        datos_ia.get("deslizamiento_ruedas_interpretacion", "") + ",inferred_from_tractive".lstrip(',')
-                    )
-                    datos_ia.setdefault("deslizamiento_ruedas_inferida", True)
-        except Exception:
-            # On any error during wheelslip inference, record interpretation if available
-            try:
-                datos_ia["deslizamiento_ruedas_interpretacion"] = interpretation
-            except NameError:
-                datos_ia.setdefault("deslizamiento_ruedas_interpretacion", "unknown")
-            datos_ia.setdefault("deslizamiento_ruedas_intensidad", 0.0)
-            datos_ia.setdefault("deslizamiento_ruedas_raw", datos_ia.get("deslizamiento_ruedas", 0.0))
-        # Brake Pressure Defaults
-        datos_ia.setdefault("presion_tubo_freno", 0.0)
-        datos_ia.setdefault("presion_freno_loco", 0.0)
-        datos_ia.setdefault("presion_freno_tren", 0.0)
-        datos_ia.setdefault("presion_deposito_equalizacion", 0.0)
-        datos_ia.setdefault("presion_deposito_principal", 0.0)
-        datos_ia.setdefault("presion_tubo_freno_mostrada", 0.0)
-        datos_ia.setdefault("presion_deposito_auxiliar", 0.0)
-        datos_ia.setdefault("presion_tubo_freno_cola", 0.0)
-        datos_ia.setdefault("presion_tubo_freno_cola_presente", False)
-        datos_ia.setdefault("presion_freno_loco_mostrada", 0.0)
-        datos_ia.setdefault("presion_freno_loco_avanzada", 0.0)
-        datos_ia.setdefault("presion_freno_tren_inferida", False)
-        # Engine Control Defaults
-        datos_ia.setdefault("freno_mano", 0.0)
-        datos_ia.setdefault("freno_emergencia", 0.0)
-        datos_ia.setdefault("estado_compresor", 0.0)
-        datos_ia.setdefault("posicion_freno_tren", 0.0)
-        datos_ia.setdefault("fecha_hora", datetime.now().isoformat())
-
-        # Fuel telemetry removed: keep compatibility keys but filled with None
-        datos_ia.setdefault("combustible_porcentaje", None)
-        datos_ia.setdefault("combustible_galones", None)
-        datos_ia.setdefault("combustible", None)
-
-        # Presencia de campos: indicar si el archivo GetData.txt contenía ciertos controles
-        datos_ia["presion_tubo_freno_presente"] = "AirBrakePipePressurePSI" in datos_archivo
-        datos_ia["presion_freno_loco_presente"] = "LocoBrakeCylinderPressurePSI" in datos_archivo
-        datos_ia["presion_freno_tren_presente"] = "TrainBrakeCylinderPressurePSI" in datos_archivo
-        datos_ia["presion_deposito_principal_presente"] = "MainReservoirPressurePSIDisplayed" in datos_archivo
-        datos_ia["eq_reservoir_presente"] = "EqReservoirPressurePSIAdvanced" in datos_archivo
-        # Presencia de control TrainBrakeControl o VirtualBrake (control de freno de tren)
-        datos_ia["posicion_freno_tren_presente"] = (
-            "TrainBrakeControl" in datos_archivo or "VirtualBrake" in datos_archivo
-        )
-        datos_ia["presion_freno_loco_avanzada_presente"] = (
-            "LocoBrakeCylinderPressurePSIAdvanced" in datos_archivo
-        )
-        # Flags para valores "mostrados" (display). Algunos mods/locos reportan solo la versión mostrada.
-        datos_ia["presion_tubo_freno_mostrada_presente"] = (
-            "AirBrakePipePressurePSIDisplayed" in datos_archivo
-        )
-        datos_ia["presion_freno_loco_mostrada_presente"] = (
-            "LocoBrakeCylinderPressurePSIDisplayed" in datos_archivo
-        )
-        datos_ia["presion_deposito_auxiliar_presente"] = "AuxReservoirPressure" in datos_archivo
-        datos_ia["presion_tubo_freno_cola_presente"] = "BrakePipePressureTailEnd" in datos_archivo
-
-        # Fallback: algunos mods solo reportan la versión "mostrada" (displayed), usar como backup
-        try:
-            if (
-                datos_ia.get("presion_tubo_freno", 0.0) == 0.0
-                and datos_ia.get("presion_tubo_freno_mostrada", 0.0) != 0.0
-            ):
-                datos_ia["presion_tubo_freno"] = datos_ia.get("presion_tubo_freno_mostrada", 0.0)
-            if (
-                datos_ia.get("presion_freno_loco", 0.0) == 0.0
-                and datos_ia.get("presion_freno_loco_mostrada", 0.0) != 0.0
-            ):
-                datos_ia["presion_freno_loco"] = datos_ia.get("presion_freno_loco_mostrada", 0.0)
-        except Exception:
-            # No fallbacks on exception
-            pass
-
-        # Inferencias si faltan sensores de presión de freno
-        try:
-            # Inferir presion_tubo_freno si no está presente
-            if not datos_ia.get("presion_tubo_freno_presente"):
-                # Basarse en el control de freno (TrainBrakeControl) cuando exista
-                train_brake_cmd = datos_archivo.get("TrainBrakeControl") or datos_archivo.get("VirtualBrake") or 0.0
-                try:
-                    train_brake_cmd = self._to_float(train_brake_cmd)
-                except Exception:
-                    train_brake_cmd = 0.0
-                if train_brake_cmd > 0.5:
-                    datos_ia["presion_tubo_freno"] = 0.0
-                else:
-                    # Suponer valor normal si no frena (conservador)
-                    datos_ia["presion_tubo_freno"] = datos_ia.get("presion_tubo_freno_mostrada", 80.0)
-                datos_ia["presion_tubo_freno_inferida"] = True
-            else:
-                datos_ia.setdefault("presion_tubo_freno_inferida", False)
-
-            # Inferir presion_freno_loco si no está presente
-            if not datos_ia.get("presion_freno_loco_presente"):
-                loco_display = datos_ia.get("presion_freno_loco_mostrada", 0.0)
-                if loco_display != 0.0:
-                    datos_ia["presion_freno_loco"] = loco_display
-                else:
-                    datos_ia["presion_freno_loco"] = 0.0
-                datos_ia["presion_freno_loco_inferida"] = True
-            else:
-                datos_ia.setdefault("presion_freno_loco_inferida", False)
-
-            # Inferir presion_freno_tren si no está presente, en función del TrainBrakeControl / VirtualBrake
-            if not datos_ia.get("presion_freno_tren_presente"):
-                train_brake_val = datos_ia.get("posicion_freno_tren") or datos_archivo.get("TrainBrakeControl") or datos_archivo.get("VirtualBrake") or 0.0
-                try:
-                    train_brake_val = self._to_float(train_brake_val)
-                except Exception:
-                    train_brake_val = 0.0
-                # Heurística conservadora: si el control de freno está parcialmente aplicado,
-                # inferimos una presión de cilindro proporcional a la posición del control.
-                if train_brake_val > 0.0:
-                    datos_ia["presion_freno_tren"] = 30.0 + (train_brake_val * 60.0)  # 30..90 PSI promedio
-                else:
-                    datos_ia["presion_freno_tren"] = datos_ia.get("presion_freno_tren", 0.0)
-                datos_ia["presion_freno_tren_inferida"] = True
-            else:
-                datos_ia.setdefault("presion_freno_tren_inferida", False)
-        except Exception as e:
-            print(f"[WARN] Error inferring brake pressure: {e}")
-            import traceback
-
-            traceback.print_exc()
-
-        return datos_ia
+        return self.conversor.convertir(datos_archivo)
 
     def datos_cambiaron(self, datos_nuevos: Dict[str, Any]) -> bool:
         """
@@ -836,11 +509,28 @@ class TSCIntegration:
 
         self.timestamp_ultima_lectura = tiempo_actual
 
+        # Camino rápido: si el plugin no reescribió GetData.txt desde la última
+        # conversión, devolver el snapshot anterior sin leer ni parsear (con
+        # ``fecha_hora`` de esta lectura, como haría una conversión nueva).
+        # La firma se toma antes de leer para que una escritura concurrente
+        # invalide el snapshot en el siguiente ciclo.
+        firma = self._firma_archivo()
+        if firma is not None and firma == self._firma_snapshot and self._datos_ia_snapshot is not None:
+            self.io_metrics["snapshot_cache_hits"] += 1
+            if tiempo_actual - self.timestamp_ultimo_cambio > 5.0:  # 5 segundos sin cambios = simulador inactivo
+                self.simulador_activo = False
+            datos_ia = dict(self._datos_ia_snapshot)
+            datos_ia["fecha_hora"] = datetime.now().isoformat()
+            return datos_ia
+        self.io_metrics["snapshot_cache_misses"] += 1
+
         # Leer datos del archivo
         datos_archivo = self.leer_datos_archivo()
 
         if not datos_archivo:
             self.simulador_activo = False
+            self._firma_snapshot = None
+            self._datos_ia_snapshot = None
             return None
 
         # Verificar si los datos cambiaron para detectar si el simulador está activo
@@ -860,8 +550,10 @@ class TSCIntegration:
         # SIEMPRE convertir y devolver los datos actuales, incluso si no cambiaron
         # Esto asegura que el dashboard muestre los valores reales en todo momento
         datos_ia = self.convertir_datos_ia(datos_archivo)
+        self._firma_snapshot = firma
+        self._datos_ia_snapshot = datos_ia
 
-        return datos_ia
+        return dict(datos_ia)
 
     def _atomic_write_lines(self, file_path: str, lines: list[str], retries: int = 3, wait: float = 0.1) -> None:
         """Write list of lines to `file_path` atomically using a unique temporary file.
@@ -912,6 +604,7 @@ class TSCIntegration:
                 if attempt > 1:
                     self.io_metrics["write_total_retries"] += (attempt - 1)
                 self.io_metrics["write_last_latency_ms"] = round(elapsed_ms, 3)
+                _LATENCIA_ESCRITURA.observar(elapsed_ms)
                 return
             except Exception as e:
                 last_exc = e
@@ -933,6 +626,7 @@ class TSCIntegration:
         self.io_metrics["write_attempts_last"] = retries
         self.io_metrics["write_total_retries"] += retries
         self.io_metrics["write_last_latency_ms"] = round(elapsed_ms, 3)
+        _FALLOS_ESCRITURA.inc()
         logger.exception("Failed to write file %s after %d attempts", file_path, retries)
         if last_exc is None:
             raise RuntimeError(f"Failed to write file {file_path}")
@@ -943,50 +637,144 @@ class TSCIntegration:
         """
         Enviar comandos de control al juego escribiendo al archivo autopilot_commands.txt.
 
+        La escritura es síncrona. Si el escritor asíncrono está activo, los
+        comandos encolados pendientes se escriben junto con estos (los de esta
+        llamada prevalecen) para que ninguno anterior los sobrescriba después.
+
         Args:
             comandos: Diccionario con comandos a enviar (comandos de texto simples)
 
         Returns:
             True si se enviaron correctamente
         """
+        writer = self.command_writer
+        if writer is not None and writer.activo:
+            return writer.enviar_ahora(comandos)
+        return self._escribir_comandos(comandos)
+
+    def encolar_comandos(
+        self,
+        comandos: Dict[str, Any],
+        al_escribir: Optional[Callable[[bool, Dict[str, Any]], None]] = None,
+    ) -> bool:
+        """Encolar comandos para el escritor asíncrono sin bloquear al llamador.
+
+        Los valores pendientes de un mismo control se sustituyen por el último
+        y cada ventana de flush produce una única escritura.
+
+        Args:
+            comandos: Comandos a escribir
+            al_escribir: Callback ``(resultado, lote)`` tras la escritura real
+
+        Returns:
+            True si los comandos se aceptaron en la cola (no que se escribieran)
+        """
+        if not comandos:
+            return True
+        self.obtener_command_writer().encolar(comandos, al_escribir)
+        return True
+
+    def obtener_command_writer(self) -> CommandWriter:
+        """Escritor asíncrono de comandos de esta integración (arrancado)."""
+        if self.command_writer is None:
+            self.command_writer = CommandWriter(self._escribir_comandos, registro=_registro)
+        self.command_writer.iniciar()
+        return self.command_writer
+
+    def vaciar_comandos(self, timeout: Optional[float] = 2.0) -> Optional[bool]:
+        """Esperar a que se escriban los comandos encolados (resultado de la última escritura)."""
+        if self.command_writer is None:
+            return None
+        return self.command_writer.vaciar(timeout)
+
+    def detener_command_writer(self) -> None:
+        """Escribir los comandos pendientes y detener el hilo escritor."""
+        if self.command_writer is not None:
+            self.command_writer.detener()
+
+    @property
+    def datos_anteriores(self) -> Dict[str, Any]:
+        """Última lectura cruda de GetData.txt (define el perfil de controles)."""
+        return self._datos_anteriores
+
+    @datos_anteriores.setter
+    def datos_anteriores(self, datos: Dict[str, Any]) -> None:
+        if datos.keys() != self._datos_anteriores.keys():
+            # Otro conjunto de controles (cambio de locomotora): usar su perfil.
+            # Copia: _resolver_control amplía el mapeo y el perfil está cacheado
+            perfil = self.perfiles.obtener(datos.keys()) if datos else None
+            self._comandos_perfil = dict(perfil.comandos) if perfil is not None else {}
+            if datos:
+                self.io_metrics["control_profile_changes"] += 1
+        self._datos_anteriores = datos
+
+    def _construir_perfil(self, controles) -> tuple:
+        """Compilar el plan de conversión y los fallbacks de comandos de un perfil."""
+        comandos = {
+            comando: self._resolver_control_perfil(comando, controles)
+            for comando in list(self.mapeo_comandos) + list(FALLBACK_CONTROLES)
+        }
+        return self.conversor.compilar_plan(controles), comandos
+
+    def _resolver_control(self, comando: str) -> str:
+        """Nombre RailDriver de ``comando`` según el perfil de locomotora actual."""
+        resuelto = self._comandos_perfil.get(comando)
+        if resuelto is None:
+            resuelto = self._resolver_control_perfil(comando, self.datos_anteriores.keys())
+            if self.datos_anteriores:
+                self._comandos_perfil[comando] = resuelto
+        return resuelto
+
+    def _resolver_control_perfil(self, comando: str, datos) -> str:
+        comando_raildriver = self.mapeo_comandos.get(comando, comando)
+        if not datos:
+            return comando_raildriver
+        # Fallback heuristics: if sending DynamicBrake but it doesn't exist in latest read, try VirtualEngineBrakeControl
+        if (
+            comando_raildriver == "DynamicBrake"
+            and "DynamicBrake" not in datos
+            and "VirtualEngineBrakeControl" in datos
+        ):
+            logger.info(
+                "[TSC] Fallback using VirtualEngineBrakeControl because DynamicBrake not present in GetData.txt"
+            )
+            return "VirtualEngineBrakeControl"
+        # Generic fallback map for a few critical controls: use the first one present
+        candidatos = FALLBACK_CONTROLES.get(comando_raildriver, ())
+        encontrado = next((c for c in candidatos if c in datos), None)
+        if encontrado and encontrado != comando_raildriver:
+            logger.info(
+                f"[TSC] Fallback mapped '{comando_raildriver}' to '{encontrado}' based on available controls"
+            )
+            return encontrado
+        return comando_raildriver
+
+    def _dentro_banda_muerta(self, control: str, valor: float, ahora: float) -> bool:
+        """True si ``valor`` no se aleja del último valor confirmado de ``control``."""
+        anterior = self.comandos_anteriores.get(control)
+        if anterior is None:
+            return False
+        confirmado = self._comandos_confirmados_ts.get(control, float("-inf"))
+        if ahora - confirmado > self.comandos_refresco_s:
+            return False
+        try:
+            return abs(valor - float(anterior)) <= self.banda_muerta_comandos
+        except (TypeError, ValueError):
+            return False
+
+    def _escribir_comandos(self, comandos: Dict[str, Any]) -> bool:
+        """Traducir y escribir comandos en los archivos de comandos (síncrono)."""
         try:
             # Los comandos ahora son simples strings de texto
             comandos_texto = []
+            # Valor numérico escrito por control, para la banda muerta
+            enviados: Dict[str, float] = {}
+            suprimidos = 0
+            ahora = time.monotonic()
             for comando, valor in comandos.items():
-                # Mapear comando en español a nombre RailDriver si está en mapeo
-                comando_raildriver = self.mapeo_comandos.get(comando, comando)
-                # Fallback heuristics: if sending DynamicBrake but it doesn't exist in latest read, try VirtualEngineBrakeControl
-                if comando_raildriver == "DynamicBrake":
-                    # if we have recent data, prefer the control that exists
-                    if self.datos_anteriores:
-                        if (
-                            "DynamicBrake" not in self.datos_anteriores
-                            and "VirtualEngineBrakeControl" in self.datos_anteriores
-                        ):
-                            comando_raildriver = "VirtualEngineBrakeControl"
-                            logger.info(
-                                "[TSC] Fallback using VirtualEngineBrakeControl because DynamicBrake not present in GetData.txt"
-                            )
-                # Generic fallback map for a few critical controls
-                fallback_map = {
-                    "Regulator": ["Regulator", "VirtualThrottle", "SimpleThrottle"],
-                    "TrainBrakeControl": ["TrainBrakeControl", "VirtualBrake"],
-                    "DynamicBrake": ["DynamicBrake", "VirtualEngineBrakeControl"],
-                }
-                if self.datos_anteriores and comando_raildriver in fallback_map:
-                    candidates = fallback_map[comando_raildriver]
-                    if candidates:
-                        # Use the first available control present in datos_anteriores
-                        found = None
-                        for c in candidates:
-                            if c in self.datos_anteriores:
-                                found = c
-                                break
-                        if found and found != comando_raildriver:
-                            logger.info(
-                                f"[TSC] Fallback mapped '{comando_raildriver}' to '{found}' based on available controls"
-                            )
-                            comando_raildriver = found
+                # Mapear comando en español a nombre RailDriver; los fallbacks según
+                # los controles del asset se resuelven una vez por perfil de locomotora
+                comando_raildriver = self._resolver_control(comando)
                 if isinstance(valor, str):
                     # Permitir cadenas de texto crudas (start/stop autopilot)
                     comandos_texto.append(valor)
@@ -1018,10 +806,14 @@ class TSCIntegration:
                             if val_f is not None:
                                 # Snap to nearest notch for physical/virtual throttle compatibility
                                 snapped = self._snap_to_notch(val_f)
+                                if self._dentro_banda_muerta("Regulator", snapped, ahora):
+                                    suprimidos += 1
+                                    continue
                                 reg_line = f"Regulator:{snapped:.3f}"
                                 vt_line = f"VirtualThrottle:{snapped:.3f}"
                                 comandos_texto.append(reg_line)
                                 comandos_texto.append(vt_line)
+                                enviados["Regulator"] = snapped
                                 commands_line = f"Regulator/VirtualThrottle:{snapped:.3f}"
                             else:
                                 comandos_texto.append(f"Regulator:{valor}")
@@ -1036,9 +828,15 @@ class TSCIntegration:
                                 commands_line = f"{comando_raildriver}:{valor}"
                                 comandos_texto.append(commands_line)
                     else:
+                        if val_f is not None and self._dentro_banda_muerta(
+                            comando_raildriver, val_f, ahora
+                        ):
+                            suprimidos += 1
+                            continue
                         try:
                             commands_line = f"{comando_raildriver}:{float(valor):.3f}"
                             comandos_texto.append(commands_line)
+                            enviados[comando_raildriver] = float(valor)
                         except Exception:
                             commands_line = f"{comando_raildriver}:{valor}"
                             comandos_texto.append(commands_line)
@@ -1049,7 +847,11 @@ class TSCIntegration:
                             f"[TSC] Remapped command '{comando}' -> '{comando_raildriver}': {commands_line}"
                         )
 
+            self.io_metrics["commands_suppressed"] += suprimidos
             if not comandos_texto:
+                if suprimidos:
+                    # Todo dentro de la banda muerta: no se toca ningún archivo
+                    self.io_metrics["command_writes_suppressed"] += 1
                 return True
 
             # If 'start_autopilot' exists but the Lua plugin is not loaded, append fallback control lines
@@ -1165,6 +967,12 @@ class TSCIntegration:
             except Exception as e:
                 logger.warning(f"[TSC] Error handling TSClassic Interface file write: {e}")
 
+            # Valores confirmados: referencia de la banda muerta de los próximos envíos
+            if write_ok:
+                self.comandos_anteriores.update(enviados)
+                for control in enviados:
+                    self._comandos_confirmados_ts[control] = ahora
+
             # If we've reached here, consider the send successful only if the
             # primary write to the Lua commands file succeeded. Auxiliary writes
             # may have failed independently but the main failure is the blocker.
@@ -1191,7 +999,22 @@ class TSCIntegration:
 
     def get_io_metrics(self) -> Dict[str, Any]:
         """Retornar una copia de las métricas I/O actuales."""
-        return dict(self.io_metrics)
+        metricas = dict(self.io_metrics)
+        for clave, valor in self.perfiles.get_metrics().items():
+            metricas[f"loco_profile_{clave}"] = valor
+        if self.command_writer is not None:
+            for clave, valor in self.command_writer.get_metrics().items():
+                metricas[f"command_writer_{clave}"] = valor
+        return metricas
+
+    def obtener_watcher(self) -> TelemetryFileWatcher:
+        """Watcher compartido de GetData.txt que publica snapshots crudos.
+
+        Todos los consumidores del mismo archivo (dashboard, control
+        predictivo, alertas, multi-locomotora) comparten un único hilo de
+        ingesta que despierta con las escrituras del plugin.
+        """
+        return get_telemetry_watcher(self.ruta_archivo, lector=self.leer_datos_archivo)
 
     def conectar(self) -> bool:
         """
@@ -9,6 +9,16 @@ let knownAlertIdToKey = new Map();
 let speedChart;
 let telemetryHistory = [];
 let maxHistoryPoints = 50;
+// Estado reconstruido del stream delta (evento telemetry_stream), por topic:
+// keyframes con el estado completo y deltas con solo lo que cambió. Cada topic
+// llega a su propio ritmo y lleva su propia secuencia
+const STREAM_TOPICS = ['telemetry', 'predictions', 'multi_loco', 'alerts', 'status', 'performance'];
+let streamTopics = {};
+// Formatos del stream que este navegador sabe decodificar, por preferencia:
+// zlib (JSON comprimido con deflate) necesita DecompressionStream
+const STREAM_ENCODINGS = typeof DecompressionStream !== 'undefined' ? ['zlib', 'json'] : ['json'];
+// Los frames zlib se descomprimen de forma asíncrona: la cola conserva el orden
+let streamDecodeQueue = Promise.resolve();
 
 // Inicialización cuando el DOM está listo
 document.addEventListener('DOMContentLoaded', function() {
@@ -121,11 +131,15 @@ function connectWebSocket() {
     socket.on('connect', function() {
         updateConnectionStatus(true);
         showAlert('Conectado al servidor', 'success');
+        // La suscripción responde con un keyframe de cada topic nuevo
+        socket.emit('subscribe_topics', { topics: STREAM_TOPICS, encodings: STREAM_ENCODINGS });
     });
 
     socket.on('disconnect', function() {
         updateConnectionStatus(false);
         showAlert('Desconectado del servidor', 'danger');
+        // Los mensajes perdidos mientras tanto obligan a empezar por un keyframe
+        streamTopics = {};
     });
 
     socket.on('telemetry_update', function(data) {
@@ -137,6 +151,13 @@ function connectWebSocket() {
         }
     });
 
+    socket.on('telemetry_stream', function(message) {
+        streamDecodeQueue = streamDecodeQueue
+            .then(() => decodeStreamMessage(message))
+            .then(handleStreamMessage)
+            .catch(error => console.error('❌ Error decodificando telemetry_stream:', error));
+    });
+
     socket.on('system_message', function(data) {
         showAlert(data.message, data.type);
     });
@@ -161,6 +182,112 @@ function connectWebSocket() {
     });
 }
 
+function streamTopic(topic) {
+    if (!streamTopics[topic]) {
+        streamTopics[topic] = { state: null, seq: null, resyncPending: false };
+    }
+    return streamTopics[topic];
+}
+
+function requestStreamResync(topic) {
+    const entry = streamTopic(topic);
+    if (entry.resyncPending || !socket || !socket.connected) {
+        return;
+    }
+    entry.resyncPending = true;
+    socket.emit('telemetry_resync', { topic: topic, seq: entry.seq });
+    // Volver a pedirlo si el keyframe no llega (p. ej. aún no hay telemetría)
+    setTimeout(() => { entry.resyncPending = false; }, 2000);
+}
+
+// Vista combinada de todos los topics con la forma del antiguo telemetry_update
+function mergedStreamState() {
+    const merged = {};
+    Object.values(streamTopics).forEach(entry => {
+        if (entry.state !== null) {
+            Object.assign(merged, entry.state);
+        }
+    });
+    return merged;
+}
+
+function isPlainObject(value) {
+    return value !== null && typeof value === 'object' && !Array.isArray(value);
+}
+
+// Fusión recursiva del campo `set` de un delta: objeto sobre objeto se fusiona,
+// cualquier otro valor (incluidas listas) reemplaza al anterior
+function mergeStreamDelta(target, changes) {
+    Object.keys(changes).forEach(key => {
+        const value = changes[key];
+        if (isPlainObject(value) && isPlainObject(target[key])) {
+            mergeStreamDelta(target[key], value);
+        } else {
+            target[key] = value;
+        }
+    });
+}
+
+function deleteStreamPath(target, path) {
+    let node = target;
+    for (let i = 0; i < path.length - 1; i++) {
+        node = node[path[i]];
+        if (!isPlainObject(node)) {
+            return;
+        }
+    }
+    delete node[path[path.length - 1]];
+}
+
+// Decodifica un mensaje del stream: los frames binarios (codificación zlib
+// negociada) llegan como ArrayBuffer y se descomprimen; el resto llega ya como objeto
+function decodeStreamMessage(message) {
+    if (!(message instanceof ArrayBuffer)) {
+        return Promise.resolve(message);
+    }
+    const stream = new Blob([message]).stream().pipeThrough(new DecompressionStream('deflate'));
+    return new Response(stream).text().then(JSON.parse);
+}
+
+function handleStreamMessage(message) {
+    if (applyStreamMessage(message) === null) {
+        return;
+    }
+    const state = mergedStreamState();
+    try {
+        updateTelemetry(state);
+    } catch (error) {
+        console.error('❌ Error en updateTelemetry:', error);
+        console.error('❌ Datos recibidos:', state);
+    }
+}
+
+// Aplica un mensaje del stream a su topic y devuelve el estado del topic, o null
+// si hay que esperar a un keyframe (hueco en la secuencia o delta sin estado previo)
+function applyStreamMessage(message) {
+    if (!message || !message.topic) {
+        return null;
+    }
+    const entry = streamTopic(message.topic);
+    if (message.type === 'keyframe') {
+        if (entry.seq !== null && message.seq < entry.seq) {
+            return null;  // respuesta de resync más antigua que lo ya aplicado
+        }
+        entry.state = message.data || {};
+        entry.seq = message.seq;
+        entry.resyncPending = false;
+        return entry.state;
+    }
+    if (entry.state === null || message.base !== entry.seq) {
+        requestStreamResync(message.topic);
+        return null;
+    }
+    mergeStreamDelta(entry.state, message.set || {});
+    (message.del || []).forEach(path => deleteStreamPath(entry.state, path));
+    entry.seq = message.seq;
+    return entry.state;
+}
+
 function setupEventListeners() {
     // Controles de piloto automático
     document.getElementById('start-autopilot').addEventListener('click', () => {
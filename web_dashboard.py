@@ -86,7 +86,7 @@ except ImportError:
 
 logger.info("Imports estándar completados")
 
-from typing import TYPE_CHECKING, Any, cast  # noqa: E402
+from typing import TYPE_CHECKING, Any, Dict, cast  # noqa: E402
 from functools import wraps  # noqa: E402
 
 # Type-only imports for static checking. These avoid creating runtime symbols
@@ -115,7 +115,7 @@ try:
     from flask import Response, jsonify, render_template, request
     # Assign to the public name under Any to avoid Pylance reportAssignmentType
     Flask = cast(Any, _Flask)
-    from flask_socketio import SocketIO, emit  # noqa: E402
+    from flask_socketio import SocketIO, emit, join_room, leave_room  # noqa: E402
     try:
         # Werkzeug BadRequest used when request.get_json() receives malformed JSON
         # Import under an alias to avoid direct assignment of a concrete class to
@@ -407,6 +407,12 @@ except Exception as e:
     def emit(*args, **kwargs):
         pass
 
+    def join_room(*args, **kwargs):
+        pass
+
+    def leave_room(*args, **kwargs):
+        pass
+
 
 # Local imports
 try:
@@ -421,6 +427,7 @@ except ImportError:
     print("[BOOT] Sistema de control directo TSC no disponible")
 
 try:
+    from telemetry_bus import POLITICA_ULTIMO, get_telemetry_bus  # noqa: E402
     from tsc_integration import TSCIntegration  # noqa: E402
 
     TSC_AVAILABLE = True
@@ -428,8 +435,15 @@ try:
 except ImportError:
     TSC_AVAILABLE = False
     TSCIntegration = None
+    get_telemetry_bus = None
+    POLITICA_ULTIMO = None
     print("[BOOT] TSC Integration no disponible")
 
+from cache_engine import get_cache_engine  # noqa: E402
+from metrics_registry import get_metrics_registry  # noqa: E402
+from stream_encoding import StreamEncoder  # noqa: E402
+from telemetry_delta import TelemetryTopicHub  # noqa: E402
+
 # Atomic command writer (simple, robust, no plugin confirmation dependency)
 
 def atomic_write_cmd(dirpath: str, payload: dict) -> str:
@@ -461,17 +475,20 @@ try:
     print("[BOOT] Autopilot system importado")
 
     from performance_monitor import (  # noqa: E402
-        data_compressor,
         latency_optimizer,
         optimize_dashboard_performance,
         performance_monitor,
         record_dashboard_metric,
-        smart_cache,
     )
 
     print("[BOOT] Performance monitor importado")
 
-    from alert_system import check_alerts, get_alert_system  # noqa: E402
+    from alert_system import (  # noqa: E402
+        check_alerts,
+        get_alert_system,
+        get_alert_worker,
+        get_cached_alerts,
+    )
     print("[BOOT] Alert system importado")
 
     from automated_reports import generate_report, get_automated_reports  # noqa: E402
@@ -583,6 +600,7 @@ except Exception:
 
 # Componentes del sistema
 tsc_integration = None
+telemetry_bus = None
 predictive_analyzer = None
 multi_loco_integration = None
 autopilot_system = None
@@ -592,6 +610,13 @@ direct_control = None
 dashboard_active = False
 telemetry_thread = None
 last_telemetry = {}
+# Cambia cada vez que el bucle de telemetría publica un snapshot nuevo
+telemetry_version = 0
+# Stream delta por topics (evento telemetry_stream): cada topic tiene su ritmo,
+# su codificador y una sala Socket.IO con los clientes suscritos
+telemetry_topics = TelemetryTopicHub(registro=get_metrics_registry())
+# Codificación negociada por cliente (JSON, MessagePack o zlib) de ese stream
+stream_encoder = StreamEncoder(registro=get_metrics_registry())
 bokeh_port = None  # Puerto dinámico del servidor Bokeh
 start_time = time.time()  # Tiempo de inicio del servidor
 system_status = {
@@ -608,9 +633,24 @@ system_status = {
 }
 
 # Métricas relacionadas con el plugin Autopilot (visibilidad y reintentos)
-autopilot_metrics = {
-    "retry_total": 0,
-}
+autopilot_metrics = get_metrics_registry().gauge_map(
+    "autopilot_plugin_", "Autopilot plugin metric", {"retry_total": 0}
+)
+
+
+def _autopilot_plugin_up() -> float:
+    """1 si el plugin Autopilot informa 'on' (0 = apagado o desconocido)."""
+    if tsc_integration and tsc_integration.get_autopilot_plugin_state() == "on":
+        return 1.0
+    return 0.0
+
+
+get_metrics_registry().gauge_fn(
+    "dashboard_uptime_seconds", "Uptime of dashboard in seconds", lambda: time.time() - start_time
+)
+get_metrics_registry().gauge_fn(
+    "autopilot_plugin_state_up", "1 if autopilot plugin reports 'on'", _autopilot_plugin_up
+)
 
 # Estado de controles de locomotora
 control_states = {
@@ -685,6 +725,7 @@ def validate_dashboard_config(config):
 def initialize_system():
     """Inicializar todos los componentes del sistema."""
     global tsc_integration, predictive_analyzer, multi_loco_integration, autopilot_system, direct_control
+    global telemetry_bus
 
     logger.info("Comenzando inicialización del sistema...")
     try:
@@ -720,6 +761,9 @@ def initialize_system():
                 assert TSCIntegration is not None
                 tsc_integration = TSCIntegration()
                 system_status["telemetry_source"] = "GetData"
+            # Bus compartido: esta instancia es el único lector de GetData.txt
+            # para el dashboard, el autopilot, las alertas y los reportes
+            telemetry_bus = get_telemetry_bus(tsc_integration)
             print("[OK] Integración TSC inicializada (para telemetría)")
         else:
             print("[WARN] Integración TSC no disponible - no se podrá leer telemetría")
@@ -742,7 +786,7 @@ def initialize_system():
 
         logger.info("Inicializando sistema autopilot...")
         # Inicializar sistema autopilot
-        autopilot_system = AutopilotSystem()
+        autopilot_system = AutopilotSystem(telemetry_bus=telemetry_bus)
         system_status["autopilot_active"] = False  # Inicia detenido
         logger.info("Sistema autopilot inicializado")
         # Cargar la opción autobrake_by_signal del config.ini y aplicarla
@@ -764,8 +808,9 @@ def initialize_system():
 
         logger.info("Inicializando sistema de alertas...")
         # Inicializar sistema de alertas
-        alert_system = get_alert_system()
-        alert_system.start_monitoring(interval_seconds=30)
+        # Las alertas se evalúan en su propio worker sobre el snapshot del
+        # dashboard; el bucle de telemetría solo lee el resumen cacheado
+        get_alert_worker(lambda: last_telemetry).iniciar()
         system_status["alerts_active"] = True
         logger.info("Sistema de alertas inicializado")
 
@@ -788,25 +833,120 @@ def initialize_system():
         return False
 
 
+def build_topic_state(topic: str) -> Dict[str, Any]:
+    """Estado actual de un topic del stream (solo se calcula lo que el topic publica)."""
+    if topic == "telemetry":
+        # La reducción de tamaño la hacen el delta y la codificación negociada
+        return {"telemetry": last_telemetry}
+    if topic == "predictions":
+        # Predicciones cacheadas hasta que el analizador publique otras
+        cached_predictions = response_cache.obtener_o_calcular(
+            "predictions",
+            "current",
+            lambda: predictive_analyzer.get_current_predictions() if predictive_analyzer else {},
+        )
+        return {"predictions": cached_predictions}
+    if topic == "multi_loco":
+        return {
+            "multi_loco": (
+                multi_loco_integration.leer_datos_todas_locomotoras()
+                if multi_loco_integration
+                else {}
+            )
+        }
+    if topic == "alerts":
+        return {"active_alerts": get_cached_alerts()}
+    if topic == "performance":
+        return {
+            "performance": (
+                performance_monitor.get_performance_report() if performance_monitor else {}
+            )
+        }
+    if topic == "status":
+        return {
+            "system_status": system_status,
+            "reports": {"status": "not_available", "last_report": None, "scheduled_reports": []},
+        }
+    raise ValueError(f"Topic desconocido: {topic}")
+
+
+def _alerts_version():
+    """Versión del índice de alertas (cambia al generar o reconocer alertas)."""
+    try:
+        return get_alert_system().alerts.version
+    except Exception:
+        return None
+
+
+def _performance_version():
+    try:
+        return performance_monitor.aggregator.version if performance_monitor else None
+    except Exception:
+        return None
+
+
+# Caché compartida de respuestas de la API y predicciones (LRU + TTL en O(1)).
+# Cada namespace se invalida cuando cambia la versión de sus datos de origen.
+response_cache = get_cache_engine()
+response_cache.configurar("api_status", ttl=1.0, version=lambda: telemetry_version)
+response_cache.configurar(
+    "api_metrics_dashboard",
+    ttl=1.0,
+    version=lambda: (telemetry_version, _performance_version()),
+)
+response_cache.configurar("api_alerts_status", ttl=5.0, version=_alerts_version)
+response_cache.configurar(
+    "predictions",
+    ttl=60.0,
+    version=lambda: getattr(predictive_analyzer, "predictions_version", None),
+)
+
+
+def _emit_histogram(topic: str):
+    """Histograma (registro de métricas) del tiempo de emisión WebSocket de un topic."""
+    return get_metrics_registry().histogram(
+        "dashboard_websocket_emit_ms", "WebSocket emit time per topic in ms", {"topic": topic}
+    )
+
+
 def telemetry_update_loop():
     """Bucle principal de actualización de telemetría."""
-    global last_telemetry, system_status
+    global last_telemetry, system_status, telemetry_version
 
     logger.debug("Iniciando bucle de telemetria")
     update_count = 0
     last_update_time = time.time()
 
+    # Despertar con cada snapshot del bus compartido en lugar de sondear a
+    # 10 Hz; sin cambios se emite un latido cada segundo
+    telemetry_sub = None
+    last_snapshot_time = 0.0
+    if telemetry_bus is not None:
+        try:
+            telemetry_sub = telemetry_bus.subscribe("dashboard", politica=POLITICA_ULTIMO)
+        except Exception as e:
+            logger.warning(f"Bus de telemetría no disponible, usando sondeo fijo: {e}")
+
     while dashboard_active:
+        snapshot = telemetry_sub.get(timeout=1.0) if telemetry_sub is not None else None
         loop_start = time.time()
 
         try:
             # Leer telemetría actual
             if tsc_integration:
-                telemetry = tsc_integration.obtener_datos_telemetria()
-                system_status["simulator_active"] = tsc_integration.simulador_activo
+                if telemetry_sub is not None:
+                    telemetry = dict(snapshot.datos) if snapshot is not None else None
+                    if snapshot is not None:
+                        last_snapshot_time = snapshot.timestamp
+                    # 5 segundos sin escrituras del plugin = simulador inactivo
+                    system_status["simulator_active"] = loop_start - last_snapshot_time < 5.0
+                else:
+                    telemetry = tsc_integration.obtener_datos_telemetria()
+                    system_status["simulator_active"] = tsc_integration.simulador_activo
                 if telemetry:
                     last_telemetry = telemetry
                     last_telemetry["timestamp"] = datetime.now().isoformat()
+                    telemetry_version += 1
                     system_status["telemetry_updates"] += 1
                     update_count += 1
 
@@ -843,68 +983,30 @@ def telemetry_update_loop():
                     # pero esperando datos reales del simulador
                     last_telemetry["timestamp"] = datetime.now().isoformat()
 
-            # Siempre enviar actualización (con datos reales o simulados)
-            if last_telemetry:
-                # Comprimir datos antes de enviar - FASE 4
-                compressed_telemetry = (
-                    data_compressor.compress_data(last_telemetry)
-                    if data_compressor
-                    else last_telemetry
-                )
-
-                # Cache inteligente para predicciones - FASE 4
-                cache_key = f"predictions_{int(time.time() // 60)}"  # Cache por minuto
-                cached_predictions = smart_cache.get(cache_key) if smart_cache else None
-                if cached_predictions is None:
-                    # Obtener predicciones actuales del analizador predictivo
-                    predictions = (
-                        predictive_analyzer.get_current_predictions() if predictive_analyzer else {}
-                    )
-                    cached_predictions = predictions
-                    if smart_cache:
-                        smart_cache.put(cache_key, predictions)
-
-                # Obtener datos de multi-locomotora
-                multi_loco_data = (
-                    multi_loco_integration.leer_datos_todas_locomotoras()
-                    if multi_loco_integration
-                    else {}
-                )
-
-                # Verificar alertas activas
-                active_alerts = check_alerts()
-
-                # Obtener métricas de rendimiento
-                performance_report = (
-                    performance_monitor.get_performance_report()
-                    if performance_monitor
-                    else {}
-                )
-
-                # Obtener estado de reportes
-                reports_status = {
-                    "status": "not_available",
-                    "last_report": None,
-                    "scheduled_reports": [],
-                }
-
+            # Publicar los topics a los que les toca según su ritmo y que
+            # tienen suscriptores; el resto ni siquiera se calcula
+            topics_pendientes = telemetry_topics.pendientes(loop_start) if last_telemetry else []
+            if topics_pendientes:
+                estados = {}
                 # Medir latencia antes de WebSocket emit - FASE 4
                 ws_start = time.time()
 
-                # Emitir actualización vía WebSocket (con manejo seguro)
+                # Emitir actualización vía WebSocket (con manejo seguro): solo los
+                # cambios respecto a la publicación anterior de cada topic
                 try:
-                    socketio.emit(
-                        "telemetry_update",
-                        {
-                            "telemetry": compressed_telemetry,
-                            "predictions": cached_predictions,
-                            "multi_loco": multi_loco_data,
-                            "system_status": system_status,
-                            "active_alerts": active_alerts,
-                            "performance": performance_report,
-                            "reports": reports_status,
-                        },
-                    )
+                    for topic in topics_pendientes:
+                        estados[topic] = build_topic_state(topic)
+                        emit_start = time.perf_counter()
+                        mensaje = telemetry_topics.codificar(topic, estados[topic])
+                        # Una codificación por formato en uso, no una por cliente
+                        for codificacion in stream_encoder.activas():
+                            socketio.emit(
+                                "telemetry_stream",
+                                stream_encoder.codificar(mensaje, codificacion),
+                                to=stream_encoder.sala(telemetry_topics.sala(topic), codificacion),
+                            )
+                        emit_ms = (time.perf_counter() - emit_start) * 1000.0
+                        _emit_histogram(topic).observar(emit_ms)
 
                     # Registrar latencia WebSocket con optimizaciones
                     ws_latency = (time.time() - ws_start) * 1000  # ms
@@ -916,14 +1018,16 @@ def telemetry_update_loop():
                             latency_optimizer.apply_optimization("websocket_batching")
 
                     # Debug: show wheelslip raw and intensity for diagnostic
-                    try:
-                        ws_debug = f"[DEBUG] Wheelslip raw={compressed_telemetry.get('deslizamiento_ruedas_raw')} intensity={compressed_telemetry.get('deslizamiento_ruedas_intensidad')}"
-                        print(ws_debug)
-                    except Exception as e:
-                        print(f"[ERROR] Failed to print wheelslip debug info: {e}")
-                        import traceback
-
-                        traceback.print_exc()
+                    if "telemetry" in estados:
+                        try:
+                            compressed_telemetry = estados["telemetry"]["telemetry"]
+                            ws_debug = f"[DEBUG] Wheelslip raw={compressed_telemetry.get('deslizamiento_ruedas_raw')} intensity={compressed_telemetry.get('deslizamiento_ruedas_intensidad')}"
+                            print(ws_debug)
+                        except Exception as e:
+                            print(f"[ERROR] Failed to print wheelslip debug info: {e}")
+                            import traceback
+
+                            traceback.print_exc()
                     # Ensure system_status reflects performance monitor state
                     try:
                         system_status["performance_monitoring"] = performance_monitor.is_monitoring
@@ -943,18 +1047,20 @@ def telemetry_update_loop():
                         system_status["autopilot_plugin_state"] = None
 
                     # Debug: active alerts payload
-                    try:
-                        active_list = active_alerts.get('alerts') if isinstance(active_alerts, dict) else active_alerts
-                        if isinstance(active_list, list):
-                            print(f"[DEBUG] Active alerts (count) = {len(active_list)}")
-                            print(f"[DEBUG] Active alerts (types) = {[a.get('alert_type') for a in active_list[:10]]}")
-                        else:
-                            print(f"[DEBUG] Active alerts: {active_alerts}")
-                    except Exception as e:
-                        print(f"[ERROR] Failed to print active alerts debug info: {e}")
-                        import traceback
-
-                        traceback.print_exc()
+                    if "alerts" in estados:
+                        try:
+                            active_alerts = estados["alerts"]["active_alerts"]
+                            active_list = active_alerts.get('alerts') if isinstance(active_alerts, dict) else active_alerts
+                            if isinstance(active_list, list):
+                                print(f"[DEBUG] Active alerts (count) = {len(active_list)}")
+                                print(f"[DEBUG] Active alerts (types) = {[a.get('alert_type') for a in active_list[:10]]}")
+                            else:
+                                print(f"[DEBUG] Active alerts: {active_alerts}")
+                        except Exception as e:
+                            print(f"[ERROR] Failed to print active alerts debug info: {e}")
+                            import traceback
+
+                            traceback.print_exc()
                 except Exception as emit_error:
                     print(f"[WS] Error en emit: {emit_error}")
                     print(
@@ -971,7 +1077,8 @@ def telemetry_update_loop():
         if loop_time > 100:  # Solo registrar si excede el intervalo esperado
             record_dashboard_metric("telemetry_loop_time", loop_time)
 
-        time.sleep(0.1)  # 10 Hz
+        if telemetry_sub is None:
+            time.sleep(0.1)  # 10 Hz
 
 
 # Rutas web
@@ -1168,7 +1275,8 @@ def get_control_status():
 @app.route("/api/status")
 def get_system_status():
     """Obtener estado actual del sistema para el dashboard"""
-    try:
+
+    def build():
         # Obtener estado de Bokeh dashboard si está disponible
         bokeh_playback_active = True  # Por defecto activo
         data_points = 0
@@ -1195,7 +1303,7 @@ def get_system_status():
                 ]
             )
 
-        return jsonify(
+        return (
             {
                 "tsc_connected": system_status.get("tsc_connected", False),
                 "playback_active": bokeh_playback_active,
@@ -1221,6 +1329,9 @@ def get_system_status():
                 "autopilot_plugin_state": tsc_integration.get_autopilot_plugin_state() if tsc_integration else None,
             }
         )
+
+    try:
+        return jsonify(response_cache.obtener_o_calcular("api_status", "status", build))
     except Exception as e:
         return (
             jsonify(
@@ -1660,6 +1771,9 @@ def handle_connect():
         import traceback
 
         traceback.print_exc()
+    # Los clientes que no piden topics concretos reciben todos, en JSON
+    stream_encoder.negociar(sid, None)
+    _subscribe_client_topics(sid, telemetry_topics.topics)
 
 
 @socketio.on("disconnect")
@@ -1667,22 +1781,101 @@ def handle_disconnect():
     """Manejar desconexión de cliente WebSocket."""
     sid = getattr(request, "sid", "unknown")  # type: ignore
     print(f"[WS] Cliente desconectado: {sid}")
+    telemetry_topics.desuscribir(sid)
+    stream_encoder.quitar(sid)
+
+
+def _topic_room(sid, topic):
+    """Sala del topic para la codificación negociada por el cliente."""
+    return stream_encoder.sala(telemetry_topics.sala(topic), stream_encoder.codificacion(sid))
+
+
+def _emit_keyframe(sid, topic):
+    mensaje = telemetry_topics.keyframe(topic)
+    if mensaje is not None:
+        emit(
+            "telemetry_stream",
+            stream_encoder.codificar(mensaje, stream_encoder.codificacion(sid)),
+        )
+
+
+def _subscribe_client_topics(sid, topics):
+    """Ajustar las salas del cliente a ``topics`` y enviarle keyframes de los nuevos."""
+    added, removed = telemetry_topics.suscribir(sid, topics)
+    for topic in removed:
+        leave_room(_topic_room(sid, topic))
+    for topic in added:
+        join_room(_topic_room(sid, topic))
+        _emit_keyframe(sid, topic)
+    return added, removed
+
+
+def _negotiate_client_encoding(sid, accepted):
+    """Fijar la codificación del cliente y moverlo a las salas de ese formato."""
+    anteriores = {topic: _topic_room(sid, topic) for topic in telemetry_topics.suscripciones(sid)}
+    stream_encoder.negociar(sid, accepted)
+    for topic, sala in anteriores.items():
+        nueva = _topic_room(sid, topic)
+        if nueva != sala:
+            leave_room(sala)
+            join_room(nueva)
+
+
+@socketio.on("subscribe_topics")
+def handle_subscribe_topics(payload=None):
+    """Elegir los topics del stream que recibe el cliente ({"topics": [...]}).
+
+    Con ``{"encodings": [...]}`` (por preferencia) se negocia además el formato
+    de los mensajes: ``json``, ``msgpack`` o ``zlib``.
+    """
+    sid = getattr(request, "sid", "unknown")  # type: ignore
+    topics = (payload or {}).get("topics")
+    if topics is None:
+        topics = telemetry_topics.topics
+    encodings = (payload or {}).get("encodings")
+    if encodings is not None:
+        _negotiate_client_encoding(sid, encodings)
+    _subscribe_client_topics(sid, topics)
+    emit(
+        "topics_subscribed",
+        {
+            "topics": telemetry_topics.suscripciones(sid),
+            "available": telemetry_topics.topics,
+            "encoding": stream_encoder.codificacion(sid),
+        },
+    )
+
+
+@socketio.on("telemetry_resync")
+def handle_telemetry_resync(payload=None):
+    """Enviar keyframes al cliente que detectó un hueco en un topic o acaba de conectar.
+
+    Con ``{"topic": ...}`` solo se reenvía ese topic; sin él, todos los suscritos.
+    """
+    sid = getattr(request, "sid", "unknown")  # type: ignore
+    topic = (payload or {}).get("topic")
+    topics = [topic] if topic else telemetry_topics.suscripciones(sid)
+    for topic in topics:
+        _emit_keyframe(sid, topic)
 
 
 @socketio.on("request_telemetry")
-def handle_telemetry_request():
-    """Manejar solicitud de telemetría."""
+def handle_telemetry_request(payload=None):
+    """Manejar solicitud de telemetría (``{"topics": [...]}`` limita las secciones)."""
     print("[WS] Solicitud de telemetria recibida")
+    topics = payload.get("topics") if isinstance(payload, dict) else None
     try:
-        # Comprimir datos antes de enviar
-        compressed_telemetry = (
-            data_compressor.compress_data(last_telemetry) if last_telemetry else {}
-        )
-
+        if topics:
+            respuesta = {}
+            for topic in topics:
+                if topic in telemetry_topics.intervalos:
+                    respuesta.update(build_topic_state(topic))
+            emit("telemetry_update", respuesta)
+            return
         emit(
             "telemetry_update",
             {
-                "telemetry": compressed_telemetry,
+                "telemetry": last_telemetry or {},
                 "predictions": (
                     predictive_analyzer.get_current_predictions() if predictive_analyzer else {}
                 ),
@@ -1692,7 +1885,7 @@ def handle_telemetry_request():
                     else {}
                 ),
                 "system_status": system_status,
-                "active_alerts": check_alerts(),
+                "active_alerts": get_cached_alerts(),
                 "performance": (
                     performance_monitor.get_performance_report()
                     if performance_monitor
@@ -1767,18 +1960,19 @@ def bokeh_dashboard():
 @app.route("/api/alerts/status")
 def get_alerts_status():
     """Obtener estado actual del sistema de alertas"""
-    try:
+
+    def build():
         alert_system = get_alert_system()
         status = alert_system.get_alerts_summary()
         active_alerts = alert_system.get_active_alerts()
+        return {
+            "success": True,
+            "status": status,
+            "active_alerts": [alert.to_dict() for alert in active_alerts[:10]],  # Últimas 10
+        }
 
-        return jsonify(
-            {
-                "success": True,
-                "status": status,
-                "active_alerts": [alert.to_dict() for alert in active_alerts[:10]],  # Últimas 10
-            }
-        )
+    try:
+        return jsonify(response_cache.obtener_o_calcular("api_alerts_status", "summary", build))
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -1801,6 +1995,8 @@ def acknowledge_alert(alert_id):
         success = alert_system.acknowledge_alert(alert_id)
 
         if success:
+            get_alert_worker().invalidar()
+            response_cache.invalidar("api_alerts_status")
             return jsonify({"success": True, "message": f"Alerta {alert_id} reconocida"})
         else:
             return jsonify({"success": False, "error": "Alerta no encontrada o ya reconocida"}), 404
@@ -1927,7 +2123,8 @@ def get_optimization_stats():
                 "success": True,
                 "cache": cache_stats,
                 "latency": latency_stats,
-                "compression_enabled": data_compressor.compression_enabled,
+                "compression_enabled": stream_encoder.compresion_habilitada,
+                "stream_encoding": stream_encoder.get_metrics(),
             }
         )
     except ImportError as e:
@@ -1953,10 +2150,11 @@ def toggle_compression():
                 400,
             )
 
-        data_compressor.compression_enabled = enabled
+        # Afecta a las negociaciones siguientes: los clientes ya en zlib siguen en zlib
+        stream_encoder.compresion_habilitada = enabled
 
         return jsonify(
-            {"success": True, "compression_enabled": data_compressor.compression_enabled}
+            {"success": True, "compression_enabled": stream_encoder.compresion_habilitada}
         )
     except Exception as e:
         print(f"[ERROR] Error cambiando estado de compresión: {e}")
@@ -2055,7 +2253,8 @@ def handle_toggle_autobrake(payload):
 @app.route("/api/metrics/dashboard")
 def get_dashboard_metrics():
     """Obtener métricas detalladas del dashboard."""
-    try:
+
+    def build():
         from performance_monitor import performance_monitor
 
         # Obtener métricas del monitor de rendimiento
@@ -2090,7 +2289,10 @@ def get_dashboard_metrics():
                 else None
             ),
         }
+        return metrics
 
+    try:
+        metrics = response_cache.obtener_o_calcular("api_metrics_dashboard", "metrics", build)
         return jsonify({"success": True, "metrics": metrics})
 
     except ImportError as e:
@@ -2119,115 +2321,16 @@ def get_io_metrics_endpoint():
 def prometheus_metrics_endpoint():
     """Export simple Prometheus text metrics (no depende de prometheus_client).
 
-    Exponemos métricas de I/O del TSC integration y métricas básicas del dashboard.
-    Formato: texto plano compatible con el colector Prometheus (type=gauge).
+    Todas las métricas viven en el registro: cada subsistema actualiza sus
+    contadores y gauges donde cambian sus valores y el scrape solo escribe los
+    valores actuales en el buffer preformateado.
     """
     try:
-        lines = []
-        # TSC I/O metrics
-        io = tsc_integration.get_io_metrics() if tsc_integration else {}
-        for k, v in io.items():
-            name = f"tsc_io_{k}"
-            lines.append(f"# HELP {name} TSC I/O metric {k}")
-            lines.append(f"# TYPE {name} gauge")
-            # Ensure numeric formatting
-            try:
-                val = float(v)
-            except Exception:
-                val = 0.0
-            lines.append(f"{name} {val}")
-        # Alert system metrics (if available)
-        try:
-            # Prefer module-level `alert_system` (may be monkeypatched in tests); fallback
-            # to `get_alert_system()` if not present.
-            if 'alert_system' in globals() and globals().get('alert_system'):
-                _as = globals().get('alert_system')
-            else:
-                _as = get_alert_system()
-
-            if _as:
-                a_metrics = getattr(_as, "metrics", {})
-                for k, v in a_metrics.items():
-                    # Avoid double-prefixing metric names if they already include
-                    # the 'alerts_' prefix.
-                    name = k if str(k).startswith("alerts_") else f"alerts_{k}"
-                    lines.append(f"# HELP {name} Alert system metric {k}")
-                    lines.append(f"# TYPE {name} gauge")
-                    try:
-                        val = float(v)
-                    except Exception:
-                        val = 0.0
-                    lines.append(f"{name} {val}")
-        except Exception:
-            # Intentionally ignore errors while collecting alert system metrics.
-            # The alert system may be uninitialized or return non-numeric values; we
-            # prefer to continue returning other metrics rather than failing the
-            # whole /metrics endpoint for a non-critical subsystem.
-            pass
-
-        # Autopilot IA metrics (if available)
-        try:
-            if autopilot_system and getattr(autopilot_system, "ia", None):
-                ia_metrics = getattr(autopilot_system.ia, "metrics", {})
-                for k, v in ia_metrics.items():
-                    name = f"autopilot_ia_{k}"
-                    lines.append(f"# HELP {name} Autopilot IA metric {k}")
-                    lines.append(f"# TYPE {name} gauge")
-                    try:
-                        val = float(v)
-                    except Exception:
-                        val = 0.0
-                    lines.append(f"{name} {val}")
-        except Exception:
-            # Intentionally ignore errors while collecting IA metrics (e.g., IA not initialized
-            # or unexpected metric types). We do not want a problem in metrics collection to
-            # make the /metrics endpoint fail. Log at debug level so we can diagnose if
-            # unexpected errors become frequent in user environments.
-            logger.debug("Ignoring exception while collecting IA metrics", exc_info=True)
-            pass
-
-        # Dashboard uptime
-        uptime = time.time() - globals().get("start_time", time.time())
-        lines.append("# HELP dashboard_uptime_seconds Uptime of dashboard in seconds")
-        lines.append("# TYPE dashboard_uptime_seconds gauge")
-        lines.append(f"dashboard_uptime_seconds {uptime}")
-
-        # Autopilot plugin metrics (reintentos y ACKs faltantes)
-        try:
-            am = globals().get("autopilot_metrics", {})
-            for k, v in am.items():
-                name = f"autopilot_plugin_{k}"
-                lines.append(f"# HELP {name} Autopilot plugin metric {k}")
-                lines.append(f"# TYPE {name} gauge")
-                try:
-                    val = float(v)
-                except Exception:
-                    val = 0.0
-                lines.append(f"{name} {val}")
-        except Exception:
-            # Intentionally ignore errors while collecting autopilot plugin metrics to
-            # ensure /metrics remains available even if plugin metrics are malformed.
-            pass
-
-        # Exponer estado del plugin como métric gauge (1 = on, 0 = off/unknown)
-        try:
-            plugin_state = None
-            if tsc_integration:
-                plugin_state = tsc_integration.get_autopilot_plugin_state()
-            state_val = 1.0 if plugin_state == "on" else 0.0
-            lines.append("# HELP autopilot_plugin_state_up 1 if autopilot plugin reports 'on'")
-            lines.append("# TYPE autopilot_plugin_state_up gauge")
-            lines.append(f"autopilot_plugin_state_up {state_val}")
-        except Exception:
-            pass
-
-        body = "\n".join(lines) + "\n"
-        return Response(body, mimetype="text/plain; version=0.0.4")
+        return Response(get_metrics_registry().render(), mimetype="text/plain; version=0.0.4")
     except Exception as e:
         logger.exception("Error producing prometheus metrics: %s", e)
         return Response("", status=500, mimetype="text/plain")
 
-
 def start_bokeh_server():
     """Iniciar el servidor Bokeh en un hilo separado."""
     try:
@@ -2348,7 +2451,7 @@ def start_dashboard(host="127.0.0.1", port=5001):
     print("[DASHBOARD] Hilo de telemetría iniciado")
 
     print("[OK] Dashboard iniciado exitosamente")
-    print("[DATA] Telemetria actualizandose cada 100ms")
+    print("[DATA] Telemetria actualizandose con cada escritura de GetData.txt")
     print("[LINK] Abre tu navegador en la URL mostrada arriba")
     print("=" * 60)
 
@@ -2388,6 +2491,11 @@ def start_dashboard(host="127.0.0.1", port=5001):
             )
             predictive_analyzer.stop_analysis()
 
+        get_alert_worker().detener()
+        get_alert_system().journal.cerrar()
+        if tsc_integration is not None:
+            tsc_integration.detener_command_writer()
+
         # Detener monitoreo de rendimiento y guardar reporte
         print("[PERF] Deteniendo monitoreo de rendimiento...")
         performance_monitor.stop_monitoring()
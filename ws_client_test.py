@@ -1,32 +1,67 @@
 #!/usr/bin/env python3
 """
 ws_client_test.py
-Cliente de prueba que se conecta al servidor Socket.IO local y muestra events `telemetry_update`.
+Cliente de prueba que se conecta al servidor Socket.IO local y muestra la telemetría.
+
+Se suscribe a los topics del stream (`subscribe_topics`) y reconstruye el estado
+a partir de los keyframes y deltas de `telemetry_stream`, pidiendo un keyframe
+(`telemetry_resync`) cuando detecta un hueco. Las respuestas a `request_telemetry`
+siguen llegando como `telemetry_update`.
 """
 import argparse
 import os
 import time
-from typing import Optional
+from typing import Dict, Optional
 
 import socketio
 
+from telemetry_delta import TelemetryDeltaDecoder
+
 # Default server URL - changed to 5001 (dashboard default uses 5001)
 SERVER_URL = os.environ.get("TSA_SERVER_URL", "http://localhost:5001")
 
+# Topics del stream que muestra el cliente
+STREAM_TOPICS = ["telemetry", "alerts"]
+
 sio: Optional[socketio.Client] = None
+# Estado reconstruido de cada topic del stream
+decoders: Dict[str, TelemetryDeltaDecoder] = {}
 
 
 def connect():
     print("[CLIENT] Connected to server")
-    # solicitar telemetría inmediata
+    # Suscribirse al stream: el servidor responde con un keyframe por topic
     try:
         if sio:
-            sio.emit("request_telemetry")
-            print("[CLIENT] Emitted request_telemetry")
+            sio.emit("subscribe_topics", {"topics": STREAM_TOPICS, "encodings": ["json"]})
+            print(f"[CLIENT] Emitted subscribe_topics {STREAM_TOPICS}")
         else:
             print("[CLIENT] Socket.IO client not available")
     except Exception as e:
-        print("[CLIENT] Error emitting request_telemetry:", e)
+        print("[CLIENT] Error emitting subscribe_topics:", e)
+
+
+def on_topics_subscribed(data):
+    print("[CLIENT] topics_subscribed:", data)
+
+
+def on_telemetry_stream(message):
+    """Aplicar un keyframe o delta del stream y mostrar el estado combinado."""
+    if not isinstance(message, dict) or not message.get("topic"):
+        print("[CLIENT] telemetry_stream message not understood:", type(message).__name__)
+        return
+    topic = message["topic"]
+    decoder = decoders.setdefault(topic, TelemetryDeltaDecoder())
+    if decoder.aplicar(message) is None:
+        if sio:
+            sio.emit("telemetry_resync", {"topic": topic})
+        print(f"[CLIENT] Gap in topic {topic}; requested keyframe")
+        return
+    if topic == "telemetry":
+        estado = {}
+        for d in decoders.values():
+            estado.update(d.estado or {})
+        on_telemetry_update(estado)
 
 
 def disconnect():
@@ -100,6 +135,8 @@ def main(listen_seconds: float = 10.0):
     # Configurar event handlers
     sio.on("connect", connect)
     sio.on("disconnect", disconnect)
+    sio.on("topics_subscribed", on_topics_subscribed)
+    sio.on("telemetry_stream", on_telemetry_stream)
     sio.on("telemetry_update", on_telemetry_update)
     sio.on("system_message", on_system_message)
 